@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# SPDX-License-Identifier: GPL-2.0-or-later
+"""
+An IBus input method which provides ``org.nerd_dictation.TextInput1`` for ``--simulate-input-tool=DBUS``.
+
+Neither IBus nor Fcitx5 allow other processes to commit text,
+so this input method commits the text it receives over D-Bus to the focused application.
+Keys are passed through to the application unchanged.
+
+Requires IBus & PyGObject (with the IBus introspection data, e.g. ``gir1.2-ibus-1.0`` or ``ibus`` packages).
+
+Usage::
+
+   ./nerd-dictation-ibus.py &
+   ibus engine nerd-dictation
+   nerd-dictation begin --simulate-input-tool=DBUS
+
+Switch back to your usual input method afterwards, e.g. ``ibus engine pinyin``.
+This isn't supported by Fcitx5 (which doesn't load IBus input methods),
+use ``--simulate-input-tool=YDOTOOL_CLIPBOARD`` there instead.
+"""
+import sys
+
+import gi
+
+gi.require_version("IBus", "1.0")
+from gi.repository import GLib, GObject, Gio, IBus  # noqa: E402
+
+ENGINE_NAME = "nerd-dictation"
+
+TEXT_INPUT_NAME = "org.nerd_dictation.TextInput1"
+TEXT_INPUT_PATH = "/org/nerd_dictation/TextInput1"
+TEXT_INPUT_XML = """
+<node>
+  <interface name="org.nerd_dictation.TextInput1">
+    <method name="SetPreedit">
+      <arg type="s" name="text" direction="in"/>
+    </method>
+    <method name="Commit">
+      <arg type="i" name="delete_chars" direction="in"/>
+      <arg type="s" name="text" direction="in"/>
+    </method>
+  </interface>
+</node>
+"""
+
+# The engine of the input context with focus (None when there is none).
+engine_focused = None
+
+
+class Engine(IBus.Engine):
+    __gtype_name__ = "NerdDictationEngine"
+
+    def do_focus_in(self):
+        global engine_focused
+        engine_focused = self
+
+    def do_focus_out(self):
+        global engine_focused
+        if engine_focused is self:
+            engine_focused = None
+
+    def do_process_key_event(self, keyval, keycode, state):
+        # Not handled, the application receives the key.
+        return False
+
+
+def text_input_method_call(connection, sender, path, interface, method, parameters, invocation):
+    engine = engine_focused
+    if engine is None:
+        invocation.return_dbus_error("org.nerd_dictation.Error.NoFocus", "No input has focus")
+        return
+
+    if method == "SetPreedit":
+        (text,) = parameters.unpack()
+        engine.update_preedit_text(IBus.Text.new_from_string(text), len(text), bool(text))
+    elif method == "Commit":
+        delete_chars, text = parameters.unpack()
+        engine.update_preedit_text(IBus.Text.new_from_string(""), 0, False)
+        if delete_chars:
+            engine.delete_surrounding_text(-delete_chars, delete_chars)
+        if text:
+            engine.commit_text(IBus.Text.new_from_string(text))
+    invocation.return_value(None)
+
+
+def main():
+    IBus.init()
+    bus = IBus.Bus()
+    if not bus.is_connected():
+        sys.stderr.write("IBus is not running.\n")
+        sys.exit(1)
+
+    factory = IBus.Factory.new(bus.get_connection())
+    factory.add_engine(ENGINE_NAME, GObject.type_from_name("NerdDictationEngine"))
+
+    component = IBus.Component(
+        name="org.freedesktop.IBus.NerdDictation",
+        description="Text input from nerd-dictation",
+        version="1.0",
+        license="GPL",
+        author="",
+        homepage="https://github.com/ideasman42/nerd-dictation",
+        command_line="",
+        textdomain="",
+    )
+    component.add_engine(
+        IBus.EngineDesc(
+            name=ENGINE_NAME,
+            longname="Nerd Dictation",
+            description="Text input from nerd-dictation",
+            language="other",
+            license="GPL",
+            author="",
+            icon="",
+            layout="default",
+        )
+    )
+    bus.register_component(component)
+
+    loop = GLib.MainLoop()
+    interface_info = Gio.DBusNodeInfo.new_for_xml(TEXT_INPUT_XML).interfaces[0]
+
+    def bus_acquired(connection, name):
+        connection.register_object(TEXT_INPUT_PATH, interface_info, text_input_method_call, None, None)
+
+    def name_lost(connection, name):
+        sys.stderr.write("Unable to own {:s} (already running?)\n".format(name))
+        loop.quit()
+
+    Gio.bus_own_name(Gio.BusType.SESSION, TEXT_INPUT_NAME, Gio.BusNameOwnerFlags.NONE, bus_acquired, None, name_lost)
+    bus.connect("disconnected", lambda _bus: loop.quit())
+    loop.run()
+
+
+if __name__ == "__main__":
+    main()
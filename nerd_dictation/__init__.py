@@ -0,0 +1,26 @@
+# SPDX-License-Identifier: GPL-2.0-or-later
+
+"""
+Offline speech to text for desktop Linux.
+
+- ``core``: dictation (the ``begin`` sub-command) & the command line interface.
+- ``control``: sub-commands which control a running dictation process (``end``, ``suspend`` .. etc),
+  these don't import ``core`` so hot-keys respond quickly.
+- ``number_parsing``: converting numbers written as words into digits.
+- ``api``: recognition for use from Python (the ``Dictation`` class), without signals or simulating input.
+"""
+
+from __future__ import annotations
+
+import sys
+
+
+def main(argv: list[str] | None = None) -> None:
+    from . import control
+
+    if control.main_fast(sys.argv[1:] if argv is None else argv):
+        return
+
+    from . import core
+
+    core.main(argv)
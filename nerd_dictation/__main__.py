@@ -0,0 +1,7 @@
+# SPDX-License-Identifier: GPL-2.0-or-later
+
+# Support running as: `python -m nerd_dictation`.
+
+from nerd_dictation import main
+
+main()
@@ -0,0 +1,271 @@
+# SPDX-License-Identifier: GPL-2.0-or-later
+
+"""
+Speech recognition for use from Python (without the command line interface).
+
+Audio (16-bit mono PCM) is passed in or read from a recording command, recognized text is returned as events.
+Nothing global is changed: no signal handlers are installed, input isn't simulated & the process isn't exited.
+
+Example::
+
+    from nerd_dictation.api import EVENT_FINAL, Dictation, capture_chunks
+
+    with Dictation("/path/to/vosk-model") as dictation:
+        for event in dictation.events(capture_chunks()):
+            if event.kind == EVENT_FINAL:
+                print(event.text)
+"""
+
+import os
+import subprocess
+import time
+
+from typing import (
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+)
+
+from .core import (
+    Engine,
+    PolyphaseResampler,
+    engine_class_from_name,
+    recording_cmd_or_none,
+)
+
+# The text of the current segment (which may still change).
+EVENT_PARTIAL = "partial"
+# The text of a segment which won't change.
+EVENT_FINAL = "final"
+# The end of speech was detected (follows the final event of the segment).
+EVENT_ENDPOINT = "endpoint"
+
+
+class DictationEvent:
+    """
+    Recognized text, times are in seconds.
+    """
+
+    __slots__ = (
+        "kind",
+        "text",
+        "segment",
+        "audio_start",
+        "audio_end",
+        "decode_seconds",
+    )
+
+    def __init__(
+        self, kind: str, text: str, segment: int, audio_start: float, audio_end: float, decode_seconds: float
+    ) -> None:
+        # One of: `EVENT_PARTIAL`, `EVENT_FINAL`, `EVENT_ENDPOINT`.
+        self.kind = kind
+        self.text = text
+        # Segments are numbered from zero, a new segment starts after each final event.
+        self.segment = segment
+        # The segment's start & the end of the audio recognized so far (offsets from the start of the audio).
+        self.audio_start = audio_start
+        self.audio_end = audio_end
+        # The time taken to recognize the audio which produced this event.
+        self.decode_seconds = decode_seconds
+
+    def __repr__(self) -> str:
+        return "DictationEvent({:s}, {!r}, segment={:d}, audio={:.2f}-{:.2f})".format(
+            self.kind, self.text, self.segment, self.audio_start, self.audio_end
+        )
+
+
+# -----------------------------------------------------------------------------
+# Dictation
+#
+
+
+class Dictation:
+    """
+    Recognize speech with a single engine (``"vosk"``, ``"sherpa"``, ``"sherpa-offline"`` or ``MODULE:CLASS``,
+    see ``--engine``)
+    from audio which is passed in, 16-bit signed mono PCM (native byte order) at ``sample_rate``.
+
+    Errors are raised (``FileNotFoundError`` for a missing model, ``ValueError`` for an unknown engine).
+    """
+
+    __slots__ = (
+        "sample_rate",
+        "_engine",
+        "_resampler",
+        "_segment",
+        "_segment_start",
+        "_audio_seconds",
+        "_text_partial",
+    )
+
+    def __init__(
+        self,
+        model_dir: str,
+        *,
+        engine: str = "vosk",
+        sample_rate: int = 16000,
+        vosk_grammar_file: str = "",
+        hotwords_file: str = "",
+        hotwords_score: float = 0.5,
+        route_model_dirs: Optional[List[str]] = None,
+        vad_model: str = "",
+        decode_workers: int = 2,
+        verbose: int = 0,
+    ) -> None:
+        if not os.path.isdir(model_dir):
+            raise FileNotFoundError("Model not found: {:s}".format(model_dir))
+        self.sample_rate = sample_rate
+        self._engine: Engine = engine_class_from_name(engine)(
+            model_dir,
+            sample_rate=sample_rate,
+            verbose=verbose,
+            options=dict(
+                vosk_grammar_file=vosk_grammar_file,
+                hotwords_file=hotwords_file,
+                hotwords_score=hotwords_score,
+                route_model_dirs=route_model_dirs or [],
+                vad_model=vad_model,
+                decode_workers=decode_workers,
+            ),
+        )
+        self._engine.start(self._engine.load(model_dir))
+        sample_rate_engine = self._engine.sample_rate
+        # Engines which use a different sample rate are passed resampled audio.
+        self._resampler = (
+            PolyphaseResampler(sample_rate, sample_rate_engine) if sample_rate_engine != sample_rate else None
+        )
+        self._segment = 0
+        self._segment_start = 0.0
+        self._audio_seconds = 0.0
+        # Only report partial text when it changes.
+        self._text_partial = ""
+
+    def __enter__(self) -> "Dictation":
+        return self
+
+    def __exit__(self, *_args: Any) -> None:
+        self.close()
+
+    def _convert(self, data: bytes) -> bytes:
+        # Convert to the engine's sample type & rate (when they differ).
+        if self._resampler is None and self._engine.sample_dtype == "int16":
+            return data
+        import numpy as np
+
+        samples = np.frombuffer(data, dtype=np.int16).astype(np.float32) / 32768.0
+        if self._resampler is not None:
+            samples = self._resampler.process(samples)
+        if self._engine.sample_dtype == "int16":
+            return bytes((samples * 32768.0).clip(-32768.0, 32767.0).astype(np.int16).tobytes())
+        return bytes(samples.astype(np.float32).tobytes())
+
+    def _segment_end(self, text: str, endpoint: bool, decode_seconds: float) -> List[DictationEvent]:
+        events = []
+        if text:
+            events.append(
+                DictationEvent(
+                    EVENT_FINAL, text, self._segment, self._segment_start, self._audio_seconds, decode_seconds
+                )
+            )
+            if endpoint:
+                events.append(
+                    DictationEvent(EVENT_ENDPOINT, "", self._segment, self._segment_start, self._audio_seconds, 0.0)
+                )
+            self._segment += 1
+        self._segment_start = self._audio_seconds
+        self._text_partial = ""
+        return events
+
+    def accept_audio(self, data: bytes) -> List[DictationEvent]:
+        """
+        Recognize ``data``, returning the events it produced.
+        """
+        time_beg = time.perf_counter()
+        if self._engine.accept(self._convert(data)):
+            text_final: Optional[str] = self._engine.final()
+            text_partial = ""
+        else:
+            text_final = None
+            text_partial = self._engine.partial()
+        decode_seconds = time.perf_counter() - time_beg
+        self._audio_seconds += len(data) / (self.sample_rate * 2)
+
+        if text_final is not None:
+            return self._segment_end(text_final, True, decode_seconds)
+        if not text_partial or text_partial == self._text_partial:
+            return []
+        self._text_partial = text_partial
+        return [
+            DictationEvent(
+                EVENT_PARTIAL, text_partial, self._segment, self._segment_start, self._audio_seconds, decode_seconds
+            )
+        ]
+
+    def finish(self) -> List[DictationEvent]:
+        """
+        End the current segment (when the audio ends), returning it's final event (when there is text).
+        """
+        time_beg = time.perf_counter()
+        text = self._engine.final()
+        return self._segment_end(text, False, time.perf_counter() - time_beg)
+
+    def events(self, chunks: Iterable[bytes]) -> Iterator[DictationEvent]:
+        """
+        Recognize each chunk of audio, yielding events as they're produced
+        (finishing the segment once there are no more chunks).
+        """
+        for data in chunks:
+            yield from self.accept_audio(data)
+        yield from self.finish()
+
+    async def events_async(self, chunks: AsyncIterable[bytes]) -> AsyncIterator[DictationEvent]:
+        """
+        Asynchronous ``events``, recognition runs on the default executor so the event loop isn't blocked.
+        """
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        async for data in chunks:
+            for event in await loop.run_in_executor(None, self.accept_audio, data):
+                yield event
+        for event in await loop.run_in_executor(None, self.finish):
+            yield event
+
+    def close(self) -> None:
+        self._engine.close()
+
+
+# -----------------------------------------------------------------------------
+# Recording
+#
+
+
+def capture_chunks(
+    input_method: str = "PAREC",
+    sample_rate: int = 16000,
+    pulse_device_name: str = "",
+    chunk_seconds: float = 0.1,
+) -> Iterator[bytes]:
+    """
+    Record audio (as ``--input`` does), yielding chunks of ``chunk_seconds`` until the generator is closed.
+    """
+    cmd = recording_cmd_or_none(input_method, sample_rate, pulse_device_name)
+    if cmd is None:
+        raise ValueError("Unknown input method {!r}, expected one of: PAREC, SOX, PW-CAT".format(input_method))
+    chunk_size = int(sample_rate * chunk_seconds) * 2
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE)
+    assert proc.stdout is not None
+    try:
+        while True:
+            data = proc.stdout.read(chunk_size)
+            if not data:
+                break
+            yield data
+    finally:
+        proc.terminate()
+        proc.wait()
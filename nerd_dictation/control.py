@@ -0,0 +1,420 @@
+# SPDX-License-Identifier: GPL-2.0-or-later
+
+"""
+Sub-commands which control a running dictation process:
+``end``, ``cancel``, ``suspend``, ``resume``, ``grammar``, ``model`` & ``status``,
+as well as ``prefetch`` which reads models into memory ahead of ``begin``.
+
+These are typically bound to hot-keys (or run on login), so they must start quickly.
+Only modules already loaded by Python's start-up are imported here
+(``argparse``, ``tempfile`` & ``typing`` each take milliseconds to import, ``signal`` only when a signal is sent),
+anything else (including ``--help``) is handled by the full command line parser in ``core``.
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+
+# Instead of importing ``typing`` (type checkers treat this as true).
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+TEMP_COOKIE_NAME = "nerd-dictation.cookie"
+
+USER_CONFIG_DIR = "nerd-dictation"
+
+
+# -----------------------------------------------------------------------------
+# General Utilities
+#
+
+
+def touch(filepath: str, mtime: int | None = None) -> None:
+    if os.path.exists(filepath):
+        os.utime(filepath, None if mtime is None else (mtime, mtime))
+    else:
+        with open(filepath, "ab") as _:
+            pass
+        if mtime is not None:
+            try:
+                os.utime(filepath, (mtime, mtime))
+            except FileNotFoundError:
+                pass
+
+
+def file_remove_if_exists(filepath: str) -> bool:
+    try:
+        os.remove(filepath)
+        return True
+    except OSError:
+        return False
+
+
+def calc_user_config_path(rest: str | None) -> str:
+    """
+    Path to the user's configuration directory.
+    """
+    base = os.environ.get("XDG_CONFIG_HOME")
+    if base is None:
+        base = os.path.expanduser("~")
+        if os.name == "posix":
+            base = os.path.join(base, ".config")
+
+    base = os.path.join(base, USER_CONFIG_DIR)
+    if rest:
+        base = os.path.join(base, rest)
+    return base
+
+
+def path_to_cookie_default() -> str:
+    # Matches the directory `tempfile.gettempdir()` uses (without importing `tempfile`),
+    # only differing when the directory isn't writable, where the cookie couldn't be written anyway.
+    for env_var in ("TMPDIR", "TEMP", "TMP"):
+        dirname = os.environ.get(env_var)
+        if dirname:
+            break
+    else:
+        dirname = "/tmp"
+    return os.path.join(os.path.abspath(dirname), TEMP_COOKIE_NAME)
+
+
+def pid_from_cookie_or_none(path_to_cookie: str, verbose: int) -> int | None:
+    if not os.path.exists(path_to_cookie):
+        if verbose >= 1:
+            sys.stderr.write("No running nerd-dictation cookie found at: {:s}, abort!\n".format(path_to_cookie))
+        return None
+
+    with open(path_to_cookie, "r", encoding="utf-8") as fh:
+        data = fh.read()
+    try:
+        pid = int(data)
+    except Exception as ex:
+        if verbose >= 1:
+            sys.stderr.write("Failed to read PID with error {!r}, abort!\n".format(ex))
+        return None
+    return pid
+
+
+def path_to_request_from_cookie(path_to_cookie: str) -> str:
+    return path_to_cookie + ".request"
+
+
+def request_write(path_to_cookie: str, request: str) -> None:
+    """
+    Write a request for the running process to handle (notified with ``SIGUSR2``).
+    """
+    path_to_request = path_to_request_from_cookie(path_to_cookie)
+    # Write & rename so the process never reads a partially written request.
+    with open(path_to_request + ".tmp", "w", encoding="utf-8") as fh:
+        fh.write(request)
+    os.replace(path_to_request + ".tmp", path_to_request)
+
+
+def request_read_or_none(path_to_cookie: str) -> str | None:
+    """
+    Read & remove the request written by ``request_write``.
+    """
+    path_to_request = path_to_request_from_cookie(path_to_cookie)
+    try:
+        with open(path_to_request, "r", encoding="utf-8") as fh:
+            request = fh.read()
+    except FileNotFoundError:
+        return None
+    file_remove_if_exists(path_to_request)
+    return request
+
+
+# -----------------------------------------------------------------------------
+# Sub-Commands
+#
+
+
+def main_end(
+    *,
+    path_to_cookie: str = "",
+) -> None:
+    if not path_to_cookie:
+        path_to_cookie = path_to_cookie_default()
+
+    # Resume (does nothing if not suspended), so suspending doesn't prevent the cancel operation.
+    main_suspend(path_to_cookie=path_to_cookie, suspend=False, verbose=0)
+
+    touch(path_to_cookie)
+
+
+def main_cancel(
+    *,
+    path_to_cookie: str = "",
+) -> None:
+    if not path_to_cookie:
+        path_to_cookie = path_to_cookie_default()
+
+    # Resume (does nothing if not suspended), so suspending doesn't prevent the cancel operation.
+    main_suspend(path_to_cookie=path_to_cookie, suspend=False, verbose=0)
+
+    file_remove_if_exists(path_to_cookie)
+
+
+def main_suspend(
+    *,
+    path_to_cookie: str = "",
+    suspend: bool,
+    verbose: int,
+) -> None:
+    # lazy import: `signal` is only needed when signaling the running process.
+    from signal import SIGCONT, SIGUSR1
+
+    if not path_to_cookie:
+        path_to_cookie = path_to_cookie_default()
+
+    pid = pid_from_cookie_or_none(path_to_cookie, verbose)
+    if pid is None:
+        return
+
+    if suspend:
+        os.kill(pid, SIGUSR1)
+    else:  # Resume.
+        os.kill(pid, SIGCONT)
+
+
+def request_send(path_to_cookie: str, request: str, verbose: int) -> None:
+    """
+    Write a request & notify the running process.
+    """
+    # lazy import: `signal` is only needed when signaling the running process.
+    from signal import SIGUSR2
+
+    if not path_to_cookie:
+        path_to_cookie = path_to_cookie_default()
+
+    pid = pid_from_cookie_or_none(path_to_cookie, verbose)
+    if pid is None:
+        return
+
+    request_write(path_to_cookie, request)
+    os.kill(pid, SIGUSR2)
+
+
+def main_grammar(
+    *,
+    path_to_cookie: str = "",
+    name: str,
+    verbose: int,
+) -> None:
+    """
+    Switch the running process to the grammar profile ``name`` (at the next end-point).
+    """
+    request_send(path_to_cookie, "grammar " + name, verbose)
+
+
+def main_model(
+    *,
+    path_to_cookie: str = "",
+    name: str,
+    verbose: int,
+) -> None:
+    """
+    Swap the running process to the ``primary`` or ``alternate`` model (at the next end-point),
+    ``auto`` to swap automatically (see ``begin --model-swap-dir``).
+    """
+    request_send(path_to_cookie, "model " + name, verbose)
+
+
+def main_status(
+    *,
+    path_to_cookie: str = "",
+    metrics_file: str = "",
+) -> None:
+    """
+    Print the state of the running process (and it's metrics when available) to the standard output.
+    """
+    if not path_to_cookie:
+        path_to_cookie = path_to_cookie_default()
+
+    pid = pid_from_cookie_or_none(path_to_cookie, 0)
+    process_state = None
+    if pid is not None:
+        try:
+            with open("/proc/{:d}/status".format(pid), "r", encoding="utf-8") as fh:
+                for line in fh:
+                    if line.startswith("State:"):
+                        process_state = line.partition(":")[2].strip()
+                        break
+        except FileNotFoundError:
+            pass
+
+    if pid is None or process_state is None:
+        sys.stdout.write("state: not running\n")
+        sys.exit(1)
+
+    sys.stdout.write("pid: {:d}\n".format(pid))
+    sys.stdout.write("process: {:s}\n".format(process_state))
+
+    if not metrics_file:
+        return
+    try:
+        with open(metrics_file, "r", encoding="utf-8") as fh:
+            metrics_text = fh.read()
+    except FileNotFoundError:
+        sys.stderr.write("Metrics not found at: {:s}\n".format(metrics_file))
+        return
+
+    prefix = "nerd_dictation_"
+    for line in metrics_text.splitlines():
+        if line.startswith("#") or not line.startswith(prefix):
+            continue
+        key, _, value = line[len(prefix) :].rpartition(" ")
+        if key.startswith("state{"):
+            if value == "1":
+                sys.stdout.write("state: {:s}\n".format(key.split('"')[1]))
+            continue
+        sys.stdout.write("{:s}: {:s}\n".format(key, value))
+
+
+def main_prefetch(
+    *,
+    paths: list[str],
+    lock: bool = False,
+    verbose: int = 0,
+) -> None:
+    """
+    Read the model files in ``paths`` into the page cache (the model in the configuration directory by default),
+    so ``begin`` doesn't read them from the disk.
+
+    When ``lock`` is set the files are kept in memory until this process is terminated.
+    """
+    import time
+
+    # lazy import: `ctypes` is only needed for prefetching.
+    from . import page_cache
+
+    if not paths:
+        paths = [calc_user_config_path("model")]
+    for path in paths:
+        if not os.path.exists(path):
+            sys.stderr.write("Model not found: {!r}.\n".format(path))
+            sys.exit(1)
+
+    files = page_cache.paths_files(paths)
+
+    cached_text = ""
+    if verbose >= 1:
+        cached = page_cache.files_cached_bytes_or_none(files)
+        if cached is not None:
+            cached_text = " ({:s} was already cached)".format(page_cache.size_as_text(cached[1]))
+
+    # Only requests reading the files, the time taken to read them isn't known (unless they're locked).
+    size_total = page_cache.files_prefetch(files)
+    sys.stdout.write(
+        "Reading {:s} in {:d} file(s) into memory in the background{:s}.\n".format(
+            page_cache.size_as_text(size_total), len(files), cached_text
+        )
+    )
+    if not lock:
+        return
+
+    time_beg = time.perf_counter()
+    size_locked, lock_error = page_cache.files_lock(files)
+    if lock_error:
+        sys.stderr.write("Unable to lock the model in memory: {:s}.\n".format(lock_error))
+        sys.exit(1)
+
+    # The files are unlocked when this process exits.
+    sys.stdout.write(
+        "Read & locked {:s} in memory in {:.3f}s until terminated.\n".format(
+            page_cache.size_as_text(size_locked), time.perf_counter() - time_beg
+        )
+    )
+    sys.stdout.flush()
+    try:
+        while True:
+            time.sleep(3600.0)
+    except KeyboardInterrupt:
+        pass
+
+
+# -----------------------------------------------------------------------------
+# Fast Path
+#
+
+# Options of ``prefetch`` (matching ``begin``) which are read into memory.
+PREFETCH_PATH_OPTIONS = ("--vosk-model-dir", "--model-swap-dir", "--punctuation-model-dir", "--vad-model")
+
+# Sub-command: (the call, options taking a value, positional arguments).
+CONTROL_COMMANDS: dict[str, tuple[Callable[[dict[str, str]], None], tuple[str, ...], tuple[str, ...]]] = {
+    "end": (lambda opts: main_end(path_to_cookie=opts["--cookie"]), ("--cookie",), ()),
+    "cancel": (lambda opts: main_cancel(path_to_cookie=opts["--cookie"]), ("--cookie",), ()),
+    "suspend": (
+        lambda opts: main_suspend(path_to_cookie=opts["--cookie"], suspend=True, verbose=1),
+        ("--cookie",),
+        (),
+    ),
+    "resume": (
+        lambda opts: main_suspend(path_to_cookie=opts["--cookie"], suspend=False, verbose=1),
+        ("--cookie",),
+        (),
+    ),
+    "grammar": (
+        lambda opts: main_grammar(path_to_cookie=opts["--cookie"], name=opts["name"], verbose=1),
+        ("--cookie",),
+        ("name",),
+    ),
+    "model": (
+        lambda opts: main_model(path_to_cookie=opts["--cookie"], name=opts["name"], verbose=1),
+        ("--cookie",),
+        ("name",),
+    ),
+    "status": (
+        lambda opts: main_status(path_to_cookie=opts["--cookie"], metrics_file=opts["--metrics-file"]),
+        ("--cookie", "--metrics-file"),
+        (),
+    ),
+    # Locking & reporting (``--lock`` & ``--verbose``) are handled by the full parser.
+    "prefetch": (
+        lambda opts: main_prefetch(paths=[opts[name] for name in PREFETCH_PATH_OPTIONS if opts[name]]),
+        PREFETCH_PATH_OPTIONS,
+        (),
+    ),
+}
+
+
+def main_fast(argv: list[str]) -> bool:
+    """
+    Run a control sub-command without building the full command line parser.
+
+    Only simple arguments are handled (``--name=value``, ``--name value`` & positional arguments),
+    returning false for anything else, so the full parser can run (reporting errors & help as usual).
+    """
+    if not argv or argv[0] not in CONTROL_COMMANDS:
+        return False
+    fn, option_names, positional_names = CONTROL_COMMANDS[argv[0]]
+    opts = dict.fromkeys(option_names + positional_names, "")
+    positional_index = 0
+    i = 1
+    while i < len(argv):
+        if not argv[i].startswith("-"):
+            if positional_index == len(positional_names):
+                return False
+            opts[positional_names[positional_index]] = argv[i]
+            positional_index += 1
+            i += 1
+            continue
+        name, sep, value = argv[i].partition("=")
+        # Abbreviations, repeated & unknown arguments are left to the full parser.
+        if name not in opts or opts[name]:
+            return False
+        if not sep:
+            i += 1
+            if i == len(argv) or argv[i].startswith("-"):
+                return False
+            value = argv[i]
+        if not value:
+            return False
+        opts[name] = value
+        i += 1
+    if positional_index != len(positional_names):
+        return False
+    fn(opts)
+    return True
@@ -0,0 +1,5360 @@
+# SPDX-License-Identifier: GPL-2.0-or-later
+
+"""
+This is a utility that activates speech to text on Linux.
+While it could use any system currently it uses the VOSK-API.
+"""
+
+# See: `hacking.rst` for developer notes.
+
+# All built in modules.
+import argparse
+import os
+import queue
+import signal
+import stat
+import subprocess
+import sys
+import time
+
+# Types.
+from typing import (
+    Any,
+    Dict,
+    IO,
+    List,
+    Optional,
+    Callable,
+    Set,
+    Tuple,
+    Type,
+    TYPE_CHECKING,
+)
+from types import (
+    ModuleType,
+)
+
+if TYPE_CHECKING:
+    # lazy import: only needed for annotations, these are imported where they're used.
+    from concurrent.futures import Future
+
+    import numpy as np
+
+# Sub-commands which control a running process, kept in a separate module so they start quickly.
+from .control import (
+    calc_user_config_path,
+    file_remove_if_exists,
+    main_cancel,
+    main_end,
+    main_grammar,
+    main_model,
+    main_prefetch,
+    main_status,
+    main_suspend,
+    path_to_cookie_default,
+    request_read_or_none,
+    touch,
+)
+
+USER_CONFIG = "nerd-dictation.py"
+
+# Passed as the number of characters to delete for commands (the text is the command):
+# - ``SETUP`` & ``TEARDOWN``: when recording starts & stops.
+# - ``COMMIT``: all text output so far is final.
+SIMULATE_INPUT_CODE_COMMAND = -1
+
+# The grammar profile used on start-up (``--vosk-grammar-file`` or free dictation when unset).
+GRAMMAR_PROFILE_DEFAULT = "default"
+
+
+# -----------------------------------------------------------------------------
+# General Utilities
+#
+
+
+def run_command_or_exit_on_failure(cmd: List[str]) -> None:
+    try:
+        subprocess.check_output(cmd)
+    # Don't catch other kinds of exceptions as they should never happen
+    # and can be considered a severe error which doesn't need to be made "user friendly".
+    except FileNotFoundError as ex:
+        sys.stderr.write("Command {!r} not found: {!s}\n".format(cmd[0], ex))
+        sys.exit(1)
+
+
+def file_mtime_or_none(filepath: str) -> Optional[int]:
+    try:
+        # For some reason `mypy` thinks this is a float.
+        return int(os.stat(filepath)[stat.ST_MTIME])
+    except FileNotFoundError:
+        return None
+
+
+def file_age_in_seconds(filepath: str) -> float:
+    """
+    Return the age of the file in seconds.
+    """
+    return time.time() - os.stat(filepath)[stat.ST_MTIME]
+
+
+def file_handle_make_non_blocking(file_handle: IO[bytes]) -> None:
+    import fcntl
+
+    # Get current `file_handle` flags.
+    flags = fcntl.fcntl(file_handle.fileno(), fcntl.F_GETFL)
+    fcntl.fcntl(file_handle, fcntl.F_SETFL, flags | os.O_NONBLOCK)
+
+
+def signal_wakeup_pipe() -> Tuple[int, int]:
+    """
+    Return a non-blocking ``(read, write)`` pipe.
+
+    Signal handlers write to this so the main loop can wait on it,
+    responding to the signal immediately instead of after the next sleep.
+    """
+    fd_read, fd_write = os.pipe()
+    os.set_blocking(fd_read, False)
+    os.set_blocking(fd_write, False)
+    return fd_read, fd_write
+
+
+def signal_wakeup_notify(fd_write: int) -> None:
+    try:
+        os.write(fd_write, b"\0")
+    except BlockingIOError:
+        # The pipe is full, the reader will wake up regardless.
+        pass
+
+
+def signal_wakeup_wait(fd_read: int, timeout: float) -> None:
+    """
+    Wait until ``timeout`` or until a signal handler calls ``signal_wakeup_notify``.
+    """
+    import select
+
+    select.select([fd_read], [], [], timeout)
+    try:
+        while os.read(fd_read, 64):
+            pass
+    except BlockingIOError:
+        pass
+
+
+def execfile(filepath: str, mod: Optional[ModuleType] = None) -> Optional[ModuleType]:
+    """
+    Execute a file path as a Python script.
+    """
+    import importlib.util
+
+    if not os.path.exists(filepath):
+        raise FileNotFoundError('File not found "{:s}"'.format(filepath))
+
+    mod_name = "__main__"
+    mod_spec = importlib.util.spec_from_file_location(mod_name, filepath)
+    if mod_spec is None:
+        raise Exception("Unable to retrieve the module-spec from %r" % filepath)
+    if mod is None:
+        mod = importlib.util.module_from_spec(mod_spec)
+
+    # While the module name is not added to `sys.modules`, it's important to temporarily
+    # include this so statements such as `sys.modules[cls.__module__].__dict__` behave as expected.
+    # See: https://bugs.python.org/issue9499 for details.
+    modules = sys.modules
+    mod_orig = modules.get(mod_name, None)
+    modules[mod_name] = mod
+
+    # No error suppression, just ensure `sys.modules[mod_name]` is properly restored in the case of an error.
+    try:
+        # `mypy` doesn't know about this function.
+        mod_spec.loader.exec_module(mod)  # type: ignore
+    finally:
+        if mod_orig is None:
+            modules.pop(mod_name, None)
+        else:
+            modules[mod_name] = mod_orig
+
+    return mod
+
+
+# -----------------------------------------------------------------------------
+# Simulate Input: XDOTOOL
+#
+def simulate_typing_with_xdotool(delete_prev_chars: int, text: str) -> None:
+    cmd = "xdotool"
+
+    # No setup/tear-down.
+    if delete_prev_chars == SIMULATE_INPUT_CODE_COMMAND:
+        return
+
+    if delete_prev_chars:
+        run_command_or_exit_on_failure(
+            [
+                cmd,
+                "key",
+                "--",
+                *(["BackSpace"] * delete_prev_chars),
+            ]
+        )
+
+    run_command_or_exit_on_failure(
+        [
+            cmd,
+            "type",
+            "--clearmodifiers",
+            "--",
+            text,
+        ]
+    )
+
+
+# -----------------------------------------------------------------------------
+# Simulate Input: YDOTOOL
+#
+def simulate_typing_with_ydotool_backspace(delete_prev_chars: int) -> None:
+    # ydotool's key subcommand works with int key IDs and key states. 14 is
+    # the linux keycode for the backspace key, and :1 and :0 respectively
+    # stand for "pressed" and "released."
+    #
+    # The key delay is lower than the typing setting because it applies to
+    # each key state change (pressed, released).
+    run_command_or_exit_on_failure(
+        [
+            "ydotool",
+            "key",
+            "--key-delay",
+            "3",
+            "--",
+            *(["14:1", "14:0"] * delete_prev_chars),
+        ]
+    )
+
+
+def simulate_typing_with_ydotool(delete_prev_chars: int, text: str) -> None:
+    cmd = "ydotool"
+
+    # No setup/tear-down.
+    if delete_prev_chars == SIMULATE_INPUT_CODE_COMMAND:
+        return
+
+    if delete_prev_chars:
+        simulate_typing_with_ydotool_backspace(delete_prev_chars)
+
+    # The low delay value makes typing fast, making the output much snappier
+    # than the slow default.
+    run_command_or_exit_on_failure(
+        [
+            cmd,
+            "type",
+            "--next-delay",
+            "5",
+            "--",
+            text,
+        ]
+    )
+
+
+# -----------------------------------------------------------------------------
+# Simulate Input: YDOTOOL_CLIPBOARD
+#
+def simulate_typing_with_ydotool_clipboard(delete_prev_chars: int, text: str) -> None:
+    cmd = "ydotool"
+
+    # No setup/tear-down.
+    if delete_prev_chars == SIMULATE_INPUT_CODE_COMMAND:
+        return
+
+    if delete_prev_chars:
+        simulate_typing_with_ydotool_backspace(delete_prev_chars)
+
+    # Use wl-copy + Ctrl+V to paste text via the Wayland clipboard.
+    # This avoids input method (e.g. Fcitx5) intercepting simulated keystrokes
+    # which would garble CJK characters.
+    subprocess.run(["wl-copy", "--", text], check=True)
+    time.sleep(0.03)
+    run_command_or_exit_on_failure(
+        [cmd, "key", "--key-delay", "0", "29:1", "47:1", "47:0", "29:0"]
+    )
+
+
+# -----------------------------------------------------------------------------
+# Simulate Input: YDOTOOL_AUTO
+#
+# Choose between typing (as ``YDOTOOL`` does) and pasting (as ``YDOTOOL_CLIPBOARD`` does) for each emission,
+# so short corrections are typed while long text is pasted at once.
+
+
+class SimulateInputCostModel:
+    """
+    Estimate the time taken to type or paste text, refined from the measured time of each.
+
+    Typing is modeled as a fixed overhead (running the command) plus a cost per character,
+    pasting as a fixed cost as it doesn't depend on the length of the text.
+    """
+
+    __slots__ = (
+        "type_per_char",
+        "paste_seconds",
+    )
+
+    # Running the typing command (excluding the delay for each character).
+    TYPE_OVERHEAD = 0.01
+    # Weight given to each new measurement (exponential moving average).
+    SMOOTHING = 0.25
+
+    def __init__(self, type_per_char: float = 0.012, paste_seconds: float = 0.06) -> None:
+        self.type_per_char = type_per_char
+        self.paste_seconds = paste_seconds
+
+    @staticmethod
+    def text_requires_paste(text: str) -> bool:
+        # Non-ASCII text (CJK for example) may be garbled by an input method intercepting the keystrokes,
+        # or may not have a key-code to type at all.
+        return any(ord(c) > 127 for c in text)
+
+    def use_paste(self, text: str) -> bool:
+        if not text:
+            return False
+        if self.text_requires_paste(text):
+            return True
+        return self.TYPE_OVERHEAD + len(text) * self.type_per_char > self.paste_seconds
+
+    def update_type(self, text_len: int, seconds: float) -> None:
+        if text_len == 0:
+            return
+        type_per_char = max(0.0, seconds - self.TYPE_OVERHEAD) / text_len
+        self.type_per_char += (type_per_char - self.type_per_char) * self.SMOOTHING
+
+    def update_paste(self, seconds: float) -> None:
+        self.paste_seconds += (seconds - self.paste_seconds) * self.SMOOTHING
+
+
+# Restore the clipboard once nothing has been pasted for this long.
+SIMULATE_INPUT_CLIPBOARD_RESTORE_DELAY = 1.0
+
+simulate_typing_with_ydotool_auto_cost: Optional[SimulateInputCostModel] = None
+# When text has been pasted: (clipboard contents before the first paste or None, pasted text, time of the paste).
+simulate_typing_with_ydotool_auto_paste: Optional[Tuple[Optional[bytes], str, float]] = None
+
+
+def clipboard_read_or_none() -> Optional[bytes]:
+    # try-catch approved: restoring the clipboard is best-effort,
+    # ``wl-paste`` may not be installed or the clipboard owner may not respond.
+    try:
+        result = subprocess.run(["wl-paste", "--no-newline"], capture_output=True, timeout=1.0)
+    except (FileNotFoundError, subprocess.TimeoutExpired):
+        return None
+    if result.returncode != 0:
+        # Empty clipboard.
+        return None
+    return result.stdout
+
+
+def simulate_typing_with_ydotool_auto_restore() -> None:
+    global simulate_typing_with_ydotool_auto_paste
+    if simulate_typing_with_ydotool_auto_paste is None:
+        return
+    clipboard_saved, text_pasted, _ = simulate_typing_with_ydotool_auto_paste
+    simulate_typing_with_ydotool_auto_paste = None
+
+    # Only restore when the clipboard still holds the pasted text,
+    # otherwise the user has copied something else in the meantime.
+    if clipboard_read_or_none() != text_pasted.encode("utf-8"):
+        return
+    if clipboard_saved is None:
+        subprocess.run(["wl-copy", "--clear"], check=False)
+    else:
+        subprocess.run(["wl-copy"], input=clipboard_saved, check=False)
+
+
+def simulate_typing_with_ydotool_auto(delete_prev_chars: int, text: str) -> None:
+    global simulate_typing_with_ydotool_auto_cost
+    global simulate_typing_with_ydotool_auto_paste
+
+    if delete_prev_chars == SIMULATE_INPUT_CODE_COMMAND:
+        if text == "SETUP":
+            # Keep the measurements when resuming after being suspended.
+            if simulate_typing_with_ydotool_auto_cost is None:
+                simulate_typing_with_ydotool_auto_cost = SimulateInputCostModel()
+        elif text == "TEARDOWN":
+            simulate_typing_with_ydotool_auto_restore()
+        elif text == "COMMIT":
+            pass
+        else:
+            raise Exception("Internal error, unknown command {!r}".format(text))
+        return
+
+    cost = simulate_typing_with_ydotool_auto_cost
+    assert cost is not None
+
+    if delete_prev_chars:
+        simulate_typing_with_ydotool_backspace(delete_prev_chars)
+
+    if not text:
+        return
+
+    time_start = time.monotonic()
+    if cost.use_paste(text):
+        if simulate_typing_with_ydotool_auto_paste is None:
+            # Save the users clipboard on the first paste (subsequent pastes replace dictated text).
+            clipboard_saved = clipboard_read_or_none()
+        else:
+            clipboard_saved = simulate_typing_with_ydotool_auto_paste[0]
+        simulate_typing_with_ydotool_clipboard(0, text)
+        time_end = time.monotonic()
+        cost.update_paste(time_end - time_start)
+        simulate_typing_with_ydotool_auto_paste = (clipboard_saved, text, time_end)
+    else:
+        simulate_typing_with_ydotool(0, text)
+        time_end = time.monotonic()
+        cost.update_type(len(text), time_end - time_start)
+        # Restore after typing (the text has already been output).
+        if (simulate_typing_with_ydotool_auto_paste is not None) and (
+            time_end - simulate_typing_with_ydotool_auto_paste[2] > SIMULATE_INPUT_CLIPBOARD_RESTORE_DELAY
+        ):
+            simulate_typing_with_ydotool_auto_restore()
+
+
+# -----------------------------------------------------------------------------
+# Simulate Input: DOTOOL
+#
+
+# NOTE: typed as a string for Py3.6 compatibility.
+simulate_typing_with_dotool_proc: "Optional[subprocess.Popen[str]]" = None
+
+
+def simulate_typing_with_dotoolc(delete_prev_chars: int, text: str) -> None:
+    simulate_typing_with_dotool(delete_prev_chars, text, cmd="dotoolc")
+
+
+def simulate_typing_with_dotool(delete_prev_chars: int, text: str, cmd: str = "dotool") -> None:
+    if delete_prev_chars == SIMULATE_INPUT_CODE_COMMAND:
+        global simulate_typing_with_dotool_proc
+        if text == "SETUP":
+            # If this isn't true, something strange is going on.
+            assert simulate_typing_with_dotool_proc is None
+            # "text" was added as a more readable alias for
+            # "universal_newlines" in Python 3.7 so use universal_newlines for
+            # Python 3.6 compatibility:
+            proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, universal_newlines=True)
+            assert proc.stdin is not None
+            proc.stdin.write("keydelay 4\nkeyhold 0\ntypedelay 12\ntypehold 0\n")
+            proc.stdin.flush()
+            simulate_typing_with_dotool_proc = proc
+        elif text == "TEARDOWN":
+            import signal
+
+            assert simulate_typing_with_dotool_proc is not None
+            os.kill(simulate_typing_with_dotool_proc.pid, signal.SIGINT)
+            # Not needed, just basic hygiene not to keep killed process reference.
+            simulate_typing_with_dotool_proc = None
+        elif text == "COMMIT":
+            pass
+        else:
+            raise Exception("Internal error, unknown command {!r}".format(text))
+        return
+
+    assert simulate_typing_with_dotool_proc is not None
+    proc = simulate_typing_with_dotool_proc
+    assert proc.stdin is not None
+    if delete_prev_chars:
+        proc.stdin.write("key" + (" backspace" * delete_prev_chars) + "\n")
+        proc.stdin.flush()
+
+    proc.stdin.write("type " + text + "\n")
+    proc.stdin.flush()
+
+
+# -----------------------------------------------------------------------------
+# Simulate Input: WTYPE
+#
+def simulate_typing_with_wtype(delete_prev_chars: int, text: str) -> None:
+    cmd = "wtype"
+
+    # No setup/tear-down.
+    if delete_prev_chars == SIMULATE_INPUT_CODE_COMMAND:
+        return
+
+    if delete_prev_chars:
+        run_command_or_exit_on_failure(
+            [
+                cmd,
+                "-s",
+                "5",
+                *(["-k", "backSpace"] * delete_prev_chars),
+            ]
+        )
+
+    run_command_or_exit_on_failure(
+        [
+            cmd,
+            text,
+        ]
+    )
+
+
+# -----------------------------------------------------------------------------
+# Simulate Input: DBUS
+#
+# Send text to an input method over D-Bus instead of simulating keystrokes,
+# partial results are shown as pre-edit text, so revisions don't need to delete typed text.
+#
+# Neither Fcitx5 nor IBus allow other processes to commit text, so an input method provides the
+# ``org.nerd_dictation.TextInput1`` interface (on the session bus) with the methods:
+#
+# - ``SetPreedit(s text)``: show ``text`` as pre-edit text at the cursor (replacing any previous pre-edit text).
+# - ``Commit(i delete_chars, s text)``: clear the pre-edit text,
+#   delete ``delete_chars`` characters before the cursor, then insert ``text``.
+#
+# An IBus input method providing this interface is included: ``examples/ibus_text_input/``.
+#
+# Requires the ``jeepney`` module.
+
+DBUS_TEXT_INPUT_NAME = "org.nerd_dictation.TextInput1"
+DBUS_TEXT_INPUT_PATH = "/org/nerd_dictation/TextInput1"
+DBUS_TEXT_INPUT_TIMEOUT = 1.0
+
+
+class DBusTextInput:
+    """
+    A connection to the input method, opened by ``open`` (on setup) & closed by ``close`` (on tear-down).
+    """
+
+    __slots__ = (
+        "preedit",
+        "_connection",
+    )
+
+    def __init__(self) -> None:
+        # Text which hasn't been committed.
+        self.preedit = ""
+        self._connection: Any = None
+
+    def open(self) -> None:
+        # lazy import: optional dependency, only needed for this input tool.
+        from jeepney.bus_messages import message_bus
+        from jeepney.io.blocking import open_dbus_connection
+
+        assert self._connection is None
+        self.preedit = ""
+        # try-catch approved: report a missing session bus without a stack trace.
+        try:
+            connection = open_dbus_connection(bus="SESSION")
+        except (KeyError, OSError) as ex:
+            sys.stderr.write("D-Bus text input: unable to connect to the session bus: {:s}\n".format(str(ex)))
+            sys.exit(1)
+
+        reply = connection.send_and_get_reply(
+            message_bus.NameHasOwner(DBUS_TEXT_INPUT_NAME),
+            timeout=DBUS_TEXT_INPUT_TIMEOUT,
+        )
+        if not reply.body[0]:
+            connection.close()
+            sys.stderr.write(
+                "D-Bus text input: {:s} is not running, "
+                "see: examples/ibus_text_input/ in the nerd-dictation repository.\n".format(DBUS_TEXT_INPUT_NAME)
+            )
+            sys.exit(1)
+        self._connection = connection
+
+    def _call(self, method: str, signature: str, args: Tuple[Any, ...]) -> None:
+        # lazy import: optional dependency, only needed for this input tool.
+        from jeepney import DBusAddress, MessageType, new_method_call
+
+        if self._connection is None:
+            raise Exception("Internal error, D-Bus text input {:s} called when not open".format(method))
+        address = DBusAddress(DBUS_TEXT_INPUT_PATH, bus_name=DBUS_TEXT_INPUT_NAME, interface=DBUS_TEXT_INPUT_NAME)
+        reply = self._connection.send_and_get_reply(
+            new_method_call(address, method, signature, args),
+            timeout=DBUS_TEXT_INPUT_TIMEOUT,
+        )
+        if reply.header.message_type == MessageType.error:
+            sys.stderr.write("D-Bus text input {:s} failed: {!r}\n".format(method, reply.body))
+            sys.exit(1)
+
+    def update(self, delete_prev_chars: int, text: str) -> None:
+        preedit = self.preedit
+        if delete_prev_chars > len(preedit):
+            # Committed text has been revised.
+            self._call("Commit", "is", (delete_prev_chars - len(preedit), ""))
+            preedit = ""
+        elif delete_prev_chars:
+            preedit = preedit[: len(preedit) - delete_prev_chars]
+        elif not text:
+            return
+        self.preedit = preedit + text
+        self._call("SetPreedit", "s", (self.preedit,))
+
+    def commit(self) -> None:
+        if self.preedit:
+            self._call("Commit", "is", (0, self.preedit))
+            self.preedit = ""
+
+    def close(self) -> None:
+        if self._connection is None:
+            return
+        self.commit()
+        self._connection.close()
+        self._connection = None
+
+
+simulate_typing_with_dbus_text_input = DBusTextInput()
+
+
+def simulate_typing_with_dbus(delete_prev_chars: int, text: str) -> None:
+    text_input = simulate_typing_with_dbus_text_input
+    if delete_prev_chars == SIMULATE_INPUT_CODE_COMMAND:
+        if text == "SETUP":
+            text_input.open()
+        elif text == "TEARDOWN":
+            text_input.close()
+        elif text == "COMMIT":
+            text_input.commit()
+        else:
+            raise Exception("Internal error, unknown command {!r}".format(text))
+        return
+
+    text_input.update(delete_prev_chars, text)
+
+
+# -----------------------------------------------------------------------------
+# Simulate Input: STDOUT
+#
+def simulate_typing_with_stdout(delete_prev_chars: int, text: str) -> None:
+    # No setup/tear-down.
+    if delete_prev_chars == SIMULATE_INPUT_CODE_COMMAND:
+        return
+
+    if delete_prev_chars:
+        sys.stdout.write("\x08" * delete_prev_chars)
+
+    sys.stdout.write(text)
+    sys.stdout.flush()
+
+
+# -----------------------------------------------------------------------------
+# Simulate Input: Tools
+#
+# Each is passed text & commands (``SIMULATE_INPUT_CODE_COMMAND`` with "SETUP", "COMMIT" & "TEARDOWN").
+
+SIMULATE_INPUT_TOOLS: Dict[str, Callable[[int, str], None]] = {
+    "XDOTOOL": simulate_typing_with_xdotool,
+    "DOTOOL": simulate_typing_with_dotool,
+    "DOTOOLC": simulate_typing_with_dotoolc,
+    "YDOTOOL": simulate_typing_with_ydotool,
+    "YDOTOOL_CLIPBOARD": simulate_typing_with_ydotool_clipboard,
+    "YDOTOOL_AUTO": simulate_typing_with_ydotool_auto,
+    "WTYPE": simulate_typing_with_wtype,
+    "DBUS": simulate_typing_with_dbus,
+    "STDOUT": simulate_typing_with_stdout,
+}
+
+
+# -----------------------------------------------------------------------------
+# Output: JSONL
+#
+
+# When more than this many bytes are waiting to be written, partial events are dropped.
+JSONL_BUFFER_LIMIT = 1 << 20
+
+
+class JSONLOutput:
+    """
+    Write recognition events as JSON lines (``--output=JSONL``), one compact object per line.
+
+    Lines are written from a thread so a slow reader never stalls decoding.
+    When the reader falls behind, partial events are dropped (final & end-point events are kept).
+    """
+
+    __slots__ = (
+        "segment",
+        "segment_start",
+        "dropped",
+        "_text_partial",
+        "_fh",
+        "_lines",
+        "_pending",
+        "_closed",
+        "_cond",
+        "_thread",
+    )
+
+    def __init__(self, fh: IO[bytes]) -> None:
+        import threading
+
+        # Segments are numbered from zero, a new segment starts after each final event.
+        self.segment = 0
+        # The audio offset (in seconds) where the current segment starts.
+        self.segment_start = 0.0
+        # The number of partial events which weren't written.
+        self.dropped = 0
+        # Only write partial text when it changes.
+        self._text_partial = ""
+        self._fh = fh
+        self._lines: List[bytes] = []
+        self._pending = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _write(self, data: Dict[str, Any], is_partial: bool) -> None:
+        import json
+
+        line = (json.dumps(data, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+        with self._cond:
+            if self._closed:
+                return
+            if is_partial and self._pending > JSONL_BUFFER_LIMIT:
+                self.dropped += 1
+                return
+            self._lines.append(line)
+            self._pending += len(line)
+            self._cond.notify()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._lines and not self._closed:
+                    self._cond.wait()
+                lines = self._lines
+                self._lines = []
+                if not lines:
+                    return
+            # try-catch approved: the reader may exit (a broken pipe), recognition continues without output.
+            try:
+                self._fh.write(b"".join(lines))
+                self._fh.flush()
+            except (BrokenPipeError, OSError):
+                with self._cond:
+                    self._closed = True
+                    self._lines.clear()
+                return
+            with self._cond:
+                self._pending -= sum(len(line) for line in lines)
+
+    def partial(self, text: str, audio_time: float) -> None:
+        """
+        Write the text of the current segment (which may still change).
+        """
+        if text == self._text_partial:
+            return
+        self._text_partial = text
+        audio_time = round(audio_time, 3)
+        self._write(
+            {"type": "partial", "segment": self.segment, "text": text, "start": self.segment_start, "end": audio_time},
+            True,
+        )
+
+    def final(
+        self,
+        text: str,
+        audio_time: float,
+        is_endpoint: bool,
+        tokens: Optional[Tuple[List[str], List[float]]] = None,
+        times: Optional[Tuple[float, float]] = None,
+    ) -> None:
+        """
+        Write the final text of the current segment, followed by an end-point (when speech ended).
+        ``tokens`` & their timestamps (relative to the segment start) are included when known.
+        ``times`` is the start & end of the speech when the engine knows them,
+        otherwise the segment spans from the previous final event to ``audio_time``.
+        """
+        if times is not None:
+            self.segment_start = round(times[0], 3)
+            audio_time = times[1]
+        audio_time = round(audio_time, 3)
+        data: Dict[str, Any] = {
+            "type": "final",
+            "segment": self.segment,
+            "text": text,
+            "start": self.segment_start,
+            "end": audio_time,
+        }
+        if tokens is not None:
+            data["tokens"], data["timestamps"] = tokens
+        self._write(data, False)
+        if is_endpoint:
+            self._write({"type": "endpoint", "segment": self.segment, "end": audio_time}, False)
+        self.segment += 1
+        self.segment_start = audio_time
+        self._text_partial = ""
+
+    def silence(self, audio_time: float) -> None:
+        """
+        Start the next segment at ``audio_time`` (an end-point without text).
+        """
+        self.segment_start = round(audio_time, 3)
+        self._text_partial = ""
+
+    def close(self) -> None:
+        """
+        Write all pending lines.
+        """
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join()
+
+
+# -----------------------------------------------------------------------------
+# Custom Configuration
+#
+
+
+def user_config_as_module_or_none(
+    config_override: Optional[str],
+    user_config_prev: Optional[ModuleType],
+) -> Optional[ModuleType]:
+    # Explicitly ask for no configuration.
+    if config_override == "":
+        return None
+    if config_override is None:
+        user_config_path = calc_user_config_path(USER_CONFIG)
+        if not os.path.exists(user_config_path):
+            return None
+    else:
+        user_config_path = config_override
+        # Allow the exception for a custom configuration.
+
+    try:
+        user_config = execfile(user_config_path)
+    except Exception as ex:
+        sys.stderr.write('Failed to run "{:s}" with error: {:s}\n'.format(user_config_path, str(ex)))
+        if user_config_prev is not None:
+            # Reloading configuration at run-time, don't exit in this case - use the previous config instead.
+            sys.stderr.write("Reload failed, continuing with previous configuration.\n")
+            user_config = user_config_prev
+        else:
+            # Exit if the user starts with an invalid configuration.
+            sys.exit(1)
+
+    return user_config
+
+
+# -----------------------------------------------------------------------------
+# Process Text
+#
+
+
+def process_text_with_user_config(user_config: ModuleType, text: str) -> str:
+    process_fn_name = "nerd_dictation_process"
+    process_fn = getattr(user_config, process_fn_name)
+    if process_fn is None:
+        sys.stderr.write("User configuration %r has no %r function\n" % (user_config, process_fn_name))
+        return text
+
+    try:
+        text = process_fn(text)
+    except Exception as ex:
+        sys.stderr.write("Failed to run %r with error %s\n" % (user_config, str(ex)))
+        sys.exit(1)
+
+    if not isinstance(text, str):
+        sys.stderr.write("%r returned a %r type, instead of a string\n" % (process_fn_name, type(text)))
+        sys.exit(1)
+
+    return text
+
+
+def process_text(
+    text: str,
+    *,
+    full_sentence: bool = False,
+    numbers_as_digits: bool = False,
+    numbers_use_separator: bool = False,
+    numbers_min_value: Optional[int] = None,
+    numbers_no_suffix: bool = False,
+    inverse_text_normalize_fn: Optional[Callable[[str], str]] = None,
+) -> str:
+    """
+    Basic post processing on text.
+    Mainly to capitalize words however other kinds of replacements may be supported.
+    """
+
+    # Make absolutely sure we never add new lines in text that is typed in.
+    # As this will press the return key when using automated key input.
+    text = text.replace("\n", " ")
+
+    # Times, dates, money .. etc, before numbers since these include numbers.
+    if inverse_text_normalize_fn is not None:
+        text = inverse_text_normalize_fn(text)
+    words = text.split(" ")
+
+    # First parse numbers.
+    if numbers_as_digits:
+        # The number tables are only created when used.
+        from .number_parsing import from_words_to_digits
+
+        from_words_to_digits.parse_numbers_in_word_list(
+            words,
+            numbers_use_separator=numbers_use_separator,
+            numbers_min_value=numbers_min_value,
+            numbers_no_suffix=numbers_no_suffix,
+        )
+
+    # Optional?
+    if full_sentence:
+        words[0] = words[0].capitalize()
+        words[-1] = words[-1]
+
+    return " ".join(words)
+
+
+# -----------------------------------------------------------------------------
+# Text Emitter
+#
+
+
+class TextEmitter:
+    """
+    Output text as it's recognized (``--progressive``), deleting & re-typing text which has changed.
+
+    Partial results are often revised, so a commit policy can hold back text until it's stable:
+    only the prefix of partial results which has remained unchanged for ``stable_partials`` (changed) partial
+    results or ``stable_time`` seconds is output, the remaining text is held back until it's stable
+    or the final result is handled. When both are zero, all changes are output immediately.
+    """
+
+    __slots__ = (
+        "handle_fn",
+        "stable_partials",
+        "stable_time",
+        "text_emitted",
+        "text_partial",
+        "chars_typed",
+        "chars_deleted",
+        "_stable_count",
+        "_stable_since",
+    )
+
+    def __init__(
+        self, handle_fn: Callable[[int, str], None], stable_partials: int = 0, stable_time: float = 0.0
+    ) -> None:
+        self.handle_fn = handle_fn
+        self.stable_partials = stable_partials
+        self.stable_time = stable_time
+        # The text which has been output.
+        self.text_emitted = ""
+        # The most recent partial text (only used with a commit policy).
+        self.text_partial = ""
+        # Totals used to report the number of characters typed for each character kept.
+        self.chars_typed = 0
+        self.chars_deleted = 0
+        # For each character in `text_partial`, the number of partial results & the time (from `time.monotonic`)
+        # it has been unchanged, along with all characters before it.
+        self._stable_count: List[int] = []
+        self._stable_since: List[float] = []
+
+    @property
+    def use_commit_policy(self) -> bool:
+        return self.stable_partials > 0 or self.stable_time > 0.0
+
+    def _emit(self, text: str, keep_tail: bool) -> None:
+        """
+        Output ``text``, deleting previous output which doesn't match.
+        When ``keep_tail`` is true and ``text`` is a prefix of the previous output, nothing is deleted.
+        """
+        text_prev = self.text_emitted
+        if text == text_prev:
+            return
+        match = min(len(text), len(text_prev))
+        for i in range(match):
+            if text[i] != text_prev[i]:
+                match = i
+                break
+
+        if keep_tail and match == len(text):
+            return
+
+        # Emit text, deleting any previous incorrectly transcribed output
+        delete_prev_chars = len(text_prev) - match
+        self.handle_fn(delete_prev_chars, text[match:])
+        self.chars_deleted += delete_prev_chars
+        self.chars_typed += len(text) - match
+        self.text_emitted = text
+
+    def _stable_prefix(self, now: float) -> str:
+        # Counts never increase & times never decrease along the text, so search from the end.
+        stable_count = self._stable_count
+        stable_since = self._stable_since
+        for i in range(len(self.text_partial) - 1, -1, -1):
+            if (self.stable_partials and stable_count[i] >= self.stable_partials) or (
+                self.stable_time and now - stable_since[i] >= self.stable_time
+            ):
+                return self.text_partial[: i + 1]
+        return ""
+
+    def update(self, text: str, is_partial: bool) -> None:
+        if not (is_partial and self.use_commit_policy):
+            self._emit(text, False)
+            if not is_partial:
+                self.text_partial = ""
+                self._stable_count.clear()
+                self._stable_since.clear()
+            return
+
+        now = time.monotonic()
+        text_prev = self.text_partial
+        if text != text_prev:
+            match = min(len(text), len(text_prev))
+            for i in range(match):
+                if text[i] != text_prev[i]:
+                    match = i
+                    break
+            tail_len = len(text) - match
+            self._stable_count = [count + 1 for count in self._stable_count[:match]] + [1] * tail_len
+            self._stable_since = self._stable_since[:match] + [now] * tail_len
+            self.text_partial = text
+
+        self._emit(self._stable_prefix(now), True)
+
+    def poll(self) -> None:
+        """
+        Output text which has become stable since the last partial result (when ``stable_time`` is used).
+        """
+        if self.stable_time and self.text_partial:
+            self._emit(self._stable_prefix(time.monotonic()), True)
+
+    def replace(self, start: int, size: int, text: str) -> None:
+        """
+        Replace ``size`` characters of final text from ``start`` with ``text``,
+        output after ``start`` is deleted & re-typed, held back partial text remains held back.
+        """
+        if self.text_partial:
+            end = start + size
+            self.text_partial = self.text_partial[:start] + text + self.text_partial[end:]
+            # The replacement is final, so it's as stable as the text it replaces.
+            i = max(end - 1, 0)
+            self._stable_count[start:end] = [self._stable_count[i]] * len(text)
+            self._stable_since[start:end] = [self._stable_since[i]] * len(text)
+        self._emit(self.text_emitted[:start] + text + self.text_emitted[start + size :], False)
+
+    def drop(self, size: int) -> None:
+        """
+        Remove ``size`` characters of final text from the start of the block (the output is kept).
+        """
+        self.text_emitted = self.text_emitted[size:]
+        if self.text_partial:
+            self.text_partial = self.text_partial[size:]
+            del self._stable_count[:size]
+            del self._stable_since[:size]
+
+    def reset(self) -> None:
+        """
+        Start a new block of text (the previous output is kept).
+        """
+        self.text_emitted = ""
+        self.text_partial = ""
+        self._stable_count.clear()
+        self._stable_since.clear()
+
+    def report(self) -> str:
+        chars_kept = self.chars_typed - self.chars_deleted
+        return "Typed {:d} characters, {:d} deleted ({:.2f} typed for each character kept).\n".format(
+            self.chars_typed,
+            self.chars_deleted,
+            self.chars_typed / chars_kept if chars_kept > 0 else 0.0,
+        )
+
+
+# -----------------------------------------------------------------------------
+# Punctuation
+#
+# Add punctuation to final results (``--punctuation-model``) on a worker thread,
+# the text is typed immediately, then patched once it has been punctuated, so partial results are never delayed.
+
+# Wait up to this long for punctuation when suspending or exiting (text which isn't ready is left as-is).
+PUNCTUATION_FLUSH_TIMEOUT = 5.0
+
+
+def punctuation_model_load(model_dir: str) -> Callable[[str], str]:
+    """
+    Load a sherpa-onnx punctuation model, returning a function which punctuates text.
+
+    Models with a ``bpe.vocab`` (CNN-BiLSTM) also restore case, otherwise a CT-Transformer model is loaded.
+    """
+    # lazy import: optional dependency, only needed when a punctuation model is used.
+    import sherpa_onnx
+
+    model = os.path.join(model_dir, "model.onnx")
+    if not os.path.exists(model):
+        model = os.path.join(model_dir, "model.int8.onnx")
+
+    bpe_vocab = os.path.join(model_dir, "bpe.vocab")
+    if os.path.exists(bpe_vocab):
+        punct_online = sherpa_onnx.OnlinePunctuation(
+            sherpa_onnx.OnlinePunctuationConfig(
+                model_config=sherpa_onnx.OnlinePunctModelConfig(
+                    cnn_bilstm=model, bpe_vocab=bpe_vocab, num_threads=1, provider="cpu"
+                ),
+            )
+        )
+        fn: Callable[[str], str] = punct_online.add_punctuation_with_case
+        return fn
+
+    punct_offline = sherpa_onnx.OfflinePunctuation(
+        sherpa_onnx.OfflinePunctuationConfig(
+            model=sherpa_onnx.OfflinePunctuationModelConfig(ct_transformer=model, num_threads=1, provider="cpu"),
+        )
+    )
+    fn = punct_offline.add_punctuation
+    return fn
+
+
+def punctuation_split(texts: List[str], text_punctuated: str) -> Optional[List[str]]:
+    """
+    Split ``text_punctuated`` (``texts`` joined by spaces, then punctuated) back into segments,
+    punctuation is kept with the text before it. Return None when the punctuated words don't match ``texts``.
+    """
+    import unicodedata
+
+    # The segment index for each character of the input (spaces are ignored).
+    chars_expect = [(i, c.lower()) for i, text in enumerate(texts) for c in text if not c.isspace()]
+    result = [""] * len(texts)
+    index = 0
+    i = 0
+    for c in text_punctuated:
+        if i < len(chars_expect) and c.lower() == chars_expect[i][1]:
+            index = chars_expect[i][0]
+            i += 1
+        elif not (c.isspace() or unicodedata.category(c).startswith("P")):
+            return None
+        result[index] += c
+    if i != len(chars_expect):
+        return None
+    return [text.strip() for text in result]
+
+
+def punctuate_batch(punctuate_fn: Callable[[str], str], texts: List[str]) -> List[str]:
+    """
+    Punctuate ``texts`` with a single call (giving the model more context) when possible.
+    """
+    if len(texts) > 1:
+        texts_punctuated = punctuation_split(texts, punctuate_fn(" ".join(texts)))
+        if texts_punctuated is not None:
+            return texts_punctuated
+    return [punctuate_fn(text) for text in texts]
+
+
+class PunctuationWorker:
+    """
+    Punctuate text on a worker thread, text submitted while the model is busy is punctuated as a single batch,
+    so a slow model falls behind by at most one batch.
+    """
+
+    __slots__ = (
+        "_requests",
+        "_results",
+        "_pending",
+        "batch_count",
+    )
+
+    def __init__(self, punctuate_fn_create: Callable[[], Callable[[str], str]], verbose: int = 0) -> None:
+        import threading
+
+        self._requests: "queue.Queue[Optional[Tuple[int, str]]]" = queue.Queue()
+        self._results: "queue.Queue[Tuple[int, str]]" = queue.Queue()
+        # The number of submitted requests which haven't been returned by `results`.
+        self._pending = 0
+        # Only used for reporting.
+        self.batch_count = 0
+        # The model is loaded on the worker thread, so recording can start 1st.
+        threading.Thread(target=self._run, args=(punctuate_fn_create, verbose), daemon=True).start()
+
+    def _run(self, punctuate_fn_create: Callable[[], Callable[[str], str]], verbose: int) -> None:
+        punctuate_fn: Optional[Callable[[str], str]] = None
+        # try-catch approved: a model which fails to load leaves the text unchanged (dictation continues).
+        try:
+            punctuate_fn = punctuate_fn_create()
+        except (ImportError, RuntimeError) as ex:
+            sys.stderr.write("Unable to load the punctuation model: {:s}\n".format(str(ex)))
+        else:
+            if verbose >= 1:
+                sys.stderr.write("Punctuation model loaded.\n")
+
+        while True:
+            request = self._requests.get()
+            if request is None:
+                return
+            batch = [request]
+            while True:
+                try:
+                    request = self._requests.get_nowait()
+                except queue.Empty:
+                    break
+                if request is None:
+                    break
+                batch.append(request)
+
+            texts = [text for _, text in batch]
+            if punctuate_fn is not None:
+                texts = punctuate_batch(punctuate_fn, texts)
+            self.batch_count += 1
+            for (key, _), text in zip(batch, texts):
+                self._results.put((key, text))
+
+            if request is None:
+                return
+
+    def submit(self, key: int, text: str) -> None:
+        self._pending += 1
+        self._requests.put((key, text))
+
+    def results(self, timeout: float = 0.0) -> List[Tuple[int, str]]:
+        """
+        Return ``(key, text)`` for text which has been punctuated,
+        waiting up to ``timeout`` seconds for all submitted text.
+        """
+        result = []
+        time_end = time.monotonic() + timeout
+        while self._pending:
+            try:
+                if timeout > 0.0:
+                    result.append(self._results.get(timeout=max(time_end - time.monotonic(), 0.0)))
+                else:
+                    result.append(self._results.get_nowait())
+            except queue.Empty:
+                break
+            self._pending -= 1
+        return result
+
+    def close(self) -> None:
+        # The thread is a daemon, so there is no need to wait for a busy model.
+        self._requests.put(None)
+
+
+class PunctuationSegments:
+    """
+    Track final results which are being punctuated, patching the output once punctuated.
+
+    With ``--continuous`` output, results remain in the emitters block until they have been punctuated
+    (so they can be re-typed), otherwise punctuated text replaces the result in ``text_list``
+    which is output on the next update (or on exit for ``--defer-output``).
+    """
+
+    __slots__ = (
+        "worker",
+        "emitter",
+        "process_fn",
+        "progressive",
+        "progressive_continuous",
+        "text_list",
+        "segments",
+        "_key",
+        "_key_base",
+    )
+
+    def __init__(
+        self,
+        worker: PunctuationWorker,
+        emitter: TextEmitter,
+        process_fn: Callable[[str], str],
+        progressive: bool,
+        progressive_continuous: bool,
+        text_list: List[str],
+    ) -> None:
+        self.worker = worker
+        self.emitter = emitter
+        self.process_fn = process_fn
+        self.progressive = progressive
+        self.progressive_continuous = progressive_continuous
+        self.text_list = text_list
+        # For continuous output, `[key, processed_text, is_punctuated]` for results in the emitters block.
+        self.segments: List[List[Any]] = []
+        self._key = 0
+        # Results with keys before this have been cleared (when suspending), so they're ignored.
+        self._key_base = 0
+
+    @property
+    def use_segments(self) -> bool:
+        return self.progressive and self.progressive_continuous
+
+    def text_prefix(self) -> str:
+        """
+        The output of results which are being punctuated (for continuous output).
+        """
+        return "".join(segment[1] for segment in self.segments)
+
+    def add(self, text: str, text_processed: str) -> None:
+        """
+        Punctuate a final result, ``text_processed`` is its output (for continuous output).
+        """
+        if self.use_segments:
+            self.segments.append([self._key, text_processed, False])
+        self.worker.submit(self._key, text)
+        self._key += 1
+
+    def apply(self, timeout: float = 0.0) -> None:
+        for key, text in self.worker.results(timeout):
+            if key < self._key_base:
+                continue
+            if not self.use_segments:
+                self.text_list[key - self._key_base] = text
+                continue
+            start = 0
+            for segment in self.segments:
+                if segment[0] == key:
+                    text_processed = self.process_fn(text)
+                    self.emitter.replace(start, len(segment[1]), text_processed)
+                    segment[1] = text_processed
+                    segment[2] = True
+                    break
+                start += len(segment[1])
+
+        # Punctuated results at the start of the block will never change, remove them.
+        while self.segments and self.segments[0][2]:
+            self.emitter.drop(len(self.segments.pop(0)[1]))
+
+    def flush(self) -> None:
+        """
+        Wait for all results to be punctuated & output them.
+        """
+        self.apply(PUNCTUATION_FLUSH_TIMEOUT)
+        if self.progressive and not self.progressive_continuous and self.text_list:
+            self.emitter.update(self.process_fn(" ".join(self.text_list)), False)
+
+    def clear(self) -> None:
+        self.segments.clear()
+        self._key_base = self._key
+
+
+def punctuation_segments_create_or_none(
+    punctuation_model_dir: str,
+    emitter: TextEmitter,
+    process_fn: Callable[[str], str],
+    progressive: bool,
+    progressive_continuous: bool,
+    text_list: List[str],
+    verbose: int,
+) -> Optional[PunctuationSegments]:
+    if not punctuation_model_dir:
+        return None
+    worker = PunctuationWorker(lambda: punctuation_model_load(punctuation_model_dir), verbose)
+    return PunctuationSegments(worker, emitter, process_fn, progressive, progressive_continuous, text_list)
+
+
+# -----------------------------------------------------------------------------
+# Audio Processing
+#
+
+
+def debug_save_audio_session(
+    debug_audio_dir: str,
+    debug_audio_buf: List[bytes],
+    sample_rate: int,
+    sample_width: int,
+) -> None:
+    if not debug_audio_dir or not debug_audio_buf:
+        return
+    import wave as _wave
+
+    wav_name = time.strftime("%m%d-%H%M%S") + ".wav"
+    with _wave.open(os.path.join(debug_audio_dir, wav_name), "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(sample_width)
+        wf.setframerate(sample_rate)
+        wf.writeframes(b"".join(debug_audio_buf))
+    debug_audio_buf.clear()
+
+
+def denoise_audio(data: bytes, sample_rate: int, level: int, dtype: str = "int16") -> bytes:
+    """
+    Apply noise reduction to raw audio bytes and return processed bytes.
+
+    :arg data: Raw audio bytes.
+    :arg sample_rate: Audio sample rate in Hz.
+    :arg level: Noise reduction aggressiveness. 0 = disabled, 1 = light, 2 = heavy.
+    :arg dtype: Sample format of `data`. Either ``"int16"`` (VOSK path) or
+        ``"float32"`` (sherpa path).
+    :return: Denoised audio as bytes in the same dtype as the input.
+
+    .. note::
+        ``noisereduce`` is imported here rather than at the top of the file for
+        two reasons: it is an optional dependency (not needed when ``level=0``,
+        the default), and this matches the lazy-import pattern used throughout
+        this file for heavy optional dependencies such as ``vosk`` and
+        ``sherpa_onnx``, which avoids slowing down startup or crashing users
+        who have not installed the package.
+    """
+    if level == 0:
+        return data
+
+    # noisereduce is an optional dependency; imported lazily - see docstring.
+    import noisereduce as nr  # type: ignore
+    import numpy as np
+
+    prop_decrease = 0.5 if level == 1 else 1.0
+
+    if dtype == "int16":
+        samples = np.frombuffer(data, dtype=np.int16).astype(np.float32) / 32768.0
+    else:  # float32
+        # frombuffer returns a read-only view; copy() is required before mutation.
+        samples = np.frombuffer(data, dtype=np.float32).copy()
+
+    denoised: "np.ndarray[Any, Any]" = nr.reduce_noise(
+        y=samples, sr=sample_rate, prop_decrease=prop_decrease, stationary=True
+    )
+
+    if dtype == "int16":
+        return (denoised * 32768.0).astype(np.int16).tobytes()
+    else:
+        return denoised.astype(np.float32).tobytes()
+
+
+class PolyphaseResampler:
+    """
+    Streaming rational resampler (windowed-sinc FIR evaluated in polyphase form),
+    used when the recording device can't record at the rate the model expects.
+
+    Requires ``numpy``, samples are ``float32``.
+    """
+
+    __slots__ = (
+        "rate_in",
+        "rate_out",
+        "_up",
+        "_down",
+        "_taps",
+        "_filters",
+        "_history",
+        "_input_len",
+        "_output_len",
+    )
+
+    def __init__(self, rate_in: int, rate_out: int, taps_per_phase: int = 24) -> None:
+        import math
+        import numpy as np
+
+        self.rate_in = rate_in
+        self.rate_out = rate_out
+        divisor = math.gcd(rate_in, rate_out)
+        up = rate_out // divisor
+        down = rate_in // divisor
+        self._up = up
+        self._down = down
+        self._taps = taps_per_phase
+
+        # Low-pass filter at the rate of the (virtual) up-sampled signal,
+        # cut-off just below the lower of the two Nyquist frequencies.
+        filter_len = taps_per_phase * up
+        cutoff = 0.475 / max(up, down)
+        n = np.arange(filter_len, dtype=np.float64) - (filter_len - 1) / 2.0
+        h = 2.0 * cutoff * np.sinc(2.0 * cutoff * n) * np.kaiser(filter_len, 6.0)
+        # Compensate for the gain lost by zero stuffing.
+        h *= up / h.sum()
+        # Filters for each phase: `filters[phase][j] = h[phase + j * up]`.
+        self._filters = np.ascontiguousarray(h.reshape(taps_per_phase, up).T, dtype=np.float32)
+
+        self._history = np.zeros(taps_per_phase - 1, dtype=np.float32)
+        # Total number of input samples & output samples.
+        self._input_len = 0
+        self._output_len = 0
+
+    def process(self, samples: "np.ndarray[Any, Any]") -> "np.ndarray[Any, Any]":
+        import numpy as np
+
+        up = self._up
+        down = self._down
+        taps = self._taps
+
+        samples_ext = np.concatenate((self._history, samples.astype(np.float32, copy=False)))
+        input_len_prev = self._input_len
+        self._input_len += len(samples)
+
+        # Output sample `k` uses input samples up to `(k * down) // up`, which must be available.
+        output_end = (self._input_len * up - 1) // down + 1 if self._input_len else 0
+        k = np.arange(self._output_len, output_end, dtype=np.int64)
+        self._output_len = max(output_end, self._output_len)
+
+        self._history = samples_ext[len(samples_ext) - (taps - 1) :]
+
+        if len(k) == 0:
+            return np.zeros(0, dtype=np.float32)
+
+        t = k * down
+        phase = t % up
+        # Index of the newest input sample for each output (relative to `samples_ext`).
+        index = (t // up) - input_len_prev + (taps - 1)
+        frames = samples_ext[index[:, np.newaxis] - np.arange(taps)[np.newaxis, :]]
+        result: "np.ndarray[Any, Any]" = np.einsum("kj,kj->k", self._filters[phase], frames)
+        return result.astype(np.float32, copy=False)
+
+
+def audio_block_rms(data: bytes, sample_width: int) -> float:
+    """
+    Return the RMS of ``int16`` (``sample_width=2``) or ``float32`` (``sample_width=4``) audio, in [0..1].
+    """
+    import array
+
+    samples = array.array("h" if sample_width == 2 else "f")
+    samples.frombytes(data[: len(data) - (len(data) % sample_width)])
+    if not samples:
+        return 0.0
+    rms: float = (sum(x * x for x in samples) / len(samples)) ** 0.5
+    return rms / 32768.0 if sample_width == 2 else rms
+
+
+AUDIO_OVERLOAD_POLICIES = ("DROP_SILENCE", "SKIP_PARTIALS", "DISABLE_NOISE_REDUCTION")
+
+
+class AudioOverload:
+    """
+    Track when processing falls behind the recording (the backlog exceeds ``backlog_limit`` seconds),
+    applying ``policies`` (see ``AUDIO_OVERLOAD_POLICIES``) until the backlog falls below half the limit.
+
+    The backlog is always bounded, once the policies don't reduce the backlog enough the oldest audio is dropped.
+    """
+
+    __slots__ = (
+        "backlog_limit",
+        "policies",
+        "overloaded",
+        "overrun_count",
+        "recovery_count",
+        "dropped_samples",
+        "silence_threshold",
+    )
+
+    def __init__(self, backlog_limit: float, policies: Set[str], silence_threshold: float = 0.01) -> None:
+        self.backlog_limit = backlog_limit
+        self.policies = policies
+        self.overloaded = False
+        self.overrun_count = 0
+        self.recovery_count = 0
+        self.dropped_samples = 0
+        # RMS below which a block of audio is considered silent.
+        self.silence_threshold = silence_threshold
+
+    @property
+    def skip_partials(self) -> bool:
+        return self.overloaded and "SKIP_PARTIALS" in self.policies
+
+    @property
+    def skip_noise_reduction(self) -> bool:
+        return self.overloaded and "DISABLE_NOISE_REDUCTION" in self.policies
+
+    def update(self, backlog: float) -> Optional[bool]:
+        """
+        Update the state from the backlog (in seconds),
+        return true/false when the state changes to overloaded/recovered, otherwise None.
+        """
+        if self.backlog_limit <= 0.0:
+            return None
+        if not self.overloaded:
+            if backlog > self.backlog_limit:
+                self.overloaded = True
+                self.overrun_count += 1
+                return True
+        elif backlog < self.backlog_limit * 0.5:
+            self.overloaded = False
+            self.recovery_count += 1
+            return False
+        return None
+
+    def trim(self, data: bytes, byte_rate: int, sample_width: int) -> bytes:
+        """
+        Return ``data`` limited to ``backlog_limit``,
+        dropping silent blocks first (when enabled) then the oldest audio.
+        """
+        if self.backlog_limit <= 0.0:
+            return data
+        size_limit = int(self.backlog_limit * byte_rate)
+        size_limit -= size_limit % sample_width
+        size = len(data)
+        if size <= size_limit:
+            return data
+
+        if "DROP_SILENCE" in self.policies:
+            # Blocks of 100ms.
+            block_size = max(sample_width, int(byte_rate * 0.1) - (int(byte_rate * 0.1) % sample_width))
+            blocks = [data[i : i + block_size] for i in range(0, size, block_size)]
+            blocks_keep = []
+            for block in blocks:
+                if size > size_limit and audio_block_rms(block, sample_width) < self.silence_threshold:
+                    size -= len(block)
+                    self.dropped_samples += len(block) // sample_width
+                    continue
+                blocks_keep.append(block)
+            data = b"".join(blocks_keep)
+
+        if len(data) > size_limit:
+            self.dropped_samples += (len(data) - size_limit) // sample_width
+            data = data[len(data) - size_limit :]
+        return data
+
+
+def audio_overload_update(overload: AudioOverload, metrics: "DictationMetrics", verbose: int) -> None:
+    """
+    Update ``overload`` from the backlog in ``metrics``, reporting changes.
+    """
+    state_change = overload.update(metrics.queue_seconds)
+    if state_change is None:
+        return
+    metrics.overrun_count = overload.overrun_count
+    metrics.recovery_count = overload.recovery_count
+    if verbose >= 1:
+        if state_change:
+            sys.stderr.write("Overloaded, {:.2f}s of audio waiting to be processed.\n".format(metrics.queue_seconds))
+        else:
+            sys.stderr.write("Recovered from overload.\n")
+
+
+class AudioRingBuffer:
+    """
+    A fixed size buffer which holds the most recently written audio,
+    older audio is overwritten (without any allocations once created).
+    """
+
+    __slots__ = (
+        "_buf",
+        "_size",
+        "_pos",
+        "_len",
+        "_sample_width",
+        "_written_tail",
+    )
+
+    def __init__(self, size: int, sample_width: int) -> None:
+        size -= size % sample_width
+        self._buf = bytearray(size)
+        self._size = size
+        # The position the next write starts at.
+        self._pos = 0
+        # The number of bytes in use.
+        self._len = 0
+        self._sample_width = sample_width
+        # The total number of bytes written (modulo the sample width),
+        # needed so reading never starts part way through a sample.
+        self._written_tail = 0
+
+    def __len__(self) -> int:
+        return self._len
+
+    def clear(self) -> None:
+        self._pos = 0
+        self._len = 0
+        self._written_tail = 0
+
+    def write(self, data: bytes) -> None:
+        size = self._size
+        data_len = len(data)
+        if size == 0 or data_len == 0:
+            return
+        self._written_tail = (self._written_tail + data_len) % self._sample_width
+        if data_len >= size:
+            self._buf[:] = data[data_len - size :]
+            self._pos = 0
+            self._len = size
+            return
+
+        pos = self._pos
+        split = min(data_len, size - pos)
+        self._buf[pos : pos + split] = data[:split]
+        if split != data_len:
+            self._buf[: data_len - split] = data[split:]
+        self._pos = (pos + data_len) % size
+        self._len = min(self._len + data_len, size)
+
+    def read_all(self) -> bytes:
+        """
+        Return the buffered audio (oldest first) and clear the buffer.
+        """
+        length = self._len
+        # Skip the remainder of a partially overwritten sample.
+        length -= (length - self._written_tail) % self._sample_width
+        beg = (self._pos - length) % self._size if length else 0
+        if beg + length <= self._size:
+            data = bytes(self._buf[beg : beg + length])
+        else:
+            data = bytes(self._buf[beg:]) + bytes(self._buf[: beg + length - self._size])
+        self.clear()
+        return data
+
+
+# -----------------------------------------------------------------------------
+# Memory
+#
+# Release memory after being suspended for a long time (``--suspend-trim-timeout``),
+# so the process can be left running (ready to resume) on systems with little memory.
+
+
+def memory_trim() -> bool:
+    """
+    Free unreachable objects & return unused heap memory to the system,
+    returning true when memory was returned (only supported with glibc).
+    """
+    import ctypes
+    import gc
+
+    gc.collect()
+    # try-catch approved: ``malloc_trim`` is a glibc extension, other C libraries (musl for e.g.) don't have it.
+    try:
+        return bool(ctypes.CDLL(None).malloc_trim(0))
+    except (OSError, AttributeError):
+        return False
+
+
+def process_continue_after(seconds: float) -> "subprocess.Popen[bytes]":
+    """
+    Continue this process (``SIGCONT``) after ``seconds`` (rounded up to whole seconds),
+    a separate process is used since a stopped process can't run it's own timers.
+    """
+    import math
+
+    # A new session, so `process_continue_cancel` can kill ``sleep`` along with the shell.
+    return subprocess.Popen(
+        ("sh", "-c", 'sleep "$0" && kill -CONT "$1"', str(math.ceil(seconds)), str(os.getpid())),
+        start_new_session=True,
+    )
+
+
+def process_continue_cancel(proc: "subprocess.Popen[bytes]") -> None:
+    # try-catch approved: the processes may have exited.
+    try:
+        os.killpg(proc.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+    proc.wait()
+
+
+def model_cache_text(model_dir: str) -> str:
+    """
+    Return how much of the model is in the page cache (reported when loading with ``--verbose``),
+    a "cold" model is read from the disk, see the ``prefetch`` sub-command.
+    """
+    # lazy import: only needed for reporting.
+    from . import page_cache
+
+    cached = page_cache.files_cached_bytes_or_none(page_cache.paths_files([model_dir]))
+    if cached is None or cached[0] == 0:
+        return "page cache unknown"
+    size, size_cached = cached
+    return "{:s}, {:d}% of {:s} cached".format(
+        "warm" if size_cached >= size * 0.9 else "cold",
+        round(size_cached * 100 / size),
+        page_cache.size_as_text(size),
+    )
+
+
+class ModelLoad:
+    """
+    Load a model on a thread (``--suspend-unload-model``),
+    so recording can start when resuming, the audio is buffered until the model has loaded.
+    """
+
+    __slots__ = (
+        "audio",
+        "_thread",
+        "_result",
+        "_error",
+    )
+
+    def __init__(self, load_fn: Callable[[], Any]) -> None:
+        import threading
+
+        # Audio recorded while loading.
+        self.audio: List[bytes] = []
+        self._result: Any = None
+        self._error: Optional[BaseException] = None
+        # A daemon thread, so exiting isn't delayed by a model which is no longer needed.
+        self._thread = threading.Thread(target=self._run, args=(load_fn,), daemon=True)
+        self._thread.start()
+
+    def _run(self, load_fn: Callable[[], Any]) -> None:
+        # try-catch approved: the error is raised by `result` (from the main thread).
+        try:
+            self._result = load_fn()
+        except BaseException as ex:
+            self._error = ex
+
+    def is_loaded(self) -> bool:
+        return not self._thread.is_alive()
+
+    def result(self) -> Any:
+        """
+        Wait for loading to finish, returning the value from ``load_fn`` (raising any error it raised).
+        """
+        self._thread.join()
+        if self._error is not None:
+            raise self._error
+        return self._result
+
+
+# -----------------------------------------------------------------------------
+# Metrics
+#
+
+
+def memory_resident_bytes() -> int:
+    try:
+        with open("/proc/self/statm", "r", encoding="utf-8") as fh:
+            return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+class DictationMetrics:
+    """
+    Counters maintained by the main loop, written to ``--metrics-file`` (Prometheus text format)
+    so a running process can be monitored (see the ``status`` sub-command).
+
+    Updating values is cheap, writing the file is throttled to ``write_interval``.
+    """
+
+    __slots__ = (
+        "filepath",
+        "write_interval",
+        "state",
+        "audio_seconds",
+        "decode_seconds",
+        "postprocess_seconds",
+        "queue_seconds",
+        "dropped_samples",
+        "overrun_count",
+        "recovery_count",
+        "capture_restart_count",
+        "model_swap_count",
+        "resume_latency",
+        "partial_time",
+        "chars_typed",
+        "chars_deleted",
+        "_write_time",
+        "_write_audio_seconds",
+        "_write_decode_seconds",
+    )
+
+    def __init__(self, filepath: str, write_interval: float = 1.0) -> None:
+        self.filepath = filepath
+        self.write_interval = write_interval
+        # One of: "loading", "recording", "suspended".
+        self.state = "loading"
+        # Seconds of audio passed to the recognizer.
+        self.audio_seconds = 0.0
+        # Time spent in the recognizer.
+        self.decode_seconds = 0.0
+        # Time spent processing and outputting text.
+        self.postprocess_seconds = 0.0
+        # Seconds of audio waiting to be processed (as of the last read).
+        self.queue_seconds = 0.0
+        self.dropped_samples = 0
+        # The number of times processing fell behind & caught up with the recording (see `AudioOverload`).
+        self.overrun_count = 0
+        self.recovery_count = 0
+        # The number of times the recording stalled & was restarted (see ``--capture-stall-timeout``).
+        self.capture_restart_count = 0
+        # The number of times the model was swapped (see ``--model-swap-dir``).
+        self.model_swap_count = 0
+        self.resume_latency = 0.0
+        # The time of the last partial result (from `time.monotonic`).
+        self.partial_time = time.monotonic()
+        # Characters typed & deleted (see `TextEmitter`).
+        self.chars_typed = 0
+        self.chars_deleted = 0
+
+        self._write_time = 0.0
+        self._write_audio_seconds = 0.0
+        self._write_decode_seconds = 0.0
+
+    def as_text(self) -> str:
+        now = time.monotonic()
+        audio_delta = self.audio_seconds - self._write_audio_seconds
+        decode_delta = self.decode_seconds - self._write_decode_seconds
+        if audio_delta > 0.0:
+            real_time_factor = decode_delta / audio_delta
+        elif self.audio_seconds > 0.0:
+            real_time_factor = self.decode_seconds / self.audio_seconds
+        else:
+            real_time_factor = 0.0
+
+        lines = [
+            "# HELP nerd_dictation_state Dictation state.",
+            "# TYPE nerd_dictation_state gauge",
+        ]
+        for state in ("loading", "recording", "suspended"):
+            lines.append('nerd_dictation_state{{state="{:s}"}} {:d}'.format(state, int(state == self.state)))
+
+        for name, metric_type, description, value in (
+            ("real_time_factor", "gauge", "Decoding / audio time (since the last update).", real_time_factor),
+            ("audio_seconds_total", "counter", "Audio passed to the recognizer.", self.audio_seconds),
+            ("decode_seconds_total", "counter", "Time spent decoding.", self.decode_seconds),
+            ("postprocess_seconds_total", "counter", "Time processing & typing text.", self.postprocess_seconds),
+            ("audio_queue_seconds", "gauge", "Audio waiting to be processed.", self.queue_seconds),
+            ("dropped_samples_total", "counter", "Audio samples dropped.", self.dropped_samples),
+            ("overrun_total", "counter", "Times processing fell behind the recording.", self.overrun_count),
+            ("recovery_total", "counter", "Times processing caught up with the recording.", self.recovery_count),
+            ("capture_restart_total", "counter", "Recording restarts (stalled).", self.capture_restart_count),
+            ("model_swap_total", "counter", "Times the model was swapped.", self.model_swap_count),
+            ("resume_latency_seconds", "gauge", "Time from resuming to processing audio.", self.resume_latency),
+            ("seconds_since_partial", "gauge", "Time since the last partial result.", now - self.partial_time),
+            ("chars_typed_total", "counter", "Characters typed.", self.chars_typed),
+            ("chars_deleted_total", "counter", "Characters deleted (revised results).", self.chars_deleted),
+            ("resident_memory_bytes", "gauge", "Resident memory size.", memory_resident_bytes()),
+            ("metrics_timestamp_seconds", "gauge", "Time this was written (seconds since the epoch).", time.time()),
+        ):
+            name = "nerd_dictation_" + name
+            lines.append("# HELP {:s} {:s}".format(name, description))
+            lines.append("# TYPE {:s} {:s}".format(name, metric_type))
+            lines.append("{:s} {!r}".format(name, value))
+        return "\n".join(lines) + "\n"
+
+    def write(self, force: bool = False) -> None:
+        if not self.filepath:
+            return
+        now = time.monotonic()
+        if not force and (now - self._write_time) < self.write_interval:
+            return
+        text = self.as_text()
+        self._write_time = now
+        self._write_audio_seconds = self.audio_seconds
+        self._write_decode_seconds = self.decode_seconds
+        # Write & rename so readers never see a partially written file.
+        filepath_tmp = self.filepath + ".tmp"
+        with open(filepath_tmp, "w", encoding="utf-8") as fh:
+            fh.write(text)
+        os.replace(filepath_tmp, self.filepath)
+
+
+# -----------------------------------------------------------------------------
+# Model Swap
+#
+
+# Seconds between checking the power supply & memory pressure.
+MODEL_SWAP_CHECK_INTERVAL = 2.0
+
+# Seconds of audio the real-time factor is measured over.
+MODEL_SWAP_RTF_WINDOW = 10.0
+
+# Requests made with the ``model`` sub-command.
+MODEL_SWAP_REQUESTS = ("primary", "alternate", "auto")
+
+
+def power_on_battery(power_supply_dir: str = "/sys/class/power_supply") -> bool:
+    """
+    Return true when a battery is discharging and no mains power supply is online.
+    """
+    # try-catch approved: there may be no power supply information (desktops & containers).
+    try:
+        names = os.listdir(power_supply_dir)
+    except OSError:
+        return False
+    on_battery = False
+    for name in names:
+        supply_dir = os.path.join(power_supply_dir, name)
+        # try-catch approved: attributes vary between drivers & devices may be removed while reading.
+        try:
+            with open(os.path.join(supply_dir, "type"), "r", encoding="utf-8") as fh:
+                supply_type = fh.read().strip()
+            if supply_type == "Mains":
+                with open(os.path.join(supply_dir, "online"), "r", encoding="utf-8") as fh:
+                    if fh.read().strip() == "1":
+                        return False
+            elif supply_type == "Battery":
+                with open(os.path.join(supply_dir, "status"), "r", encoding="utf-8") as fh:
+                    if fh.read().strip() == "Discharging":
+                        on_battery = True
+        except OSError:
+            continue
+    return on_battery
+
+
+def memory_pressure_or_none(pressure_file: str = "/proc/pressure/memory") -> Optional[float]:
+    """
+    Return the percentage of time (averaged over 10 seconds) some tasks stalled waiting for memory,
+    None when pressure stall information isn't available.
+    """
+    # try-catch approved: requires Linux 4.20 (or later) with PSI enabled.
+    try:
+        with open(pressure_file, "r", encoding="utf-8") as fh:
+            for line in fh:
+                fields = line.split()
+                if fields and fields[0] == "some":
+                    for field in fields[1:]:
+                        key, _, value = field.partition("=")
+                        if key == "avg10":
+                            return float(value)
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+class ModelSwap:
+    """
+    Choose between the primary & alternate model (``--model-swap-dir``).
+
+    The alternate model is used while any of the enabled conditions hold
+    (running on battery, memory pressure or a real-time factor over the limit)
+    or when requested with the ``model`` sub-command.
+    A high real-time factor is only measured for the primary model, once reached the alternate model is kept
+    until the ``model`` sub-command is used (otherwise the faster model would swap back).
+    """
+
+    __slots__ = (
+        "model_dirs",
+        "index",
+        "request",
+        "on_battery",
+        "rtf_limit",
+        "pressure_limit",
+        "_rtf_high",
+        "_index_want",
+        "_check_time",
+        "_audio_seconds",
+        "_decode_seconds",
+    )
+
+    def __init__(
+        self,
+        model_dir: str,
+        model_dir_alternate: str,
+        *,
+        on_battery: bool = False,
+        rtf_limit: float = 0.0,
+        pressure_limit: float = 0.0,
+    ) -> None:
+        self.model_dirs = (model_dir, model_dir_alternate)
+        # The index of the model in use (in `model_dirs`).
+        self.index = 0
+        # One of `MODEL_SWAP_REQUESTS`.
+        self.request = "auto"
+        self.on_battery = on_battery
+        self.rtf_limit = rtf_limit
+        self.pressure_limit = pressure_limit
+        self._rtf_high = False
+        self._index_want = 0
+        self._check_time = -MODEL_SWAP_CHECK_INTERVAL
+        self._audio_seconds = 0.0
+        self._decode_seconds = 0.0
+
+    def request_set(self, request: str) -> bool:
+        """
+        Handle the ``model`` sub-command, returning false for an unknown request.
+        """
+        if request not in MODEL_SWAP_REQUESTS:
+            return False
+        self.request = request
+        self._rtf_high = False
+        # Check the conditions immediately when returning to automatic swapping.
+        self._check_time = -MODEL_SWAP_CHECK_INTERVAL
+        return True
+
+    def swapped(self, index: int, metrics: DictationMetrics) -> None:
+        """
+        The model at ``index`` is now in use.
+        """
+        self.index = index
+        self._audio_seconds = metrics.audio_seconds
+        self._decode_seconds = metrics.decode_seconds
+        metrics.model_swap_count += 1
+
+    def index_want(self, metrics: DictationMetrics) -> int:
+        """
+        Return the index of the model which should be used.
+        """
+        if self.request != "auto":
+            return MODEL_SWAP_REQUESTS.index(self.request)
+        now = time.monotonic()
+        if now - self._check_time >= MODEL_SWAP_CHECK_INTERVAL:
+            self._check_time = now
+            self._index_want = int(self._check(metrics))
+        return self._index_want
+
+    def _check(self, metrics: DictationMetrics) -> bool:
+        if self.rtf_limit > 0.0:
+            audio_delta = metrics.audio_seconds - self._audio_seconds
+            if audio_delta >= MODEL_SWAP_RTF_WINDOW:
+                if self.index == 0 and (metrics.decode_seconds - self._decode_seconds) / audio_delta > self.rtf_limit:
+                    self._rtf_high = True
+                self._audio_seconds = metrics.audio_seconds
+                self._decode_seconds = metrics.decode_seconds
+            if self._rtf_high:
+                return True
+        if self.pressure_limit > 0.0:
+            pressure = memory_pressure_or_none()
+            if pressure is not None and pressure > self.pressure_limit:
+                return True
+        if self.on_battery and power_on_battery():
+            return True
+        return False
+
+
+def model_swap_request(model_swap: Optional[ModelSwap], request: str) -> None:
+    if model_swap is None:
+        sys.stderr.write("Unable to swap the model without ``--model-swap-dir``.\n")
+    elif not model_swap.request_set(request):
+        sys.stderr.write("Unknown model {!r}, expected one of: {:s}\n".format(request, ", ".join(MODEL_SWAP_REQUESTS)))
+
+
+# -----------------------------------------------------------------------------
+# Capture
+#
+# Recording audio for `text_from_engine`, created by the engine (see `Engine.capture_create`).
+
+# The most audio read from a recording command at once (1mb).
+CAPTURE_PROCESS_BLOCK_SIZE = 1_048_576
+
+
+def recording_cmd_or_none(input_method: str, sample_rate: int, pulse_device_name: str) -> Optional[Tuple[str, ...]]:
+    """
+    Return the command which records 16-bit mono audio to the standard output,
+    or None when ``input_method`` isn't supported.
+    """
+    if input_method == "PAREC":
+        cmd = (
+            "parec",
+            "--record",
+            "--rate=%d" % sample_rate,
+            "--channels=1",
+            *(("--device=%s" % pulse_device_name,) if pulse_device_name else ()),
+            "--format=s16ne",
+            "--latency=10",
+        )
+    elif input_method == "SOX":
+        cmd = (
+            "sox",
+            "-q",
+            "-V1",
+            "-d",
+            "--buffer",
+            "1000",
+            "-r",
+            "%d" % sample_rate,
+            "-b",
+            "16",
+            "-e",
+            "signed-integer",
+            "-c",
+            "1",
+            "-t",
+            "raw",
+            "-L",
+            "-",
+        )
+    elif input_method == "PW-CAT":
+        cmd = (
+            "pw-cat",
+            "--record",
+            "--format=s16",
+            "--rate",
+            str(sample_rate),
+            "--channels=1",
+            "-",
+        )
+    else:
+        return None
+    return cmd
+
+
+def recording_proc_with_non_blocking_stdout(
+    input_method: str,
+    sample_rate: int,
+    pulse_device_name: str,
+    # NOTE: typed as a string for Py3.6 compatibility.
+) -> "Tuple[subprocess.Popen[bytes], IO[bytes]]":
+    cmd = recording_cmd_or_none(input_method, sample_rate, pulse_device_name)
+    if cmd is None:
+        sys.stderr.write("--input %r not supported.\n" % input_method)
+        sys.exit(1)
+
+    ps = subprocess.Popen(cmd, stdout=subprocess.PIPE)
+    stdout = ps.stdout
+    assert stdout is not None
+
+    # Needed so whatever is available can be read (without waiting).
+    file_handle_make_non_blocking(stdout)
+
+    return ps, stdout
+
+
+class Capture:
+    """
+    Record mono audio, reading returns everything recorded since the previous read (without waiting).
+    """
+
+    __slots__ = (
+        "sample_rate",
+        "sample_width",
+        "dropped_samples",
+    )
+
+    def __init__(self, sample_rate: int, sample_width: int) -> None:
+        self.sample_rate = sample_rate
+        # Bytes per sample, 2 for 16-bit integers, 4 for 32-bit floats.
+        self.sample_width = sample_width
+        # Samples dropped before they could be read (when the backlog is limited).
+        self.dropped_samples = 0
+
+    @property
+    def byte_rate(self) -> int:
+        return self.sample_rate * self.sample_width
+
+    def start(self) -> None:
+        raise NotImplementedError
+
+    def stop(self) -> None:
+        raise NotImplementedError
+
+    def restart(self) -> None:
+        """
+        Restart a recording which stalled (e.g. after a system sleep).
+        """
+        raise NotImplementedError
+
+    def read(self) -> bytes:
+        raise NotImplementedError
+
+    def wait(self, timeout: float) -> None:
+        """
+        Wait up to ``timeout`` seconds for audio to be recorded.
+        """
+        raise NotImplementedError
+
+    def convert(self, data: bytes) -> bytes:
+        """
+        Return audio which has been read, converted to the engine's sample rate.
+        """
+        return data
+
+
+class CaptureProcess(Capture):
+    """
+    Record 16-bit audio with a command (see ``--input``).
+    """
+
+    __slots__ = (
+        "input_method",
+        "pulse_device_name",
+        "_ps",
+        "_stdout",
+    )
+
+    def __init__(self, input_method: str, sample_rate: int, pulse_device_name: str) -> None:
+        super().__init__(sample_rate, 2)
+        self.input_method = input_method
+        self.pulse_device_name = pulse_device_name
+        # NOTE: typed as a string for Py3.6 compatibility.
+        self._ps: "Optional[subprocess.Popen[bytes]]" = None
+        self._stdout: Optional[IO[bytes]] = None
+
+    def start(self) -> None:
+        self._ps, self._stdout = recording_proc_with_non_blocking_stdout(
+            self.input_method, self.sample_rate, self.pulse_device_name
+        )
+
+    def stop(self) -> None:
+        assert self._ps is not None and self._stdout is not None
+        self._stdout.close()
+        os.kill(self._ps.pid, signal.SIGINT)
+        self._ps = None
+        self._stdout = None
+
+    def restart(self) -> None:
+        assert self._ps is not None and self._stdout is not None
+        self._stdout.close()
+        # A stalled process may not respond to SIGINT.
+        self._ps.kill()
+        self._ps.wait()
+        self.start()
+
+    def read(self) -> bytes:
+        assert self._stdout is not None
+        # Mostly the data read is quite small (under 1k).
+        # Only the first read is large, due to the time it takes to load the model.
+        return self._stdout.read(CAPTURE_PROCESS_BLOCK_SIZE) or b""
+
+    def wait(self, timeout: float) -> None:
+        import select
+
+        stdout = self._stdout
+        assert stdout is not None
+        select.select([stdout], [], [], timeout)
+
+
+class CaptureDevice(Capture):
+    """
+    Record 32-bit float audio from the default input device (with ``sounddevice``),
+    resampled to ``sample_rate_engine`` when recording at a different rate.
+    """
+
+    __slots__ = (
+        "_sd",
+        "_stream",
+        "_queue",
+        "_pending",
+        "_resampler",
+    )
+
+    def __init__(self, sample_rate_engine: int, sample_rate: int, queue_seconds: float, verbose: int) -> None:
+        # lazy import: optional deps, moving to top would crash vosk-only usage
+        import math
+        import sounddevice as sd
+
+        # Record at the engine's sample rate when the device supports it, otherwise resample.
+        if sample_rate == 0:
+            sample_rate = sample_rate_engine
+            # try-catch approved: the device may not support the model's rate, record at it's default rate instead
+            try:
+                sd.check_input_settings(samplerate=sample_rate, channels=1, dtype="float32")
+            except (sd.PortAudioError, ValueError):
+                sample_rate = int(sd.query_devices(kind="input")["default_samplerate"])
+        super().__init__(sample_rate, 4)
+        self._sd = sd
+        self._stream: Any = None
+        self._resampler = (
+            PolyphaseResampler(sample_rate, sample_rate_engine) if sample_rate != sample_rate_engine else None
+        )
+        if verbose >= 2:
+            sys.stderr.write(
+                "Sample rate: {:d}{:s}\n".format(
+                    sample_rate, "" if self._resampler is None else " (resampled to {:d})".format(sample_rate_engine)
+                )
+            )
+        # Blocks of 10ms, when limited the oldest audio is dropped once the queue holds ``queue_seconds``.
+        self._queue: "queue.Queue[bytes]" = queue.Queue(
+            maxsize=int(math.ceil(queue_seconds / 0.01)) if queue_seconds > 0.0 else 0
+        )
+        # Blocks taken from the queue by `wait`.
+        self._pending: List[bytes] = []
+
+    def _callback(self, indata: Any, _frames: int, _time_info: Any, _status: Any) -> None:
+        data = bytes(indata)
+        try:
+            self._queue.put_nowait(data)
+        except queue.Full:
+            # Drop the oldest audio (main loop can't keep up).
+            try:
+                self.dropped_samples += len(self._queue.get_nowait()) // 4
+            except queue.Empty:
+                pass
+            self._queue.put_nowait(data)
+
+    def start(self) -> None:
+        # Small blocks keep the latency low when resuming from a warm suspend,
+        # reading joins all pending blocks so this doesn't increase the decoding overhead.
+        self._stream = self._sd.InputStream(
+            samplerate=self.sample_rate,
+            channels=1,
+            dtype="float32",
+            callback=self._callback,
+            blocksize=int(0.01 * self.sample_rate),
+        )
+        self._stream.start()
+
+    def stop(self) -> None:
+        if self._stream is not None:
+            self._stream.stop()
+            self._stream.close()
+            self._stream = None
+
+    def restart(self) -> None:
+        # Close & open a new stream (only using the public API), which opens the current default device.
+        self.stop()
+        # try-catch approved: the device may not be available yet, retry after another time-out.
+        try:
+            self.start()
+        except self._sd.PortAudioError as ex:
+            sys.stderr.write("Unable to restart the recording: {:s}\n".format(str(ex)))
+
+    def read(self) -> bytes:
+        chunks = self._pending
+        self._pending = []
+        while not self._queue.empty():
+            chunks.append(self._queue.get_nowait())
+        return b"".join(chunks)
+
+    def wait(self, timeout: float) -> None:
+        try:
+            self._pending.append(self._queue.get(timeout=timeout))
+        except queue.Empty:
+            pass
+
+    def convert(self, data: bytes) -> bytes:
+        if self._resampler is None:
+            return data
+        import numpy as np
+
+        return bytes(self._resampler.process(np.frombuffer(data, dtype=np.float32)).tobytes())
+
+
+# -----------------------------------------------------------------------------
+# Engines
+#
+# An engine decodes audio into text, `text_from_engine` handles everything else
+# (recording, suspending, outputting text .. etc).
+
+# Engines which can be selected with ``--engine`` (name: class), see `engine_register`.
+ENGINES: "Dict[str, Type[Engine]]" = {}
+
+
+class Engine:
+    """
+    Speech recognition, subclasses implement the methods which raise ``NotImplementedError``.
+
+    ``options`` holds the engine specific command line arguments (see `main_begin`),
+    ``sample_rate`` is the preferred rate for audio passed to `accept` (zero for the model's rate),
+    engines set ``sample_rate`` to the rate they use.
+
+    Audio is passed to `accept`, once an end-point is reached (or when suspending or exiting)
+    `final` ends the segment. Besides `load`, methods are only called from the main loop.
+
+    Engines are also used from Python (see ``api``), so they raise instead of exiting,
+    ``FileNotFoundError`` for missing files & ``ValueError`` for invalid models.
+    """
+
+    __slots__ = (
+        "model_dir",
+        "sample_rate",
+        "verbose",
+        "options",
+        "model",
+    )
+
+    # The type of samples passed to `accept` (mono, native byte order), "int16" or "float32".
+    sample_dtype = "int16"
+
+    def __init__(self, model_dir: str, *, sample_rate: int, verbose: int, options: Dict[str, Any]) -> None:
+        self.model_dir = model_dir
+        # Most models are trained with 16kHz audio.
+        self.sample_rate = sample_rate or 16000
+        self.verbose = verbose
+        self.options = options
+        # The loaded model, passed to `load` so it's not loaded again after the recognizers are released.
+        self.model: Any = None
+
+    @property
+    def sample_width(self) -> int:
+        return 2 if self.sample_dtype == "int16" else 4
+
+    def capture_create(
+        self,
+        input_method: str,
+        pulse_device_name: str,
+        sample_rate: int,
+        queue_seconds: float,
+    ) -> Capture:
+        """
+        Return the recording, by default ``input_method`` records at the engine's sample rate.
+        """
+        return CaptureProcess(input_method, self.sample_rate, pulse_device_name)
+
+    def load(self, model_dir: str, model: Any = None) -> Any:
+        """
+        Load the model from ``model_dir`` (unless ``model`` is passed in) & create the recognizers,
+        returning a value to pass to `start`.
+
+        This runs on a thread when loading in the background (see `ModelLoad`), so it must not change the engine.
+        """
+        raise NotImplementedError
+
+    def start(self, loaded: Any) -> None:
+        """
+        Use the model & recognizers from `load`, replacing any in use.
+        """
+        raise NotImplementedError
+
+    def release(self, unload: bool) -> None:
+        """
+        Release the recognizers (and the model when ``unload`` is true) while suspended,
+        they're loaded again before `start` is called.
+        """
+        raise NotImplementedError
+
+    def accept(self, data: bytes) -> bool:
+        """
+        Decode audio, returning true when an end-point has been reached (`final` must be called next).
+        """
+        raise NotImplementedError
+
+    def partial(self) -> str:
+        """
+        Return the text of the current segment (which may still change).
+        """
+        raise NotImplementedError
+
+    def final(self) -> str:
+        """
+        Return the text of the current segment, starting a new segment.
+        """
+        raise NotImplementedError
+
+    def speech_active(self) -> bool:
+        """
+        Return true while speech is being recognized (activity without partial results),
+        so ``--timeout`` isn't reached during speech for engines which don't return partial results.
+        """
+        return False
+
+    def final_tokens(self) -> Optional[Tuple[List[str], List[float]]]:
+        """
+        Return the tokens of the last `final` text & their start times (in seconds, relative to the segment start),
+        None when they aren't available.
+        """
+        return None
+
+    def final_times(self) -> Optional[Tuple[float, float]]:
+        """
+        Return the start & end of the speech in the last `final` text
+        (in seconds, offsets from the start of the audio passed to `accept`), None when they aren't known.
+        """
+        return None
+
+    def reset(self) -> None:
+        """
+        Discard the current segment.
+        """
+        raise NotImplementedError
+
+    def profile_switch(self, name: str) -> None:
+        """
+        Switch grammar profiles (see ``--vosk-grammar-profile``), called between segments.
+        """
+        sys.stderr.write("Grammar profiles aren't supported by this engine, ignoring {!r}.\n".format(name))
+
+    def close(self) -> None:
+        pass
+
+
+def engine_register(name: str) -> "Callable[[Type[Engine]], Type[Engine]]":
+    """
+    A class decorator, so the engine can be selected with ``--engine=name``.
+    """
+
+    def register(cls: "Type[Engine]") -> "Type[Engine]":
+        ENGINES[name] = cls
+        return cls
+
+    return register
+
+
+def engine_class_from_name(name: str) -> "Type[Engine]":
+    """
+    Return a registered engine, or for ``MODULE:CLASS``, an engine class imported from a module.
+    Raise ``ValueError`` when the engine isn't found.
+    """
+    cls = ENGINES.get(name)
+    if cls is not None:
+        return cls
+    module_name, sep, class_name = name.partition(":")
+    if not (sep and module_name and class_name):
+        raise ValueError(
+            "Unknown engine {!r}, expected one of: {:s} (or MODULE:CLASS)".format(name, ", ".join(ENGINES))
+        )
+    import importlib
+
+    # try-catch approved: report plugins which fail to import as an unknown engine.
+    try:
+        module = importlib.import_module(module_name)
+    except ImportError as ex:
+        raise ValueError("Unable to import engine module {!r}: {:s}".format(module_name, str(ex))) from ex
+    cls = getattr(module, class_name, None)
+    if not (isinstance(cls, type) and issubclass(cls, Engine)):
+        raise ValueError("{!r} is not an engine class (a subclass of Engine)".format(name))
+    return cls
+
+
+# -----------------------------------------------------------------------------
+# Engine: VOSK
+#
+
+
+def vosk_model_sample_rate_or_none(vosk_model_dir: str) -> Optional[int]:
+    """
+    Return the sample rate the model was trained with (from it's ``conf/mfcc.conf``).
+    """
+    try:
+        with open(os.path.join(vosk_model_dir, "conf", "mfcc.conf"), "r", encoding="utf-8") as fh:
+            for line in fh:
+                line = line.split("#", 1)[0].strip()
+                if line.startswith("--sample-frequency="):
+                    return int(float(line.partition("=")[2]))
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+@engine_register("vosk")
+class EngineVOSK(Engine):
+    """
+    VOSK (Kaldi) models, supporting grammar profiles (see ``--vosk-grammar-profile``).
+    """
+
+    __slots__ = (
+        "grammar_profile_files",
+        "grammar_profile",
+        "recognizers",
+        "rec",
+        "_partial_json",
+        "_partial_text",
+    )
+
+    def __init__(self, model_dir: str, *, sample_rate: int, verbose: int, options: Dict[str, Any]) -> None:
+        if not os.path.isdir(model_dir):
+            raise FileNotFoundError(
+                "Please download the model from "
+                "https://alphacephei.com/vosk/models and unpack it to {!r}".format(model_dir)
+            )
+
+        # Record at the models native sample rate, so VOSK doesn't need to resample the audio.
+        if sample_rate == 0:
+            sample_rate = vosk_model_sample_rate_or_none(model_dir) or 16000
+            if verbose >= 2:
+                sys.stderr.write("Sample rate: {:d}\n".format(sample_rate))
+
+        super().__init__(model_dir, sample_rate=sample_rate, verbose=verbose, options=options)
+
+        # Grammar profiles (name: grammar file), the file is empty for free dictation.
+        self.grammar_profile_files = {GRAMMAR_PROFILE_DEFAULT: options.get("vosk_grammar_file") or ""}
+        self.grammar_profile_files.update(options.get("vosk_grammar_profiles") or {})
+        self.grammar_profile = GRAMMAR_PROFILE_DEFAULT
+        self.recognizers: Dict[str, Any] = {}
+        self.rec: Any = None
+        # Only decode the partial result when it changes.
+        self._partial_json = ""
+        self._partial_text = ""
+
+    def load(self, model_dir: str, model: Any = None) -> Tuple[Any, Dict[str, Any]]:
+        # `mypy` doesn't know about VOSK.
+        import vosk  # type: ignore
+
+        vosk.SetLogLevel(-1)
+        if model is None:
+            model = vosk.Model(model_dir)
+
+        # A recognizer for each profile sharing the model, created up-front since compiling a grammar is slow,
+        # switching profiles is then immediate. Profiles with the same grammar share a recognizer.
+        recognizers: Dict[str, Any] = {}
+        recognizer_cache: Dict[str, Any] = {}
+        for grammar_profile, grammar_file in self.grammar_profile_files.items():
+            if not grammar_file:
+                grammar_json = ""
+            else:
+                with open(grammar_file, encoding="utf-8") as fh:
+                    grammar_json = fh.read()
+            rec = recognizer_cache.get(grammar_json)
+            if rec is None:
+                if grammar_json == "":
+                    rec = vosk.KaldiRecognizer(model, self.sample_rate)
+                else:
+                    rec = vosk.KaldiRecognizer(model, self.sample_rate, grammar_json)
+                recognizer_cache[grammar_json] = rec
+            recognizers[grammar_profile] = rec
+        return model, recognizers
+
+    def start(self, loaded: Tuple[Any, Dict[str, Any]]) -> None:
+        self.model, self.recognizers = loaded
+        self.rec = self.recognizers[self.grammar_profile]
+        self._partial_json = ""
+
+    def release(self, unload: bool) -> None:
+        # Recognizers hold the decoder state.
+        self.recognizers = {}
+        self.rec = None
+        if unload:
+            self.model = None
+
+    def accept(self, data: bytes) -> bool:
+        ok: bool = self.rec.AcceptWaveform(data)
+        return ok
+
+    def partial(self) -> str:
+        json_text = self.rec.PartialResult()
+        # Without this, there are *many* calls which decode the same partial text.
+        if json_text != self._partial_json:
+            import json
+
+            self._partial_json = json_text
+            # In rare cases this can be unset (when resuming from being suspended).
+            self._partial_text = json.loads(json_text).get("partial", "")
+        return self._partial_text
+
+    def final(self) -> str:
+        import json
+
+        self._partial_json = ""
+        json_text = self.rec.FinalResult()
+        # When `rec.FinalResult()` returns an empty string, typically immediately after a resume,
+        # it can cause the JSON decoder to fail, treat this as no text.
+        if not json_text:
+            return ""
+        text: str = json.loads(json_text)["text"]
+        return text
+
+    def reset(self) -> None:
+        self._partial_json = ""
+        self.rec.Reset()
+
+    def profile_switch(self, name: str) -> None:
+        if name not in self.recognizers:
+            sys.stderr.write(
+                "Unknown grammar profile {!r}, expected one of: {:s}\n".format(name, ", ".join(self.recognizers))
+            )
+            return
+        if name == self.grammar_profile:
+            return
+        self.rec = self.recognizers[name]
+        self.reset()
+        self.grammar_profile = name
+        if self.verbose >= 1:
+            sys.stderr.write("Grammar profile: {:s}.\n".format(name))
+
+
+# -----------------------------------------------------------------------------
+# Engine: sherpa-onnx
+#
+
+
+def sherpa_result_score_or_none(recognizer: Any, stream: Any) -> Optional[float]:
+    """
+    Return the mean log-probability of the tokens decoded so far (higher is more confident),
+    None when the score isn't available.
+    """
+    # try-catch approved: older sherpa-onnx versions don't expose token probabilities.
+    try:
+        ys_probs: List[float] = list(recognizer.get_result_all(stream).ys_probs)
+    except AttributeError:
+        return None
+    if not ys_probs:
+        return None
+    return sum(ys_probs) / len(ys_probs)
+
+
+def route_choose(candidates: List[Tuple[str, Optional[float]]], index_default: int) -> int:
+    """
+    Return the index of the ``(text, score)`` candidate with the highest score, ignoring empty text.
+    Candidates without a score are only chosen when no others have text (preferring ``index_default``).
+    """
+    index_best = -1
+    score_best = 0.0
+    for i, (text, score) in enumerate(candidates):
+        if text and score is not None and (index_best == -1 or score > score_best):
+            index_best = i
+            score_best = score
+    if index_best != -1:
+        return index_best
+    if candidates[index_default][0]:
+        return index_default
+    for i, (text, _) in enumerate(candidates):
+        if text:
+            return i
+    return index_default
+
+
+def sherpa_recognizer_create(
+    model_dir: str,
+    sample_rate: int,
+    hotwords_file: str,
+    hotwords_score: float,
+    verbose: int,
+) -> Any:
+    """
+    Create a streaming transducer recognizer from ``model_dir``, using CUDA when available.
+    """
+    import sherpa_onnx
+
+    model_kwargs = dict(
+        encoder=os.path.join(model_dir, "encoder-epoch-99-avg-1.int8.onnx"),
+        decoder=os.path.join(model_dir, "decoder-epoch-99-avg-1.onnx"),
+        joiner=os.path.join(model_dir, "joiner-epoch-99-avg-1.int8.onnx"),
+        tokens=os.path.join(model_dir, "tokens.txt"),
+        num_threads=1,
+        sample_rate=sample_rate,
+        feature_dim=80,
+        enable_endpoint_detection=True,
+        rule1_min_trailing_silence=2.4,
+        rule2_min_trailing_silence=1.2,
+        rule3_min_utterance_length=300,
+    )
+    if hotwords_file:
+        model_kwargs["decoding_method"] = "modified_beam_search"
+        model_kwargs["hotwords_file"] = hotwords_file
+        model_kwargs["hotwords_score"] = hotwords_score
+    for provider in ("cuda", "cpu"):
+        model_kwargs["provider"] = provider
+        # try-catch approved: CUDA libs may be missing, fall back to CPU
+        try:
+            return sherpa_onnx.OnlineRecognizer.from_transducer(**model_kwargs)
+        except RuntimeError:
+            if provider == "cpu":
+                raise
+            if verbose >= 1:
+                sys.stderr.write("CUDA unavailable, falling back to CPU.\n")
+
+
+class SherpaRouter:
+    """
+    Decode the same audio with one or more sherpa-onnx recognizers (``--route-model``),
+    choosing the result with the highest decoder score for each segment.
+
+    Recognizers decode concurrently on a thread pool (the decoding runs in ONNX Runtime, using separate cores),
+    so additional models don't add latency when there are idle cores.
+    Partial results & endpoints come from the recognizer chosen for the previous segment,
+    since the language spoken tends not to change between segments.
+    """
+
+    __slots__ = (
+        "recognizers",
+        "streams",
+        "index",
+        "verbose",
+        "_pool",
+    )
+
+    def __init__(self, recognizers: List[Any], verbose: int = 0) -> None:
+        self.recognizers = recognizers
+        self.streams = [recognizer.create_stream() for recognizer in recognizers]
+        # The recognizer used for partial results & endpoints.
+        self.index = 0
+        self.verbose = verbose
+        self._pool = None
+        if len(recognizers) > 1:
+            from concurrent.futures import ThreadPoolExecutor
+
+            self._pool = ThreadPoolExecutor(max_workers=len(recognizers))
+
+    def _decode(self, i: int, sample_rate: int, samples: Any) -> None:
+        recognizer = self.recognizers[i]
+        stream = self.streams[i]
+        stream.accept_waveform(sample_rate, samples)
+        while recognizer.is_ready(stream):
+            recognizer.decode_stream(stream)
+
+    def accept_waveform(self, sample_rate: int, samples: Any) -> None:
+        if self._pool is None:
+            self._decode(0, sample_rate, samples)
+            return
+        # Consume the iterator so exceptions are raised.
+        for _ in self._pool.map(lambda i: self._decode(i, sample_rate, samples), range(len(self.recognizers))):
+            pass
+
+    def result(self) -> str:
+        text: str = self.recognizers[self.index].get_result(self.streams[self.index])
+        return text
+
+    def result_final(self) -> str:
+        """
+        Choose the result for the current segment, call before ``reset``.
+        """
+        if self._pool is None:
+            return self.result()
+        candidates = [
+            (recognizer.get_result(stream), sherpa_result_score_or_none(recognizer, stream))
+            for recognizer, stream in zip(self.recognizers, self.streams)
+        ]
+        self.index = route_choose(candidates, self.index)
+        if self.verbose >= 2:
+            sys.stderr.write(
+                "Route: model {:d} of {:s}.\n".format(
+                    self.index + 1,
+                    ", ".join(
+                        "{!r} ({:s})".format(text, "?" if score is None else "{:.3f}".format(score))
+                        for text, score in candidates
+                    ),
+                )
+            )
+        text: str = candidates[self.index][0]
+        return text
+
+    def result_tokens(self) -> Optional[Tuple[List[str], List[float]]]:
+        """
+        Return the tokens of the current result & their start times (in seconds, relative to the segment start),
+        None when they aren't available.
+        """
+        # try-catch approved: older sherpa-onnx versions don't expose token timestamps.
+        try:
+            result = self.recognizers[self.index].get_result_all(self.streams[self.index])
+            tokens, timestamps = result.tokens, result.timestamps
+        except AttributeError:
+            return None
+        return list(tokens), [round(t, 3) for t in timestamps]
+
+    def is_endpoint(self) -> bool:
+        is_endpoint: bool = self.recognizers[self.index].is_endpoint(self.streams[self.index])
+        return is_endpoint
+
+    def reset(self) -> None:
+        for recognizer, stream in zip(self.recognizers, self.streams):
+            recognizer.reset(stream)
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+
+
+@engine_register("sherpa")
+class EngineSherpa(Engine):
+    """
+    sherpa-onnx streaming transducer models, supporting additional models (see ``--route-model``).
+    """
+
+    __slots__ = (
+        "hotwords_file",
+        "hotwords_score",
+        "route_model_dirs",
+        "router",
+        "tokens",
+    )
+
+    sample_dtype = "float32"
+
+    def __init__(self, model_dir: str, *, sample_rate: int, verbose: int, options: Dict[str, Any]) -> None:
+        # The sample rate of the models features (sherpa-onnx streaming transducers all use 16kHz),
+        # audio recorded at other rates is resampled.
+        super().__init__(model_dir, sample_rate=16000, verbose=verbose, options=options)
+        self.hotwords_file: str = options.get("hotwords_file") or ""
+        self.hotwords_score: float = options.get("hotwords_score", 0.5)
+        self.route_model_dirs: List[str] = options.get("route_model_dirs") or []
+        self.router: Optional[SherpaRouter] = None
+        # The tokens of the last final result.
+        self.tokens: Optional[Tuple[List[str], List[float]]] = None
+
+    def capture_create(
+        self,
+        input_method: str,
+        pulse_device_name: str,
+        sample_rate: int,
+        queue_seconds: float,
+    ) -> Capture:
+        return CaptureDevice(self.sample_rate, sample_rate, queue_seconds, self.verbose)
+
+    def load(self, model_dir: str, model: Any = None) -> "SherpaRouter":
+        if model is None:
+            # Hot-words are tokenized using the model's tokens, so they're only used for the main model.
+            # When only the main model changes (see `--model-swap-dir`), loaded route models are reused.
+            model_loaded = self.model
+            model = [
+                sherpa_recognizer_create(
+                    model_dir, self.sample_rate, self.hotwords_file, self.hotwords_score, self.verbose
+                )
+            ] + (
+                model_loaded[1:]
+                if model_loaded is not None
+                else [
+                    sherpa_recognizer_create(route_model_dir, self.sample_rate, "", self.hotwords_score, self.verbose)
+                    for route_model_dir in self.route_model_dirs
+                ]
+            )
+        return SherpaRouter(list(model), verbose=self.verbose)
+
+    def start(self, loaded: "SherpaRouter") -> None:
+        if self.router is not None:
+            self.router.close()
+        self.router = loaded
+        self.model = loaded.recognizers
+
+    def release(self, unload: bool) -> None:
+        assert self.router is not None
+        # Streams hold the decoder state.
+        self.router.close()
+        self.router = None
+        if unload:
+            self.model = None
+
+    def accept(self, data: bytes) -> bool:
+        import numpy as np
+
+        assert self.router is not None
+        self.router.accept_waveform(self.sample_rate, np.frombuffer(data, dtype=np.float32))
+        return self.router.is_endpoint()
+
+    def partial(self) -> str:
+        assert self.router is not None
+        return self.router.result()
+
+    def final(self) -> str:
+        assert self.router is not None
+        text = self.router.result_final()
+        # Tokens are read before the router is reset.
+        self.tokens = self.router.result_tokens() if text else None
+        self.router.reset()
+        return text
+
+    def final_tokens(self) -> Optional[Tuple[List[str], List[float]]]:
+        return self.tokens
+
+    def reset(self) -> None:
+        assert self.router is not None
+        self.router.reset()
+
+    def close(self) -> None:
+        if self.router is not None:
+            self.router.close()
+
+
+# -----------------------------------------------------------------------------
+# Engine: sherpa-onnx (offline)
+#
+
+
+def sherpa_offline_model_kwargs_or_none(model_dir: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+    """
+    Return the ``OfflineRecognizer.from_*`` method name & it's model arguments for the model in ``model_dir``,
+    None when no model is found. Whisper, SenseVoice & Paraformer exports are supported.
+    """
+    import glob
+
+    def file_or_empty(*patterns: str) -> str:
+        for pattern in patterns:
+            files = sorted(glob.glob(os.path.join(glob.escape(model_dir), pattern)))
+            if files:
+                return files[0]
+        return ""
+
+    tokens = file_or_empty("tokens.txt", "*tokens.txt")
+    if not tokens:
+        return None
+    # Whisper exports are named by size, e.g. `tiny.en-encoder.int8.onnx`.
+    encoder = file_or_empty("*encoder.int8.onnx", "*encoder.onnx")
+    decoder = file_or_empty("*decoder.int8.onnx", "*decoder.onnx")
+    if encoder and decoder:
+        return "from_whisper", dict(encoder=encoder, decoder=decoder, tokens=tokens, language="", task="transcribe")
+    model = file_or_empty("model.int8.onnx", "model.onnx")
+    if not model:
+        return None
+    # SenseVoice & Paraformer exports use the same file names.
+    if "sense" in os.path.basename(os.path.normpath(model_dir)).lower():
+        return "from_sense_voice", dict(model=model, tokens=tokens, use_itn=True)
+    return "from_paraformer", dict(paraformer=model, tokens=tokens)
+
+
+def sherpa_vad_create(vad_model: str, sample_rate: int) -> Any:
+    """
+    Create a Silero voice activity detector, splitting speech into segments at pauses.
+    """
+    import sherpa_onnx
+
+    config = sherpa_onnx.VadModelConfig()
+    config.silero_vad.model = vad_model
+    config.silero_vad.min_silence_duration = 0.5
+    # Long segments are split, so decoding isn't delayed until there is a pause.
+    config.silero_vad.max_speech_duration = 20.0
+    config.sample_rate = sample_rate
+    return sherpa_onnx.VoiceActivityDetector(config, buffer_size_in_seconds=60)
+
+
+@engine_register("sherpa-offline")
+class EngineSherpaOffline(Engine):
+    """
+    sherpa-onnx non-streaming models (Whisper, SenseVoice or Paraformer), decoding each segment of speech
+    found by a voice activity detector (see ``--vad-model``).
+
+    Segments are decoded on a thread pool (see ``--decode-workers``) so consecutive segments decode concurrently,
+    results are returned in the order they were spoken. Partial results aren't available,
+    instead speech being detected is reported by `speech_active` (delaying ``--timeout``).
+    """
+
+    __slots__ = (
+        "vad_model",
+        "decode_workers",
+        "vad",
+        "segments",
+        "tokens",
+        "times",
+        "_endpoint",
+        "_pool",
+        "_samples_accepted",
+        "_samples_vad_start",
+    )
+
+    sample_dtype = "float32"
+
+    def __init__(self, model_dir: str, *, sample_rate: int, verbose: int, options: Dict[str, Any]) -> None:
+        # The sample rate of the models features, audio recorded at other rates is resampled.
+        super().__init__(model_dir, sample_rate=16000, verbose=verbose, options=options)
+        self.vad_model: str = options.get("vad_model") or os.path.join(model_dir, "silero_vad.onnx")
+        self.decode_workers: int = max(1, options.get("decode_workers") or 2)
+        if not os.path.isdir(model_dir):
+            raise FileNotFoundError("Model not found: {!r}".format(model_dir))
+        if sherpa_offline_model_kwargs_or_none(model_dir) is None:
+            raise ValueError(
+                "No sherpa-onnx offline model (Whisper, SenseVoice or Paraformer) found in {!r}".format(model_dir)
+            )
+        if not os.path.exists(self.vad_model):
+            raise FileNotFoundError(
+                "Please download the Silero VAD model (``silero_vad.onnx``) from "
+                "https://github.com/k2-fsa/sherpa-onnx/releases/tag/asr-models to {!r} "
+                "(or pass in ``--vad-model``)".format(self.vad_model)
+            )
+        self.vad: Any = None
+        # Segments being decoded (start & end sample, future) in the order they were spoken,
+        # samples are offsets from the start of the audio passed to `accept`.
+        self.segments: List[Tuple[int, int, "Future[Tuple[str, Optional[Tuple[List[str], List[float]]]]]"]] = []
+        # The tokens of the last final result.
+        self.tokens: Optional[Tuple[List[str], List[float]]] = None
+        # The start & end of the last final result (in seconds).
+        self.times: Optional[Tuple[float, float]] = None
+        self._endpoint = False
+        self._pool: Any = None
+        # The number of samples passed to `accept`.
+        self._samples_accepted = 0
+        # The sample the VAD's offsets are relative to (it's offsets start from zero when it's reset).
+        self._samples_vad_start = 0
+
+    def capture_create(
+        self,
+        input_method: str,
+        pulse_device_name: str,
+        sample_rate: int,
+        queue_seconds: float,
+    ) -> Capture:
+        return CaptureDevice(self.sample_rate, sample_rate, queue_seconds, self.verbose)
+
+    def load(self, model_dir: str, model: Any = None) -> Tuple[Any, Any]:
+        if model is None:
+            import sherpa_onnx
+
+            model_kwargs = sherpa_offline_model_kwargs_or_none(model_dir)
+            if model_kwargs is None:
+                raise RuntimeError("No sherpa-onnx offline model found in {!r}".format(model_dir))
+            method, kwargs = model_kwargs
+            # Threads are shared between the decode workers.
+            kwargs["num_threads"] = max(1, (os.cpu_count() or 1) // self.decode_workers)
+            model = getattr(sherpa_onnx.OfflineRecognizer, method)(**kwargs)
+        return model, sherpa_vad_create(self.vad_model, self.sample_rate)
+
+    def start(self, loaded: Tuple[Any, Any]) -> None:
+        # When swapping models (see `--model-swap-dir`), keep the VAD which may hold the start of a segment.
+        self.model, vad = loaded
+        if self.vad is None:
+            self.vad = vad
+            self._samples_vad_start = self._samples_accepted
+        if self._pool is None:
+            from concurrent.futures import ThreadPoolExecutor
+
+            # Threads (not processes) since decoding runs in ONNX Runtime (without the GIL),
+            # processes would each need a copy of the model.
+            self._pool = ThreadPoolExecutor(max_workers=self.decode_workers)
+
+    def release(self, unload: bool) -> None:
+        self.reset()
+        self.vad = None
+        if unload:
+            self.model = None
+
+    @staticmethod
+    def _decode(model: Any, stream: Any) -> Tuple[str, Optional[Tuple[List[str], List[float]]]]:
+        model.decode_stream(stream)
+        result = stream.result
+        text: str = result.text.strip()
+        tokens = list(result.tokens)
+        timestamps = list(result.timestamps)
+        if not tokens or len(tokens) != len(timestamps):
+            return text, None
+        return text, (tokens, [round(t, 3) for t in timestamps])
+
+    def _segments_submit(self) -> None:
+        model = self.model
+        vad = self.vad
+        while not vad.empty():
+            segment = vad.front
+            # The model is passed in since it may be swapped before the segment is decoded.
+            stream = model.create_stream()
+            stream.accept_waveform(self.sample_rate, segment.samples)
+            start = self._samples_vad_start + segment.start
+            self.segments.append((start, start + len(segment.samples), self._pool.submit(self._decode, model, stream)))
+            vad.pop()
+
+    def accept(self, data: bytes) -> bool:
+        import numpy as np
+
+        assert self.vad is not None
+        # Audio is also passed in while decoding in the background, so finished segments are returned promptly.
+        if data:
+            # The VAD buffers samples which don't fill a window.
+            samples = np.frombuffer(data, dtype=np.float32)
+            self._samples_accepted += len(samples)
+            self.vad.accept_waveform(samples)
+            self._segments_submit()
+        self._endpoint = bool(self.segments) and self.segments[0][2].done()
+        return self._endpoint
+
+    def partial(self) -> str:
+        return ""
+
+    def speech_active(self) -> bool:
+        # Speech is being detected or segments of speech are being decoded.
+        return bool(self.segments) or (self.vad is not None and self.vad.is_speech_detected())
+
+    def final(self) -> str:
+        assert self.vad is not None
+        if self._endpoint:
+            # The oldest segment has been decoded.
+            self._endpoint = False
+            start, end, future = self.segments.pop(0)
+            text, self.tokens = future.result()
+            self.times = (start / self.sample_rate, end / self.sample_rate)
+            return text
+
+        # Decode all remaining speech (when finishing or suspending).
+        self.vad.flush()
+        self._segments_submit()
+        self.vad.reset()
+        self._samples_vad_start = self._samples_accepted
+        texts: List[str] = []
+        tokens: List[str] = []
+        timestamps: List[float] = []
+        start_first = self.segments[0][0] if self.segments else 0
+        self.times = (
+            (start_first / self.sample_rate, self.segments[-1][1] / self.sample_rate) if self.segments else None
+        )
+        for start, _, future in self.segments:
+            text, segment_tokens = future.result()
+            if not text:
+                continue
+            texts.append(text)
+            if segment_tokens is not None:
+                # Token times are relative to the first segment.
+                offset = (start - start_first) / self.sample_rate
+                tokens.extend(segment_tokens[0])
+                timestamps.extend(round(t + offset, 3) for t in segment_tokens[1])
+        self.segments.clear()
+        self.tokens = (tokens, timestamps) if tokens else None
+        return " ".join(texts)
+
+    def final_tokens(self) -> Optional[Tuple[List[str], List[float]]]:
+        return self.tokens
+
+    def final_times(self) -> Optional[Tuple[float, float]]:
+        return self.times
+
+    def reset(self) -> None:
+        for _, _, future in self.segments:
+            future.cancel()
+        self.segments.clear()
+        self._endpoint = False
+        if self.vad is not None:
+            self.vad.reset()
+            self._samples_vad_start = self._samples_accepted
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+# -----------------------------------------------------------------------------
+# Text from Engine
+#
+
+
+def text_from_engine(
+    *,
+    engine: Engine,
+    exit_fn: Callable[..., int],
+    process_fn: Callable[[str], str],
+    handle_fn: Callable[[int, str], None],
+    timeout: float,
+    idle_time: float,
+    progressive: bool,
+    progressive_continuous: bool,
+    input_method: str = "PAREC",
+    pulse_device_name: str = "",
+    sample_rate_capture: int = 0,
+    suspend_on_start: bool = False,
+    verbose: int = 0,
+    grammar_phrases: Optional[Dict[str, str]] = None,
+    path_to_cookie: str = "",
+    noise_reduction: int = 0,
+    debug_audio_dir: str = "",
+    suspend_mode: str = "STOP",
+    preroll: float = 0.0,
+    metrics_file: str = "",
+    backlog_limit: float = 0.0,
+    overload_policies: Optional[Set[str]] = None,
+    stable_partials: int = 0,
+    stable_time: float = 0.0,
+    punctuation_model_dir: str = "",
+    capture_stall_timeout: float = 0.0,
+    suspend_trim_timeout: float = 0.0,
+    suspend_unload_model: bool = False,
+    model_swap: Optional[ModelSwap] = None,
+    events: Optional[JSONLOutput] = None,
+    term_correct_fn: Optional[Callable[[str], str]] = None,
+) -> bool:
+    """
+    Recognize speech with ``engine`` until ``exit_fn`` returns non-zero,
+    returning true when any text was handled.
+    """
+    from types import FrameType
+
+    # When limited, the recording holds up to double the backlog limit,
+    # giving the main loop the chance to drop silence instead of the oldest audio.
+    capture = engine.capture_create(input_method, pulse_device_name, sample_rate_capture, backlog_limit * 2.0)
+
+    has_capture = False
+    # A warm suspend keeps the recording open, so start recording even when suspended.
+    if not suspend_on_start or suspend_mode == "WARM":
+        capture.start()
+        has_capture = True
+
+    # Phrases (normalized as engines output text) which switch grammar profiles.
+    grammar_phrases = {" ".join(phrase.lower().split()): name for phrase, name in (grammar_phrases or {}).items()}
+
+    metrics = DictationMetrics(metrics_file)
+    metrics.write(force=True)
+
+    # Allow for loading the model to take some time:
+    if verbose >= 1:
+        sys.stderr.write("Loading model ({:s})...\n".format(model_cache_text(engine.model_dir)))
+    model_load_time_beg = time.perf_counter()
+    engine.start(engine.load(engine.model_dir))
+    # False while the recognizers are released (see `--suspend-trim-timeout`).
+    engine_started = True
+    # The directory of the model in use (see `--model-swap-dir`).
+    model_dir_curr = engine.model_dir
+
+    # The profile to switch to at the next end-point (when set).
+    grammar_profile_request: Optional[str] = None
+
+    if verbose >= 1:
+        sys.stderr.write("Model loaded in {:.3f}s.\n".format(time.perf_counter() - model_load_time_beg))
+
+    # Audio passed to the engine (which may differ from the recording when it's resampled).
+    sample_rate = engine.sample_rate
+    sample_width = engine.sample_width
+
+    overload = AudioOverload(backlog_limit, overload_policies or set())
+
+    metrics.state = "suspended" if suspend_on_start else "recording"
+
+    if debug_audio_dir:
+        os.makedirs(debug_audio_dir, exist_ok=True)
+        if verbose >= 1:
+            sys.stderr.write("Debug audio dir: {:s}\n".format(debug_audio_dir))
+
+    use_timeout = timeout != 0.0
+    if use_timeout:
+        timeout_text_prev = ""
+        timeout_time_prev = time.time()
+
+    # Collect the output used when time-out is enabled.
+    # Unused for continuous output.
+    text_list: List[str] = []
+
+    debug_audio_buf: List[bytes] = []
+
+    # Set true if handle has been called.
+    handled_any = False
+
+    emitter = TextEmitter(handle_fn, stable_partials, stable_time)
+    punctuation = punctuation_segments_create_or_none(
+        punctuation_model_dir, emitter, process_fn, progressive, progressive_continuous, text_list, verbose
+    )
+
+    # Track this to prevent excessive load when the partial text doesn't change.
+    text_partial_prev = ""
+
+    # True when there is partial text (speech which hasn't reached an end-point).
+    has_partial = False
+
+    # -----------------------------
+    # Utilities for Text Processing
+
+    def handle_fn_suspended() -> None:
+        nonlocal handled_any
+        nonlocal text_partial_prev
+
+        handled_any = False
+        if punctuation is not None:
+            punctuation.flush()
+            punctuation.clear()
+        emitter.reset()
+        text_partial_prev = ""
+
+        if not (progressive and progressive_continuous):
+            text_list.clear()
+
+    def handle_fn_wrapper(text: str, is_partial_arg: bool, is_endpoint: bool = False) -> None:
+        time_beg = time.perf_counter()
+        try:
+            handle_fn_wrapper_impl(text, is_partial_arg, is_endpoint)
+        finally:
+            metrics.postprocess_seconds += time.perf_counter() - time_beg
+        if is_partial_arg:
+            metrics.partial_time = time.monotonic()
+
+    def handle_fn_wrapper_impl(text: str, is_partial_arg: bool, is_endpoint: bool) -> None:
+        nonlocal handled_any
+        nonlocal grammar_profile_request
+
+        # Switch grammar profiles from a spoken phrase, the phrase itself isn't output.
+        if not is_partial_arg and text in grammar_phrases:
+            grammar_profile_request = grammar_phrases[text]
+            if progressive:
+                # Remove the phrase (from partial results).
+                if progressive_continuous or not text_list:
+                    text_curr = ""
+                else:
+                    text_curr = process_fn(" ".join(text_list))
+                text_prefix = punctuation.text_prefix() if punctuation is not None else ""
+                emitter.update(text_prefix + text_curr, False)
+                handle_fn(SIMULATE_INPUT_CODE_COMMAND, "COMMIT")
+            return
+
+        if events is not None:
+            if is_partial_arg:
+                events.partial(process_fn(text), metrics.audio_seconds)
+            else:
+                events.final(
+                    process_fn(text),
+                    metrics.audio_seconds,
+                    is_endpoint,
+                    engine.final_tokens(),
+                    engine.final_times(),
+                )
+
+        # Simple deferred text input, just accumulate values in a list (finish entering text on exit).
+        if not progressive:
+            if is_partial_arg:
+                return
+            text_list.append(text)
+            if punctuation is not None:
+                punctuation.add(text, "")
+            handled_any = True
+            return
+
+        # Progressive support (type as you speak).
+        if progressive_continuous:
+            text_curr = process_fn(text)
+        else:
+            text_curr = process_fn(" ".join(text_list + [text]))
+
+        text_prefix = punctuation.text_prefix() if punctuation is not None else ""
+        emitter.update(text_prefix + text_curr, is_partial_arg)
+        metrics.chars_typed = emitter.chars_typed
+        metrics.chars_deleted = emitter.chars_deleted
+
+        if not is_partial_arg:
+            handle_fn(SIMULATE_INPUT_CODE_COMMAND, "COMMIT")
+            if not progressive_continuous:
+                text_list.append(text)
+            if punctuation is not None:
+                # Continuous output keeps the block until the text has been punctuated.
+                punctuation.add(text, text_curr)
+            elif progressive_continuous:
+                emitter.reset()
+
+        handled_any = True
+
+    def handle_fn_wrapper_from_final(text: str, is_endpoint: bool = False) -> None:
+        nonlocal has_partial, text_partial_prev
+        has_partial = False
+        text_partial_prev = ""
+        if text:
+            # Only final results are corrected (partial results are replaced).
+            if term_correct_fn is not None:
+                text = term_correct_fn(text)
+            handle_fn_wrapper(text, False, is_endpoint)
+        elif events is not None:
+            events.silence(metrics.audio_seconds)
+
+    if has_capture:
+        # Support setting up input simulation state.
+        handle_fn(SIMULATE_INPUT_CODE_COMMAND, "SETUP")
+
+    # Use code to delay exiting, allowing reading the recording buffer to catch-up.
+    code = 0
+
+    # ---------------
+    # Signal Handling
+
+    suspend = suspend_on_start
+
+    # Signal handlers only store the request, the main loop performs the state change
+    # since closing pipes & spawning processes from a signal context isn't safe.
+    # None when there is no pending request, otherwise true to suspend and false to resume.
+    suspend_request: Optional[bool] = None
+
+    # Used to report the time between requesting to resume and passing audio to the recognizer.
+    resume_request_time = 0.0
+    resume_awaiting_audio = False
+
+    # Set when a request has been written by a control sub-command (see `request_write`).
+    control_request = False
+
+    wakeup_fd_read, wakeup_fd_write = signal_wakeup_pipe()
+
+    # Keep the most recent audio while suspended, passed to the recognizer on resume
+    # so speech that starts before resuming isn't lost.
+    preroll_buf = (
+        AudioRingBuffer(int(preroll * capture.sample_rate) * capture.sample_width, capture.sample_width)
+        if (preroll > 0.0)
+        else None
+    )
+    preroll_data = b""
+
+    def capture_discard() -> None:
+        # Read everything recorded, only keeping the pre-roll (when enabled).
+        while True:
+            data = capture.read()
+            if not data:
+                break
+            if preroll_buf is not None:
+                preroll_buf.write(data)
+
+    def do_suspend_pause() -> None:
+        nonlocal has_capture
+        model_load_wait()
+        handle_fn_wrapper_from_final(engine.final())
+
+        # Don't include any of the current analysis when resuming.
+        engine.reset()
+
+        # Clear the buffer:
+        handle_fn_suspended()
+        debug_save_audio_session(debug_audio_dir, debug_audio_buf, sample_rate, sample_width)
+
+        if verbose >= 1:
+            sys.stderr.write("Recording suspended.\n")
+
+        # With a warm suspend, the recording & input simulation remain active so resuming is immediate.
+        if suspend_mode == "WARM":
+            return
+
+        # Close the recording.
+        if has_capture:
+            # Support setting up input simulation state.
+            handle_fn(SIMULATE_INPUT_CODE_COMMAND, "TEARDOWN")
+
+            capture.stop()
+            has_capture = False
+
+    # When set, the time to release memory while suspended (see `--suspend-trim-timeout`).
+    suspend_trim_time: Optional[float] = None
+    # Continues the process at `suspend_trim_time` (when stopped).
+    suspend_trim_proc: "Optional[subprocess.Popen[bytes]]" = None
+
+    def suspend_trim_timer_start() -> None:
+        nonlocal suspend_trim_time, suspend_trim_proc
+        suspend_trim_time = time.monotonic() + suspend_trim_timeout
+        if suspend_mode == "STOP":
+            suspend_trim_proc = process_continue_after(suspend_trim_timeout)
+
+    def suspend_trim_timer_cancel() -> None:
+        nonlocal suspend_trim_time, suspend_trim_proc
+        suspend_trim_time = None
+        if suspend_trim_proc is not None:
+            process_continue_cancel(suspend_trim_proc)
+            suspend_trim_proc = None
+
+    # Loading the model & recognizers when resuming after they were released.
+    model_load: Optional[ModelLoad] = None
+
+    # Loading the model to swap to (see `--model-swap-dir`), recognition continues with the current model.
+    model_swap_load: Optional[ModelLoad] = None
+    model_swap_index = 0
+
+    def do_suspend_trim() -> None:
+        nonlocal engine_started, model_swap_load
+        # Recognizers hold the decoder state, they're created again when resuming.
+        engine.release(suspend_unload_model)
+        engine_started = False
+        # A model being loaded to swap to is loaded again when needed.
+        model_swap_load = None
+        memory_trim()
+        if verbose >= 1:
+            sys.stderr.write("Memory released{:s}.\n".format(" (model unloaded)" if suspend_unload_model else ""))
+
+    def model_load_start() -> None:
+        nonlocal model_load, model_load_time_beg
+        model_loaded = engine.model
+        model_dir_load = model_dir_curr
+        if verbose >= 1:
+            sys.stderr.write("Loading model ({:s})...\n".format(model_cache_text(model_dir_load)))
+        model_load_time_beg = time.perf_counter()
+        model_load = ModelLoad(lambda: engine.load(model_dir_load, model_loaded))
+
+    def model_load_finish() -> bytes:
+        # Use the loaded model, returning the audio recorded while it loaded.
+        nonlocal model_load, engine_started
+        assert model_load is not None
+        engine.start(model_load.result())
+        engine_started = True
+        data = b"".join(model_load.audio)
+        model_load = None
+        if verbose >= 1:
+            sys.stderr.write("Model loaded in {:.3f}s.\n".format(time.perf_counter() - model_load_time_beg))
+        return data
+
+    def model_load_wait() -> None:
+        # Wait for the model when suspending or exiting before it has loaded,
+        # passing the audio recorded meanwhile to the recognizer (noise reduction isn't applied).
+        if model_load is None:
+            return
+        data = model_load_finish()
+        if data and engine.accept(capture.convert(data)):
+            handle_fn_wrapper_from_final(engine.final(), is_endpoint=True)
+
+    def model_swap_update() -> None:
+        nonlocal model_dir_curr, model_swap_load, model_swap_index
+        assert model_swap is not None
+        if model_swap_load is None:
+            index = model_swap.index_want(metrics)
+            if index == model_swap.index:
+                return
+            model_dir_load = model_swap.model_dirs[index]
+            if verbose >= 1:
+                sys.stderr.write("Loading model to swap to: {:s}\n".format(model_dir_load))
+            model_swap_load = ModelLoad(lambda: engine.load(model_dir_load))
+            model_swap_index = index
+            return
+        # Swap once speech has reached an end-point, so no speech is lost.
+        if not model_swap_load.is_loaded() or engine.partial():
+            return
+        engine.start(model_swap_load.result())
+        model_swap_load = None
+        model_dir_curr = model_swap.model_dirs[model_swap_index]
+        model_swap.swapped(model_swap_index, metrics)
+        # Release the previous model.
+        memory_trim()
+        if verbose >= 1:
+            sys.stderr.write("Model swapped to: {:s}\n".format(model_dir_curr))
+
+    # The time audio was last read, used to detect the recording stalling (e.g. after a system sleep).
+    capture_time_prev = time.monotonic()
+
+    def capture_restart() -> None:
+        nonlocal capture_time_prev
+        if verbose >= 1:
+            sys.stderr.write("No audio for {:.1f} seconds, restarting the recording.\n".format(capture_stall_timeout))
+        # Only the recording is restarted, the recognizer (and any speech it's processing) is kept.
+        capture.restart()
+        capture_time_prev = time.monotonic()
+        metrics.capture_restart_count += 1
+
+    # Warning: do not call do_suspend_resume() from a signal context because it
+    # can cause reentrant runtime errors and other related bugs.
+    def do_suspend_resume() -> None:
+        nonlocal has_capture, preroll_data, capture_time_prev
+
+        if verbose >= 1:
+            sys.stderr.write("Recording.\n")
+
+        if has_capture:
+            # Warm resume, don't pass audio recorded while suspended to the recognizer (besides the pre-roll).
+            capture_discard()
+            if preroll_buf is not None:
+                preroll_data = preroll_buf.read_all()
+        else:
+            handle_fn(SIMULATE_INPUT_CODE_COMMAND, "SETUP")
+            capture.start()
+            has_capture = True
+        capture_time_prev = time.monotonic()
+
+        if not engine_started:
+            model_load_start()
+
+    def handle_sig_suspend_from_usr1(_signum: int, _frame: Optional[FrameType]) -> None:
+        nonlocal suspend_request
+        suspend_request = True
+        signal_wakeup_notify(wakeup_fd_write)
+
+    def handle_sig_resume_from_cont(_signum: int, _frame: Optional[FrameType]) -> None:
+        nonlocal suspend_request, resume_request_time
+        suspend_request = False
+        resume_request_time = time.monotonic()
+        signal_wakeup_notify(wakeup_fd_write)
+
+    def handle_sig_request_from_usr2(_signum: int, _frame: Optional[FrameType]) -> None:
+        nonlocal control_request
+        control_request = True
+        signal_wakeup_notify(wakeup_fd_write)
+
+    def handle_sig_reload_from_hup(_signum: int, _frame: Optional[FrameType]) -> None:
+        if verbose >= 1:
+            sys.stderr.write("Reload.\n")
+        process_fn("")
+
+    # Suspend resume from separate signals.
+    signal.signal(signal.SIGUSR1, handle_sig_suspend_from_usr1)
+
+    # This allows you to stop via ctrl+z and resume with `fg` at a terminal.
+    # This intentionally re-uses the handle_sig_suspend_from_usr1 handler:
+    signal.signal(signal.SIGTSTP, handle_sig_suspend_from_usr1)
+
+    signal.signal(signal.SIGCONT, handle_sig_resume_from_cont)
+
+    signal.signal(signal.SIGHUP, handle_sig_reload_from_hup)
+
+    signal.signal(signal.SIGUSR2, handle_sig_request_from_usr2)
+
+    if suspend and suspend_trim_timeout > 0.0:
+        suspend_trim_timer_start()
+
+    if suspend and suspend_mode == "STOP":
+        # Use when Py3.6 compatibility is dropped.
+        # `signal.raise_signal(signal.SIGSTOP)`
+        os.kill(os.getpid(), signal.SIGSTOP)
+
+    # ---------
+    # Main Loop
+
+    if idle_time > 0.0:
+        idle_time_prev = time.time()
+
+    while code == 0:
+        # -1=cancel, 0=continue, 1=finish.
+        code = exit_fn(handled_any)
+
+        if control_request:
+            control_request = False
+            request = request_read_or_none(path_to_cookie)
+            if request is not None:
+                request_command, _, request_value = request.partition(" ")
+                if request_command == "grammar":
+                    grammar_profile_request = request_value
+                elif request_command == "model":
+                    model_swap_request(model_swap, request_value)
+                else:
+                    sys.stderr.write("Unknown request: {!r}\n".format(request))
+
+        # Switch once speech has reached an end-point (and the recognizers have been loaded).
+        if grammar_profile_request is not None and not has_partial and engine_started:
+            engine.profile_switch(grammar_profile_request)
+            grammar_profile_request = None
+
+        if suspend and suspend_trim_time is not None and time.monotonic() >= suspend_trim_time:
+            # Continued by the timer (not a request to resume), release memory & stop again.
+            suspend_request = None
+            suspend_trim_timer_cancel()
+            do_suspend_trim()
+            # Unless a request to resume was received meanwhile (which would be lost once stopped).
+            if suspend_mode == "STOP" and suspend_request is None:
+                os.kill(os.getpid(), signal.SIGSTOP)
+                continue
+
+        if suspend_request is not None:
+            suspend_request_value = suspend_request
+            suspend_request = None
+            if suspend_request_value:
+                if not suspend:
+                    suspend = True
+                    do_suspend_pause()
+                    metrics.state = "suspended"
+                    metrics.write(force=True)
+                    if suspend_trim_timeout > 0.0:
+                        suspend_trim_timer_start()
+                    if suspend_mode == "STOP":
+                        # Use when Py3.6 compatibility is dropped.
+                        # `signal.raise_signal(signal.SIGSTOP)`
+                        os.kill(os.getpid(), signal.SIGSTOP)
+                        # Continue so the resume request (from SIGCONT) is handled.
+                        continue
+            elif suspend:
+                suspend = False
+                suspend_trim_timer_cancel()
+                do_suspend_resume()
+                resume_awaiting_audio = True
+                metrics.state = "recording"
+                metrics.write(force=True)
+
+        metrics.write()
+
+        if suspend:
+            # Wait for a signal, when the recording is kept open (warm suspend), discard its output.
+            signal_wakeup_wait(wakeup_fd_read, 0.05)
+            if has_capture:
+                capture_discard()
+            continue
+
+        if model_swap is not None and model_load is None:
+            model_swap_update()
+
+        if resume_awaiting_audio:
+            # Don't idle after resuming, wait for the recording instead.
+            if not preroll_data:
+                capture.wait(max(idle_time, 0.01))
+        elif idle_time > 0.0:
+            # Subtract processing time from the previous loop.
+            # Skip idling in the event dictation can't keep up with the recording.
+            idle_time_curr = time.time()
+            idle_time_test = idle_time - (idle_time_curr - idle_time_prev)
+            if idle_time_test > 0.0:
+                # Prevents excessive processor load.
+                time.sleep(idle_time_test)
+                idle_time_prev = time.time()
+            else:
+                idle_time_prev = idle_time_curr
+
+        data = capture.read()
+
+        if preroll_data:
+            data = preroll_data + data
+            preroll_data = b""
+
+        if data:
+            capture_time_prev = time.monotonic()
+        elif capture_stall_timeout > 0.0 and time.monotonic() - capture_time_prev > capture_stall_timeout:
+            capture_restart()
+
+        if model_load is not None:
+            # Buffer the audio until the model has loaded.
+            if data:
+                model_load.audio.append(data)
+            if not model_load.is_loaded():
+                continue
+            data = model_load_finish()
+
+        if not data:
+            continue
+
+        if resume_awaiting_audio:
+            resume_awaiting_audio = False
+            metrics.resume_latency = time.monotonic() - resume_request_time
+            if verbose >= 1:
+                sys.stderr.write("Resume latency: {:.1f}ms.\n".format(metrics.resume_latency * 1000.0))
+        # All recorded audio is read, so the size of the read is the size of the backlog.
+        metrics.queue_seconds = len(data) / capture.byte_rate
+        if backlog_limit > 0.0:
+            audio_overload_update(overload, metrics, verbose)
+            data = overload.trim(data, capture.byte_rate, capture.sample_width)
+            metrics.dropped_samples = overload.dropped_samples + capture.dropped_samples
+        data = capture.convert(data)
+        metrics.audio_seconds += len(data) / (sample_rate * sample_width)
+        if debug_audio_dir:
+            debug_audio_buf.append(data)
+        if noise_reduction > 0 and not overload.skip_noise_reduction:
+            data = denoise_audio(data, sample_rate, noise_reduction, dtype=engine.sample_dtype)
+
+        time_beg = time.perf_counter()
+        is_endpoint = engine.accept(data)
+        text: Optional[str]
+        if is_endpoint:
+            text = engine.final()
+        elif overload.skip_partials:
+            text = None
+        else:
+            text = engine.partial()
+        metrics.decode_seconds += time.perf_counter() - time_beg
+
+        if is_endpoint:
+            assert text is not None
+            handle_fn_wrapper_from_final(text, is_endpoint=True)
+        elif text is None:
+            # Calculating the partial result is skipped (only final results are handled),
+            # treat this as activity so the time-out isn't reached while overloaded.
+            text = ""
+            if use_timeout:
+                timeout_time_prev = time.time()
+        elif text != text_partial_prev:
+            # Without this, there are *many* calls with the same partial text.
+            text_partial_prev = text
+            if text:
+                has_partial = True
+                handle_fn_wrapper(text, True)
+
+        # Output held back text which has become stable without a new partial result.
+        emitter.poll()
+        if punctuation is not None:
+            punctuation.apply()
+
+        # Monitor the partial output (and speech for engines without partial results).
+        # Finish if no changes are made for `timeout` seconds.
+        if use_timeout:
+            if text != timeout_text_prev or engine.speech_active():
+                timeout_text_prev = text
+                timeout_time_prev = time.time()
+            elif time.time() - timeout_time_prev > timeout and code == 0:
+                if progressive_continuous:
+                    suspend_request = True
+                    timeout_text_prev = ""
+                    timeout_time_prev = time.time()
+                else:
+                    code = 1
+
+    os.close(wakeup_fd_read)
+    os.close(wakeup_fd_write)
+
+    suspend_trim_timer_cancel()
+
+    # Close the recording.
+    if has_capture:
+        capture.stop()
+        has_capture = False
+
+        # Support setting up input simulation state.
+        handle_fn(SIMULATE_INPUT_CODE_COMMAND, "TEARDOWN")
+
+    debug_save_audio_session(debug_audio_dir, debug_audio_buf, sample_rate, sample_width)
+
+    if metrics_file:
+        file_remove_if_exists(metrics_file)
+
+    if code == -1:
+        sys.stderr.write("Text input canceled!\n")
+        sys.exit(0)
+
+    # Only wait for the model when there is audio for it to recognize.
+    if model_load is not None and model_load.audio:
+        model_load_wait()
+
+    if engine_started:
+        handle_fn_wrapper_from_final(engine.final())
+    engine.close()
+
+    if punctuation is not None:
+        punctuation.flush()
+        punctuation.worker.close()
+
+    if not progressive:
+        # We never arrive here needing deletions
+        handle_fn(0, process_fn(" ".join(text_list)))
+        handle_fn(SIMULATE_INPUT_CODE_COMMAND, "COMMIT")
+    elif verbose >= 1:
+        sys.stderr.write(emitter.report())
+
+    return handled_any
+
+
+def main_begin(
+    *,
+    vosk_model_dir: str,
+    engine: str = "vosk",
+    path_to_cookie: str = "",
+    pulse_device_name: str = "",
+    sample_rate: int = 0,
+    input_method: str = "PAREC",
+    progressive: bool = False,
+    progressive_continuous: bool = False,
+    full_sentence: bool = False,
+    numbers_as_digits: bool = False,
+    numbers_use_separator: bool = False,
+    numbers_min_value: Optional[int] = None,
+    numbers_no_suffix: bool = False,
+    itn_languages: Optional[List[str]] = None,
+    term_lists: Optional[List[str]] = None,
+    term_max_distance: int = 2,
+    timeout: float = 0.0,
+    idle_time: float = 0.0,
+    delay_exit: float = 0.0,
+    punctuate_from_previous_timeout: float = 0.0,
+    config_override: Optional[str],
+    output: str = "TYPE",
+    simulate_input_tool: str = "XDOTOOL",
+    suspend_on_start: bool = False,
+    suspend_mode: str = "STOP",
+    preroll: float = 0.0,
+    metrics_file: str = "",
+    backlog_limit: float = 0.0,
+    overload_policies: Optional[Set[str]] = None,
+    stable_partials: int = 0,
+    stable_time: float = 0.0,
+    punctuation_model_dir: str = "",
+    capture_stall_timeout: float = 0.0,
+    suspend_trim_timeout: float = 0.0,
+    suspend_unload_model: bool = False,
+    verbose: int = 0,
+    vosk_grammar_file: str = "",
+    vosk_grammar_profiles: Optional[Dict[str, str]] = None,
+    vosk_grammar_phrases: Optional[Dict[str, str]] = None,
+    noise_reduction: int = 0,
+    debug_audio_dir: str = "",
+    hotwords_file: str = "",
+    hotwords_score: float = 0.5,
+    route_model_dirs: Optional[List[str]] = None,
+    vad_model: str = "",
+    decode_workers: int = 2,
+    model_swap_dir: str = "",
+    model_swap_on_battery: bool = False,
+    model_swap_rtf: float = 0.0,
+    model_swap_memory_pressure: float = 0.0,
+) -> None:
+    """
+    Initialize audio recording, then full text to speech conversion can take place.
+
+    This is terminated by the ``end`` or ``cancel`` actions.
+    """
+
+    # Find language model in:
+    # - `--vosk-model-dir=...`
+    # - `~/.config/nerd-dictation/model`
+    if not vosk_model_dir:
+        vosk_model_dir = calc_user_config_path("model")
+        # If this still doesn't exist the error is handled later.
+
+    if preroll > 0.0 and suspend_mode != "WARM":
+        # The recording is stopped while suspended, so there is no audio to keep.
+        sys.stderr.write("``--preroll`` requires ``--suspend-mode=WARM``.\n")
+        sys.exit(1)
+
+    if punctuation_model_dir and not os.path.isdir(punctuation_model_dir):
+        sys.stderr.write("Punctuation model not found: {!r}.\n".format(punctuation_model_dir))
+        sys.exit(1)
+
+    if model_swap_dir and not os.path.isdir(model_swap_dir):
+        sys.stderr.write("Model to swap to not found: {!r}.\n".format(model_swap_dir))
+        sys.exit(1)
+
+    for term_list in term_lists or ():
+        if not os.path.isfile(term_list):
+            sys.stderr.write("Term list not found: {!r}.\n".format(term_list))
+            sys.exit(1)
+
+    #
+    # Initialize the recording state and perform some sanity checks.
+    #
+    if not path_to_cookie:
+        path_to_cookie = path_to_cookie_default()
+
+    is_run_on = False
+    if punctuate_from_previous_timeout > 0.0:
+        age_in_seconds: Optional[float] = None
+        try:
+            age_in_seconds = file_age_in_seconds(path_to_cookie)
+        except FileNotFoundError:
+            age_in_seconds = None
+        is_run_on = age_in_seconds is not None and (age_in_seconds < punctuate_from_previous_timeout)
+        del age_in_seconds
+
+    # Requests from control sub-commands (see `request_write`) are handled once recording starts,
+    # ignore them until then (by default the signal terminates the process).
+    signal.signal(signal.SIGUSR2, signal.SIG_IGN)
+
+    # Write the PID, needed for suspend/resume sub-commands to know the PID of the current process.
+    with open(path_to_cookie, "w", encoding="utf-8") as fh:
+        fh.write(str(os.getpid()))
+
+    # Force zero time-stamp so a fast begin/end (tap) action
+    # doesn't leave dictation running.
+    touch(path_to_cookie, mtime=0)
+    cookie_timestamp = file_mtime_or_none(path_to_cookie)
+    if cookie_timestamp != 0:
+        sys.stderr.write("Cookie removed after right after creation (unlikely but respect the request)\n")
+        return
+
+    #
+    # Start recording the output file.
+    #
+
+    touch_mtime = None
+    use_overtime = delay_exit > 0.0 and timeout == 0.0
+
+    # Lazy loaded so recording can start 1st.
+    user_config = None
+
+    def exit_fn(handled_any: bool) -> int:
+        nonlocal touch_mtime
+        if not os.path.exists(path_to_cookie):
+            return -1  # Cancel.
+        if file_mtime_or_none(path_to_cookie) != cookie_timestamp:
+            # Only delay exit if some text has been handled,
+            # this prevents accidental tapping of push to talk from running.
+            if handled_any:
+                # Implement `delay_exit` workaround.
+                if use_overtime:
+                    if touch_mtime is None:
+                        touch_mtime = time.time()
+                    if time.time() - touch_mtime < delay_exit:
+                        # Continue until `delay_exit` is reached.
+                        return 0
+                # End `delay_exit`.
+
+            return 1  # End.
+        return 0  # Continue.
+
+    inverse_text_normalize_fn: Optional[Callable[[str], str]] = None
+    if itn_languages:
+        # The grammars are compiled once (only when used).
+        from .text_normalization import InverseTextNormalizer
+
+        inverse_text_normalize_fn = InverseTextNormalizer(itn_languages).apply
+
+    term_correct_fn: Optional[Callable[[str], str]] = None
+    if term_lists:
+        # The index is read from the cache (only built when the term lists change).
+        from .term_correction import term_index_load
+
+        term_correct_fn = term_index_load(term_lists, term_max_distance, verbose).correct
+
+    process_fn_is_first = True
+
+    def process_fn(text: str) -> str:
+        nonlocal user_config
+        nonlocal process_fn_is_first
+
+        #
+        # Load the user configuration (when found).
+        #
+        # text=="" indicates that user_config should be reloaded (SIGHUP)
+        #
+        if process_fn_is_first or text == "":
+            user_config = user_config_as_module_or_none(config_override=config_override, user_config_prev=user_config)
+
+        if not text:
+            return ""
+
+        #
+        # Simple text post processing and capitalization.
+        #
+        text = process_text(
+            text,
+            full_sentence=full_sentence,
+            numbers_as_digits=numbers_as_digits,
+            numbers_use_separator=numbers_use_separator,
+            numbers_min_value=numbers_min_value,
+            numbers_no_suffix=numbers_no_suffix,
+            inverse_text_normalize_fn=inverse_text_normalize_fn,
+        )
+
+        #
+        # User text post processing (when found).
+        #
+        if user_config is not None:
+            text = process_text_with_user_config(user_config, text)
+
+        if is_run_on:
+            # This is a signal that the end of the sentence has been reached.
+            if full_sentence:
+                text = ". " + text
+            else:
+                text = ", " + text
+
+        process_fn_is_first = False
+
+        return text
+
+    #
+    # Handled the resulting text
+    #
+    if output == "SIMULATE_INPUT":
+        if simulate_input_tool not in SIMULATE_INPUT_TOOLS:
+            raise Exception("Internal error, unknown input tool: {!r}".format(simulate_input_tool))
+        handle_fn = SIMULATE_INPUT_TOOLS[simulate_input_tool]
+
+    elif output == "STDOUT":
+
+        def handle_fn(delete_prev_chars: int, text: str) -> None:
+            # No setup/tear-down.
+            if delete_prev_chars == SIMULATE_INPUT_CODE_COMMAND:
+                return
+
+            if delete_prev_chars:
+                sys.stdout.write("\x08" * delete_prev_chars)
+            sys.stdout.write(text)
+
+    elif output == "JSONL":
+
+        def handle_fn(delete_prev_chars: int, text: str) -> None:
+            # Text is written as events by the recognizer loop.
+            pass
+
+    else:
+        # Unreachable.
+        assert False
+
+    events = JSONLOutput(sys.stdout.buffer) if output == "JSONL" else None
+
+    model_swap = (
+        ModelSwap(
+            vosk_model_dir,
+            model_swap_dir,
+            on_battery=model_swap_on_battery,
+            rtf_limit=model_swap_rtf,
+            pressure_limit=model_swap_memory_pressure,
+        )
+        if model_swap_dir
+        else None
+    )
+
+    # Options for the engine (unused options are ignored).
+    engine_options: Dict[str, Any] = dict(
+        vosk_grammar_file=vosk_grammar_file,
+        vosk_grammar_profiles=vosk_grammar_profiles,
+        hotwords_file=hotwords_file,
+        hotwords_score=hotwords_score,
+        route_model_dirs=route_model_dirs,
+        vad_model=vad_model,
+        decode_workers=decode_workers,
+    )
+
+    # try-catch approved: engines raise (instead of exiting) for use from Python, report the error here.
+    try:
+        engine_instance = engine_class_from_name(engine)(
+            vosk_model_dir, sample_rate=sample_rate, verbose=verbose, options=engine_options
+        )
+    except (FileNotFoundError, ValueError) as ex:
+        sys.stderr.write("{:s}.\n".format(str(ex)))
+        sys.exit(1)
+
+    # Pending events are written even when exiting early (canceling).
+    try:
+        found_any = text_from_engine(
+            engine=engine_instance,
+            input_method=input_method,
+            pulse_device_name=pulse_device_name,
+            sample_rate_capture=sample_rate,
+            timeout=timeout,
+            idle_time=idle_time,
+            progressive=progressive,
+            progressive_continuous=progressive_continuous,
+            exit_fn=exit_fn,
+            process_fn=process_fn,
+            handle_fn=handle_fn,
+            suspend_on_start=suspend_on_start,
+            suspend_mode=suspend_mode,
+            preroll=preroll,
+            metrics_file=metrics_file,
+            backlog_limit=backlog_limit,
+            overload_policies=overload_policies,
+            stable_partials=stable_partials,
+            stable_time=stable_time,
+            punctuation_model_dir=punctuation_model_dir,
+            capture_stall_timeout=capture_stall_timeout,
+            suspend_trim_timeout=suspend_trim_timeout,
+            suspend_unload_model=suspend_unload_model,
+            verbose=verbose,
+            grammar_phrases=vosk_grammar_phrases,
+            path_to_cookie=path_to_cookie,
+            noise_reduction=noise_reduction,
+            debug_audio_dir=debug_audio_dir,
+            model_swap=model_swap,
+            events=events,
+            term_correct_fn=term_correct_fn,
+        )
+    finally:
+        if events is not None:
+            events.close()
+            if verbose >= 1 and events.dropped:
+                sys.stderr.write("JSONL output: {:d} partial event(s) dropped.\n".format(events.dropped))
+
+    if not found_any:
+        sys.stderr.write("No text found in the audio\n")
+        # Avoid continuing punctuation from where this recording (which recorded nothing) left off.
+        touch(path_to_cookie)
+        return
+
+
+def argparse_type_overload_policy(value: str) -> str:
+    for policy in value.split(","):
+        if policy and policy not in AUDIO_OVERLOAD_POLICIES:
+            raise argparse.ArgumentTypeError(
+                "{!r} is not one of: {:s}".format(policy, ", ".join(AUDIO_OVERLOAD_POLICIES))
+            )
+    return value
+
+
+def argparse_type_engine(value: str) -> str:
+    # try-catch approved: report unknown engines as an invalid argument.
+    try:
+        engine_class_from_name(value)
+    except ValueError as ex:
+        raise argparse.ArgumentTypeError(str(ex)) from ex
+    return value
+
+
+def argparse_type_itn_languages(value: str) -> List[str]:
+    from .text_normalization import GRAMMARS
+
+    languages = [language.strip() for language in value.split(",") if language.strip()]
+    for language in languages:
+        if language not in GRAMMARS:
+            raise argparse.ArgumentTypeError(
+                "Unknown language {!r}, expected one of: {:s}".format(language, ", ".join(GRAMMARS))
+            )
+    return languages
+
+
+def argparse_type_name_value(value: str) -> Tuple[str, str]:
+    name, sep, value = value.partition("=")
+    if not (sep and name and value):
+        raise argparse.ArgumentTypeError("expected NAME=VALUE, found {!r}".format(name + sep + value))
+    return name, value
+
+
+def argparse_generic_command_cookie(subparse: argparse.ArgumentParser) -> None:
+    subparse.add_argument(
+        "--cookie",
+        dest="path_to_cookie",
+        default="",
+        type=str,
+        metavar="FILE_PATH",
+        help="Location for writing a temporary cookie (this file is monitored to begin/end dictation).",
+        required=False,
+    )
+
+
+def argparse_create_begin(subparsers: "argparse._SubParsersAction[argparse.ArgumentParser]") -> None:
+    subparse = subparsers.add_parser(
+        "begin",
+        help="Begin dictation.",
+        description=(
+            "This creates the directory used to store internal data, "
+            "so other commands such as sync can be performed."
+        ),
+        formatter_class=argparse.RawTextHelpFormatter,
+    )
+
+    argparse_generic_command_cookie(subparse)
+
+    subparse.add_argument(
+        "--config",
+        default=None,
+        dest="config",
+        type=str,
+        metavar="FILE",
+        help=(
+            "Override the file used for the user configuration.\n"
+            "Use an empty string to prevent the users configuration being read."
+        ),
+        required=False,
+    )
+
+    subparse.add_argument(
+        "--engine",
+        default="vosk",
+        dest="engine",
+        type=argparse_type_engine,
+        metavar="ENGINE",
+        help=(
+            "Speech recognition engine: vosk (default), sherpa (sherpa-onnx streaming)\n"
+            "or sherpa-offline (sherpa-onnx Whisper, SenseVoice or Paraformer, decoding each utterance\n"
+            "found by a voice activity detector, so text is only output at the end of each utterance).\n"
+            "Other engines are loaded from a module with ``MODULE:CLASS``, where CLASS is a subclass of\n"
+            "``nerd_dictation.core.Engine`` (the module must be importable, see ``PYTHONPATH``)."
+        ),
+        required=False,
+    )
+
+    subparse.add_argument(
+        "--vosk-model-dir",
+        default="",
+        dest="vosk_model_dir",
+        type=str,
+        metavar="DIR",
+        help=("Path to the model directory (VOSK or sherpa-onnx model)."),
+        required=False,
+    )
+
+    subparse.add_argument(
+        "--vosk-grammar-file",
+        default=None,
+        dest="vosk_grammar_file",
+        type=str,
+        metavar="DIR",
+        help=(
+            "Path to a JSON grammar file.  This restricts the phrases recognized by VOSK for\n"
+            "better accuracy.  See `vosk_recognizer_new_grm` in the API reference:\n"
+            "https://github.com/alphacep/vosk-api/blob/master/src/vosk_api.h"
+        ),
+        required=False,
+    )
+
+    subparse.add_argument(
+        "--vosk-grammar-profile",
+        dest="vosk_grammar_profiles",
+        default=[],
+        action="append",
+        type=argparse_type_name_value,
+        metavar="NAME=FILE",
+        help=(
+            "A named JSON grammar file (may be used multiple times), the ``grammar`` sub-command switches\n"
+            "between profiles without reloading the model (the profile ``default`` is used on start-up,\n"
+            "set by ``--vosk-grammar-file`` or free dictation when unset)."
+        ),
+        required=False,
+    )
+
+    subparse.add_argument(
+        "--vosk-grammar-phrase",
+        dest="vosk_grammar_phrases",
+        default=[],
+        action="append",
+        type=argparse_type_name_value,
+        metavar="PHRASE=NAME",
+        help=(
+            "Switch to the grammar profile NAME when PHRASE is spoken (may be used multiple times),\n"
+            "the phrase isn't typed. Grammars must include the phrase for it to be recognized."
+        ),
+        required=False,
+    )
+
+    subparse.add_argument(
+        "--pulse-device-name",
+        dest="pulse_device_name",
+        default="",
+        type=str,
+        metavar="IDENTIFIER",
+        help=(
+            "The name of the pulse-audio device to use for recording.\n"
+            'See the output of "pactl list sources" to find device names (using the identifier following "Name:").'
+        ),
+        required=False,
+    )
+
+    subparse.add_argument(
+        "--sample-rate",
+        dest="sample_rate",
+        default=0,
+        type=int,
+        metavar="HZ",
+        help=(
+            "The sample rate to use for recording (in Hz).\n"
+            "Defaults to the sample rate of the model (zero),\n"
+            "audio is resampled when the recording device doesn't support this rate (sherpa engine only)."
+        ),
+        required=False,
+    )
+
+    subparse.add_argument(
+        "--defer-output",
+        dest="defer_output",
+        default=False,
+        action="store_true",
+        help=(
+            "When enabled, output is deferred until exiting.\n"
+            "\n"
+            "This prevents text being typed during speech (implied with ``--output=STDOUT`` & ``--output=JSONL``)"
+        ),
+        required=False,
+    )
+
+    subparse.add_argument(
+        "--continuous",
+        dest="progressive_continuous",
+        default=False,
+        action="store_true",
+        help=(
+            "Enable this option, when you intend to keep the dictation process enabled for extended periods of time.\n"
+            "without this enabled, the entirety of this dictation session will be processed on every update.\n"
+            "Only used when ``--defer-output`` is disabled."
+        ),
+        required=False,
+    )
+
+    subparse.add_argument(
+        "--stable-partials",
+        dest="stable_partials",
+        default=0,
+        type=int,
+        metavar="NUMBER",
+        help=(
+            "Only type the start of partial results once it has remained unchanged for this many partial results,\n"
+            "holding back the remaining text until it's stable or the final result is available.\n"
+            "This reduces the text deleted & re-typed when the recognizer revises words, at the cost of latency.\n"
+            "Zero types all changes immediately (default).\n"
+            "Only used when ``--defer-output`` is disabled."
+        ),
+        required=False,
+    )
+
+    subparse.add_argument(
+        "--stable-time",
+        dest="stable_time",
+        default=0.0,
+        type=float,
+        metavar="SECONDS",
+        help=(
+            "Only type the start of partial results once it has remained unchanged for this many seconds.\n"
+            "May be combined with ``--stable-partials`` (text is typed when either is met).\n"
+            "Use ``--verbose=1`` to report the number of characters typed for each character kept."
+        ),
+        required=False,
+    )
+
+    subparse.add_argument(
+        "--capture-stall-timeout",
+        dest="capture_stall_timeout",
+        default=0.0,
+        type=float,
+        metavar="SECONDS",
+        help=(
+            "Restart the recording when no audio has been received for this many seconds while recording\n"
+            "(the recording may stop after a system sleep), the loaded model is kept.\n"
+            "Zero disables (default)."
+        ),
+        required=False,
+    )
+
+    subparse.add_argument(
+        "--punctuation-model",
+        dest="punctuation_model_dir",
+        default="",
+        type=str,
+        metavar="DIR",
+        help=(
+            "Add punctuation to each final result using a sherpa-onnx punctuation model in DIR\n"
+            "(a CT-Transformer model or a CNN-BiLSTM model with a ``bpe.vocab``, which also restores case).\n"
+            "The model runs on a separate thread, text is typed immediately & patched once it has been punctuated.\n"
+            "Works with either engine, requires the ``sherpa-onnx`` module."
+        ),
+        required=False,
+    )
+
+    subparse.add_argument(
+        "--timeout",
+        dest="timeout",
+        default=0.0,
+        type=float,
+        metavar="SECONDS",
+        help=(
+            "Time out recording when no speech is processed for the time in seconds.\n"
+            "This can be used to avoid having to explicitly exit "
+            "(zero disables)."
+        ),
+        required=False,
+    )
+
+    subparse.add_argument(
+        "--idle-time",
+        dest="idle_time",
+        default=0.1,
+        type=float,
+        metavar="SECONDS",
+        help=(
+            "Time to idle between processing audio from the recording.\n"
+            "Setting to zero is the most responsive at the cost of high CPU usage.\n"
+            "The default value is 0.1 (processing 10 times a second), which is quite responsive in practice\n"
+            "(the maximum value is clamped to 0.5)"
+        ),
+        required=False,
+    )
+
+    subparse.add_argument(
+        "--delay-exit",
+        dest="delay_exit",
+        default=0.0,
+        type=float,
+        metavar="SECONDS",
+        help=(
+            "The time to continue running after an end request.\n"
+            'this can be useful so "push to talk" setups can be released while you finish speaking\n'
+            "(zero disables)."
+        ),
+        required=False,
+    )
+
+    subparse.add_argument(
+        "--suspend-on-start",
+        dest="suspend_on_start",
+        default=False,
+        action="store_true",
+        help=(
+            "Start the process and immediately suspend.\n"
+            "Intended for use when nerd-dictation is kept open\n"
+            "where resume/suspend is used for dictation instead of begin/end."
+        ),
+        required=False,
+    )
+
+    subparse.add_argument(
+        "--suspend-mode",
+        dest="suspend_mode",
+        default="STOP",
+        type=str,
+        choices=("STOP", "WARM"),
+        metavar="SUSPEND_MODE",
+        help=(
+            "How the process is suspended (see the ``suspend`` & ``resume`` sub-commands).\n"
+            "\n"
+            "- ``STOP`` stop recording and the process (default), no CPU overhead while suspended.\n"
+            "- ``WARM`` keep recording and the input simulation running, discarding audio while suspended.\n"
+            "  Resuming is immediate at the cost of a small CPU overhead while suspended.\n"
+            "  Note that the process is not stopped (its state won't be ``T`` in ``/proc/PID/status``)."
+        ),
+        required=False,
+    )
+
+    subparse.add_argument(
+        "--preroll",
+        dest="preroll",
+        default=0.0,
+        type=float,
+        metavar="SECONDS",
+        help=(
+            "Keep the most recent audio recorded while suspended (in seconds),\n"
+            "passing it to the speech recognizer on resume so the start of speech isn't lost\n"
+            "(zero disables).\n"
+            "Requires ``--suspend-mode=WARM``, the audio isn't processed while suspended."
+        ),
+        required=False,
+    )
+
+    subparse.add_argument(
+        "--suspend-trim-timeout",
+        dest="suspend_trim_timeout",
+        default=0.0,
+        type=float,
+        metavar="SECONDS",
+        help=(
+            "Release memory once suspended for this many seconds (zero disables),\n"
+            "freeing the decoder state & returning unused memory to the system.\n"
+            "With ``--suspend-mode=STOP`` a ``sleep`` process continues the stopped process to release memory."
+        ),
+        required=False,
+    )
+
+    subparse.add_argument(
+        "--suspend-unload-model",
+        dest="suspend_unload_model",
+        default=False,
+        action="store_true",
+        help=(
+            "Also unload the model when releasing memory (see ``--suspend-trim-timeout``),\n"
+            "it's loaded again when resuming, audio recorded while loading is recognized once it has loaded."
+        ),
+        required=False,
+    )
+
+    subparse.add_argument(
+        "--punctuate-from-previous-timeout",
+        dest="punctuate_from_previous_timeout",
+        default=0.0,
+        type=float,
+        metavar="SECONDS",
+        help=(
+            "The time-out in seconds for detecting the state of dictation from the previous recording,\n"
+            "this can be useful so punctuation it is added before entering the dictation"
+            "(zero disables)."
+        ),
+        required=False,
+    )
+
+    subparse.add_argument(
+        "--full-sentence",
+        dest="full_sentence",
+        default=False,
+        action="store_true",
+        help=(
+            "Capitalize the first character.\n"
+            "This is also used to add either a comma or a full stop when dictation is performed under the\n"
+            "``--punctuate-from-previous-timeout`` value."
+        ),
+        required=False,
+    )
+
+    subparse.add_argument(
+        "--numbers-as-digits",
+        dest="numbers_as_digits",
+        default=False,
+        action="store_true",
+        help=("Convert numbers into digits instead of using whole words."),
+        required=False,
+    )
+
+    subparse.add_argument(
+        "--numbers-use-separator",
+        dest="numbers_use_separator",
+        default=False,
+        action="store_true",
+        help=("Use a comma separators for numbers."),
+        required=False,
+    )
+
+    subparse.add_argument(
+        "--numbers-min-value",
+        dest="numbers_min_value",
+        default=None,
+        type=int,
+        help=(
+            "Minimum value for numbers to convert from whole words to digits.\n"
+            'This provides for more formal writing and prevents terms like "no one"\n'
+            'from being turned into "no 1".'
+        ),
+        required=False,
+    )
+
+    subparse.add_argument(
+        "--numbers-no-suffix",
+        dest="numbers_no_suffix",
+        default=False,
+        action="store_true",
+        help=(
+            "Suppress number suffixes when --numbers-as-digits is specified.\n"
+            'For example, this will prevent "first" from becoming "1st".'
+        ),
+        required=False,
+    )
+
+    subparse.add_argument(
+        "--itn",
+        dest="itn_languages",
+        default=[],
+        type=argparse_type_itn_languages,
+        metavar="LANGUAGES",
+        help=(
+            "Write spoken times, dates, money, percentages & units in their written form\n"
+            "(inverse text normalization), a comma separated list of languages: en, zh.\n"
+            'For example "five dollars" becomes "$5", "三点半" becomes "3:30" & "二零二六年" becomes "2026年".\n'
+            "Chinese numbers are also written with digits.\n"
+            "This is applied before ``--numbers-as-digits``."
+        ),
+        required=False,
+    )
+
+    subparse.add_argument(
+        "--term-list",
+        dest="term_lists",
+        default=[],
+        action="append",
+        metavar="FILE",
+        help=(
+            "Correct misrecognized terms in final results from a term list (may be used multiple times).\n"
+            "Each line is a term, either Latin (matched by spelling) or Chinese (matched by pinyin),\n"
+            "optionally followed by it's pinyin & frequency. Fcitx5 pinyin dictionaries are also supported\n"
+            "(read using ``libime_pinyindict``).\n"
+            'For example "transformar" becomes "transformer" & "鱼弦" becomes "余弦".\n'
+            "The index is cached in ``~/.cache/nerd-dictation``."
+        ),
+        required=False,
+    )
+
+    subparse.add_argument(
+        "--term-max-distance",
+        dest="term_max_distance",
+        default=2,
+        type=int,
+        metavar="N",
+        help=(
+            "The maximum number of edits between a Latin term & the recognized text for it to be corrected,\n"
+            "words shorter than 4 letters are only corrected when they only differ by case (default 2)."
+        ),
+        required=False,
+    )
+
+    subparse.add_argument(
+        "--input",
+        dest="input_method",
+        default="PAREC",
+        type=str,
+        metavar="INPUT_METHOD",
+        choices=("PAREC", "SOX", "PW-CAT"),
+        help=(
+            "Specify input method to be used for audio recording. Valid methods: PAREC, SOX, PW-CAT.\n"
+            "\n"
+            "- ``PAREC`` (external command, default)\n"
+            "  See --pulse-device-name option to use a specific pulse-audio device.\n"
+            "- ``SOX`` (external command)\n"
+            "  For help on setting up sox, see ``readme-sox.rst`` in the nerd-dictation repository.\n"
+            "- ``PW-CAT`` (external command)\n"
+        ),
+        required=False,
+    )
+
+    subparse.add_argument(
+        "--noise-reduction",
+        dest="noise_reduction",
+        default=0,
+        type=int,
+        choices=(0, 1, 2),
+        metavar="LEVEL",
+        help=(
+            "Noise reduction level applied to audio before speech recognition (default: 0).\n"
+            "\n"
+            "- ``0`` disabled (default, no extra dependency required).\n"
+            "- ``1`` light: reduce steady background noise (fans, AC units).\n"
+            "- ``2`` heavy: more aggressive reduction for noisy environments.\n"
+            "\n"
+            "Requires the ``noisereduce`` Python package when LEVEL > 0."
+        ),
+        required=False,
+    )
+
+    subparse.add_argument(
+        "--hotwords-file",
+        dest="hotwords_file",
+        default="",
+        metavar="FILE",
+        help=(
+            "Path to a hotwords file for contextual biasing (sherpa engine only).\n"
+            "Each line contains space-separated BPE tokens and an optional boost score.\n"
+            "When set, switches decoding to ``modified_beam_search``.\n"
+            "Default: empty (disabled, uses ``greedy_search``)."
+        ),
+        required=False,
+    )
+
+    subparse.add_argument(
+        "--hotwords-score",
+        dest="hotwords_score",
+        default=0.5,
+        type=float,
+        metavar="SCORE",
+        help=(
+            "Boosting score for hotwords (default: 1.5).\n"
+            "Higher values make hotwords more likely to be recognized."
+        ),
+        required=False,
+    )
+
+    subparse.add_argument(
+        "--route-model",
+        dest="route_model_dirs",
+        default=[],
+        action="append",
+        type=str,
+        metavar="DIR",
+        help=(
+            "An additional sherpa-onnx model which decodes the same audio concurrently (may be used multiple times),\n"
+            "for example an English model alongside a bilingual model.\n"
+            "For each segment, the text from the model with the highest decoder score is used.\n"
+            "Only used with ``--engine=sherpa``."
+        ),
+        required=False,
+    )
+
+    subparse.add_argument(
+        "--vad-model",
+        dest="vad_model",
+        default="",
+        type=str,
+        metavar="FILE",
+        help=(
+            "The Silero voice activity detection model (``silero_vad.onnx``) used to split speech into utterances.\n"
+            "Default: ``silero_vad.onnx`` in the model directory.\n"
+            "Only used with ``--engine=sherpa-offline``."
+        ),
+        required=False,
+    )
+
+    subparse.add_argument(
+        "--decode-workers",
+        dest="decode_workers",
+        default=2,
+        type=int,
+        metavar="N",
+        help=(
+            "The number of utterances decoded at once (default: 2), so consecutive utterances decode in parallel.\n"
+            "Only used with ``--engine=sherpa-offline``."
+        ),
+        required=False,
+    )
+
+    subparse.add_argument(
+        "--model-swap-dir",
+        dest="model_swap_dir",
+        default="",
+        type=str,
+        metavar="DIR",
+        help=(
+            "An alternate model (for the same engine), typically a smaller model which uses less processing.\n"
+            "The model is loaded in the background & swapped in at the next end-point (no audio is dropped),\n"
+            "when one of the ``--model-swap-*`` conditions is met or when requested with the ``model`` sub-command.\n"
+            "Only one model is kept loaded, the previous model is loaded again when swapping back.\n"
+            "With ``--engine=sherpa`` only the main model is swapped (not the ``--route-model`` models)."
+        ),
+        required=False,
+    )
+
+    subparse.add_argument(
+        "--model-swap-on-battery",
+        dest="model_swap_on_battery",
+        default=False,
+        action="store_true",
+        help="Use the alternate model (see ``--model-swap-dir``) while running on battery power.",
+        required=False,
+    )
+
+    subparse.add_argument(
+        "--model-swap-rtf",
+        dest="model_swap_rtf",
+        default=0.0,
+        type=float,
+        metavar="RATIO",
+        help=(
+            "Use the alternate model (see ``--model-swap-dir``) once decoding takes longer than this ratio\n"
+            "of the audio's duration (the real-time factor, measured over {:g} seconds of audio),\n"
+            "the alternate model is kept until the ``model`` sub-command is used. Zero disables (default)."
+        ).format(MODEL_SWAP_RTF_WINDOW),
+        required=False,
+    )
+
+    subparse.add_argument(
+        "--model-swap-memory-pressure",
+        dest="model_swap_memory_pressure",
+        default=0.0,
+        type=float,
+        metavar="PERCENT",
+        help=(
+            "Use the alternate model (see ``--model-swap-dir``) while the memory pressure is above this percentage\n"
+            "(the time tasks stalled waiting for memory over the last 10 seconds, from ``/proc/pressure/memory``).\n"
+            "Zero disables (default)."
+        ),
+        required=False,
+    )
+
+    subparse.add_argument(
+        "--debug-audio-dir",
+        dest="debug_audio_dir",
+        default="",
+        metavar="DIR",
+        help=(
+            "Save each raw audio chunk as a numbered WAV file in DIR for debugging.\n"
+            "Disabled by default (empty string)."
+        ),
+        required=False,
+    )
+
+    subparse.add_argument(
+        "--output",
+        dest="output",
+        default="SIMULATE_INPUT",
+        choices=("SIMULATE_INPUT", "STDOUT", "JSONL"),
+        metavar="OUTPUT_METHOD",
+        help=(
+            "Method used to at put the result of speech to text.\n"
+            "\n"
+            "- ``SIMULATE_INPUT`` simulate keystrokes (default).\n"
+            "- ``STDOUT`` print the result to the standard output.\n"
+            "  Be sure only to handle text from the standard output\n"
+            "  as the standard error may be used for reporting any problems that occur.\n"
+            "- ``JSONL`` print a JSON object for each event to the standard output (one per line),\n"
+            "  ``partial``, ``final`` & ``endpoint`` events with the ``segment`` number, ``text``,\n"
+            "  the ``start`` & ``end`` of the segment (seconds of audio recognized)\n"
+            "  and with sherpa-onnx, final events include ``tokens`` & their ``timestamps``.\n"
+            "  Partial events are dropped when the reader can't keep up.\n"
+        ),
+        required=False,
+    )
+    subparse.add_argument(
+        "--simulate-input-tool",
+        dest="simulate_input_tool",
+        default="XDOTOOL",
+        choices=tuple(SIMULATE_INPUT_TOOLS.keys()),
+        metavar="SIMULATE_INPUT_TOOL",
+        help=(
+            "Program used to simulate keystrokes (default).\n"
+            "\n"
+            "- ``XDOTOOL`` Compatible with the X server only (default).\n"
+            "- ``DOTOOL`` Compatible with all Linux distributions and Wayland.\n"
+            "- ``DOTOOLC`` Same as DOTOOL but for use with the `dotoold` daemon.\n"
+            "- ``YDOTOOL`` Compatible with all Linux distributions and Wayland but requires some setup.\n"
+            "- ``YDOTOOL_CLIPBOARD`` Like YDOTOOL but injects text via ``wl-copy`` + Ctrl+V.\n"
+            "  Use this on Wayland when an input method (e.g. Fcitx5) intercepts simulated keystrokes.\n"
+            "  Requires ``wl-copy`` (from ``wl-clipboard``).\n"
+            "- ``YDOTOOL_AUTO`` Chooses between YDOTOOL & YDOTOOL_CLIPBOARD for each output,\n"
+            "  pasting non-ASCII text and text estimated to be slower to type (from measured timings).\n"
+            "  The previous clipboard contents are restored afterwards (requires ``wl-paste``).\n"
+            "- ``WTYPE`` Compatible with Wayland.\n"
+            "- ``DBUS`` Sends text to an input method over D-Bus (``org.nerd_dictation.TextInput1``),\n"
+            "  partial results are shown as pre-edit text so nothing is deleted. Requires ``jeepney``.\n"
+            "  An IBus input method providing this is included in ``examples/ibus_text_input/``.\n"
+            "- ``STDOUT`` Bare stdout with Ctrl-H for backspaces.\n"
+            "  For help on setting up ydotool, see ``readme-ydotool.rst`` in the nerd-dictation repository.\n"
+        ),
+        required=False,
+    )
+
+    subparse.add_argument(
+        "--backlog-limit",
+        dest="backlog_limit",
+        default=0.0,
+        type=float,
+        metavar="SECONDS",
+        help=(
+            "The maximum amount of recorded audio waiting to be processed (in seconds),\n"
+            "when processing can't keep up with the recording the ``--overload-policy`` is used\n"
+            "until the backlog is below half this value.\n"
+            "Once the policies don't reduce the backlog enough, the oldest audio is dropped\n"
+            "(zero disables, the backlog is unbounded)."
+        ),
+        required=False,
+    )
+
+    subparse.add_argument(
+        "--overload-policy",
+        dest="overload_policy",
+        default="DROP_SILENCE",
+        type=argparse_type_overload_policy,
+        metavar="POLICY[,POLICY...]",
+        help=(
+            "A comma separated list of policies used when the ``--backlog-limit`` is exceeded.\n"
+            "\n"
+            "- ``DROP_SILENCE`` drop silent audio before dropping the oldest audio (default).\n"
+            "- ``SKIP_PARTIALS`` only handle final results, skipping partial results.\n"
+            "- ``DISABLE_NOISE_REDUCTION`` skip ``--noise-reduction``.\n"
+            "\n"
+            "Use an empty string to only drop the oldest audio."
+        ),
+        required=False,
+    )
+
+    subparse.add_argument(
+        "--metrics-file",
+        dest="metrics_file",
+        default="",
+        type=str,
+        metavar="FILE",
+        help=(
+            "Write metrics to FILE (in the Prometheus text format), updated every second while running.\n"
+            "Includes the state, real-time factor, queued audio, processing times, dropped samples & memory use.\n"
+            "See the ``status`` sub-command."
+        ),
+        required=False,
+    )
+
+    subparse.add_argument(
+        "--verbose",
+        dest="verbose",
+        default=0,
+        type=int,
+        help=(
+            "Verbosity level, defaults to zero (no output except for errors)\n"
+            "\n"
+            "- Level 1: report top level actions (dictation started, suspended .. etc).\n"
+            "- Level 2: report internal details (may be noisy)."
+        ),
+        required=False,
+    )
+
+    subparse.add_argument(
+        "-",
+        dest="rest",
+        default=False,
+        nargs=argparse.REMAINDER,
+        help=(
+            "End argument parsing.\n"
+            "This can be used for user defined arguments which configuration scripts may read from the ``sys.argv``."
+        ),
+    )
+
+    subparse.set_defaults(
+        func=lambda args: main_begin(
+            path_to_cookie=args.path_to_cookie,
+            vosk_model_dir=args.vosk_model_dir,
+            engine=args.engine,
+            pulse_device_name=args.pulse_device_name,
+            sample_rate=args.sample_rate,
+            input_method=args.input_method,
+            progressive=not (args.defer_output or args.output in {"STDOUT", "JSONL"}),
+            progressive_continuous=args.progressive_continuous,
+            full_sentence=args.full_sentence,
+            numbers_as_digits=args.numbers_as_digits,
+            numbers_use_separator=args.numbers_use_separator,
+            numbers_min_value=args.numbers_min_value,
+            numbers_no_suffix=args.numbers_no_suffix,
+            itn_languages=args.itn_languages,
+            term_lists=args.term_lists,
+            term_max_distance=args.term_max_distance,
+            timeout=args.timeout,
+            idle_time=min(args.idle_time, 0.5),
+            delay_exit=args.delay_exit,
+            punctuate_from_previous_timeout=args.punctuate_from_previous_timeout,
+            config_override=args.config,
+            output=args.output,
+            simulate_input_tool=args.simulate_input_tool,
+            suspend_on_start=args.suspend_on_start,
+            suspend_mode=args.suspend_mode,
+            preroll=args.preroll,
+            metrics_file=args.metrics_file,
+            backlog_limit=args.backlog_limit,
+            overload_policies=set(args.overload_policy.split(",")) - {""},
+            stable_partials=args.stable_partials,
+            stable_time=args.stable_time,
+            punctuation_model_dir=args.punctuation_model_dir,
+            capture_stall_timeout=args.capture_stall_timeout,
+            suspend_trim_timeout=args.suspend_trim_timeout,
+            suspend_unload_model=args.suspend_unload_model,
+            verbose=args.verbose,
+            vosk_grammar_file=args.vosk_grammar_file,
+            vosk_grammar_profiles=dict(args.vosk_grammar_profiles),
+            vosk_grammar_phrases=dict(args.vosk_grammar_phrases),
+            noise_reduction=args.noise_reduction,
+            debug_audio_dir=args.debug_audio_dir,
+            hotwords_file=args.hotwords_file,
+            hotwords_score=args.hotwords_score,
+            route_model_dirs=args.route_model_dirs,
+            vad_model=args.vad_model,
+            decode_workers=args.decode_workers,
+            model_swap_dir=args.model_swap_dir,
+            model_swap_on_battery=args.model_swap_on_battery,
+            model_swap_rtf=args.model_swap_rtf,
+            model_swap_memory_pressure=args.model_swap_memory_pressure,
+        ),
+    )
+
+
+def argparse_create_end(subparsers: "argparse._SubParsersAction[argparse.ArgumentParser]") -> None:
+    subparse = subparsers.add_parser(
+        "end",
+        help="End dictation.",
+        description="""\
+This ends dictation, causing the text to be typed in.
+    """,
+        formatter_class=argparse.RawTextHelpFormatter,
+    )
+
+    argparse_generic_command_cookie(subparse)
+
+    subparse.set_defaults(
+        func=lambda args: main_end(
+            path_to_cookie=args.path_to_cookie,
+        ),
+    )
+
+
+def argparse_create_cancel(subparsers: "argparse._SubParsersAction[argparse.ArgumentParser]") -> None:
+    subparse = subparsers.add_parser(
+        "cancel",
+        help="Cancel dictation.",
+        description="This cancels dictation.",
+        formatter_class=argparse.RawTextHelpFormatter,
+    )
+
+    argparse_generic_command_cookie(subparse)
+
+    subparse.set_defaults(
+        func=lambda args: main_cancel(
+            path_to_cookie=args.path_to_cookie,
+        ),
+    )
+
+
+def argparse_create_suspend(subparsers: "argparse._SubParsersAction[argparse.ArgumentParser]") -> None:
+    subparse = subparsers.add_parser(
+        "suspend",
+        help="Suspend the dictation process.",
+        description=(
+            "Suspend recording audio & the dictation process.\n"
+            "\n"
+            "This is useful on slower systems or when large language models take longer to load.\n"
+            "Recording audio is stopped and the process is paused to remove any CPU overhead."
+        ),
+        formatter_class=argparse.RawTextHelpFormatter,
+    )
+
+    argparse_generic_command_cookie(subparse)
+
+    subparse.set_defaults(
+        func=lambda args: main_suspend(
+            path_to_cookie=args.path_to_cookie,
+            suspend=True,
+            verbose=1,
+        ),
+    )
+
+
+def argparse_create_resume(subparsers: "argparse._SubParsersAction[argparse.ArgumentParser]") -> None:
+    subparse = subparsers.add_parser(
+        "resume",
+        help="Resume the dictation process.",
+        description=(
+            "Resume recording audio & the dictation process.\n"
+            "\n"
+            "This is to be used to resume after the 'suspend' command.\n"
+            "When nerd-dictation is not suspended, this does nothing.\n"
+        ),
+        formatter_class=argparse.RawTextHelpFormatter,
+    )
+
+    argparse_generic_command_cookie(subparse)
+
+    subparse.set_defaults(
+        func=lambda args: main_suspend(
+            path_to_cookie=args.path_to_cookie,
+            suspend=False,
+            verbose=1,
+        ),
+    )
+
+
+def argparse_create_grammar(subparsers: "argparse._SubParsersAction[argparse.ArgumentParser]") -> None:
+    subparse = subparsers.add_parser(
+        "grammar",
+        help="Switch the grammar profile of the dictation process.",
+        description=(
+            "Switch the grammar profile (see ``begin --vosk-grammar-profile``) without reloading the model.\n"
+            "\n"
+            "The switch is made once the speech being recognized reaches an end-point."
+        ),
+        formatter_class=argparse.RawTextHelpFormatter,
+    )
+
+    argparse_generic_command_cookie(subparse)
+
+    subparse.add_argument(
+        "name",
+        type=str,
+        metavar="NAME",
+        help="The profile name (``{:s}`` for the profile used on start-up).".format(GRAMMAR_PROFILE_DEFAULT),
+    )
+
+    subparse.set_defaults(
+        func=lambda args: main_grammar(
+            path_to_cookie=args.path_to_cookie,
+            name=args.name,
+            verbose=1,
+        ),
+    )
+
+
+def argparse_create_model(subparsers: "argparse._SubParsersAction[argparse.ArgumentParser]") -> None:
+    subparse = subparsers.add_parser(
+        "model",
+        help="Swap the model of the dictation process.",
+        description=(
+            "Swap to the primary model or the alternate model (see ``begin --model-swap-dir``),\n"
+            "``auto`` swaps when the ``--model-swap-*`` conditions are met (the default).\n"
+            "\n"
+            "The model is loaded in the background, swapping once the speech being recognized reaches an end-point."
+        ),
+        formatter_class=argparse.RawTextHelpFormatter,
+    )
+
+    argparse_generic_command_cookie(subparse)
+
+    subparse.add_argument(
+        "name",
+        type=str,
+        choices=MODEL_SWAP_REQUESTS,
+        metavar="MODEL",
+        help="One of: {:s}.".format(", ".join(MODEL_SWAP_REQUESTS)),
+    )
+
+    subparse.set_defaults(
+        func=lambda args: main_model(
+            path_to_cookie=args.path_to_cookie,
+            name=args.name,
+            verbose=1,
+        ),
+    )
+
+
+def argparse_create_status(subparsers: "argparse._SubParsersAction[argparse.ArgumentParser]") -> None:
+    subparse = subparsers.add_parser(
+        "status",
+        help="Report the status of the dictation process.",
+        description=(
+            "Print the state of the running dictation process to the standard output.\n"
+            "\n"
+            "Exits with a non-zero code when no dictation process is running."
+        ),
+        formatter_class=argparse.RawTextHelpFormatter,
+    )
+
+    argparse_generic_command_cookie(subparse)
+
+    subparse.add_argument(
+        "--metrics-file",
+        dest="metrics_file",
+        default="",
+        type=str,
+        metavar="FILE",
+        help="Also report the metrics written by the process started with ``begin --metrics-file=FILE``.",
+        required=False,
+    )
+
+    subparse.set_defaults(
+        func=lambda args: main_status(
+            path_to_cookie=args.path_to_cookie,
+            metrics_file=args.metrics_file,
+        ),
+    )
+
+
+def argparse_create_prefetch(subparsers: "argparse._SubParsersAction[argparse.ArgumentParser]") -> None:
+    subparse = subparsers.add_parser(
+        "prefetch",
+        help="Read models into memory ahead of dictation.",
+        description=(
+            "Read the model files into the page cache, so the next ``begin`` doesn't read the model from the disk.\n"
+            "The model in the configuration directory is used when no models are given.\n"
+            "\n"
+            "This starts reading in the background & exits immediately, so it can be run on login."
+        ),
+        formatter_class=argparse.RawTextHelpFormatter,
+    )
+
+    subparse.add_argument(
+        "--vosk-model-dir",
+        dest="vosk_model_dir",
+        default="",
+        type=str,
+        metavar="DIR",
+        help="The model directory (as passed to ``begin``).",
+        required=False,
+    )
+
+    subparse.add_argument(
+        "--model-swap-dir",
+        dest="model_swap_dir",
+        default="",
+        type=str,
+        metavar="DIR",
+        help="The model directory to swap to (as passed to ``begin``).",
+        required=False,
+    )
+
+    subparse.add_argument(
+        "--punctuation-model-dir",
+        dest="punctuation_model_dir",
+        default="",
+        type=str,
+        metavar="DIR",
+        help="The punctuation model directory (as passed to ``begin``).",
+        required=False,
+    )
+
+    subparse.add_argument(
+        "--vad-model",
+        dest="vad_model",
+        default="",
+        type=str,
+        metavar="FILE",
+        help="The voice activity detection model (as passed to ``begin``).",
+        required=False,
+    )
+
+    subparse.add_argument(
+        "--lock",
+        dest="lock",
+        default=False,
+        action="store_true",
+        help=(
+            "Lock the models in memory (waiting for them to be read), so they aren't evicted from the page cache.\n"
+            "This process keeps running until it's terminated, the size which can be locked is limited by\n"
+            "``ulimit -l``."
+        ),
+        required=False,
+    )
+
+    subparse.add_argument(
+        "--verbose",
+        dest="verbose",
+        default=0,
+        type=int,
+        help="Verbosity level, defaults to zero, level 1 also reports how much of the models was already cached.",
+        required=False,
+    )
+
+    subparse.set_defaults(
+        func=lambda args: main_prefetch(
+            paths=[
+                path
+                for path in (args.vosk_model_dir, args.model_swap_dir, args.punctuation_model_dir, args.vad_model)
+                if path
+            ],
+            lock=args.lock,
+            verbose=args.verbose,
+        ),
+    )
+
+
+def argparse_create() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+
+    subparsers = parser.add_subparsers()
+
+    argparse_create_begin(subparsers)
+
+    argparse_create_end(subparsers)
+    argparse_create_cancel(subparsers)
+
+    argparse_create_suspend(subparsers)
+    argparse_create_resume(subparsers)
+
+    argparse_create_grammar(subparsers)
+    argparse_create_model(subparsers)
+
+    argparse_create_status(subparsers)
+
+    argparse_create_prefetch(subparsers)
+
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse_create()
+    args = parser.parse_args(argv)
+    # Call sub-parser callback.
+    if not hasattr(args, "func"):
+        parser.print_help()
+        return
+
+    args.func(args)
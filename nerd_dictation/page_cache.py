@@ -0,0 +1,145 @@
+# SPDX-License-Identifier: GPL-2.0-or-later
+
+"""
+Reading model files into the page cache (used by the ``prefetch`` sub-command).
+
+Models are read from the page cache when they have been read recently,
+otherwise loading a model is limited by reading it from the disk (a "cold" load).
+The C library is used for the memory mapping functions Python doesn't expose (``mincore`` & ``mlock``).
+
+As with ``control``, ``typing`` isn't imported so ``prefetch`` starts quickly.
+"""
+
+from __future__ import annotations
+
+import ctypes
+import mmap
+import os
+
+
+def paths_files(paths: list[str]) -> list[str]:
+    """
+    Return the files in ``paths`` (files & directories, searched recursively), missing paths are ignored.
+    """
+    files = []
+    for path in paths:
+        if os.path.isfile(path):
+            files.append(path)
+            continue
+        for dirpath, dirnames, filenames in os.walk(path, followlinks=True):
+            dirnames.sort()
+            for filename in sorted(filenames):
+                filepath = os.path.join(dirpath, filename)
+                if os.path.isfile(filepath):
+                    files.append(filepath)
+    return files
+
+
+def size_as_text(size: int) -> str:
+    return "{:.1f} MiB".format(size / (1 << 20))
+
+
+def libc_or_none() -> ctypes.CDLL | None:
+    """
+    Return the C library or None when it's unavailable.
+    """
+    # try-catch approved: only available on systems with a C library which has these functions (Linux).
+    try:
+        libc = ctypes.CDLL(None, use_errno=True)
+        libc.mmap.restype = ctypes.c_void_p
+        libc.mmap.argtypes = (
+            ctypes.c_void_p,
+            ctypes.c_size_t,
+            ctypes.c_int,
+            ctypes.c_int,
+            ctypes.c_int,
+            ctypes.c_long,
+        )
+        libc.munmap.argtypes = (ctypes.c_void_p, ctypes.c_size_t)
+        libc.mincore.argtypes = (ctypes.c_void_p, ctypes.c_size_t, ctypes.c_char_p)
+        libc.mlock.argtypes = (ctypes.c_void_p, ctypes.c_size_t)
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+
+def file_map_or_none(libc: ctypes.CDLL, fd: int, size: int) -> int | None:
+    """
+    Return the address of the file ``fd`` mapped (read-only) into memory or None on failure,
+    mapping a file doesn't read it.
+    """
+    addr = libc.mmap(None, size, mmap.PROT_READ, mmap.MAP_SHARED, fd, 0)
+    if addr is None or addr == ctypes.c_void_p(-1).value:
+        return None
+    return int(addr)
+
+
+def files_cached_bytes_or_none(files: list[str]) -> tuple[int, int] | None:
+    """
+    Return the size of ``files`` & the number of bytes of them in the page cache, None when unknown.
+    """
+    libc = libc_or_none()
+    if libc is None:
+        return None
+    size_total = 0
+    cached_total = 0
+    for filepath in files:
+        fd = os.open(filepath, os.O_RDONLY)
+        try:
+            size = os.fstat(fd).st_size
+            addr = file_map_or_none(libc, fd, size) if size else None
+        finally:
+            os.close(fd)
+        if addr is None:
+            continue
+        # One byte for each page, where the lowest bit is set for pages in the page cache.
+        vec = ctypes.create_string_buffer((size + mmap.PAGESIZE - 1) // mmap.PAGESIZE)
+        result = libc.mincore(addr, size, vec)
+        libc.munmap(addr, size)
+        if result != 0:
+            continue
+        size_total += size
+        cached_total += min(size, sum(b & 1 for b in vec.raw) * mmap.PAGESIZE)
+    return size_total, cached_total
+
+
+def files_prefetch(files: list[str]) -> int:
+    """
+    Start reading ``files`` into the page cache (without waiting for the disk), returning their size.
+    """
+    size_total = 0
+    for filepath in files:
+        fd = os.open(filepath, os.O_RDONLY)
+        try:
+            size_total += os.fstat(fd).st_size
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+        finally:
+            os.close(fd)
+    return size_total
+
+
+def files_lock(files: list[str]) -> tuple[int, str]:
+    """
+    Lock ``files`` in memory (waiting for them to be read), returning the size locked & an error (empty on success).
+
+    The files stay locked until the process exits.
+    """
+    libc = libc_or_none()
+    if libc is None:
+        return 0, "the C library was not found"
+    size_locked = 0
+    for filepath in files:
+        fd = os.open(filepath, os.O_RDONLY)
+        try:
+            size = os.fstat(fd).st_size
+            addr = file_map_or_none(libc, fd, size) if size else None
+        finally:
+            # The mapping keeps a reference to the file.
+            os.close(fd)
+        if addr is None:
+            continue
+        if libc.mlock(addr, size) != 0:
+            libc.munmap(addr, size)
+            return size_locked, '{:s} (the limit is set by "ulimit -l")'.format(os.strerror(ctypes.get_errno()))
+        size_locked += size
+    return size_locked, ""
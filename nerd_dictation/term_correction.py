@@ -0,0 +1,471 @@
+# SPDX-License-Identifier: GPL-2.0-or-later
+
+"""
+Correct misrecognized domain terms in final results from a term list (used for ``--term-list``),
+e.g. "transformar" -> "transformer", "鱼弦" -> "余弦".
+
+The index is built once from the term lists & cached, so loading it doesn't depend on the number of terms:
+
+- Latin terms use a SymSpell style index, mapping each term with up to ``distance_max`` letters deleted
+  to the term, so terms near a span of text are found by looking up the deletes of the span.
+- Chinese terms are indexed by their tone-less pinyin (with fuzzy initials & finals merged),
+  so a span of characters which sounds like a term is found with a single lookup.
+"""
+
+import os
+import re
+import sys
+
+from typing import (
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+)
+
+# Increment when the index layout changes, so cached indices are rebuilt.
+TERM_INDEX_VERSION = 2
+
+# Spans of up to this many Latin words are checked, so a term split into words is corrected ("post gres").
+LATIN_SPAN_WORDS_MAX = 3
+
+# Shorter words must match a term exactly, most short words are within an edit of a common word
+# ("rest", "must" & "lava" aren't "Rust" or "Java").
+LATIN_FUZZY_LENGTH_MIN = 5
+
+WORD_LATIN_MATCH = re.compile(r"[A-Za-z][A-Za-z0-9+#]*")
+# Words which are never part of a span of words corrected to a term ("in the rest" isn't "interest").
+LATIN_FUNCTION_WORDS = frozenset(
+    "a an and are as at be but by do for he i if in is it its me my no not of on or our so the to up was we you".split()
+)
+# Chinese characters, words may be separated by spaces (as some models output them).
+SPAN_CHINESE_MATCH = re.compile(r"[一-鿿](?: ?[一-鿿])*")
+
+_TONE_MAP = str.maketrans(
+    "āáǎàēéěèīíǐìōóǒòūúǔùǖǘǚǜü",
+    "aaaaeeeeiiiioooouuuuvvvvv",
+)
+
+# Initials & finals which sound alike (matching the pairs input methods conflate).
+_FUZZY_INITIALS = (("zh", "z"), ("ch", "c"), ("sh", "s"))
+_FUZZY_FINALS = (("eng", "en"), ("ing", "in"), ("ang", "an"))
+
+
+# -----------------------------------------------------------------------------
+# Utilities
+#
+
+
+def is_chinese(text: str) -> bool:
+    return all("一" <= c <= "鿿" for c in text)
+
+
+def syllable_fuzzy(syllable: str) -> str:
+    """
+    Return the tone-less pinyin ``syllable`` with sounds which are commonly confused merged.
+    """
+    syllable = syllable.translate(_TONE_MAP).lower()
+    for src, dst in _FUZZY_INITIALS:
+        if syllable.startswith(src):
+            syllable = dst + syllable[len(src) :]
+            break
+    for src, dst in _FUZZY_FINALS:
+        if syllable.endswith(src):
+            syllable = syllable[: -len(src)] + dst
+            break
+    return syllable
+
+
+def deletes_from_word(word: str, distance: int) -> Set[str]:
+    """
+    Return ``word`` with every combination of up to ``distance`` characters removed (including ``word``).
+    """
+    result = {word}
+    edits = [word]
+    for _ in range(distance):
+        edits_next = []
+        for edit in edits:
+            if len(edit) <= 1:
+                continue
+            for i in range(len(edit)):
+                edit_delete = edit[:i] + edit[i + 1 :]
+                if edit_delete not in result:
+                    result.add(edit_delete)
+                    edits_next.append(edit_delete)
+        edits = edits_next
+    return result
+
+
+def distance_osa(a: str, b: str) -> int:
+    """
+    Return the edit distance between ``a`` & ``b`` (optimal string alignment, counting transpositions).
+    """
+    row_prev_prev: List[int] = []
+    row_prev = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        row = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            row[j] = min(row_prev[j] + 1, row[j - 1] + 1, row_prev[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                row[j] = min(row[j], row_prev_prev[j - 2] + 1)
+        row_prev_prev, row_prev = row_prev, row
+    return row_prev[-1]
+
+
+# -----------------------------------------------------------------------------
+# Term Lists
+#
+
+
+def terms_from_lines(lines: Iterator[str]) -> Iterator[Tuple[str, str, int]]:
+    """
+    Yield ``(term, pinyin, frequency)`` from lines of a term list,
+    each line is a term, optionally followed by it's pinyin & frequency (as written by ``libime_pinyindict``).
+    """
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        # Latin terms may contain spaces, Chinese terms never do.
+        if not is_chinese(line.split(None, 1)[0]):
+            yield (line, "", 0)
+            continue
+        fields = line.split()
+        pinyin = fields[1] if len(fields) > 1 else ""
+        frequency = int(fields[2]) if len(fields) > 2 and fields[2].isdigit() else 0
+        yield (fields[0], pinyin, frequency)
+
+
+def terms_from_file(path: str) -> List[Tuple[str, str, int]]:
+    """
+    Return the terms of a term list, Fcitx5 pinyin dictionaries (binary files) are read using ``libime_pinyindict``.
+    """
+    import subprocess
+
+    with open(path, "rb") as fh:
+        data = fh.read()
+    # try-catch approved: text which isn't UTF-8 is a binary dictionary.
+    try:
+        return list(terms_from_lines(iter(data.decode("utf-8").splitlines())))
+    except UnicodeDecodeError:
+        pass
+
+    try:
+        text = subprocess.check_output(
+            ["libime_pinyindict", "-d", path, "/dev/stdout"],
+            stderr=subprocess.DEVNULL,
+            encoding="utf-8",
+        )
+    except FileNotFoundError:
+        sys.stderr.write('Reading the Fcitx5 dictionary {!r} requires "libime_pinyindict".\n'.format(path))
+        return []
+    return list(terms_from_lines(iter(text.splitlines())))
+
+
+# -----------------------------------------------------------------------------
+# Term Index
+#
+
+
+class TermIndex:
+    """
+    Terms indexed for correcting spans of text with a lookup per span.
+    """
+
+    __slots__ = (
+        "distance_max",
+        # Latin terms: (lower-case term without spaces: term).
+        "latin_terms",
+        # Latin terms with letters deleted: (delete: [lower-case terms, ...]).
+        "latin_deletes",
+        # Chinese terms: (space separated fuzzy syllables: term), the most frequent term for each key.
+        "chinese_terms",
+        # The lengths of Chinese terms (longest first).
+        "chinese_lengths",
+        # The fuzzy syllable of each character which may be part of a term (character: syllable).
+        "char_syllables",
+    )
+
+    def __init__(self, distance_max: int) -> None:
+        self.distance_max = distance_max
+        self.latin_terms: Dict[str, str] = {}
+        self.latin_deletes: Dict[str, List[str]] = {}
+        self.chinese_terms: Dict[str, str] = {}
+        self.chinese_lengths: List[int] = []
+        self.char_syllables: Dict[str, str] = {}
+
+    def distance_from_length(self, length: int) -> int:
+        # Short words allow fewer edits, otherwise most short words would be "corrected".
+        if length < LATIN_FUZZY_LENGTH_MIN:
+            return 0
+        return min(self.distance_max, length // 4)
+
+    @classmethod
+    def from_terms(cls, terms: Sequence[Tuple[str, str, int]], distance_max: int) -> "TermIndex":
+        index = cls(distance_max)
+
+        latin_deletes: Dict[str, Set[str]] = {}
+        chinese_terms: Dict[str, Tuple[int, str]] = {}
+        chinese_syllables: List[Tuple[str, List[str], int]] = []
+        for term, pinyin, frequency in terms:
+            if is_chinese(term):
+                if len(term) < 2:
+                    continue
+                syllables = pinyin.split("'") if pinyin else []
+                if syllables and len(syllables) != len(term):
+                    syllables = []
+                chinese_syllables.append((term, syllables, frequency))
+            elif WORD_LATIN_MATCH.fullmatch(term.replace(" ", "")):
+                key = term.replace(" ", "").lower()
+                index.latin_terms[key] = term
+                for delete in deletes_from_word(key, index.distance_from_length(len(key))):
+                    latin_deletes.setdefault(delete, set()).add(key)
+            # Mixed terms (Latin & Chinese) aren't supported.
+
+        index.latin_deletes = {delete: sorted(keys) for delete, keys in latin_deletes.items()}
+
+        if chinese_syllables:
+            char_syllables_all = chinese_char_syllables_or_none()
+            if char_syllables_all is None:
+                sys.stderr.write('Correcting Chinese terms requires "pypinyin", Chinese terms are ignored.\n')
+                chinese_syllables.clear()
+                char_syllables_all = {}
+
+            keys_syllables: Set[str] = set()
+            for term, syllables, frequency in chinese_syllables:
+                # Index the pinyin from the term list (when known) & the default pinyin of each character.
+                keys = set()
+                if syllables:
+                    keys.add(" ".join(syllable_fuzzy(syllable) for syllable in syllables))
+                if all(c in char_syllables_all for c in term):
+                    keys.add(" ".join(char_syllables_all[c] for c in term))
+                for key in keys:
+                    keys_syllables.update(key.split(" "))
+                    # The most frequent term wins when terms sound the same.
+                    if key not in chinese_terms or chinese_terms[key][0] < frequency:
+                        chinese_terms[key] = (frequency, term)
+
+            index.chinese_terms = {key: term for key, (_, term) in chinese_terms.items()}
+            index.chinese_lengths = sorted({key.count(" ") + 1 for key in chinese_terms}, reverse=True)
+            # Only characters which sound like part of a term are needed.
+            index.char_syllables = {c: s for c, s in char_syllables_all.items() if s in keys_syllables}
+
+        return index
+
+    # -------------------------------------------------------------------------
+    # Correction
+
+    def latin_term_or_none(self, text: str) -> Optional[Tuple[str, int]]:
+        """
+        Return the term nearest to ``text`` (lower-case without spaces) & it's distance or None.
+        """
+        term = self.latin_terms.get(text)
+        if term is not None:
+            return term, 0
+        distance_limit = self.distance_from_length(len(text))
+        if distance_limit == 0:
+            return None
+        keys_found: Set[str] = set()
+        for delete in deletes_from_word(text, distance_limit):
+            keys_found.update(self.latin_deletes.get(delete, ()))
+        distance_best = distance_limit + 1
+        key_best = ""
+        # Sorted for stable results (when the distance is the same).
+        for key in sorted(keys_found):
+            # Words which only differ by their ending are other forms of a word
+            # ("transform", "transformers" & "pythons"), not a misrecognized term.
+            if key.startswith(text) or text.startswith(key):
+                continue
+            # Words which start differently are other words ("locker" & "censor" aren't "Docker" or "tensor"),
+            # misrecognized terms keep their first sound.
+            if key[0] != text[0]:
+                continue
+            distance = distance_osa(text, key)
+            if distance < distance_best and distance <= self.distance_from_length(len(key)):
+                distance_best = distance
+                key_best = key
+        return (self.latin_terms[key_best], distance_best) if key_best else None
+
+    def _latin_span_is_candidate(self, text: str, span: List["re.Match[str]"]) -> bool:
+        """
+        Return true when the words in ``span`` may be a term which was split into words ("post gres").
+        """
+        for j, m in enumerate(span):
+            word = m.group(0).lower()
+            # Words which are terms (or common words) aren't part of another term.
+            if word in LATIN_FUNCTION_WORDS or word in self.latin_terms:
+                return False
+            # Words must be separated by a single space.
+            if j + 1 < len(span) and (span[j + 1].start() != m.end() + 1 or text[m.end()] != " "):
+                return False
+        return True
+
+    def _correct_latin(self, text: str) -> str:
+        words = list(WORD_LATIN_MATCH.finditer(text))
+        if not words:
+            return text
+        # The term nearest to each word (& it's distance) or None.
+        words_term = [self.latin_term_or_none(m.group(0).lower()) for m in words]
+        result = []
+        text_index = 0
+        i = 0
+        while i < len(words):
+            term_and_len = None
+            # Longest spans 1st, a span must be nearer to a term than any of it's words are.
+            for span_len in range(min(LATIN_SPAN_WORDS_MAX, len(words) - i), 1, -1):
+                span = words[i : i + span_len]
+                if not self._latin_span_is_candidate(text, span):
+                    continue
+                span_term = self.latin_term_or_none("".join(m.group(0) for m in span).lower())
+                if span_term is None:
+                    continue
+                distances = [word_term[1] for word_term in words_term[i : i + span_len] if word_term is not None]
+                if distances and span_term[1] >= min(distances):
+                    continue
+                term_and_len = span_term[0], span_len
+                break
+            else:
+                word_term = words_term[i]
+                if word_term is not None:
+                    term_and_len = word_term[0], 1
+            if term_and_len is None:
+                i += 1
+                continue
+            term, span_len = term_and_len
+            result.append(text[text_index : words[i].start()])
+            result.append(term)
+            text_index = words[i + span_len - 1].end()
+            i += span_len
+        result.append(text[text_index:])
+        return "".join(result)
+
+    def _correct_chinese_span(self, span: str) -> str:
+        # The index of each character (spaces are kept where they are).
+        chars_index = [i for i, c in enumerate(span) if c != " "]
+        # Empty for characters which aren't part of any term.
+        syllables = [self.char_syllables.get(span[i], "") for i in chars_index]
+        result = list(span)
+        i = 0
+        while i < len(chars_index):
+            for term_len in self.chinese_lengths:
+                if i + term_len > len(chars_index):
+                    continue
+                syllables_term = syllables[i : i + term_len]
+                if "" in syllables_term:
+                    continue
+                term = self.chinese_terms.get(" ".join(syllables_term))
+                if term is None:
+                    continue
+                chars = [span[j] for j in chars_index[i : i + term_len]]
+                # Half the characters must match, so words which sound alike aren't all replaced.
+                if sum(c == c_term for c, c_term in zip(chars, term)) < max(1, term_len // 2):
+                    continue
+                for j, c_term in zip(chars_index[i : i + term_len], term):
+                    result[j] = c_term
+                i += term_len
+                break
+            else:
+                i += 1
+        return "".join(result)
+
+    def correct(self, text: str) -> str:
+        """
+        Return ``text`` with spans which are near a term replaced by the term.
+        """
+        if self.latin_terms:
+            text = self._correct_latin(text)
+        if self.chinese_terms:
+            text = SPAN_CHINESE_MATCH.sub(lambda m: self._correct_chinese_span(m.group(0)), text)
+        return text
+
+    # -------------------------------------------------------------------------
+    # Cache
+
+    def to_data(self) -> Tuple[object, ...]:
+        return tuple(getattr(self, attr) for attr in self.__slots__)
+
+    @classmethod
+    def from_data(cls, data: Tuple[object, ...]) -> "TermIndex":
+        index = cls.__new__(cls)
+        for attr, value in zip(cls.__slots__, data):
+            setattr(index, attr, value)
+        return index
+
+
+def chinese_char_syllables_or_none() -> Optional[Dict[str, str]]:
+    """
+    Return the fuzzy syllable of each Chinese character (using it's most common pronunciation).
+    """
+    # try-catch approved: pypinyin is optional, only needed for Chinese terms when the index is built.
+    try:
+        # lazy import: only needed when building the index.
+        from pypinyin import pinyin_dict
+    except ImportError:
+        return None
+    return {
+        chr(codepoint): syllable_fuzzy(readings.split(",", 1)[0])
+        for codepoint, readings in pinyin_dict.pinyin_dict.items()
+        if 0x4E00 <= codepoint <= 0x9FFF
+    }
+
+
+def term_index_cache_path(paths: Sequence[str], distance_max: int) -> str:
+    """
+    Return the cache path for the index of ``paths``, which changes whenever the term lists change.
+    """
+    import hashlib
+
+    hasher = hashlib.sha256("{:d} {:d}".format(TERM_INDEX_VERSION, distance_max).encode("utf-8"))
+    for path in paths:
+        hasher.update(os.path.abspath(path).encode("utf-8") + b"\0")
+        with open(path, "rb") as fh:
+            hasher.update(hashlib.sha256(fh.read()).digest())
+    cache_dir = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(cache_dir, "nerd-dictation", "term-index-{:s}.pickle".format(hasher.hexdigest()[:32]))
+
+
+def term_index_load(paths: Sequence[str], distance_max: int = 2, verbose: int = 0) -> TermIndex:
+    """
+    Return the index of the term lists in ``paths``, built when it's not found in the cache.
+    """
+    import pickle
+    import time
+
+    time_beg = time.perf_counter()
+    cache_path = term_index_cache_path(paths, distance_max)
+    # try-catch approved: a missing or unreadable cache is rebuilt.
+    try:
+        with open(cache_path, "rb") as fh:
+            index = TermIndex.from_data(pickle.load(fh))
+    except (OSError, EOFError, pickle.UnpicklingError, TypeError, ValueError):
+        pass
+    else:
+        if verbose >= 1:
+            sys.stderr.write(
+                "Term index loaded from cache in {:.3f}s: {!r}\n".format(time.perf_counter() - time_beg, cache_path)
+            )
+        return index
+
+    terms: List[Tuple[str, str, int]] = []
+    for path in paths:
+        terms.extend(terms_from_file(path))
+    index = TermIndex.from_terms(terms, distance_max)
+
+    # Written to a temporary file 1st, so a partially written cache is never read.
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    cache_path_tmp = "{:s}.{:d}.tmp".format(cache_path, os.getpid())
+    with open(cache_path_tmp, "wb") as fh:
+        pickle.dump(index.to_data(), fh, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(cache_path_tmp, cache_path)
+
+    if verbose >= 1:
+        sys.stderr.write(
+            "Term index built from {:d} term(s) in {:.3f}s: {!r}\n".format(
+                len(terms), time.perf_counter() - time_beg, cache_path
+            )
+        )
+    return index
@@ -0,0 +1,733 @@
+# SPDX-License-Identifier: GPL-2.0-or-later
+
+"""
+Inverse text normalization, writing spoken times, dates, money, percentages, units & Chinese numerals
+in their written form (used for ``--itn``), e.g. "three thirty pm" -> "3:30 pm", "三点半" -> "3:30".
+
+Each language has a grammar (see ``GRAMMARS``): a table of rules, each a regular expression
+(written using the grammar's word classes) with a function which writes the matched text.
+The rules of all languages used are compiled once into a single expression,
+so text is normalized in a single pass.
+"""
+
+import re
+
+from typing import (
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+)
+
+# A rule: the name, the pattern & a function which takes the named groups of the pattern,
+# returning the written text or None to leave the text unchanged.
+Rule = Tuple[str, str, Callable[[Dict[str, str]], Optional[str]]]
+# A grammar: a pattern which matches where any of it's rules may start (checked before trying each rule),
+# & the rules.
+Grammar = Tuple[str, List[Rule]]
+
+# Functions returning the grammar of each language (language: function).
+GRAMMARS: Dict[str, Callable[[], Grammar]] = {}
+
+
+def grammar_register(language: str) -> Callable[[Callable[[], Grammar]], Callable[[], Grammar]]:
+    """
+    A decorator which adds a grammar for ``language`` (only called when the language is used).
+    """
+
+    def register(fn: Callable[[], Grammar]) -> Callable[[], Grammar]:
+        GRAMMARS[language] = fn
+        return fn
+
+    return register
+
+
+def pattern_expand(pattern: str, classes: Dict[str, str]) -> str:
+    """
+    Replace ``<<name>>`` in ``pattern`` with the (non-capturing) pattern of the word class.
+    """
+    return re.sub(r"<<(\w+)>>", lambda m: "(?:" + classes[m.group(1)] + ")", pattern)
+
+
+def words_pattern(words: List[str]) -> str:
+    # Longest first, so the longest word is matched.
+    return "|".join(re.escape(word) for word in sorted(words, key=len, reverse=True))
+
+
+# -----------------------------------------------------------------------------
+# Grammar: English
+#
+
+EN_UNITS = {
+    word: value
+    for value, word in enumerate(
+        (
+            "zero",
+            "one",
+            "two",
+            "three",
+            "four",
+            "five",
+            "six",
+            "seven",
+            "eight",
+            "nine",
+            "ten",
+            "eleven",
+            "twelve",
+            "thirteen",
+            "fourteen",
+            "fifteen",
+            "sixteen",
+            "seventeen",
+            "eighteen",
+            "nineteen",
+        )
+    )
+}
+EN_TENS = {
+    "twenty": 20,
+    "thirty": 30,
+    "forty": 40,
+    "fifty": 50,
+    "sixty": 60,
+    "seventy": 70,
+    "eighty": 80,
+    "ninety": 90,
+}
+EN_SCALES = {
+    "hundred": 100,
+    "thousand": 1_000,
+    "million": 1_000_000,
+    "billion": 1_000_000_000,
+    "trillion": 1_000_000_000_000,
+}
+EN_ORDINALS = {
+    "first": 1,
+    "second": 2,
+    "third": 3,
+    "fourth": 4,
+    "fifth": 5,
+    "sixth": 6,
+    "seventh": 7,
+    "eighth": 8,
+    "ninth": 9,
+    "tenth": 10,
+    "eleventh": 11,
+    "twelfth": 12,
+    "thirteenth": 13,
+    "fourteenth": 14,
+    "fifteenth": 15,
+    "sixteenth": 16,
+    "seventeenth": 17,
+    "eighteenth": 18,
+    "nineteenth": 19,
+    "twentieth": 20,
+    "thirtieth": 30,
+}
+EN_DIGITS = dict(EN_UNITS, oh=0)
+EN_MONTHS = (
+    "january",
+    "february",
+    "march",
+    "april",
+    "may",
+    "june",
+    "july",
+    "august",
+    "september",
+    "october",
+    "november",
+    "december",
+)
+# Months which are also (common) words.
+EN_MONTHS_WORDS = ("march", "may")
+# Currencies (spoken: symbol), the symbol is written before the amount.
+EN_CURRENCIES = {
+    "dollar": "$",
+    "dollars": "$",
+    "buck": "$",
+    "bucks": "$",
+    "euro": "€",
+    "euros": "€",
+    "pound": "£",
+    "pounds": "£",
+    "yen": "¥",
+    "yuan": "¥",
+}
+# Units (spoken: symbol), the symbol is written after the amount.
+EN_UNIT_SYMBOLS = {
+    "millimeter": "mm",
+    "millimeters": "mm",
+    "centimeter": "cm",
+    "centimeters": "cm",
+    "meter": "m",
+    "meters": "m",
+    "kilometer": "km",
+    "kilometers": "km",
+    "milligram": "mg",
+    "milligrams": "mg",
+    "gram": "g",
+    "grams": "g",
+    "kilogram": "kg",
+    "kilograms": "kg",
+    "milliliter": "ml",
+    "milliliters": "ml",
+    "liter": "l",
+    "liters": "l",
+    "inches": "in",
+    "feet": "ft",
+    "mile": "mi",
+    "miles": "mi",
+    "miles per hour": "mph",
+    "kilometers per hour": "km/h",
+    "kilobyte": "KB",
+    "kilobytes": "KB",
+    "megabyte": "MB",
+    "megabytes": "MB",
+    "gigabyte": "GB",
+    "gigabytes": "GB",
+    "terabyte": "TB",
+    "terabytes": "TB",
+    "hertz": "Hz",
+    "kilohertz": "kHz",
+    "megahertz": "MHz",
+    "gigahertz": "GHz",
+    "millisecond": "ms",
+    "milliseconds": "ms",
+    "degree": "°",
+    "degrees": "°",
+    "degrees celsius": "°C",
+    "degrees fahrenheit": "°F",
+}
+
+
+def en_cardinal_or_none(text: str) -> Optional[int]:
+    """
+    Return the value of a spoken (or written) number, None when the words aren't a valid number.
+    """
+    text = text.lower()
+    if text[:1].isdigit():
+        return int(text.replace(",", ""))
+    words = text.replace("-", " ").split()
+    # "a hundred", "a thousand" .. are the same as "one hundred".
+    if words[0] == "a" and len(words) > 1 and words[1] in EN_SCALES:
+        del words[0]
+    total = current = 0
+    # The kind of the previous word, used to reject sequences such as "five six" or "twenty twelve".
+    kind_prev = ""
+    for word in words:
+        if word == "and":
+            if kind_prev not in {"hundred", "scale"}:
+                return None
+            kind_prev = "and"
+            continue
+        value = EN_UNITS.get(word)
+        if value is not None:
+            if kind_prev in {"unit", "teen"} or (kind_prev == "tens" and not 0 < value < 10):
+                return None
+            current += value
+            kind_prev = "teen" if value >= 10 else "unit"
+            continue
+        value = EN_TENS.get(word)
+        if value is not None:
+            if kind_prev in {"unit", "teen", "tens"}:
+                return None
+            current += value
+            kind_prev = "tens"
+            continue
+        value = EN_SCALES.get(word)
+        if value is None:
+            return None
+        if value == 100:
+            if current >= 100 or kind_prev == "hundred":
+                return None
+            current = (current or 1) * 100
+            kind_prev = "hundred"
+        else:
+            if kind_prev == "scale":
+                return None
+            total += (current or 1) * value
+            current = 0
+            kind_prev = "scale"
+    if kind_prev == "and":
+        return None
+    return total + current
+
+
+def en_year_or_none(text: str) -> Optional[int]:
+    """
+    Return the value of a year, spoken as a number or as pairs of digits ("twenty twenty six").
+    """
+    value = en_cardinal_or_none(text)
+    if value is not None:
+        return value
+    words = text.lower().replace("-", " ").split()
+    century = EN_UNITS.get(words[0]) or EN_TENS.get(words[0])
+    if century is None or century < 10:
+        return None
+    if words[1] in {"oh", "o"}:
+        year = EN_UNITS.get(words[2]) if len(words) == 3 else None
+        if year is None or year >= 10:
+            return None
+    else:
+        year = en_cardinal_or_none(" ".join(words[1:]))
+        if year is None or not 10 <= year < 100:
+            return None
+    return century * 100 + year
+
+
+def en_decimal_or_none(groups: Dict[str, str], name: str) -> Optional[str]:
+    value = en_cardinal_or_none(groups[name])
+    if value is None:
+        return None
+    fraction = groups[name + "_fraction"]
+    if not fraction:
+        return "{:d}".format(value)
+    return "{:d}.{:s}".format(value, "".join(str(EN_DIGITS[word]) for word in fraction.lower().split()))
+
+
+def en_day_or_none(text: str) -> Optional[int]:
+    text = text.lower()
+    if text[:1].isdigit():
+        day = int(text.rstrip("stndrh"))
+    else:
+        tens, _, unit = text.replace("-", " ").rpartition(" ")
+        day = EN_ORDINALS[unit] + (EN_TENS[tens] if tens else 0)
+    return day if 1 <= day <= 31 else None
+
+
+def en_money(groups: Dict[str, str]) -> Optional[str]:
+    amount = en_decimal_or_none(groups, "amount")
+    if amount is None:
+        return None
+    if groups["cents"]:
+        cents = en_cardinal_or_none(groups["cents"])
+        if cents is None or cents >= 100 or "." in amount:
+            return None
+        amount += ".{:02d}".format(cents)
+    return EN_CURRENCIES[groups["currency"].lower()] + amount
+
+
+def en_cents(groups: Dict[str, str]) -> Optional[str]:
+    cents = en_cardinal_or_none(groups["cents"])
+    if cents is None or cents >= 100:
+        return None
+    return "{:d}¢".format(cents)
+
+
+def en_percent(groups: Dict[str, str]) -> Optional[str]:
+    amount = en_decimal_or_none(groups, "amount")
+    return None if amount is None else amount + "%"
+
+
+def en_unit(groups: Dict[str, str]) -> Optional[str]:
+    amount = en_decimal_or_none(groups, "amount")
+    if amount is None:
+        return None
+    symbol = EN_UNIT_SYMBOLS[" ".join(groups["unit"].lower().split())]
+    return amount + symbol if symbol[0] == "°" else amount + " " + symbol
+
+
+def en_time(groups: Dict[str, str]) -> Optional[str]:
+    hour = en_cardinal_or_none(groups["hour"])
+    if hour is None or not 0 <= hour <= 24:
+        return None
+    minute = 0
+    if groups["minute"]:
+        words = groups["minute"].lower().split()
+        minute_or_none = EN_UNITS.get(words[1]) if words[0] in {"oh", "o"} else en_cardinal_or_none(groups["minute"])
+        if minute_or_none is None or not 0 <= minute_or_none <= 59:
+            return None
+        minute = minute_or_none
+    if groups["clock"]:
+        return "{:d}:{:02d}".format(hour, minute)
+    period = "am" if groups["period"].lower().startswith("a") else "pm"
+    if not groups["minute"]:
+        return "{:d} {:s}".format(hour, period)
+    return "{:d}:{:02d} {:s}".format(hour, minute, period)
+
+
+def en_date(groups: Dict[str, str]) -> Optional[str]:
+    day = en_day_or_none(groups["day"])
+    if day is None:
+        return None
+    year = en_year_or_none(groups["year"]) if groups["year"] else None
+    if year is not None and year < 1000:
+        year = None
+    # Months which are also words are only followed by "the" in a date with a year ("may the fourth be ..").
+    if groups["the"] and year is None and groups["month"].lower() in EN_MONTHS_WORDS:
+        return None
+    text = "{:s} {:d}".format(groups["month"], day)
+    if groups["year"]:
+        # Numbers which follow the date may not be a year ("may first one of ..").
+        text += " " + groups["year"] if year is None else ", {:d}".format(year)
+    return text
+
+
+@grammar_register("en")
+def grammar_en() -> Grammar:
+    number_word = words_pattern(list(EN_UNITS) + list(EN_TENS) + list(EN_SCALES))
+    # Numbers may start with "a" before a scale ("a hundred").
+    a_scale = r"a (?=(?:{:s})\b)".format(words_pattern(list(EN_SCALES)))
+    unit_1_9 = words_pattern([word for word, value in EN_UNITS.items() if 0 < value < 10])
+    ordinal = words_pattern(list(EN_ORDINALS))
+    classes = {
+        "num": r"\d+(?:,\d{3})*|" + "(?:{1:s})?(?:{0:s})(?:[ -](?:and )?(?:{0:s}))*".format(number_word, a_scale),
+        "fraction": "(?: (?:{:s}))+".format(words_pattern(list(EN_DIGITS))),
+        "hour": r"\d{1,2}|" + words_pattern([word for word, value in EN_UNITS.items() if 0 < value <= 12]),
+        "minute": r"(?:oh|o) (?:{0:s})|(?:{1:s})(?:[ -](?:{0:s}))?|{2:s}".format(
+            unit_1_9,
+            words_pattern(["twenty", "thirty", "forty", "fifty"]),
+            words_pattern([word for word, value in EN_UNITS.items() if 10 <= value]),
+        ),
+        "period": r"[ap]\.? ?m\b\.?",
+        "day": r"\d{1,2}(?:st|nd|rd|th)|" + "(?:(?:twenty|thirty)[ -])?(?:{:s})".format(ordinal),
+        "month": words_pattern(list(EN_MONTHS)),
+        "year": r"\d{4}|" + "(?:{0:s})(?:[ -](?:and )?(?:{0:s}|oh|o))*".format(number_word),
+        "currency": words_pattern(list(EN_CURRENCIES)),
+        "unit": words_pattern(list(EN_UNIT_SYMBOLS)),
+    }
+    # Amounts may have a fraction, e.g. "two point five".
+    amount = r"(?P<amount><<num>>)(?: point(?P<amount_fraction><<fraction>>))?"
+    rules: List[Rule] = [
+        (
+            "money",
+            r"\b" + amount + r" (?P<currency><<currency>>)(?: and (?P<cents><<num>>) cents?)?\b",
+            en_money,
+        ),
+        ("cents", r"\b(?P<cents><<num>>) cents?\b", en_cents),
+        ("percent", r"\b" + amount + r" per ?cent\b", en_percent),
+        (
+            "time",
+            r"\b(?P<hour><<hour>>)(?: (?P<minute><<minute>>))?"
+            r"(?: (?P<period><<period>>)|(?P<clock> o'? ?clock\b))",
+            en_time,
+        ),
+        # Days must be ordinals since some months are also words ("may", "march").
+        (
+            "date",
+            r"\b(?P<month><<month>>) (?P<the>the )?(?P<day><<day>>)\b(?:,? (?P<year><<year>>)\b)?",
+            en_date,
+        ),
+        ("unit", r"\b" + amount + r" (?P<unit><<unit>>)\b", en_unit),
+    ]
+    start = r"\d|\b(?:{:s})\b|\b{:s}".format(
+        words_pattern(list(EN_UNITS) + list(EN_TENS) + list(EN_SCALES) + list(EN_MONTHS)), a_scale
+    )
+    return start, [(name, pattern_expand(pattern, classes), fn) for name, pattern, fn in rules]
+
+
+# -----------------------------------------------------------------------------
+# Grammar: Chinese
+#
+
+ZH_DIGITS = {
+    "零": 0,
+    "〇": 0,
+    "一": 1,
+    "二": 2,
+    "两": 2,
+    "三": 3,
+    "四": 4,
+    "五": 5,
+    "六": 6,
+    "七": 7,
+    "八": 8,
+    "九": 9,
+}
+ZH_UNITS = {
+    "十": 10,
+    "百": 100,
+    "千": 1_000,
+}
+ZH_SCALES = {
+    "万": 10_000,
+    "亿": 100_000_000,
+}
+# Written after an amount (kept as they're written in Chinese).
+ZH_CURRENCIES = ("块钱", "块", "元", "美元", "美金", "欧元", "英镑", "日元", "港元", "港币")
+ZH_MEASURES = (
+    "公里",
+    "千米",
+    "米",
+    "厘米",
+    "毫米",
+    "平方米",
+    "公斤",
+    "千克",
+    "克",
+    "斤",
+    "吨",
+    "升",
+    "毫升",
+    "摄氏度",
+    "岁",
+    "分钟",
+    "小时",
+    "秒钟",
+    "秒",
+    "个月",
+)
+ZH_PERIODS = ("上午", "下午", "早上", "晚上", "中午", "凌晨", "傍晚")
+
+
+def zh_cardinal_or_none(text: str) -> Optional[int]:
+    """
+    Return the value of a Chinese (or written) number, None when the characters aren't a valid number.
+    """
+    text = text.replace(" ", "")
+    if text.isdigit():
+        return int(text)
+    total = section = digit = 0
+    # The unit of the previous character, units must decrease within each section.
+    unit_prev = 0
+    scale_prev = 0
+    # The previous character (zero when it's a digit).
+    ch_value_prev = 0
+    # The unit or scale before the last digit, without a zero between them.
+    digit_unit = 0
+    for ch in text:
+        value = ZH_DIGITS.get(ch)
+        if value is not None:
+            # A zero only separates digits from a higher unit ("一百零五").
+            if ch_value_prev == 0 and digit != 0:
+                return None
+            digit = value
+            digit_unit = ch_value_prev
+            ch_value_prev = 0
+            continue
+        value = ZH_UNITS.get(ch)
+        if value is not None:
+            if digit == 0:
+                # "十五" (without a leading digit).
+                if value != 10 or section != 0 or total != 0:
+                    return None
+                digit = 1
+            if unit_prev and value >= unit_prev:
+                return None
+            section += digit * value
+            digit = 0
+            unit_prev = ch_value_prev = value
+            continue
+        value = ZH_SCALES[ch]
+        section += digit
+        if section == 0 or (scale_prev and value >= scale_prev):
+            return None
+        total += section * value
+        section = digit = unit_prev = 0
+        scale_prev = ch_value_prev = value
+    # A trailing digit is of the next lower unit, "三百五" is 350 & "两万五" is 25,000.
+    if digit and digit_unit > 10:
+        digit *= digit_unit // 10
+    return total + section + digit
+
+
+def zh_number_or_none(text: str) -> Optional[str]:
+    """
+    Return a number written with digits (read digit by digit when there are no units, e.g. "二零二六").
+    """
+    text = text.replace(" ", "")
+    if text.isdigit():
+        return text
+    if all(ch in ZH_DIGITS for ch in text):
+        if len(text) == 1:
+            return str(ZH_DIGITS[text])
+        if "两" in text:
+            return None
+        return "".join(str(ZH_DIGITS[ch]) for ch in text)
+    value = zh_cardinal_or_none(text)
+    return None if value is None else "{:d}".format(value)
+
+
+def zh_decimal_or_none(groups: Dict[str, str], name: str) -> Optional[str]:
+    text = groups[name]
+    # "一" alone is common in words ("一块儿", "一米阳光"), so it's kept.
+    if text == "一" and not groups[name + "_fraction"]:
+        return None
+    value = zh_cardinal_or_none(text)
+    if value is None:
+        return None
+    fraction = groups[name + "_fraction"].replace(" ", "")
+    if not fraction:
+        return "{:d}".format(value)
+    return "{:d}.{:s}".format(value, "".join(str(ZH_DIGITS[ch]) for ch in fraction))
+
+
+def zh_percent(groups: Dict[str, str]) -> Optional[str]:
+    value = zh_cardinal_or_none(groups["amount"])
+    if value is None:
+        return None
+    fraction = groups["amount_fraction"].replace(" ", "")
+    if fraction:
+        return "{:d}.{:s}%".format(value, "".join(str(ZH_DIGITS[ch]) for ch in fraction))
+    return "{:d}%".format(value)
+
+
+def zh_year(groups: Dict[str, str]) -> Optional[str]:
+    year = zh_number_or_none(groups["year"])
+    return None if year is None else year + "年"
+
+
+def zh_date(groups: Dict[str, str]) -> Optional[str]:
+    month = zh_cardinal_or_none(groups["month"])
+    day = zh_cardinal_or_none(groups["day"])
+    if month is None or day is None or not (1 <= month <= 12 and 1 <= day <= 31):
+        return None
+    return "{:d}月{:d}{:s}".format(month, day, groups["suffix"])
+
+
+def zh_time(groups: Dict[str, str]) -> Optional[str]:
+    hour = zh_cardinal_or_none(groups["hour"])
+    if hour is None or not 0 <= hour <= 24:
+        return None
+    if groups["half"]:
+        minute = 30
+    elif groups["quarter"]:
+        minute = 15 if groups["quarter"].startswith("一") else 45
+    elif groups["minute"]:
+        minute_or_none = zh_cardinal_or_none(groups["minute"])
+        if minute_or_none is None or not 0 <= minute_or_none <= 59:
+            return None
+        minute = minute_or_none
+    else:
+        minute = 0
+    return "{:s}{:d}:{:02d}".format(groups["period"], hour, minute)
+
+
+def zh_hour(groups: Dict[str, str]) -> Optional[str]:
+    hour = zh_cardinal_or_none(groups["hour"])
+    if hour is None or not 0 <= hour <= 24:
+        return None
+    return "{:s}{:d}点".format(groups["period"], hour)
+
+
+def zh_decimal(groups: Dict[str, str]) -> Optional[str]:
+    return zh_decimal_or_none(groups, "amount")
+
+
+def zh_amount(groups: Dict[str, str]) -> Optional[str]:
+    amount = zh_decimal_or_none(groups, "amount")
+    return None if amount is None else amount + groups["unit"]
+
+
+def zh_cardinal(groups: Dict[str, str]) -> Optional[str]:
+    text = groups["amount"].replace(" ", "")
+    # Words such as "一一" or "三三两两" aren't numbers, only longer sequences of digits are.
+    if all(ch in ZH_DIGITS for ch in text) and len(text) < 3:
+        return None
+    return zh_number_or_none(text)
+
+
+@grammar_register("zh")
+def grammar_zh() -> Grammar:
+    digit = "[{:s}]".format("".join(ZH_DIGITS))
+    number = "[{:s}]".format("".join(list(ZH_DIGITS) + list(ZH_UNITS) + list(ZH_SCALES)))
+    # Recognizers which segment words separate them with spaces.
+    classes = {
+        "num": r"\d+|{0:s}(?: ?{0:s})*".format(number),
+        "fraction": r"{0:s}(?: ?{0:s})*".format(digit),
+        "digits": r"\d{{4}}|{0:s}(?: ?{0:s}){{1,3}}".format(digit),
+        "period": words_pattern(list(ZH_PERIODS)),
+        "currency": words_pattern(list(ZH_CURRENCIES)),
+        "measure": words_pattern(list(ZH_MEASURES)),
+    }
+    # Amounts may have a fraction, e.g. "三点五", not followed by "点" ("一点一点").
+    amount = r"(?P<amount><<num>>)(?: ?点 ?(?P<amount_fraction><<fraction>>)(?! ?点))?"
+    rules: List[Rule] = [
+        ("percent", r"百分之 ?" + amount, zh_percent),
+        ("year", r"(?P<year><<digits>>) ?年", zh_year),
+        ("date", r"(?P<month><<num>>) ?月 ?(?P<day><<num>>) ?(?P<suffix>[日号])", zh_date),
+        (
+            "time",
+            r"(?:(?P<period><<period>>) ?)?(?P<hour><<num>>) ?点 ?"
+            r"(?:(?P<half>半)|(?P<quarter>[一三]刻)|(?P<whole>整)|(?P<minute><<num>>) ?分)",
+            zh_time,
+        ),
+        # "一点" alone means "a little", so the hour is only written with digits after the time of day.
+        ("hour", r"(?P<period><<period>>) ?(?P<hour><<num>>) ?点(?: ?钟)?", zh_hour),
+        ("money", amount + r" ?(?P<unit><<currency>>)", zh_amount),
+        ("measure", amount + r" ?(?P<unit><<measure>>)", zh_amount),
+        ("decimal", r"(?P<amount><<num>>) ?点 ?(?P<amount_fraction><<fraction>>)(?! ?点)", zh_decimal),
+        ("cardinal", r"(?P<amount>[{:s}十](?: ?<<num>>)+)".format("".join(ZH_DIGITS)), zh_cardinal),
+    ]
+    start = r"\d|{:s}|{:s}".format(number, classes["period"])
+    return start, [(name, pattern_expand(pattern, classes), fn) for name, pattern, fn in rules]
+
+
+# -----------------------------------------------------------------------------
+# Normalizer
+#
+
+WORD_LATIN_MATCH = re.compile(r"[A-Za-z0-9]+").match
+
+
+class InverseTextNormalizer:
+    """
+    Normalize text with the grammars of ``languages`` (applied in order), compiled into a single expression.
+    Raise ``ValueError`` for an unknown language.
+    """
+
+    __slots__ = (
+        "pattern",
+        "rules",
+    )
+
+    def __init__(self, languages: List[str]) -> None:
+        starts = []
+        patterns = []
+        # The function & named groups (the name in the pattern, the name in the rule) of each rule.
+        self.rules: Dict[str, Tuple[Callable[[Dict[str, str]], Optional[str]], List[Tuple[str, str]]]] = {}
+        for language in languages:
+            grammar = GRAMMARS.get(language)
+            if grammar is None:
+                raise ValueError("Unknown language {!r}, expected one of: {:s}".format(language, ", ".join(GRAMMARS)))
+            start, rules = grammar()
+            starts.append(start)
+            for name, pattern, fn in rules:
+                # Group names must be unique, so they're prefixed with the rule.
+                rule_name = "{:s}_{:s}_{:d}".format(language, name, len(self.rules))
+                group_names = re.findall(r"\(\?P<(\w+)>", pattern)
+                pattern = re.sub(r"\(\?P<(\w+)>", lambda m: "(?P<" + rule_name + "__" + m.group(1) + ">", pattern)
+                patterns.append("(?P<{:s}>{:s})".format(rule_name, pattern))
+                self.rules[rule_name] = (fn, [(rule_name + "__" + group, group) for group in group_names])
+        # Checking where rules may start first is much faster than trying every rule at each character.
+        self.pattern = (
+            re.compile("(?={:s})(?:{:s})".format("|".join(starts), "|".join(patterns)), re.IGNORECASE)
+            if patterns
+            else None
+        )
+
+    def _write(self, m: "re.Match[str]") -> Optional[str]:
+        # The outer group of the rule is the last group to close.
+        assert m.lastgroup is not None
+        fn, groups = self.rules[m.lastgroup]
+        return fn({group: m.group(group_full) or "" for group_full, group in groups})
+
+    def apply(self, text: str) -> str:
+        if self.pattern is None:
+            return text
+        search = self.pattern.search
+        m = search(text)
+        if m is None:
+            return text
+        result = []
+        pos = 0
+        while m is not None:
+            text_written = self._write(m)
+            if text_written is None:
+                # Search again from the next word, since a match which starts later may be valid,
+                # e.g. "twenty twenty and five dollars". Other text (Chinese numerals) is kept together,
+                # so idioms such as "一五一十" are unchanged.
+                word_end = WORD_LATIN_MATCH(text, m.start())
+                pos_next = word_end.end() if word_end is not None else m.end()
+                result.append(text[pos:pos_next])
+                pos = pos_next
+            else:
+                result.append(text[pos : m.start()])
+                result.append(text_written)
+                pos = m.end()
+            m = search(text, pos)
+        result.append(text[pos:])
+        return "".join(result)
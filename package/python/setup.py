@@ -20,12 +20,13 @@ def main(base_dir):
     CWD = os.getcwd()
 
     NERD_DICTATION_DST = os.path.join(base_dir, "nerd-dictation")
+    NERD_DICTATION_PKG_DST = os.path.join(base_dir, "nerd_dictation")
     README_DST = os.path.join(base_dir, "doc", "readme.rst")
     os.makedirs(os.path.join(base_dir, "doc"), exist_ok=True)
 
     # Path pairs to copy.
     COPY_PATH_PAIRS = (
-        # As this is a single, self contained script, this is all that's needed.
+        # The launcher script & the package it runs.
         (os.path.join(root_dir, "nerd-dictation"), NERD_DICTATION_DST),
         (os.path.join(root_dir, "readme.rst"), README_DST),
     )
@@ -33,9 +34,16 @@ def main(base_dir):
     if root_dir != base_dir:
         for src, dst in COPY_PATH_PAIRS:
             shutil.copy2(src, dst)
+        shutil.copytree(
+            os.path.join(root_dir, "nerd_dictation"),
+            NERD_DICTATION_PKG_DST,
+            dirs_exist_ok=True,
+            ignore=shutil.ignore_patterns("__pycache__"),
+        )
 
     # `setuptools` expects relative paths.
     NERD_DICTATION_DST = os.path.relpath(NERD_DICTATION_DST, CWD)
+    NERD_DICTATION_PKG_DST = os.path.relpath(NERD_DICTATION_PKG_DST, CWD)
     README_DST = os.path.relpath(README_DST, CWD)
 
     setuptools.setup(
@@ -56,9 +64,8 @@ def main(base_dir):
         ],
         scripts=[NERD_DICTATION_DST],
         data_files=[("nerd-dictation", [NERD_DICTATION_DST, README_DST])],
-        packages=[""],
-        package_data={"": [NERD_DICTATION_DST, README_DST]},
-        include_package_data=True,
+        packages=["nerd_dictation"],
+        package_dir={"nerd_dictation": NERD_DICTATION_PKG_DST},
         install_requires=["vosk"],
         python_requires=">=3.8",
     )
@@ -11,14 +11,18 @@ Usage:
     python scripts/clean_user_dict.py                    # dry run
     python scripts/clean_user_dict.py --min-freq 2       # only keep words used ≥2 times
     python scripts/clean_user_dict.py --apply             # actually write cleaned dict
+  python scripts/clean_user_dict.py --jobs 4 --timing   # check in 4 processes, report timing
 """
 
 import argparse
+import itertools
+import multiprocessing
 import os
 import subprocess
 import sys
 import tempfile
-from collections import Counter
+import time
+from collections import Counter, deque
 
 from pypinyin import pinyin, pinyin_dict, Style
 
@@ -30,43 +34,34 @@ FCITX5_HISTORY = os.path.expanduser(
 )
 
 
-def dump_dict(dict_path):
-    """Dump binary dict to text, return list of (word, pinyin, freq_str) tuples."""
-    with tempfile.NamedTemporaryFile(mode="w", suffix=".txt", delete=False) as f:
-        tmp = f.name
+def _stream_lines(cmd):
+    """Run a ``libime_*`` tool writing its text output to ``/dev/stdout``, yield lines as they are read."""
+    proc = subprocess.Popen(
+        cmd + ["/dev/stdout"],
+        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, encoding="utf-8",
+    )
     try:
-        subprocess.run(
-            ["libime_pinyindict", "-d", dict_path, tmp],
-            check=True, capture_output=True,
-        )
-        entries = []
-        with open(tmp, encoding="utf-8") as f:
-            for line in f:
-                parts = line.strip().split()
-                if len(parts) >= 2:
-                    entries.append((parts[0], parts[1], parts[2] if len(parts) > 2 else "0"))
-        return entries
+        yield from proc.stdout
     finally:
-        os.unlink(tmp)
+        proc.stdout.close()
+        if proc.wait() != 0:
+            raise subprocess.CalledProcessError(proc.returncode, cmd)
+
+
+def dump_dict(dict_path):
+    """Dump binary dict to text, yield (word, pinyin, freq_str) tuples."""
+    for line in _stream_lines(["libime_pinyindict", "-d", dict_path]):
+        parts = line.strip().split()
+        if len(parts) >= 2:
+            yield (parts[0], parts[1], parts[2] if len(parts) > 2 else "0")
 
 
 def dump_history(history_path):
     """Dump binary history to text, return word frequency counter."""
-    with tempfile.NamedTemporaryFile(mode="w", suffix=".txt", delete=False) as f:
-        tmp = f.name
-    try:
-        subprocess.run(
-            ["libime_history", history_path, tmp],
-            check=True, capture_output=True,
-        )
-        counter = Counter()
-        with open(tmp, encoding="utf-8") as f:
-            for line in f:
-                for token in line.strip().split():
-                    counter[token] += 1
-        return counter
-    finally:
-        os.unlink(tmp)
+    counter = Counter()
+    for line in _stream_lines(["libime_history", history_path]):
+        counter.update(line.split())
+    return counter
 
 
 _TONE_MAP = str.maketrans(
@@ -151,6 +146,108 @@ def check_pinyin(word, recorded_pinyin):
     return True, standard
 
 
+def _fuzzy_variants(syllable):
+    """Return the set of syllables ``s`` where ``_fuzzy_eq(syllable, s)`` (or equal)."""
+    variants = {syllable}
+    for x, y in _FUZZY_INITIALS:
+        for a, b in ((x, y), (y, x)):
+            if syllable.startswith(a):
+                variants.add(b + syllable[len(a):])
+    for x, y in _FUZZY_FINALS:
+        for a, b in ((x, y), (y, x)):
+            if syllable.endswith(a):
+                variants.add(syllable[:-len(a)] + b)
+    return frozenset(variants)
+
+
+def _build_syllable_table():
+    """Map each character to the recorded syllables accepted for it.
+
+    Polyphonic characters map to None (any syllable is accepted, as with ``check_pinyin``),
+    others to their fuzzy variants, so checking an entry only needs table lookups.
+    """
+    table = {}
+    variants_cache = {}
+    for cp, py_str in pinyin_dict.pinyin_dict.items():
+        bases = {_strip_tone(r) for r in py_str.split(",")}
+        if len(bases) > 1:
+            table[chr(cp)] = None
+            continue
+        # Match ``Style.NORMAL`` which writes "ü" as "v".
+        syllable = bases.pop().replace("ü", "v")
+        variants = variants_cache.get(syllable)
+        if variants is None:
+            variants = variants_cache[syllable] = _fuzzy_variants(syllable)
+        table[chr(cp)] = variants
+    return table
+
+
+_SYLLABLE_TABLE = None
+
+
+def _get_syllable_table():
+    global _SYLLABLE_TABLE
+    if _SYLLABLE_TABLE is None:
+        _SYLLABLE_TABLE = _build_syllable_table()
+    return _SYLLABLE_TABLE
+
+
+def check_pinyin_fast(word, recorded_pinyin):
+    """Same result as ``check_pinyin`` using table lookups.
+
+    Falls back to ``check_pinyin`` for characters not in the table and for mismatches
+    (so the standard pinyin is only calculated when it's reported), for matches the standard pinyin is None.
+
+    Returns (match: bool, standard_pinyin: str | None).
+    """
+    table = _get_syllable_table()
+
+    rec_parts = recorded_pinyin.split("'")
+    if len(rec_parts) == len(word):
+        for char, rec_py in zip(word, rec_parts):
+            accepted = table.get(char, False)
+            if accepted is None:
+                continue
+            if accepted is False or rec_py not in accepted:
+                break
+        else:
+            return True, None
+    return check_pinyin(word, recorded_pinyin)
+
+
+def _check_chunk(chunk):
+    return [check_pinyin_fast(word, py) for word, py, _f in chunk]
+
+
+def _chunked(iterable, size):
+    it = iter(iterable)
+    while chunk := list(itertools.islice(it, size)):
+        yield chunk
+
+
+def check_entries(entries, jobs=1, chunk_size=2000):
+    """Yield ((word, pinyin, freq_str), (match, standard_pinyin)) for each entry, in order.
+
+    With ``jobs > 1`` chunks of entries are checked in a process pool as they're streamed in,
+    limiting the number of chunks in-flight so the entries are never all held in memory.
+    """
+    if jobs <= 1:
+        for entry in entries:
+            yield entry, check_pinyin_fast(entry[0], entry[1])
+        return
+
+    with multiprocessing.Pool(jobs) as pool:
+        in_flight = deque()
+        for chunk in _chunked(entries, chunk_size):
+            in_flight.append((chunk, pool.apply_async(_check_chunk, (chunk,))))
+            if len(in_flight) > jobs * 2:
+                chunk, result = in_flight.popleft()
+                yield from zip(chunk, result.get())
+        while in_flight:
+            chunk, result = in_flight.popleft()
+            yield from zip(chunk, result.get())
+
+
 def compile_dict(entries, output_path):
     """Compile text entries back to binary dict."""
     with tempfile.NamedTemporaryFile(mode="w", suffix=".txt", delete=False) as f:
@@ -187,24 +284,40 @@ def main():
         "--apply", action="store_true",
         help="Actually write the cleaned dict (default: dry run only)",
     )
+    parser.add_argument(
+        "--jobs", type=int, default=1,
+        help="Number of processes used to check pinyin (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--timing", action="store_true",
+        help="Report the time taken by each step",
+    )
     args = parser.parse_args()
 
-    print("Loading dict: {}".format(args.dict))
-    entries = dump_dict(args.dict)
-    print("  {} entries".format(len(entries)))
+    timing = []
+    time_start = time.perf_counter()
 
     print("Loading history: {}".format(args.history))
     freq = dump_history(args.history)
     print("  {} unique tokens".format(len(freq)))
+    timing.append(("Load history", time.perf_counter() - time_start))
 
+    # Build the table up-front (inherited by the processes when ``--jobs`` is used).
+    time_start = time.perf_counter()
+    _get_syllable_table()
+    timing.append(("Build syllable table", time.perf_counter() - time_start))
+
+    print("Loading dict: {}".format(args.dict))
+    time_start = time.perf_counter()
+    total = 0
     pinyin_bad = []
     never_used = []
     low_freq = []
     keep = []
 
-    for word, py, f in entries:
+    for (word, py, f), (py_ok, std_py) in check_entries(dump_dict(args.dict), jobs=args.jobs):
+        total += 1
         usage = freq[word]
-        py_ok, std_py = check_pinyin(word, py)
 
         if not py_ok:
             pinyin_bad.append((word, py, std_py, usage))
@@ -215,11 +328,14 @@ def main():
         else:
             keep.append((word, py, f))
 
+    print("  {} entries".format(total))
+    timing.append(("Load & check dict", time.perf_counter() - time_start))
+
     total_remove = len(pinyin_bad) + len(never_used) + len(low_freq)
     print("\n" + "=" * 60)
     print("SUMMARY")
     print("=" * 60)
-    print("  Total entries:      {}".format(len(entries)))
+    print("  Total entries:      {}".format(total))
     print("  Keep:               {}".format(len(keep)))
     print("  Remove:             {}".format(total_remove))
     print("    Pinyin mismatch:  {}".format(len(pinyin_bad)))
@@ -272,6 +388,17 @@ def main():
         print("This is a DRY RUN. Use --apply to write changes.")
         print("Tip: adjust --min-freq to be more aggressive.")
 
+    if args.timing:
+        print()
+        print("-" * 60)
+        print("TIMING (jobs={})".format(args.jobs))
+        print("-" * 60)
+        for name, seconds in timing:
+            print("  {:24s}  {:8.3f}s".format(name, seconds))
+        seconds = timing[-1][1]
+        if seconds > 0.0:
+            print("  {:24s}  {:8.0f}".format("Entries per second", total / seconds))
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+"""Measure the keystroke cost of progressive output, replaying recorded recognizer results.
+
+The partial & final results a recognizer emits for each test WAV are recorded once (a trace),
+then replayed through ``TextEmitter`` into a counting stand-in for the input tool.
+For each commit policy (``--stable-partials`` & ``--stable-time``) the characters typed, backspaces,
+emission calls & the estimated time to type them with each input tool are reported,
+so changes to the emission logic can be compared without re-running recognition.
+
+Run with:
+    python -m tests.benchmark_emission --models=sherpa-large
+    python -m tests.benchmark_emission --models=vosk-small --stable-partials=0,2,4 --stable-time=0,0.3 --continuous
+
+Notes:
+- Traces are cached per (model, audio hash) under ``$XDG_CACHE_HOME/nerd-dictation/emission-traces``,
+  use ``--record`` to record them again (after updating a model for example).
+- Replay uses the audio time as the clock, as if recognition ran in real-time.
+- The estimated times use the delays nerd-dictation passes to each tool (see ``TOOL_DELAYS``),
+  the time taken by the display server & the application receiving the text isn't included.
+"""
+
+import argparse
+import json
+import os
+import sys
+from unittest import mock
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from nerd_dictation import core as _mod  # noqa: E402
+from tests.param_sweep import MODELS, SAMPLE_RATE, load_clips, worker_create_recognizer  # noqa: E402
+
+SIMULATE_INPUT_CODE_COMMAND = _mod.SIMULATE_INPUT_CODE_COMMAND
+SimulateInputCostModel = _mod.SimulateInputCostModel
+TextEmitter = _mod.TextEmitter
+
+CACHE_DIR = os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"),
+    "nerd-dictation",
+    "emission-traces",
+)
+# Increment when a change invalidates recorded traces.
+TRACE_VERSION = 1
+# Audio is passed to the recognizer in blocks of this size, a result may be emitted after each block.
+CHUNK_SECONDS = 0.1
+
+# Input tool: (seconds for each command run, seconds for each character typed, seconds for each backspace).
+# Deleting runs a separate command (except for ``DOTOOL`` which keeps a single process running).
+TOOL_DELAYS = {
+    # The default ``--delay`` of 12ms for both ``type`` & ``key``.
+    "XDOTOOL": (0.01, 0.012, 0.012),
+    # ``type --next-delay 5``, ``key --key-delay 3`` (applied to both the press & release).
+    "YDOTOOL": (0.01, 0.005, 0.006),
+    # ``typedelay 12`` & ``keydelay 4``.
+    "DOTOOL": (0.0, 0.012, 0.004),
+    # ``-s 5`` between backspaces, text is typed without a delay.
+    "WTYPE": (0.01, 0.0, 0.005),
+}
+# Pasting (``YDOTOOL_CLIPBOARD``) doesn't depend on the length of the text.
+PASTE_SECONDS = SimulateInputCostModel().paste_seconds
+TOOLS = (*TOOL_DELAYS.keys(), "YDOTOOL_CLIPBOARD", "YDOTOOL_AUTO")
+
+
+# -----------------------------------------------------------------------------
+# Record
+#
+# A trace is a dict with the number of audio blocks (``"blocks"``) & the results (``"results"``),
+# a list of ``[block_index, is_partial, text]``, partial results are only stored when they change.
+
+
+def record_trace_vosk(model, samples):
+    import vosk
+
+    rec = vosk.KaldiRecognizer(model, SAMPLE_RATE)
+    raw_bytes = (samples * 32768).clip(-32768, 32767).astype(np.int16).tobytes()
+    chunk_size = int(CHUNK_SECONDS * SAMPLE_RATE) * 2
+    results = []
+    text_partial_prev = ""
+    block_index = 0
+    for block_index, i in enumerate(range(0, len(raw_bytes), chunk_size)):
+        if rec.AcceptWaveform(raw_bytes[i : i + chunk_size]):
+            text = json.loads(rec.Result())["text"]
+            if text:
+                results.append([block_index, False, text])
+            text_partial_prev = ""
+        else:
+            # In rare cases this can be unset.
+            text = json.loads(rec.PartialResult()).get("partial", "")
+            if text and text != text_partial_prev:
+                results.append([block_index, True, text])
+                text_partial_prev = text
+
+    text = json.loads(rec.FinalResult())["text"]
+    if text:
+        results.append([block_index, False, text])
+    return {"blocks": block_index + 1, "results": results}
+
+
+def record_trace_sherpa(recognizer, samples):
+    stream = recognizer.create_stream()
+    chunk_size = int(CHUNK_SECONDS * SAMPLE_RATE)
+    # Trailing silence so the last words are decoded.
+    samples = np.concatenate((samples, np.zeros(int(0.5 * SAMPLE_RATE), dtype=np.float32)))
+    results = []
+    text_partial_prev = ""
+    block_index = 0
+    for block_index, i in enumerate(range(0, len(samples), chunk_size)):
+        stream.accept_waveform(SAMPLE_RATE, samples[i : i + chunk_size])
+        while recognizer.is_ready(stream):
+            recognizer.decode_stream(stream)
+        is_endpoint = recognizer.is_endpoint(stream)
+        text = recognizer.get_result(stream).strip()
+        if text and (is_endpoint or text != text_partial_prev):
+            results.append([block_index, not is_endpoint, text])
+            text_partial_prev = text
+        if is_endpoint:
+            recognizer.reset(stream)
+            text_partial_prev = ""
+
+    text = recognizer.get_result(stream).strip()
+    if text:
+        results.append([block_index, False, text])
+    return {"blocks": block_index + 1, "results": results}
+
+
+def trace_path(model_name, audio_hash):
+    return os.path.join(CACHE_DIR, model_name, audio_hash + ".json")
+
+
+def trace_load(model_name, audio_hash):
+    path = trace_path(model_name, audio_hash)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as fh:
+        trace = json.load(fh)
+    if trace.get("version") != TRACE_VERSION:
+        return None
+    return trace
+
+
+def trace_store(model_name, audio_hash, trace):
+    path = trace_path(model_name, audio_hash)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    path_tmp = path + ".tmp{:d}".format(os.getpid())
+    with open(path_tmp, "w", encoding="utf-8") as fh:
+        json.dump({"version": TRACE_VERSION, **trace}, fh, ensure_ascii=False)
+    os.replace(path_tmp, path)
+
+
+def traces_for_model(model_name, clips, record):
+    """Return a trace for each clip, recording those which aren't cached (or all when ``record`` is true)."""
+    engine, model_dir = MODELS[model_name]
+    traces = [None if record else trace_load(model_name, audio_hash) for (_, _, _, audio_hash) in clips]
+    if None in traces:
+        # The defaults used by ``param_sweep``.
+        config = {
+            "engine": engine,
+            "model_dir": model_dir,
+            "hotwords_score": 0.0,
+            "threads": 2,
+            "rule1": 2.4,
+            "rule2": 1.2,
+        }
+        model = worker_create_recognizer(config)
+        record_fn = record_trace_vosk if engine == "vosk" else record_trace_sherpa
+        for i, (name, samples, _, audio_hash) in enumerate(clips):
+            if traces[i] is None:
+                print(f"  recording: {model_name} {name}")
+                traces[i] = record_fn(model, samples)
+                trace_store(model_name, audio_hash, traces[i])
+    return traces
+
+
+# -----------------------------------------------------------------------------
+# Replay
+#
+
+
+class EmissionCounter:
+    """Stands in for the input tool, storing each ``(delete_prev_chars, text)`` emission."""
+
+    __slots__ = ("emissions",)
+
+    def __init__(self):
+        self.emissions = []
+
+    def __call__(self, delete_prev_chars, text):
+        # Set-up, tear-down & commit don't type anything.
+        if delete_prev_chars == SIMULATE_INPUT_CODE_COMMAND:
+            return
+        self.emissions.append((delete_prev_chars, text))
+
+
+def replay_trace(trace, stable_partials, stable_time, continuous):
+    """
+    Pass the results of ``trace`` to a ``TextEmitter`` (as the progressive output of nerd-dictation does),
+    returning the emissions.
+    """
+    counter = EmissionCounter()
+    emitter = TextEmitter(counter, stable_partials, stable_time)
+    results_by_block = {}
+    for block_index, is_partial, text in trace["results"]:
+        results_by_block.setdefault(block_index, []).append((is_partial, text))
+
+    time_now = 0.0
+    text_list = []
+    with mock.patch.object(_mod.time, "monotonic", side_effect=lambda: time_now):
+        for block_index in range(trace["blocks"]):
+            time_now = (block_index + 1) * CHUNK_SECONDS
+            for is_partial, text in results_by_block.get(block_index, ()):
+                emitter.update(text if continuous else " ".join(text_list + [text]), is_partial)
+                if not is_partial:
+                    counter(SIMULATE_INPUT_CODE_COMMAND, "COMMIT")
+                    if continuous:
+                        emitter.reset()
+                    else:
+                        text_list.append(text)
+            emitter.poll()
+    return counter.emissions
+
+
+def emissions_seconds(tool, emissions):
+    """Estimate the time ``tool`` takes to output ``emissions``."""
+    cost_model = SimulateInputCostModel()
+    seconds = 0.0
+    for delete_prev_chars, text in emissions:
+        if tool in TOOL_DELAYS:
+            command_seconds, char_seconds, backspace_seconds = TOOL_DELAYS[tool]
+            seconds += command_seconds + len(text) * char_seconds
+        else:
+            command_seconds, char_seconds, backspace_seconds = TOOL_DELAYS["YDOTOOL"]
+            if tool == "YDOTOOL_CLIPBOARD" or cost_model.use_paste(text):
+                seconds += PASTE_SECONDS
+            elif text:
+                seconds += cost_model.TYPE_OVERHEAD + len(text) * cost_model.type_per_char
+        if delete_prev_chars:
+            seconds += command_seconds + delete_prev_chars * backspace_seconds
+    return seconds
+
+
+# -----------------------------------------------------------------------------
+# Report
+#
+
+
+def policy_label(stable_partials, stable_time):
+    if not (stable_partials or stable_time):
+        return "immediate"
+    parts = []
+    if stable_partials:
+        parts.append(f"partials={stable_partials:d}")
+    if stable_time:
+        parts.append(f"time={stable_time:g}")
+    return " ".join(parts)
+
+
+def print_report(model_name, policies, tools, rows):
+    label_width = max(len(policy_label(*policy)) for policy in policies)
+    tool_width = max(len(tool) for tool in tools)
+    header = f"{'policy':<{label_width}s}  {'calls':>6s}  {'typed':>6s}  {'bksp':>6s}  {'ratio':>5s}"
+    header += "".join(f"  {tool:>{tool_width}s}" for tool in tools)
+    print()
+    print(f"{model_name} (estimated seconds for each tool)")
+    print(header)
+    print("-" * len(header))
+    for policy, (calls, typed, deleted, seconds) in zip(policies, rows):
+        kept = typed - deleted
+        line = f"{policy_label(*policy):<{label_width}s}  {calls:>6d}  {typed:>6d}  {deleted:>6d}"
+        line += f"  {typed / kept if kept else 0.0:>5.2f}"
+        line += "".join(f"  {seconds[tool]:>{tool_width - 1}.2f}s" for tool in tools)
+        print(line)
+    print("-" * len(header))
+    print("ratio: characters typed for each character kept.")
+
+
+# -----------------------------------------------------------------------------
+# Main
+#
+
+
+def main():
+    def float_list(value):
+        return [float(v) for v in value.split(",")]
+
+    def int_list(value):
+        return [int(v) for v in value.split(",")]
+
+    def name_list(names):
+        def fn(value):
+            result = value.split(",")
+            for name in result:
+                if name not in names:
+                    raise argparse.ArgumentTypeError("{!r} is not one of: {:s}".format(name, ", ".join(names)))
+            return result
+
+        return fn
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", 1)[0])
+    parser.add_argument("--models", type=name_list(MODELS), default=list(MODELS.keys()), help="Comma separated.")
+    parser.add_argument("--stable-partials", type=int_list, default=[0, 2], help="Counts, e.g. 0,2,4.")
+    parser.add_argument("--stable-time", type=float_list, default=[0.0, 0.3], help="Seconds, e.g. 0,0.3.")
+    parser.add_argument("--continuous", action="store_true", help="Replay as ``--continuous`` output does.")
+    parser.add_argument("--tools", type=name_list(TOOLS), default=list(TOOLS), help="Comma separated.")
+    parser.add_argument("--record", action="store_true", help="Record all traces (the cache is still updated).")
+    args = parser.parse_args()
+
+    clips = load_clips()
+    if not clips:
+        print("[SKIP] no test WAVs found")
+        return
+
+    policies = [
+        (stable_partials, stable_time) for stable_partials in args.stable_partials for stable_time in args.stable_time
+    ]
+    for model_name in args.models:
+        if not os.path.isdir(MODELS[model_name][1]):
+            print(f"[SKIP] {model_name}: {MODELS[model_name][1]} not found")
+            continue
+        traces = traces_for_model(model_name, clips, args.record)
+        rows = []
+        for stable_partials, stable_time in policies:
+            calls = typed = deleted = 0
+            seconds = {tool: 0.0 for tool in args.tools}
+            for trace in traces:
+                emissions = replay_trace(trace, stable_partials, stable_time, args.continuous)
+                calls += len(emissions)
+                typed += sum(len(text) for _, text in emissions)
+                deleted += sum(delete_prev_chars for delete_prev_chars, _ in emissions)
+                for tool in args.tools:
+                    seconds[tool] += emissions_seconds(tool, emissions)
+            rows.append((calls, typed, deleted, seconds))
+        print_report(model_name, policies, args.tools, rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""Benchmark each registered engine (``--engine``) through the engine interface used by the main loop.
+
+Reports the time to load each model, decoder CPU time per second of audio
+and the latency of decoding each 100ms chunk (including the partial result).
+Models which aren't found are skipped.
+
+Run with:
+    python -m tests.benchmark_engines
+"""
+
+import json
+import os
+import sys
+import time
+import wave
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from nerd_dictation import core as _mod  # noqa: E402
+
+ENGINES = _mod.ENGINES
+PolyphaseResampler = _mod.PolyphaseResampler
+
+TESTS_DIR = os.path.dirname(__file__)
+MODELS_DIR = os.path.join(TESTS_DIR, "..", "..", "vosk-models")
+WAV_DIR = os.path.join(TESTS_DIR, "test_wavs")
+MANIFEST = json.load(open(os.path.join(WAV_DIR, "manifest.json")))
+
+# Models for each engine (engine name: [(label, model directory), ...]).
+ENGINE_MODELS = {
+    "vosk": [
+        ("vosk-small", os.path.join(MODELS_DIR, "vosk-model-small-cn-0.22")),
+        ("vosk-large", os.path.join(MODELS_DIR, "vosk-model-cn-0.22")),
+    ],
+    "sherpa": [
+        ("sherpa-small", os.path.join(MODELS_DIR, "sherpa-onnx-streaming-zipformer-small-bilingual-zh-en-2023-02-16")),
+        ("sherpa-large", os.path.join(MODELS_DIR, "sherpa-onnx-streaming-zipformer-bilingual-zh-en-2023-02-20")),
+    ],
+    # Offline models also need `silero_vad.onnx` in the model directory.
+    "sherpa-offline": [
+        ("sense-voice", os.path.join(MODELS_DIR, "sherpa-onnx-sense-voice-zh-en-ja-ko-yue-2024-07-17")),
+        ("paraformer", os.path.join(MODELS_DIR, "sherpa-onnx-paraformer-zh-small-2024-03-09")),
+    ],
+}
+CHUNK_SECONDS = 0.1
+
+
+def read_wav_samples(wav_path):
+    with wave.open(wav_path, "rb") as f:
+        raw = f.readframes(f.getnframes())
+        sample_rate = f.getframerate()
+    samples = np.frombuffer(raw, dtype=np.int16).astype(np.float32) / 32768.0
+    return samples, sample_rate
+
+
+def load_clips():
+    clips = []
+    for entry in MANIFEST:
+        wav_path = os.path.join(WAV_DIR, entry["wav"])
+        if os.path.exists(wav_path):
+            clips.append(read_wav_samples(wav_path))
+    return clips
+
+
+def chunks_for_engine(engine, clips):
+    """
+    Return the clips as chunks of the engine's sample type & rate.
+    """
+    result = []
+    for samples, sample_rate in clips:
+        if sample_rate != engine.sample_rate:
+            samples = PolyphaseResampler(sample_rate, engine.sample_rate).process(samples)
+        if engine.sample_dtype == "int16":
+            data = (samples * 32768.0).clip(-32768.0, 32767.0).astype(np.int16).tobytes()
+        else:
+            data = samples.astype(np.float32).tobytes()
+        chunk_size = int(engine.sample_rate * CHUNK_SECONDS) * engine.sample_width
+        result.append([data[i : i + chunk_size] for i in range(0, len(data), chunk_size)])
+    return result
+
+
+def bench_engine(name, label, model_dir, clips):
+    engine = ENGINES[name](model_dir, sample_rate=0, verbose=0, options={})
+    t0 = time.perf_counter()
+    engine.start(engine.load(model_dir))
+    load_seconds = time.perf_counter() - t0
+
+    clip_chunks = chunks_for_engine(engine, clips)
+    audio_seconds = sum(len(chunk) for chunks in clip_chunks for chunk in chunks) / (
+        engine.sample_rate * engine.sample_width
+    )
+    latencies = []
+    cpu_beg = time.process_time()
+    for chunks in clip_chunks:
+        for chunk in chunks:
+            t0 = time.perf_counter()
+            if engine.accept(chunk):
+                engine.final()
+            else:
+                engine.partial()
+            latencies.append(time.perf_counter() - t0)
+        engine.final()
+        engine.reset()
+    cpu_seconds = time.process_time() - cpu_beg
+    engine.close()
+
+    latencies.sort()
+    print(
+        f"{label:<14s}  {load_seconds:>8.2f}  {cpu_seconds / audio_seconds * 1000.0:>16.1f}  "
+        f"{latencies[len(latencies) // 2] * 1000.0:>8.2f}  {latencies[int(len(latencies) * 0.95)] * 1000.0:>8.2f}"
+    )
+
+
+def main():
+    clips = load_clips()
+    if not clips:
+        print(f"[SKIP] no clips found in {WAV_DIR}")
+        return
+    print(f"{'model':<14s}  {'load (s)':>8s}  {'CPU ms / audio s':>16s}  {'p50 (ms)':>8s}  {'p95 (ms)':>8s}")
+    print("-" * 62)
+    for name in ENGINES:
+        for label, model_dir in ENGINE_MODELS.get(name, []):
+            if not os.path.isdir(model_dir):
+                print(f"[SKIP] {label}: {model_dir} not found")
+                continue
+            bench_engine(name, label, model_dir, clips)
+
+
+if __name__ == "__main__":
+    main()
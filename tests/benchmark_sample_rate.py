@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""Benchmark decoder CPU time per second of audio, at the model's native rate vs 44.1kHz.
+
+Before capturing at the model's native rate, VOSK was fed 44.1kHz audio (the old ``--sample-rate`` default)
+which Kaldi resampled internally. This compares that against 16kHz audio,
+as well as the cost of resampling in-process with ``PolyphaseResampler``.
+
+Run with:
+    python -m tests.benchmark_sample_rate
+"""
+
+import json
+import os
+import sys
+import time
+import wave
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from nerd_dictation import core as _mod  # noqa: E402
+
+PolyphaseResampler = _mod.PolyphaseResampler
+
+TESTS_DIR = os.path.dirname(__file__)
+MODELS_DIR = os.path.join(TESTS_DIR, "..", "..", "vosk-models")
+WAV_DIR = os.path.join(TESTS_DIR, "test_wavs")
+MANIFEST = json.load(open(os.path.join(WAV_DIR, "manifest.json")))
+
+VOSK_MODELS = [
+    ("vosk-small", os.path.join(MODELS_DIR, "vosk-model-small-cn-0.22")),
+    ("vosk-large", os.path.join(MODELS_DIR, "vosk-model-cn-0.22")),
+]
+SHERPA_MODELS = [
+    ("sherpa-small", os.path.join(MODELS_DIR, "sherpa-onnx-streaming-zipformer-small-bilingual-zh-en-2023-02-16")),
+    ("sherpa-large", os.path.join(MODELS_DIR, "sherpa-onnx-streaming-zipformer-bilingual-zh-en-2023-02-20")),
+]
+CHUNK_SECONDS = 0.1
+
+
+def read_wav_samples(wav_path):
+    with wave.open(wav_path, "rb") as f:
+        raw = f.readframes(f.getnframes())
+        sample_rate = f.getframerate()
+    samples = np.frombuffer(raw, dtype=np.int16).astype(np.float32) / 32768.0
+    return samples, sample_rate
+
+
+def load_clips():
+    clips = []
+    for entry in MANIFEST:
+        wav_path = os.path.join(WAV_DIR, entry["wav"])
+        if os.path.exists(wav_path):
+            samples, sample_rate = read_wav_samples(wav_path)
+            if sample_rate != 16000:
+                samples = PolyphaseResampler(sample_rate, 16000).process(samples)
+            clips.append(samples)
+    return clips
+
+
+def cpu_per_audio_second(fn, clips, sample_rate):
+    audio_seconds = sum(len(samples) for samples in clips) / sample_rate
+    t0 = time.process_time()
+    for samples in clips:
+        fn(samples, sample_rate)
+    return (time.process_time() - t0) / audio_seconds
+
+
+def bench_resampler():
+    samples = np.random.default_rng(0).standard_normal(48000 * 10).astype(np.float32) * 0.1
+    print(f"{'resampler':<28s}  {'CPU ms / audio s':>16s}")
+    print("-" * 48)
+    for rate_in in (44100, 48000):
+        src = samples[: rate_in * 10]
+        resampler = PolyphaseResampler(rate_in, 16000)
+        chunk = int(rate_in * CHUNK_SECONDS)
+        t0 = time.process_time()
+        for i in range(0, len(src), chunk):
+            resampler.process(src[i : i + chunk])
+        elapsed = time.process_time() - t0
+        print(f"{rate_in:>6d} -> 16000{'':<14s}  {elapsed / 10.0 * 1000.0:>16.2f}")
+    print()
+
+
+def bench_vosk(clips):
+    # lazy import: vosk is optional, sherpa-only users won't have it
+    import vosk
+
+    vosk.SetLogLevel(-1)
+
+    for model_name, model_path in VOSK_MODELS:
+        if not os.path.isdir(model_path):
+            print(f"[SKIP] {model_name}: {model_path} not found")
+            continue
+        model = vosk.Model(model_path)
+
+        def decode(samples, sample_rate):
+            rec = vosk.KaldiRecognizer(model, sample_rate)
+            raw = (samples * 32767.0).astype(np.int16).tobytes()
+            chunk = int(sample_rate * CHUNK_SECONDS) * 2
+            for i in range(0, len(raw), chunk):
+                rec.AcceptWaveform(raw[i : i + chunk])
+            rec.FinalResult()
+
+        report(model_name, decode, clips)
+
+
+def bench_sherpa(clips):
+    from tests.test_sherpa_recognition import create_recognizer
+
+    for model_name, model_path in SHERPA_MODELS:
+        if not os.path.isdir(model_path):
+            print(f"[SKIP] {model_name}: {model_path} not found")
+            continue
+        recognizer = create_recognizer(model_path)
+
+        def decode(samples, sample_rate):
+            stream = recognizer.create_stream()
+            chunk = int(sample_rate * CHUNK_SECONDS)
+            for i in range(0, len(samples), chunk):
+                stream.accept_waveform(sample_rate, samples[i : i + chunk])
+                while recognizer.is_ready(stream):
+                    recognizer.decode_stream(stream)
+
+        report(model_name, decode, clips)
+
+
+def report(model_name, decode, clips):
+    clips_44k = [PolyphaseResampler(16000, 44100).process(samples) for samples in clips]
+    native = cpu_per_audio_second(decode, clips, 16000)
+    upsampled = cpu_per_audio_second(decode, clips_44k, 44100)
+    print(
+        f"{model_name:<16s}  44.1kHz: {upsampled * 1000.0:>7.1f}ms  16kHz: {native * 1000.0:>7.1f}ms  "
+        f"(CPU per audio second, {upsampled / native:.2f}x)"
+    )
+
+
+def main():
+    bench_resampler()
+    clips = load_clips()
+    if not clips:
+        print(f"[SKIP] no test wavs found in {WAV_DIR}")
+        return
+    try:
+        bench_vosk(clips)
+    except ImportError:
+        print("[SKIP] vosk not installed")
+    try:
+        bench_sherpa(clips)
+    except ImportError:
+        print("[SKIP] sherpa_onnx not installed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""Benchmark the start-up time of each sub-command.
+
+Control sub-commands (``end``, ``cancel``, ``suspend``, ``resume`` & ``status``) are typically bound to hot-keys,
+so they should respond quickly (as should ``prefetch``, run on login),
+``begin`` is measured with ``--help`` (building the full command line parser).
+A stand-in process (ignoring the signals) is used as the dictation process.
+
+Run with:
+    python -m tests.benchmark_startup
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+TESTS_DIR = os.path.dirname(__file__)
+SCRIPT_PATH = os.path.normpath(os.path.join(TESTS_DIR, "..", "nerd-dictation"))
+REPEAT = 20
+
+# Ignores `SIGUSR1` (suspend), `SIGCONT` (resume) is harmless.
+STAND_IN_PROCESS = "import signal, time; signal.signal(signal.SIGUSR1, signal.SIG_IGN); time.sleep(600)"
+
+
+def time_command(args):
+    times = []
+    for _ in range(REPEAT):
+        time_start = time.perf_counter()
+        subprocess.run(args, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False)
+        times.append(time.perf_counter() - time_start)
+    return statistics.median(times), min(times)
+
+
+def main():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cookie = os.path.join(temp_dir, "nerd-dictation.cookie")
+        proc = subprocess.Popen([sys.executable, "-c", STAND_IN_PROCESS])
+        try:
+            with open(cookie, "w", encoding="utf-8") as fh:
+                fh.write(str(proc.pid))
+
+            commands = [
+                ("python (no script)", [sys.executable, "-c", "pass"]),
+                ("begin --help", [sys.executable, SCRIPT_PATH, "begin", "--help"]),
+            ]
+            for sub_command in ("suspend", "resume", "status", "end"):
+                commands.append((sub_command, [sys.executable, SCRIPT_PATH, sub_command, "--cookie", cookie]))
+            # Cancel removes the cookie, use a separate one.
+            commands.append(("cancel", [sys.executable, SCRIPT_PATH, "cancel", "--cookie", cookie + ".cancel"]))
+            # Prefetch is typically run on login (the directory stands in for a model).
+            commands.append(("prefetch", [sys.executable, SCRIPT_PATH, "prefetch", "--vosk-model-dir", TESTS_DIR]))
+
+            print(f"{'command':<20s}  {'median':>9s}  {'min':>9s}")
+            print("-" * 42)
+            for name, args in commands:
+                median, minimum = time_command(args)
+                print(f"{name:<20s}  {median * 1000.0:>7.1f}ms  {minimum * 1000.0:>7.1f}ms")
+        finally:
+            proc.kill()
+            proc.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""Benchmark inverse text normalization (``--itn``), which runs on every partial result.
+
+Each transcript (from the test WAV manifest & sentences with times, dates, money .. etc)
+is normalized as the partial results a recognizer would emit (each a little longer than the last),
+reporting the time to compile the grammars & the time for each partial result.
+
+Run with:
+    python -m tests.benchmark_text_normalization
+"""
+
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from nerd_dictation import text_normalization as _itn  # noqa: E402
+
+InverseTextNormalizer = _itn.InverseTextNormalizer
+
+TESTS_DIR = os.path.dirname(__file__)
+MANIFEST = json.load(open(os.path.join(TESTS_DIR, "test_wavs", "manifest.json")))
+
+SENTENCES = [
+    "so we meet on january first twenty twenty six at three thirty pm",
+    "it costs five dollars and twenty cents which is fifty percent more than two point five gigabytes",
+    "我们下午三点半在会议室见面",
+    "二零二六年三月五号花了两块钱买了五公里的票百分之五十的人同意",
+]
+LANGUAGES = (["en"], ["zh"], ["en", "zh"])
+REPEAT = 20
+
+
+def partials_from_text(text):
+    # Words for text with spaces, otherwise characters.
+    if " " in text:
+        words = text.split()
+        return [" ".join(words[: i + 1]) for i in range(len(words))]
+    return [text[: i + 1] for i in range(len(text))]
+
+
+def main():
+    partials = [
+        partial for text in [entry["text"] for entry in MANIFEST] + SENTENCES for partial in partials_from_text(text)
+    ]
+    print(f"{len(partials)} partial results")
+    print(f"{'languages':<10s}  {'compile (ms)':>12s}  {'mean (us)':>9s}  {'p95 (us)':>9s}  {'max (us)':>9s}")
+    print("-" * 58)
+    for languages in LANGUAGES:
+        t0 = time.perf_counter()
+        normalizer = InverseTextNormalizer(languages)
+        compile_seconds = time.perf_counter() - t0
+
+        times = []
+        for _ in range(REPEAT):
+            for text in partials:
+                t0 = time.perf_counter()
+                normalizer.apply(text)
+                times.append(time.perf_counter() - t0)
+        times.sort()
+        print(
+            f"{','.join(languages):<10s}  {compile_seconds * 1000.0:>12.2f}  {sum(times) / len(times) * 1e6:>9.1f}  "
+            f"{times[int(len(times) * 0.95)] * 1e6:>9.1f}  {times[-1] * 1e6:>9.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -6,56 +6,15 @@ Test number to digit conversion.
 """
 
 # TIP: to run tests on file change (on Linux).
-# bash -c 'while true; do inotifywait -e close_write nerd-dictation tests/from_words_to_digits.py ; tests/from_words_to_digits.py ; done'
+# bash -c 'while true; do inotifywait -e close_write nerd_dictation/number_parsing.py tests/from_words_to_digits.py ; tests/from_words_to_digits.py ; done'
 
 import os
 import sys
 
-from types import (
-    ModuleType,
-)
-
 
 # -----------------------------------------------------------------------------
 # General Utilities
 #
-def execfile_as_module(mod_name: str, filepath: str) -> ModuleType:
-    """
-    Execute a file path as a Python script.
-
-    :arg mod_name: The name to use for the module.
-    :type mod_name: string
-    :arg filepath: Path of the script to execute.
-    :type filepath: string
-    :return: The module which can be passed back in as ``mod``.
-    :rtype: ModuleType
-    """
-    import importlib.util
-    import importlib.machinery
-
-    loader = importlib.machinery.SourceFileLoader(mod_name, filepath)
-    mod = loader.load_module()
-
-    # While the module name is not added to `sys.modules`, it's important to temporarily
-    # include this so statements such as `sys.modules[cls.__module__].__dict__` behave as expected.
-    # See: https://bugs.python.org/issue9499 for details.
-    modules = sys.modules
-
-    mod_orig = modules.get(mod_name, None)
-    modules[mod_name] = mod
-
-    # No error suppression, just ensure `sys.modules[mod_name]` is properly restored in the case of an error.
-    try:
-        loader.exec_module(mod)
-    finally:
-        if mod_orig is None:
-            modules.pop(mod_name, None)
-        else:
-            modules[mod_name] = mod_orig
-
-    return mod
-
-
 def name_of_caller(frame_number: int = 1) -> str:
     """
     Return "class_name.function_name" of the caller or just "function_name".
@@ -86,7 +45,7 @@ import unittest
 class NumberMixIn:
     def assertNumberFromTextEqual(self, words_input: str, expected_output: str) -> None:
         words = words_input.split()
-        nerd_dictation.from_words_to_digits.parse_numbers_in_word_list(
+        number_parsing.from_words_to_digits.parse_numbers_in_word_list(
             words,
             numbers_use_separator=True,
         )
@@ -229,9 +188,7 @@ class TestNumberWholeAutoDelimit(unittest.TestCase, NumberMixIn):
 
 
 if __name__ == "__main__":
-    nerd_dictation = execfile_as_module(
-        "nerd_dictation",
-        os.path.join(os.path.abspath(os.path.dirname(__file__)), "..", "nerd-dictation"),
-    )
+    sys.path.insert(0, os.path.join(os.path.abspath(os.path.dirname(__file__)), ".."))
+    from nerd_dictation import number_parsing
 
     unittest.main(verbosity=not VERBOSE)
@@ -0,0 +1,394 @@
+#!/usr/bin/env python3
+"""Sweep recognition parameters, reporting the accuracy (CER) / speed (RTF) trade-off.
+
+Grid points (engine/model, noise reduction level, hotwords score, endpoint rules & thread count)
+run across a process pool with the test WAVs held in memory.
+Results are stored in a content-addressed cache keyed on (audio hash, config),
+so re-running only computes new points.
+
+Run with:
+    python -m tests.param_sweep --models=sherpa-small,sherpa-large --noise-reduction=0,1 --threads=1,2
+
+Notes:
+- RTF is the decoding time divided by the audio duration (lower is faster),
+  running many jobs with many threads each will inflate it, use ``--jobs`` to avoid over-subscribing the CPU.
+- Hotwords, endpoint rules & thread count only apply to sherpa, vosk grid points ignore them.
+"""
+
+import argparse
+import concurrent.futures
+import hashlib
+import json
+import os
+import sys
+import time
+import wave
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from nerd_dictation import core as _mod  # noqa: E402
+
+denoise_audio = _mod.denoise_audio
+PolyphaseResampler = _mod.PolyphaseResampler
+
+TESTS_DIR = os.path.dirname(__file__)
+MODELS_DIR = os.path.join(TESTS_DIR, "..", "..", "vosk-models")
+WAV_DIR = os.path.join(TESTS_DIR, "test_wavs")
+CACHE_DIR = os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"),
+    "nerd-dictation",
+    "param-sweep",
+)
+# Increment when a change invalidates cached results (recognition or scoring).
+CACHE_VERSION = 1
+SAMPLE_RATE = 16000
+
+MODELS = {
+    "vosk-small": ("vosk", os.path.join(MODELS_DIR, "vosk-model-small-cn-0.22")),
+    "vosk-large": ("vosk", os.path.join(MODELS_DIR, "vosk-model-cn-0.22")),
+    "sherpa-small": (
+        "sherpa",
+        os.path.join(MODELS_DIR, "sherpa-onnx-streaming-zipformer-small-bilingual-zh-en-2023-02-16"),
+    ),
+    "sherpa-large": (
+        "sherpa",
+        os.path.join(MODELS_DIR, "sherpa-onnx-streaming-zipformer-bilingual-zh-en-2023-02-20"),
+    ),
+}
+
+
+def cer(result, truth):
+    # lazy import: only needed for scoring, so other benchmarks can share this module without it
+    import jiwer
+
+    return jiwer.cer(
+        truth.replace(" ", "").lower().strip(),
+        result.replace(" ", "").lower().strip(),
+    )
+
+
+def read_wav_samples(wav_path):
+    with wave.open(wav_path, "rb") as f:
+        raw = f.readframes(f.getnframes())
+        sample_rate = f.getframerate()
+        num_channels = f.getnchannels()
+    samples = np.frombuffer(raw, dtype=np.int16).astype(np.float32) / 32768.0
+    if num_channels > 1:
+        samples = samples[::num_channels]
+    if sample_rate != SAMPLE_RATE:
+        samples = PolyphaseResampler(sample_rate, SAMPLE_RATE).process(samples)
+    return samples
+
+
+def load_clips():
+    """Return a list of ``(name, samples, truth, audio_hash)``."""
+    with open(os.path.join(WAV_DIR, "manifest.json"), encoding="utf-8") as fh:
+        manifest = json.load(fh)
+    clips = []
+    for entry in manifest:
+        wav_path = os.path.join(WAV_DIR, entry["wav"])
+        if not os.path.exists(wav_path):
+            print(f"[SKIP] {entry['wav']}")
+            continue
+        samples = read_wav_samples(wav_path)
+        audio_hash = hashlib.sha256(samples.tobytes()).hexdigest()
+        clips.append((entry["wav"], samples, entry["text"], audio_hash))
+    return clips
+
+
+# -----------------------------------------------------------------------------
+# Grid & Cache
+#
+
+
+def grid_configs(args):
+    """
+    Expand the command line into a list of unique configs (dicts).
+    Parameters which don't apply to an engine are left out, so they don't multiply its grid points.
+    """
+    hotwords_hash = ""
+    if args.hotwords_file:
+        with open(args.hotwords_file, "rb") as fh:
+            hotwords_hash = hashlib.sha256(fh.read()).hexdigest()
+
+    configs = []
+    seen = set()
+    for model_name in args.models:
+        engine, model_dir = MODELS[model_name]
+        for noise_reduction in args.noise_reduction:
+            if engine == "vosk":
+                variants = [{}]
+            else:
+                variants = [
+                    {
+                        "hotwords_score": hotwords_score if hotwords_hash else None,
+                        "rule1": rule1,
+                        "rule2": rule2,
+                        "threads": threads,
+                    }
+                    for hotwords_score in args.hotwords_score
+                    for rule1 in args.rule1
+                    for rule2 in args.rule2
+                    for threads in args.threads
+                ]
+            for variant in variants:
+                config = {
+                    "model": model_name,
+                    "engine": engine,
+                    "noise_reduction": noise_reduction,
+                    **variant,
+                }
+                if engine == "sherpa" and hotwords_hash:
+                    config["hotwords_file"] = args.hotwords_file
+                    config["hotwords_hash"] = hotwords_hash
+                key = json.dumps(config, sort_keys=True)
+                if key not in seen:
+                    seen.add(key)
+                    config["model_dir"] = model_dir
+                    configs.append(config)
+    return configs
+
+
+def cache_key(config, audio_hash):
+    # The model directory is excluded, so moving the models doesn't invalidate the cache.
+    data = {key: value for key, value in config.items() if key not in {"model_dir", "hotwords_file"}}
+    data["audio"] = audio_hash
+    data["version"] = CACHE_VERSION
+    return hashlib.sha256(json.dumps(data, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def cache_path(key):
+    return os.path.join(CACHE_DIR, key[:2], key + ".json")
+
+
+def cache_load(key):
+    path = cache_path(key)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def cache_store(key, result):
+    path = cache_path(key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    path_tmp = path + ".tmp{:d}".format(os.getpid())
+    with open(path_tmp, "w", encoding="utf-8") as fh:
+        json.dump(result, fh, ensure_ascii=False)
+    os.replace(path_tmp, path)
+
+
+# -----------------------------------------------------------------------------
+# Worker Process
+#
+# Clips are sent once per process (via the pool initializer), tasks only reference them by index.
+
+_worker_clips = []
+
+
+def worker_init(clips):
+    global _worker_clips
+    _worker_clips = clips
+
+
+def worker_create_recognizer(config):
+    if config["engine"] == "vosk":
+        # lazy import: vosk is optional, sherpa-only users won't have it
+        import vosk
+
+        vosk.SetLogLevel(-1)
+        return vosk.Model(config["model_dir"])
+
+    from tests.test_sherpa_recognition import create_recognizer
+
+    return create_recognizer(
+        config["model_dir"],
+        hotwords_file=config.get("hotwords_file", ""),
+        hotwords_score=config["hotwords_score"] or 1.5,
+        num_threads=config["threads"],
+        rule1_min_trailing_silence=config["rule1"],
+        rule2_min_trailing_silence=config["rule2"],
+    )
+
+
+def worker_recognize(config, model, samples):
+    if config["engine"] == "vosk":
+        import vosk
+
+        rec = vosk.KaldiRecognizer(model, SAMPLE_RATE)
+        raw_bytes = (samples * 32768).clip(-32768, 32767).astype(np.int16).tobytes()
+        chunk_size = int(0.1 * SAMPLE_RATE) * 2
+        for i in range(0, len(raw_bytes), chunk_size):
+            rec.AcceptWaveform(raw_bytes[i : i + chunk_size])
+        return json.loads(rec.FinalResult())["text"]
+
+    from tests.test_sherpa_recognition import recognize_samples
+
+    return recognize_samples(model, samples, SAMPLE_RATE, use_endpoints=True)
+
+
+def worker_run(config, clip_indices):
+    """Decode the clips for a single config, returning ``(clip_index, result)`` pairs."""
+    model = worker_create_recognizer(config)
+    results = []
+    for clip_index in clip_indices:
+        name, samples, truth, _audio_hash = _worker_clips[clip_index]
+        time_start = time.perf_counter()
+        if config["noise_reduction"]:
+            samples = np.frombuffer(
+                denoise_audio(samples.tobytes(), SAMPLE_RATE, config["noise_reduction"], dtype="float32"),
+                dtype=np.float32,
+            )
+        text = worker_recognize(config, model, samples)
+        elapsed = time.perf_counter() - time_start
+        results.append(
+            (
+                clip_index,
+                {
+                    "wav": name,
+                    "text": text,
+                    "cer": cer(text, truth),
+                    "seconds": elapsed,
+                    "audio_seconds": len(samples) / SAMPLE_RATE,
+                },
+            )
+        )
+    return results
+
+
+# -----------------------------------------------------------------------------
+# Report
+#
+
+
+def config_label(config):
+    label = "{:s} nr={:d}".format(config["model"], config["noise_reduction"])
+    if config["engine"] == "sherpa":
+        if config["hotwords_score"] is not None:
+            label += " hw={:g}".format(config["hotwords_score"])
+        label += " r1={:g} r2={:g} t={:d}".format(config["rule1"], config["rule2"], config["threads"])
+    return label
+
+
+def pareto_front(rows):
+    """Return the indices of rows where no other row has a lower or equal CER & RTF (and one strictly lower)."""
+    front = set()
+    for i, (_, cer_i, rtf_i) in enumerate(rows):
+        if not any(
+            (cer_j <= cer_i and rtf_j <= rtf_i) and (cer_j < cer_i or rtf_j < rtf_i)
+            for j, (_, cer_j, rtf_j) in enumerate(rows)
+            if j != i
+        ):
+            front.add(i)
+    return front
+
+
+def print_report(configs, results):
+    rows = []
+    for config_index, config in enumerate(configs):
+        clip_results = results[config_index]
+        errs = [r["cer"] for r in clip_results]
+        seconds = sum(r["seconds"] for r in clip_results)
+        audio_seconds = sum(r["audio_seconds"] for r in clip_results)
+        rows.append((config_label(config), sum(errs) / len(errs), seconds / audio_seconds))
+
+    front = pareto_front(rows)
+    width = max(len(row[0]) for row in rows)
+    print()
+    print(f"  {'config':<{width}s}  {'CER':>6s}  {'RTF':>6s}")
+    print("-" * (width + 20))
+    for i in sorted(range(len(rows)), key=lambda i: (rows[i][2], rows[i][1])):
+        label, err, rtf = rows[i]
+        print(f"{'*' if i in front else ' '} {label:<{width}s}  {err:>6.1%}  {rtf:>6.3f}")
+    print("-" * (width + 20))
+    print("* Pareto optimal (no other config is both more accurate & faster).")
+
+
+# -----------------------------------------------------------------------------
+# Main
+#
+
+
+def main():
+    def float_list(value):
+        return [float(v) for v in value.split(",")]
+
+    def int_list(value):
+        return [int(v) for v in value.split(",")]
+
+    def model_list(value):
+        models = value.split(",")
+        for model_name in models:
+            if model_name not in MODELS:
+                raise argparse.ArgumentTypeError(
+                    "{!r} is not one of: {:s}".format(model_name, ", ".join(MODELS.keys()))
+                )
+        return models
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", 1)[0])
+    parser.add_argument("--models", type=model_list, default=list(MODELS.keys()), help="Comma separated names.")
+    parser.add_argument("--noise-reduction", type=int_list, default=[0], help="Levels, e.g. 0,1,2.")
+    parser.add_argument("--hotwords-file", default="", help="Hotwords file (sherpa), enables --hotwords-score.")
+    parser.add_argument("--hotwords-score", type=float_list, default=[1.5], help="Scores, e.g. 1.0,1.5,2.0.")
+    parser.add_argument("--rule1", type=float_list, default=[2.4], help="Trailing silence (no speech), seconds.")
+    parser.add_argument("--rule2", type=float_list, default=[1.2], help="Trailing silence (after speech), seconds.")
+    parser.add_argument("--threads", type=int_list, default=[2], help="Decoder threads, e.g. 1,2,4.")
+    parser.add_argument("--jobs", type=int, default=max(1, (os.cpu_count() or 1) // 2), help="Worker processes.")
+    parser.add_argument("--no-cache", action="store_true", help="Recompute all points (the cache is still updated).")
+    args = parser.parse_args()
+
+    models_found = []
+    for model_name in args.models:
+        if os.path.isdir(MODELS[model_name][1]):
+            models_found.append(model_name)
+        else:
+            print(f"[SKIP] {model_name}: {MODELS[model_name][1]} not found")
+    args.models = models_found
+    if not args.models:
+        return
+
+    clips = load_clips()
+    if not clips:
+        print("[SKIP] no test WAVs found")
+        return
+
+    configs = grid_configs(args)
+    results = [[None] * len(clips) for _ in configs]
+    tasks = []
+    for config_index, config in enumerate(configs):
+        pending = []
+        for clip_index, (_, _, _, audio_hash) in enumerate(clips):
+            result = None if args.no_cache else cache_load(cache_key(config, audio_hash))
+            if result is None:
+                pending.append(clip_index)
+            else:
+                results[config_index][clip_index] = result
+        if pending:
+            tasks.append((config_index, pending))
+
+    print(f"{len(configs)} configs, {len(clips)} clips, {len(tasks)} configs to compute ({args.jobs} jobs).")
+    time_start = time.time()
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=args.jobs,
+        initializer=worker_init,
+        initargs=(clips,),
+    ) as executor:
+        futures = {
+            executor.submit(worker_run, configs[config_index], pending): config_index
+            for config_index, pending in tasks
+        }
+        for future in concurrent.futures.as_completed(futures):
+            config_index = futures[future]
+            config = configs[config_index]
+            for clip_index, result in future.result():
+                results[config_index][clip_index] = result
+                cache_store(cache_key(config, clips[clip_index][3]), result)
+            print(f"  done: {config_label(config)}")
+    print(f"Computed in {time.time() - time_start:.1f}s.")
+
+    print_report(configs, results)
+
+
+if __name__ == "__main__":
+    main()
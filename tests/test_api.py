@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# SPDX-License-Identifier: GPL-2.0-or-later
+
+"""
+Unit tests for the ``Dictation`` class (``nerd_dictation.api``), using stand-in recognizers.
+
+Run with:
+    python -m pytest tests/test_api.py -v
+"""
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import types
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from nerd_dictation import api as _mod  # noqa: E402
+
+Dictation = _mod.Dictation
+EVENT_PARTIAL = _mod.EVENT_PARTIAL
+EVENT_FINAL = _mod.EVENT_FINAL
+EVENT_ENDPOINT = _mod.EVENT_ENDPOINT
+
+# One second of audio at 16kHz.
+CHUNK = b"\0\0" * 16000
+
+
+class _KaldiRecognizer:
+    """Recognize a word for each chunk, reaching an end-point after every 3 chunks."""
+
+    def __init__(self, model, sample_rate, grammar=None):
+        self.words = []
+        self.count = 0
+
+    def AcceptWaveform(self, data):
+        self.count += 1
+        self.words.append("word{:d}".format(self.count))
+        return self.count % 3 == 0
+
+    def PartialResult(self):
+        return json.dumps({"partial": " ".join(self.words)})
+
+    def Result(self):
+        return self.FinalResult()
+
+    def FinalResult(self):
+        text = " ".join(self.words)
+        self.words = []
+        return json.dumps({"text": text})
+
+
+_vosk = types.SimpleNamespace(
+    SetLogLevel=lambda level: None, Model=lambda path: None, KaldiRecognizer=_KaldiRecognizer
+)
+
+
+class TestDictation(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        patch = mock.patch.dict(sys.modules, {"vosk": _vosk})
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def events(self, chunks):
+        with Dictation(self.temp_dir.name) as dictation:
+            return [(event.kind, event.text, event.segment) for event in dictation.events(chunks)]
+
+    def test_events(self):
+        self.assertEqual(
+            self.events([CHUNK] * 4),
+            [
+                (EVENT_PARTIAL, "word1", 0),
+                (EVENT_PARTIAL, "word1 word2", 0),
+                (EVENT_FINAL, "word1 word2 word3", 0),
+                (EVENT_ENDPOINT, "", 0),
+                (EVENT_PARTIAL, "word4", 1),
+                # The audio ended (without an end-point).
+                (EVENT_FINAL, "word4", 1),
+            ],
+        )
+
+    def test_timings(self):
+        with Dictation(self.temp_dir.name) as dictation:
+            events = list(dictation.events([CHUNK] * 4))
+        final_first, final_last = [event for event in events if event.kind == EVENT_FINAL]
+        self.assertEqual((final_first.audio_start, final_first.audio_end), (0.0, 3.0))
+        self.assertEqual((final_last.audio_start, final_last.audio_end), (3.0, 4.0))
+        self.assertTrue(all(event.decode_seconds >= 0.0 for event in events))
+
+    def test_no_audio(self):
+        self.assertEqual(self.events([]), [])
+
+    def test_async(self):
+        async def chunks():
+            for _ in range(3):
+                yield CHUNK
+
+        async def collect():
+            with Dictation(self.temp_dir.name) as dictation:
+                return [event.kind async for event in dictation.events_async(chunks())]
+
+        self.assertEqual(
+            asyncio.run(collect()),
+            [EVENT_PARTIAL, EVENT_PARTIAL, EVENT_FINAL, EVENT_ENDPOINT],
+        )
+
+    def test_errors(self):
+        with self.assertRaises(FileNotFoundError):
+            Dictation(os.path.join(self.temp_dir.name, "missing"))
+        with self.assertRaises(ValueError):
+            Dictation(self.temp_dir.name, engine="unknown")
+
+    def test_engine_errors(self):
+        # Engines raise instead of exiting the process.
+        engine_class = _mod.engine_class_from_name("vosk")
+        with self.assertRaises(FileNotFoundError):
+            engine_class(os.path.join(self.temp_dir.name, "missing"), sample_rate=16000, verbose=0, options={})
+        # No offline model or voice activity detection model.
+        with self.assertRaises(ValueError):
+            Dictation(self.temp_dir.name, engine="sherpa-offline")
+        for filename in ("model.int8.onnx", "tokens.txt"):
+            open(os.path.join(self.temp_dir.name, filename), "w").close()
+        with self.assertRaises(FileNotFoundError):
+            Dictation(self.temp_dir.name, engine="sherpa-offline")
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# SPDX-License-Identifier: GPL-2.0-or-later
+
+"""
+Unit tests for the AudioOverload class (used for ``--backlog-limit`` & ``--overload-policy``).
+
+Run with:
+    python -m pytest tests/test_audio_overload.py -v
+"""
+
+import array
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from nerd_dictation import core as _mod  # noqa: E402
+
+AudioOverload = _mod.AudioOverload
+audio_block_rms = _mod.audio_block_rms
+
+# 100 samples per second (of int16), keeps the sizes easy to reason about.
+_BYTE_RATE = 200
+
+
+def _int16_block(value, seconds):
+    return array.array("h", [value] * int(_BYTE_RATE * seconds // 2)).tobytes()
+
+
+class TestAudioOverloadState(unittest.TestCase):
+    def test_disabled(self):
+        overload = AudioOverload(0.0, {"SKIP_PARTIALS"})
+        self.assertIsNone(overload.update(100.0))
+        self.assertFalse(overload.skip_partials)
+
+    def test_overrun_and_recovery(self):
+        overload = AudioOverload(1.0, {"SKIP_PARTIALS"})
+        self.assertIsNone(overload.update(0.5))
+        self.assertTrue(overload.update(1.5))
+        self.assertTrue(overload.skip_partials)
+        self.assertFalse(overload.skip_noise_reduction)
+        # Hysteresis, remain overloaded until the backlog is below half the limit.
+        self.assertIsNone(overload.update(0.75))
+        self.assertTrue(overload.overloaded)
+        self.assertFalse(overload.update(0.25))
+        self.assertFalse(overload.skip_partials)
+        self.assertEqual((overload.overrun_count, overload.recovery_count), (1, 1))
+
+
+class TestAudioOverloadTrim(unittest.TestCase):
+    def test_under_limit_unchanged(self):
+        overload = AudioOverload(1.0, set())
+        data = _int16_block(1000, 0.5)
+        self.assertIs(overload.trim(data, _BYTE_RATE, 2), data)
+        self.assertEqual(overload.dropped_samples, 0)
+
+    def test_drop_oldest(self):
+        overload = AudioOverload(1.0, set())
+        data = _int16_block(1000, 1.0) + _int16_block(2000, 1.0)
+        result = overload.trim(data, _BYTE_RATE, 2)
+        self.assertEqual(result, _int16_block(2000, 1.0))
+        self.assertEqual(overload.dropped_samples, 100)
+
+    def test_drop_silence_first(self):
+        overload = AudioOverload(1.0, {"DROP_SILENCE"})
+        speech_a = _int16_block(8000, 0.5)
+        silence = _int16_block(0, 1.0)
+        speech_b = _int16_block(-8000, 0.5)
+        result = overload.trim(speech_a + silence + speech_b, _BYTE_RATE, 2)
+        # All speech is kept.
+        self.assertEqual(result, speech_a + speech_b)
+        self.assertEqual(overload.dropped_samples, 100)
+
+    def test_drop_silence_then_oldest(self):
+        overload = AudioOverload(1.0, {"DROP_SILENCE"})
+        speech = _int16_block(8000, 1.0) + _int16_block(4000, 1.0)
+        result = overload.trim(speech + _int16_block(0, 0.5), _BYTE_RATE, 2)
+        self.assertEqual(result, _int16_block(4000, 1.0))
+        self.assertEqual(overload.dropped_samples, 150)
+
+
+class TestAudioBlockRMS(unittest.TestCase):
+    def test_int16(self):
+        self.assertAlmostEqual(audio_block_rms(_int16_block(16384, 0.1), 2), 0.5)
+
+    def test_float32(self):
+        self.assertAlmostEqual(audio_block_rms(array.array("f", [-0.25, 0.25]).tobytes(), 4), 0.25)
+
+    def test_empty(self):
+        self.assertEqual(audio_block_rms(b"", 2), 0.0)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# SPDX-License-Identifier: GPL-2.0-or-later
+
+"""
+Unit tests for the AudioRingBuffer class (used for ``--preroll``).
+
+Run with:
+    python -m pytest tests/test_audio_ring_buffer.py -v
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from nerd_dictation import core as _mod  # noqa: E402
+
+AudioRingBuffer = _mod.AudioRingBuffer
+
+
+class TestAudioRingBuffer(unittest.TestCase):
+    def test_empty(self):
+        buf = AudioRingBuffer(8, 2)
+        self.assertEqual(len(buf), 0)
+        self.assertEqual(buf.read_all(), b"")
+
+    def test_under_capacity(self):
+        buf = AudioRingBuffer(8, 2)
+        buf.write(b"ab")
+        buf.write(b"cd")
+        self.assertEqual(buf.read_all(), b"abcd")
+        # Reading clears the buffer.
+        self.assertEqual(buf.read_all(), b"")
+
+    def test_wrap_keeps_most_recent(self):
+        buf = AudioRingBuffer(8, 2)
+        for chunk in (b"0123", b"4567", b"89ab"):
+            buf.write(chunk)
+        self.assertEqual(len(buf), 8)
+        self.assertEqual(buf.read_all(), b"456789ab")
+
+    def test_write_larger_than_capacity(self):
+        buf = AudioRingBuffer(4, 2)
+        buf.write(b"0123456789")
+        self.assertEqual(buf.read_all(), b"6789")
+
+    def test_size_rounded_to_sample_width(self):
+        buf = AudioRingBuffer(9, 4)
+        buf.write(b"0123456789ab")
+        self.assertEqual(buf.read_all(), b"456789ab")
+
+    def test_sample_alignment(self):
+        # Odd sized writes must never return a partial sample at the start,
+        # the end may be part way through a sample (continued by the next read from the recording).
+        buf = AudioRingBuffer(4, 2)
+        buf.write(b"012")
+        buf.write(b"345")
+        buf.write(b"6")
+        self.assertEqual(buf.read_all(), b"456")
+
+    def test_sample_alignment_wide_samples(self):
+        # 4 byte samples (``float32``), the total written isn't a multiple of the sample width.
+        buf = AudioRingBuffer(8, 4)
+        buf.write(b"0123456789abc")
+        self.assertEqual(buf.read_all(), b"89abc")
+        buf.write(b"01234")
+        buf.write(b"56789a")
+        self.assertEqual(buf.read_all(), b"456789a")
+
+    def test_zero_size(self):
+        buf = AudioRingBuffer(0, 2)
+        buf.write(b"0123")
+        self.assertEqual(buf.read_all(), b"")
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# SPDX-License-Identifier: GPL-2.0-or-later
+
+"""
+Unit tests for the control sub-commands fast path & requests (used by the ``grammar`` & ``model`` sub-commands),
+as well as prefetching models (the ``prefetch`` sub-command).
+
+Run with:
+    python -m pytest tests/test_control.py -v
+"""
+
+import contextlib
+import io
+import os
+import signal
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from nerd_dictation import control  # noqa: E402
+from nerd_dictation import page_cache  # noqa: E402
+
+
+class TestRequest(unittest.TestCase):
+    def test_round_trip(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            cookie = os.path.join(temp_dir, "cookie")
+            self.assertIsNone(control.request_read_or_none(cookie))
+            control.request_write(cookie, "grammar commands")
+            self.assertEqual(control.request_read_or_none(cookie), "grammar commands")
+            # Reading removes the request.
+            self.assertIsNone(control.request_read_or_none(cookie))
+            self.assertEqual(os.listdir(temp_dir), [])
+
+
+class TestMainFast(unittest.TestCase):
+    def test_positional_arguments(self):
+        # Missing & extra positional arguments are left to the full parser.
+        self.assertFalse(control.main_fast(["grammar"]))
+        self.assertFalse(control.main_fast(["grammar", "a", "b"]))
+        self.assertFalse(control.main_fast(["end", "a"]))
+
+    def test_grammar(self):
+        received = []
+        handler_prev = signal.signal(signal.SIGUSR2, lambda signum, frame: received.append(signum))
+        try:
+            with tempfile.TemporaryDirectory() as temp_dir:
+                cookie = os.path.join(temp_dir, "cookie")
+                with open(cookie, "w", encoding="utf-8") as fh:
+                    fh.write(str(os.getpid()))
+                self.assertTrue(control.main_fast(["grammar", "--cookie", cookie, "commands"]))
+                self.assertEqual(received, [signal.SIGUSR2])
+                self.assertEqual(control.request_read_or_none(cookie), "grammar commands")
+        finally:
+            signal.signal(signal.SIGUSR2, handler_prev)
+
+    def test_model(self):
+        handler_prev = signal.signal(signal.SIGUSR2, lambda signum, frame: None)
+        try:
+            with tempfile.TemporaryDirectory() as temp_dir:
+                cookie = os.path.join(temp_dir, "cookie")
+                with open(cookie, "w", encoding="utf-8") as fh:
+                    fh.write(str(os.getpid()))
+                self.assertTrue(control.main_fast(["model", "--cookie=" + cookie, "alternate"]))
+                self.assertEqual(control.request_read_or_none(cookie), "model alternate")
+        finally:
+            signal.signal(signal.SIGUSR2, handler_prev)
+
+
+class TestPrefetch(unittest.TestCase):
+    def test_paths_files(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            os.makedirs(os.path.join(temp_dir, "model", "graph"))
+            for name in ("model/graph/HCLG.fst", "model/final.mdl", "vad.onnx"):
+                with open(os.path.join(temp_dir, name), "wb") as fh:
+                    fh.write(b"\0" * 100)
+            self.assertEqual(
+                [
+                    os.path.relpath(path, temp_dir)
+                    for path in page_cache.paths_files(
+                        [os.path.join(temp_dir, "model"), os.path.join(temp_dir, "vad.onnx")]
+                    )
+                ],
+                ["model/final.mdl", "model/graph/HCLG.fst", "vad.onnx"],
+            )
+            self.assertEqual(page_cache.paths_files([os.path.join(temp_dir, "missing")]), [])
+
+    def test_cached(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "model.bin")
+            with open(path, "wb") as fh:
+                fh.write(os.urandom(1 << 16))
+            with open(path, "rb") as fh:
+                fh.read()
+            # A file which was just read is in the page cache (when the page cache can be checked).
+            cached = page_cache.files_cached_bytes_or_none([path])
+            if cached is not None:
+                self.assertEqual(cached, (1 << 16, 1 << 16))
+
+    def test_main_fast(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            with open(os.path.join(temp_dir, "model.bin"), "wb") as fh:
+                fh.write(b"\0" * (1 << 20))
+            stdout = io.StringIO()
+            with contextlib.redirect_stdout(stdout):
+                self.assertTrue(control.main_fast(["prefetch", "--vosk-model-dir", temp_dir]))
+            self.assertTrue(stdout.getvalue().startswith("Reading 1.0 MiB in 1 file(s) into memory in the background"))
+        # Locking is left to the full parser.
+        self.assertFalse(control.main_fast(["prefetch", "--lock"]))
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# SPDX-License-Identifier: GPL-2.0-or-later
+
+"""
+Unit tests for ``--simulate-input-tool=DBUS``,
+using a stand-in input method service on a private session bus (requires ``dbus-daemon`` & ``jeepney``).
+
+Run with:
+    python -m pytest tests/test_dbus_text_input.py -v
+"""
+
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from nerd_dictation import core as _mod  # noqa: E402
+
+DBusTextInput = _mod.DBusTextInput
+
+try:
+    import jeepney
+    from jeepney.bus_messages import message_bus
+    from jeepney.io.blocking import open_dbus_connection
+except ImportError:
+    jeepney = None
+
+
+class _InputMethod:
+    """Implement ``org.nerd_dictation.TextInput1`` on a thread, recording the document & calls."""
+
+    def __init__(self):
+        self.connection = open_dbus_connection(bus="SESSION")
+        self.connection.send_and_get_reply(message_bus.RequestName(_mod.DBUS_TEXT_INPUT_NAME))
+        self.text = ""
+        self.preedit = ""
+        self.calls = []
+        self.fail = False
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while True:
+            msg = self.connection.receive()
+            if msg.header.message_type != jeepney.MessageType.method_call:
+                continue
+            method = msg.header.fields[jeepney.HeaderFields.member]
+            self.calls.append((method, msg.body))
+            if method == "Stop":
+                self.connection.send(jeepney.new_method_return(msg))
+                return
+            if self.fail:
+                self.connection.send(jeepney.new_error(msg, "org.nerd_dictation.Error", "s", ("No focus",)))
+                continue
+            if method == "SetPreedit":
+                (self.preedit,) = msg.body
+            elif method == "Commit":
+                delete_chars, text = msg.body
+                self.preedit = ""
+                self.text = self.text[: len(self.text) - delete_chars] + text
+            self.connection.send(jeepney.new_method_return(msg))
+
+    def stop(self):
+        with open_dbus_connection(bus="SESSION") as connection:
+            address = jeepney.DBusAddress(
+                _mod.DBUS_TEXT_INPUT_PATH, bus_name=_mod.DBUS_TEXT_INPUT_NAME, interface=_mod.DBUS_TEXT_INPUT_NAME
+            )
+            connection.send_and_get_reply(jeepney.new_method_call(address, "Stop"))
+        self.thread.join()
+        self.connection.close()
+
+
+@unittest.skipIf(jeepney is None or shutil.which("dbus-daemon") is None, "requires jeepney & dbus-daemon")
+class TestDBusTextInput(unittest.TestCase):
+    def setUp(self):
+        self.bus = subprocess.Popen(
+            ["dbus-daemon", "--session", "--nofork", "--print-address=1"],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            universal_newlines=True,
+        )
+        self.address_prev = os.environ.get("DBUS_SESSION_BUS_ADDRESS")
+        os.environ["DBUS_SESSION_BUS_ADDRESS"] = self.bus.stdout.readline().strip()
+        self.input_method = _InputMethod()
+
+    def tearDown(self):
+        self.input_method.stop()
+        self.bus.terminate()
+        self.bus.wait()
+        self.bus.stdout.close()
+        if self.address_prev is None:
+            del os.environ["DBUS_SESSION_BUS_ADDRESS"]
+        else:
+            os.environ["DBUS_SESSION_BUS_ADDRESS"] = self.address_prev
+
+    def test_partials_as_preedit(self):
+        text_input = DBusTextInput()
+        text_input.open()
+        text_input.update(0, "hello")
+        text_input.update(0, " wold")
+        text_input.update(2, "rld")
+        self.assertEqual((self.input_method.text, self.input_method.preedit), ("", "hello world"))
+        text_input.commit()
+        text_input.update(0, " again")
+        text_input.close()
+        self.assertEqual((self.input_method.text, self.input_method.preedit), ("hello world again", ""))
+        self.assertEqual(
+            self.input_method.calls,
+            [
+                ("SetPreedit", ("hello",)),
+                ("SetPreedit", ("hello wold",)),
+                ("SetPreedit", ("hello world",)),
+                ("Commit", (0, "hello world")),
+                ("SetPreedit", (" again",)),
+                ("Commit", (0, " again")),
+            ],
+        )
+
+    def test_revise_committed_text(self):
+        text_input = DBusTextInput()
+        text_input.open()
+        text_input.update(0, "one two")
+        text_input.commit()
+        text_input.update(0, " thr")
+        # Deletes the pre-edit text & part of the committed text.
+        text_input.update(8, ", two. Three")
+        text_input.close()
+        self.assertEqual(self.input_method.text, "one, two. Three")
+
+    def test_error_exits(self):
+        self.input_method.fail = True
+        text_input = DBusTextInput()
+        text_input.open()
+        with self.assertRaises(SystemExit):
+            text_input.update(0, "hello")
+        self.input_method.fail = False
+        text_input.close()
+
+    def test_not_running_exits(self):
+        text_input = DBusTextInput()
+        with mock.patch.object(_mod, "DBUS_TEXT_INPUT_NAME", "org.nerd_dictation.NotRunning"):
+            with self.assertRaises(SystemExit):
+                text_input.open()
+
+    def test_commands(self):
+        handle_fn = _mod.simulate_typing_with_dbus
+        handle_fn(_mod.SIMULATE_INPUT_CODE_COMMAND, "SETUP")
+        handle_fn(0, "hello")
+        handle_fn(_mod.SIMULATE_INPUT_CODE_COMMAND, "COMMIT")
+        handle_fn(0, " world")
+        handle_fn(_mod.SIMULATE_INPUT_CODE_COMMAND, "TEARDOWN")
+        self.assertEqual((self.input_method.text, self.input_method.preedit), ("hello world", ""))
+        # The connection isn't opened again after tear-down.
+        with self.assertRaises(Exception):
+            handle_fn(0, "late")
+        with self.assertRaises(Exception):
+            handle_fn(_mod.SIMULATE_INPUT_CODE_COMMAND, "UNKNOWN")
+        self.assertEqual(self.input_method.text, "hello world")
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
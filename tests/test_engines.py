@@ -0,0 +1,657 @@
+#!/usr/bin/env python3
+# SPDX-License-Identifier: GPL-2.0-or-later
+
+"""
+Conformance & performance tests for every registered engine (``--engine``),
+using stand-in recognizers for each engine's module, see ``ENGINE_MODULES``.
+The main loop is also tested with stand-in engines (resume latency for e.g.).
+
+Run with:
+    python -m pytest tests/test_engines.py -v
+"""
+
+import json
+import os
+import signal
+import sys
+import tempfile
+import time
+import types
+import unittest
+from unittest import mock
+
+# Imported before the stand-in modules are added (which removes modules imported while they're in use).
+import numpy  # noqa: F401
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from nerd_dictation import core as _mod  # noqa: E402
+
+Capture = _mod.Capture
+Engine = _mod.Engine
+ENGINES = _mod.ENGINES
+engine_class_from_name = _mod.engine_class_from_name
+text_from_engine = _mod.text_from_engine
+
+# Chunks of 100ms, each chunk is recognized as a word.
+CHUNK_SECONDS = 0.1
+
+
+class _KaldiRecognizer:
+    """Recognize a word for each chunk, reaching an end-point after every 3 chunks."""
+
+    def __init__(self, model, sample_rate, grammar=None):
+        self.words = []
+        self.count = 0
+
+    def AcceptWaveform(self, data):
+        self.count += 1
+        self.words.append("word{:d}".format(self.count))
+        return len(self.words) == 3
+
+    def PartialResult(self):
+        return json.dumps({"partial": " ".join(self.words)})
+
+    def FinalResult(self):
+        text = " ".join(self.words)
+        self.words = []
+        return json.dumps({"text": text})
+
+    def Reset(self):
+        self.words = []
+
+
+class _OnlineStream:
+    def __init__(self):
+        self.words = []
+        self.count = 0
+        self.pending = False
+
+    def accept_waveform(self, sample_rate, samples):
+        self.pending = True
+
+
+class _OnlineRecognizer:
+    """Recognize a word for each chunk, reaching an end-point after every 3 chunks."""
+
+    @classmethod
+    def from_transducer(cls, **_kwargs):
+        return cls()
+
+    def create_stream(self):
+        return _OnlineStream()
+
+    def is_ready(self, stream):
+        return stream.pending
+
+    def decode_stream(self, stream):
+        stream.pending = False
+        stream.count += 1
+        stream.words.append("word{:d}".format(stream.count))
+
+    def get_result(self, stream):
+        return " ".join(stream.words)
+
+    def get_result_all(self, stream):
+        return types.SimpleNamespace(
+            tokens=list(stream.words),
+            timestamps=[i * CHUNK_SECONDS for i in range(len(stream.words))],
+            ys_probs=[-0.1] * len(stream.words),
+        )
+
+    def is_endpoint(self, stream):
+        return len(stream.words) == 3
+
+    def reset(self, stream):
+        stream.words = []
+
+
+class _VadModelConfig:
+    def __init__(self):
+        self.silero_vad = types.SimpleNamespace(model="", min_silence_duration=0.0, max_speech_duration=0.0)
+        self.sample_rate = 0
+
+
+class _VoiceActivityDetector:
+    """Detect a segment of speech for every 3 chunks."""
+
+    def __init__(self, config, buffer_size_in_seconds):
+        self.segment_size = int(config.sample_rate * CHUNK_SECONDS) * 3
+        self.start = 0
+        self.samples = []
+        self.segments = []
+
+    def accept_waveform(self, samples):
+        self.samples.extend(samples)
+        while len(self.samples) >= self.segment_size:
+            self.samples, samples = self.samples[self.segment_size :], self.samples[: self.segment_size]
+            self._segment_add(samples)
+
+    def _segment_add(self, samples):
+        self.segments.append(types.SimpleNamespace(start=self.start, samples=samples))
+        self.start += len(samples)
+
+    def flush(self):
+        if self.samples:
+            self._segment_add(self.samples)
+            self.samples = []
+
+    def empty(self):
+        return not self.segments
+
+    @property
+    def front(self):
+        return self.segments[0]
+
+    def pop(self):
+        del self.segments[0]
+
+    def is_speech_detected(self):
+        return bool(self.samples)
+
+    def reset(self):
+        # Segment offsets start from zero again (as sherpa's detector does).
+        self.start = 0
+        self.samples = []
+        self.segments = []
+
+
+class _OfflineStream:
+    def __init__(self, recognizer):
+        self.recognizer = recognizer
+        self.words = []
+        self.result = None
+
+    def accept_waveform(self, sample_rate, samples):
+        for _ in range(0, len(samples), int(sample_rate * CHUNK_SECONDS)):
+            self.recognizer.count += 1
+            self.words.append("word{:d}".format(self.recognizer.count))
+
+
+class _OfflineRecognizer:
+    """Recognize a word for each chunk of a segment, words are numbered in the order the audio is accepted."""
+
+    def __init__(self):
+        self.count = 0
+
+    @classmethod
+    def from_paraformer(cls, **_kwargs):
+        return cls()
+
+    def create_stream(self):
+        return _OfflineStream(self)
+
+    def decode_stream(self, stream):
+        stream.result = types.SimpleNamespace(
+            text=" ".join(stream.words),
+            tokens=list(stream.words),
+            timestamps=[i * CHUNK_SECONDS for i in range(len(stream.words))],
+        )
+
+
+# Stand-in modules for each engine (engine name: modules), registered engines must have an entry.
+_sherpa_onnx = types.SimpleNamespace(
+    OnlineRecognizer=_OnlineRecognizer,
+    OfflineRecognizer=_OfflineRecognizer,
+    VadModelConfig=_VadModelConfig,
+    VoiceActivityDetector=_VoiceActivityDetector,
+)
+ENGINE_MODULES = {
+    "vosk": {
+        "vosk": types.SimpleNamespace(
+            SetLogLevel=lambda level: None, Model=lambda path: object(), KaldiRecognizer=_KaldiRecognizer
+        ),
+    },
+    "sherpa": {
+        "sherpa_onnx": _sherpa_onnx,
+    },
+    "sherpa-offline": {
+        "sherpa_onnx": _sherpa_onnx,
+    },
+}
+# Files each engine expects in the model directory.
+MODEL_FILES = ("model.int8.onnx", "tokens.txt", "silero_vad.onnx")
+
+
+class _CaptureChunks(Capture):
+    """Return a chunk for each read."""
+
+    def __init__(self, chunks, sample_rate, sample_width):
+        super().__init__(sample_rate, sample_width)
+        self.chunks = list(chunks)
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def read(self):
+        return self.chunks.pop(0) if self.chunks else b""
+
+    def wait(self, timeout):
+        pass
+
+
+class _EngineNull(Engine):
+    """Decode nothing, to measure the overhead of the main loop."""
+
+    def load(self, model_dir, model=None):
+        return None
+
+    def start(self, loaded):
+        pass
+
+    def release(self, unload):
+        pass
+
+    def accept(self, data):
+        return False
+
+    def partial(self):
+        return ""
+
+    def final(self):
+        return ""
+
+    def reset(self):
+        pass
+
+
+class _CaptureRealTime(Capture):
+    """Return the chunks recorded since the last read, recording a chunk every ``chunk_seconds``."""
+
+    def __init__(self, chunk, chunk_seconds, sample_rate, sample_width):
+        super().__init__(sample_rate, sample_width)
+        self.chunk = chunk
+        self.chunk_seconds = chunk_seconds
+        self.time_next = 0.0
+
+    def start(self):
+        self.time_next = time.monotonic() + self.chunk_seconds
+
+    def stop(self):
+        pass
+
+    def read(self):
+        time_curr = time.monotonic()
+        if time_curr < self.time_next:
+            return b""
+        count = int((time_curr - self.time_next) / self.chunk_seconds) + 1
+        self.time_next += count * self.chunk_seconds
+        return self.chunk * count
+
+    def wait(self, timeout):
+        time.sleep(max(0.0, min(timeout, self.time_next - time.monotonic())))
+
+
+class _CaptureStall(_CaptureRealTime):
+    """Stop recording after ``stall_seconds`` until restarted (as a device may after a system sleep)."""
+
+    def __init__(self, stall_seconds, *args):
+        super().__init__(*args)
+        self.stall_seconds = stall_seconds
+        self.stall_time = 0.0
+        self.restart_times = []
+
+    def start(self):
+        super().start()
+        self.stall_time = time.monotonic() + self.stall_seconds
+
+    def restart(self):
+        self.restart_times.append(time.monotonic())
+        # Recording continues after a restart.
+        self.stall_time = float("inf")
+        super().start()
+
+    def read(self):
+        if time.monotonic() > self.stall_time:
+            return b""
+        return super().read()
+
+
+class _EngineAcceptTimes(_EngineNull):
+    """Record the time audio is accepted."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.accept_times = []
+
+    def accept(self, data):
+        self.accept_times.append(time.monotonic())
+        return False
+
+
+class _EngineSpeech(_EngineNull):
+    """Detect speech (without partial results) until ``speech_time_end``."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.speech_time_end = 0.0
+
+    def speech_active(self):
+        return time.monotonic() < self.speech_time_end
+
+
+def chunk_create(engine):
+    return b"\0" * (int(engine.sample_rate * CHUNK_SECONDS) * engine.sample_width)
+
+
+class EngineTestCase(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        for filename in MODEL_FILES:
+            open(os.path.join(self.temp_dir.name, filename), "w").close()
+        modules = {}
+        for engine_modules in ENGINE_MODULES.values():
+            modules.update(engine_modules)
+        patch = mock.patch.dict(sys.modules, modules)
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def engines(self):
+        for name, cls in ENGINES.items():
+            with self.subTest(engine=name):
+                self.assertIn(name, ENGINE_MODULES, "Stand-in modules are needed to test this engine")
+                engine = cls(self.temp_dir.name, sample_rate=0, verbose=0, options={})
+                yield engine
+                engine.close()
+
+    def accept_until_endpoint(self, engine, chunk):
+        """
+        Accept ``chunk`` then wait for an end-point, since engines may decode in the background.
+        """
+        if engine.accept(chunk):
+            return True
+        deadline = time.monotonic() + 5.0
+        while time.monotonic() < deadline:
+            if engine.accept(b""):
+                return True
+            time.sleep(0.001)
+        return False
+
+    def run_engine(self, engine, chunks):
+        """
+        Run the main loop, returning the text handled & the time taken.
+        """
+        for signum in (signal.SIGUSR1, signal.SIGUSR2, signal.SIGTSTP, signal.SIGCONT, signal.SIGHUP):
+            self.addCleanup(signal.signal, signum, signal.getsignal(signum))
+        capture = _CaptureChunks(chunks, engine.sample_rate, engine.sample_width)
+        text_handled = []
+
+        def handle_fn(delete_prev_chars, text):
+            if delete_prev_chars != _mod.SIMULATE_INPUT_CODE_COMMAND:
+                text_handled.append(text)
+
+        time_beg = time.perf_counter()
+        with mock.patch.object(type(engine), "capture_create", lambda *_args: capture):
+            text_from_engine(
+                engine=engine,
+                exit_fn=lambda _handled_any: 0 if capture.chunks else 1,
+                process_fn=lambda text: text,
+                handle_fn=handle_fn,
+                timeout=0.0,
+                idle_time=0.0,
+                progressive=False,
+                progressive_continuous=False,
+            )
+        return text_handled, time.perf_counter() - time_beg
+
+
+class TestEngineConformance(EngineTestCase):
+    def test_registered(self):
+        self.assertIs(engine_class_from_name("vosk"), ENGINES["vosk"])
+        self.assertIs(engine_class_from_name(__name__ + ":_EngineNull"), _EngineNull)
+        for name in ("unknown", "os:path", "module_which_does_not_exist:Engine"):
+            with self.assertRaises(ValueError):
+                engine_class_from_name(name)
+
+    def test_segments(self):
+        for engine in self.engines():
+            self.assertIn(engine.sample_dtype, ("int16", "float32"))
+            self.assertGreater(engine.sample_rate, 0)
+            engine.start(engine.load(engine.model_dir))
+            chunk = chunk_create(engine)
+
+            self.assertFalse(engine.accept(chunk))
+            # Partial results are optional.
+            self.assertIn(engine.partial(), ("", "word1"))
+            self.assertFalse(engine.accept(chunk))
+            self.assertTrue(self.accept_until_endpoint(engine, chunk))
+            self.assertEqual(engine.final(), "word1 word2 word3")
+            tokens = engine.final_tokens()
+            if tokens is not None:
+                self.assertEqual(len(tokens[0]), len(tokens[1]))
+            # A new segment.
+            self.assertEqual(engine.partial(), "")
+            self.assertFalse(engine.accept(chunk))
+            self.assertIn(engine.partial(), ("", "word4"))
+            engine.reset()
+            self.assertEqual(engine.partial(), "")
+            self.assertEqual(engine.final(), "")
+
+    def test_release(self):
+        for engine in self.engines():
+            engine.start(engine.load(engine.model_dir))
+            chunk = chunk_create(engine)
+            # The model is kept, only the recognizers are created again.
+            engine.release(False)
+            self.assertIsNotNone(engine.model)
+            engine.start(engine.load(engine.model_dir, engine.model))
+            self.assertFalse(engine.accept(chunk))
+            self.assertTrue(engine.final())
+            engine.release(True)
+            self.assertIsNone(engine.model)
+            engine.start(engine.load(engine.model_dir))
+            self.assertFalse(engine.accept(chunk))
+
+    def test_main_loop(self):
+        for engine in self.engines():
+            text_handled, _ = self.run_engine(engine, [chunk_create(engine)] * 4)
+            # The last segment ends when exiting (without an end-point).
+            self.assertEqual(text_handled, ["word1 word2 word3 word4"])
+
+
+class TestEngineSherpaOffline(EngineTestCase):
+    def test_order(self):
+        # The first segment decodes slowest, results must still be in the order spoken.
+        decode_stream = _OfflineRecognizer.decode_stream
+
+        def decode_stream_slow(recognizer, stream):
+            if stream.words[0] == "word1":
+                time.sleep(0.2)
+            decode_stream(recognizer, stream)
+
+        engine = ENGINES["sherpa-offline"](self.temp_dir.name, sample_rate=0, verbose=0, options={})
+        self.addCleanup(engine.close)
+        engine.start(engine.load(engine.model_dir))
+        chunk = chunk_create(engine)
+        with mock.patch.object(_OfflineRecognizer, "decode_stream", decode_stream_slow):
+            for _ in range(6):
+                self.assertFalse(engine.accept(chunk))
+            self.assertTrue(self.accept_until_endpoint(engine, b""))
+            self.assertEqual(engine.final(), "word1 word2 word3")
+            self.assertEqual(engine.final_times(), (0.0, 0.3))
+            self.assertTrue(self.accept_until_endpoint(engine, b""))
+            self.assertEqual(engine.final(), "word4 word5 word6")
+            self.assertEqual(engine.final_times(), (0.3, 0.6))
+            # Remaining speech is decoded without an end-point.
+            engine.accept(chunk)
+            self.assertEqual(engine.final(), "word7")
+            self.assertEqual(engine.final_times(), (0.6, 0.7))
+            # Offsets continue after the detector is reset.
+            for _ in range(3):
+                engine.accept(chunk)
+            self.assertTrue(self.accept_until_endpoint(engine, b""))
+            self.assertEqual(engine.final(), "word8 word9 word10")
+            self.assertEqual(engine.final_times(), (0.7, 1.0))
+
+    def test_speech_active(self):
+        engine = ENGINES["sherpa-offline"](self.temp_dir.name, sample_rate=0, verbose=0, options={})
+        self.addCleanup(engine.close)
+        engine.start(engine.load(engine.model_dir))
+        chunk = chunk_create(engine)
+        self.assertFalse(engine.speech_active())
+        # Speech is detected, then decoded (without partial results).
+        for _ in range(2):
+            self.assertFalse(engine.accept(chunk))
+            self.assertTrue(engine.speech_active())
+        self.assertTrue(self.accept_until_endpoint(engine, chunk))
+        self.assertEqual(engine.final(), "word1 word2 word3")
+        self.assertFalse(engine.speech_active())
+
+
+class TestEnginePerformance(EngineTestCase):
+    def test_main_loop_overhead(self):
+        engine = _EngineNull(self.temp_dir.name, sample_rate=16000, verbose=0, options={})
+        chunks = [chunk_create(engine)] * 2000
+        _, elapsed = self.run_engine(engine, chunks)
+        # Typically a few micro-seconds for each chunk.
+        self.assertLess(elapsed / len(chunks), 0.0005)
+
+    def test_real_time_factor(self):
+        # The stand-in recognizers are near instant, so this measures the engine & main loop overhead.
+        for engine in self.engines():
+            chunks = [chunk_create(engine)] * 300
+            _, elapsed = self.run_engine(engine, chunks)
+            self.assertLess(elapsed / (len(chunks) * CHUNK_SECONDS), 0.05)
+
+
+class TestTimeout(EngineTestCase):
+    def run_until_timeout(self, engine, timeout):
+        """
+        Run the main loop until ``timeout`` is reached, returning the time taken.
+        """
+        for signum in (signal.SIGUSR1, signal.SIGUSR2, signal.SIGTSTP, signal.SIGCONT, signal.SIGHUP):
+            self.addCleanup(signal.signal, signum, signal.getsignal(signum))
+        chunk_seconds = 0.01
+        capture = _CaptureRealTime(
+            b"\0" * (int(engine.sample_rate * chunk_seconds) * engine.sample_width),
+            chunk_seconds,
+            engine.sample_rate,
+            engine.sample_width,
+        )
+        time_beg = time.monotonic()
+        with mock.patch.object(type(engine), "capture_create", lambda *_args: capture):
+            text_from_engine(
+                engine=engine,
+                exit_fn=lambda _handled_any: 1 if time.monotonic() - time_beg > 5.0 else 0,
+                process_fn=lambda text: text,
+                handle_fn=lambda delete_prev_chars, text: None,
+                timeout=timeout,
+                idle_time=0.0,
+                progressive=False,
+                progressive_continuous=False,
+            )
+        return time.monotonic() - time_beg
+
+    def test_silence(self):
+        engine = _EngineSpeech(self.temp_dir.name, sample_rate=16000, verbose=0, options={})
+        self.assertLess(self.run_until_timeout(engine, 0.1), 0.3)
+
+    def test_speech_without_partials(self):
+        # Speech delays the time-out for engines without partial results (``sherpa-offline`` for e.g.).
+        engine = _EngineSpeech(self.temp_dir.name, sample_rate=16000, verbose=0, options={})
+        engine.speech_time_end = time.monotonic() + 0.3
+        elapsed = self.run_until_timeout(engine, 0.1)
+        self.assertGreater(elapsed, 0.3 + 0.1 - 0.02)
+        self.assertLess(elapsed, 1.0)
+
+
+class TestSuspendResume(EngineTestCase):
+    def test_warm_resume_latency(self):
+        # Resuming from a warm suspend passes audio to the recognizer within a chunk of the request.
+        for signum in (signal.SIGUSR1, signal.SIGUSR2, signal.SIGTSTP, signal.SIGCONT, signal.SIGHUP):
+            self.addCleanup(signal.signal, signum, signal.getsignal(signum))
+        chunk_seconds = 0.01
+        engine = _EngineAcceptTimes(self.temp_dir.name, sample_rate=16000, verbose=0, options={})
+        capture = _CaptureRealTime(
+            b"\0" * (int(engine.sample_rate * chunk_seconds) * engine.sample_width),
+            chunk_seconds,
+            engine.sample_rate,
+            engine.sample_width,
+        )
+        # Resume, suspend after audio is accepted & repeat.
+        resume_times = []
+        latencies = []
+        time_end = time.monotonic() + 5.0
+
+        def exit_fn(_handled_any):
+            time_curr = time.monotonic()
+            if time_curr > time_end or len(latencies) == 3:
+                return 1
+            if len(resume_times) == len(latencies):
+                # Suspended (the loop discards the recording), resume after some audio is recorded.
+                if len(resume_times) == 0 or time_curr - resume_times[-1] > 0.1:
+                    resume_times.append(time.monotonic())
+                    os.kill(os.getpid(), signal.SIGCONT)
+            elif engine.accept_times and engine.accept_times[-1] >= resume_times[-1]:
+                latencies.append(engine.accept_times[-1] - resume_times[-1])
+                del engine.accept_times[:]
+                os.kill(os.getpid(), signal.SIGUSR1)
+            return 0
+
+        with mock.patch.object(type(engine), "capture_create", lambda *_args: capture):
+            text_from_engine(
+                engine=engine,
+                exit_fn=exit_fn,
+                process_fn=lambda text: text,
+                handle_fn=lambda delete_prev_chars, text: None,
+                timeout=0.0,
+                idle_time=0.0,
+                progressive=False,
+                progressive_continuous=False,
+                suspend_on_start=True,
+                suspend_mode="WARM",
+            )
+        self.assertEqual(len(latencies), 3)
+        # Typically a few milliseconds (waiting for the next chunk).
+        self.assertLess(max(latencies), chunk_seconds * 5)
+
+
+class TestCaptureStall(EngineTestCase):
+    def test_restart(self):
+        # A recording which stops producing audio is restarted, audio is then passed to the recognizer again.
+        for signum in (signal.SIGUSR1, signal.SIGUSR2, signal.SIGTSTP, signal.SIGCONT, signal.SIGHUP):
+            self.addCleanup(signal.signal, signum, signal.getsignal(signum))
+        chunk_seconds = 0.01
+        stall_timeout = 0.1
+        engine = _EngineAcceptTimes(self.temp_dir.name, sample_rate=16000, verbose=0, options={})
+        capture = _CaptureStall(
+            0.05,
+            b"\0" * (int(engine.sample_rate * chunk_seconds) * engine.sample_width),
+            chunk_seconds,
+            engine.sample_rate,
+            engine.sample_width,
+        )
+        time_end = time.monotonic() + 5.0
+
+        def exit_fn(_handled_any):
+            if time.monotonic() > time_end:
+                return 1
+            # Exit once audio is accepted after the restart.
+            if capture.restart_times and engine.accept_times and engine.accept_times[-1] > capture.restart_times[0]:
+                return 1
+            return 0
+
+        with mock.patch.object(type(engine), "capture_create", lambda *_args: capture):
+            text_from_engine(
+                engine=engine,
+                exit_fn=exit_fn,
+                process_fn=lambda text: text,
+                handle_fn=lambda delete_prev_chars, text: None,
+                timeout=0.0,
+                idle_time=0.0,
+                progressive=False,
+                progressive_continuous=False,
+                capture_stall_timeout=stall_timeout,
+            )
+        self.assertEqual(len(capture.restart_times), 1)
+        # Restarted once no audio was received for the time-out.
+        accept_time_stall = max(t for t in engine.accept_times if t < capture.restart_times[0])
+        self.assertGreater(capture.restart_times[0] - accept_time_stall, stall_timeout - chunk_seconds)
+        self.assertLess(capture.restart_times[0] - accept_time_stall, stall_timeout + 0.1)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
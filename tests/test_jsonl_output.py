@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# SPDX-License-Identifier: GPL-2.0-or-later
+
+"""
+Unit tests for writing events as JSON lines (``--output=JSONL``).
+
+Run with:
+    python -m pytest tests/test_jsonl_output.py -v
+"""
+
+import io
+import json
+import os
+import sys
+import threading
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from nerd_dictation import core as _mod  # noqa: E402
+
+JSONLOutput = _mod.JSONLOutput
+
+
+class _SlowFile(io.BytesIO):
+    """Block writing until ``event`` is set."""
+
+    def __init__(self):
+        super().__init__()
+        self.event = threading.Event()
+
+    def write(self, data):
+        self.event.wait(5.0)
+        return super().write(data)
+
+
+class _BrokenFile(io.BytesIO):
+    def write(self, data):
+        raise BrokenPipeError()
+
+
+def lines_from_bytes(data):
+    return [json.loads(line) for line in data.decode("utf-8").splitlines()]
+
+
+class TestJSONLOutput(unittest.TestCase):
+    def test_events(self):
+        fh = io.BytesIO()
+        events = JSONLOutput(fh)
+        events.partial("hello", 0.5)
+        events.final("hello world", 1.25, True, (["hello", "world"], [0.1, 0.6]))
+        events.partial("again", 1.5)
+        events.final("again", 2.0, False)
+        events.close()
+        self.assertEqual(
+            lines_from_bytes(fh.getvalue()),
+            [
+                {"type": "partial", "segment": 0, "text": "hello", "start": 0.0, "end": 0.5},
+                {
+                    "type": "final",
+                    "segment": 0,
+                    "text": "hello world",
+                    "start": 0.0,
+                    "end": 1.25,
+                    "tokens": ["hello", "world"],
+                    "timestamps": [0.1, 0.6],
+                },
+                {"type": "endpoint", "segment": 0, "end": 1.25},
+                {"type": "partial", "segment": 1, "text": "again", "start": 1.25, "end": 1.5},
+                {"type": "final", "segment": 1, "text": "again", "start": 1.25, "end": 2.0},
+            ],
+        )
+
+    def test_times(self):
+        # Engines which know where speech starts & ends (decoding may finish later).
+        fh = io.BytesIO()
+        events = JSONLOutput(fh)
+        events.final("hello", 1.5, True, None, (0.2, 0.8))
+        events.final("again", 2.5, False, None, (1.0, 1.25))
+        events.close()
+        self.assertEqual(
+            lines_from_bytes(fh.getvalue()),
+            [
+                {"type": "final", "segment": 0, "text": "hello", "start": 0.2, "end": 0.8},
+                {"type": "endpoint", "segment": 0, "end": 0.8},
+                {"type": "final", "segment": 1, "text": "again", "start": 1.0, "end": 1.25},
+            ],
+        )
+
+    def test_compact_utf8(self):
+        fh = io.BytesIO()
+        events = JSONLOutput(fh)
+        events.final("café", 1.0, False)
+        events.close()
+        self.assertEqual(fh.getvalue(), '{"type":"final","segment":0,"text":"café","start":0.0,"end":1.0}\n'.encode())
+
+    def test_partial_unchanged(self):
+        fh = io.BytesIO()
+        events = JSONLOutput(fh)
+        events.partial("hello", 0.5)
+        events.partial("hello", 0.6)
+        events.silence(1.0)
+        events.partial("hello", 1.5)
+        events.close()
+        self.assertEqual([line["end"] for line in lines_from_bytes(fh.getvalue())], [0.5, 1.5])
+
+    def test_slow_reader(self):
+        fh = _SlowFile()
+        with mock.patch.object(_mod, "JSONL_BUFFER_LIMIT", 100):
+            events = JSONLOutput(fh)
+            for i in range(20):
+                events.partial("word{:d}".format(i), float(i))
+            events.final("done", 20.0, True)
+            fh.event.set()
+            events.close()
+        lines = lines_from_bytes(fh.getvalue())
+        self.assertGreater(events.dropped, 0)
+        self.assertEqual(len(lines), 20 - events.dropped + 2)
+        # Final events are never dropped.
+        self.assertEqual([line["type"] for line in lines[-2:]], ["final", "endpoint"])
+
+    def test_broken_pipe(self):
+        events = JSONLOutput(_BrokenFile())
+        events.final("hello", 1.0, True)
+        events.close()
+        # Writing after the reader has exited has no effect.
+        events.final("hello", 2.0, True)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
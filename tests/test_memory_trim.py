@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# SPDX-License-Identifier: GPL-2.0-or-later
+
+"""
+Unit tests for releasing memory while suspended (``--suspend-trim-timeout`` & ``--suspend-unload-model``).
+
+Run with:
+    python -m pytest tests/test_memory_trim.py -v
+"""
+
+import os
+import sys
+import threading
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from nerd_dictation import core as _mod  # noqa: E402
+
+ModelLoad = _mod.ModelLoad
+memory_trim = _mod.memory_trim
+process_continue_after = _mod.process_continue_after
+process_continue_cancel = _mod.process_continue_cancel
+
+
+class TestMemoryTrim(unittest.TestCase):
+    def test_returns_bool(self):
+        # False without glibc, the result isn't otherwise predictable.
+        self.assertIsInstance(memory_trim(), bool)
+
+
+class TestModelLoad(unittest.TestCase):
+    def test_result(self):
+        load = ModelLoad(lambda: "model")
+        self.assertEqual(load.result(), "model")
+        self.assertTrue(load.is_loaded())
+
+    def test_audio_buffered_while_loading(self):
+        event = threading.Event()
+
+        def load_fn():
+            event.wait(5.0)
+            return "model"
+
+        load = ModelLoad(load_fn)
+        self.assertFalse(load.is_loaded())
+        load.audio.append(b"ab")
+        load.audio.append(b"cd")
+        event.set()
+        self.assertEqual(load.result(), "model")
+        self.assertEqual(b"".join(load.audio), b"abcd")
+
+    def test_error_raised_from_result(self):
+        def load_fn():
+            raise RuntimeError("missing model")
+
+        load = ModelLoad(load_fn)
+        with self.assertRaises(RuntimeError):
+            load.result()
+
+
+class TestProcessContinue(unittest.TestCase):
+    def test_continue(self):
+        # Continuing a running process has no effect.
+        proc = process_continue_after(0.0)
+        self.assertEqual(proc.wait(5.0), 0)
+        process_continue_cancel(proc)
+
+    def test_cancel(self):
+        proc = process_continue_after(60.0)
+        process_continue_cancel(proc)
+        self.assertNotEqual(proc.returncode, 0)
+        # The ``sleep`` process is killed along with the shell.
+        with self.assertRaises(ProcessLookupError):
+            os.killpg(proc.pid, 0)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
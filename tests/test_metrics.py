@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# SPDX-License-Identifier: GPL-2.0-or-later
+
+"""
+Unit tests for the metrics written by ``--metrics-file`` & reported by the ``status`` sub-command.
+
+Run with:
+    python -m pytest tests/test_metrics.py -v
+"""
+
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from nerd_dictation import control  # noqa: E402
+from nerd_dictation import core as _mod  # noqa: E402
+
+DictationMetrics = _mod.DictationMetrics
+
+
+def main_status_output(**kwargs):
+    """
+    Return the output of the ``status`` sub-command & it's exit code.
+    """
+    stdout = io.StringIO()
+    code = 0
+    with contextlib.redirect_stdout(stdout):
+        try:
+            control.main_status(**kwargs)
+        except SystemExit as ex:
+            code = ex.code
+    return stdout.getvalue(), code
+
+
+class TestMetrics(unittest.TestCase):
+    def test_as_text(self):
+        metrics = DictationMetrics("")
+        metrics.state = "recording"
+        metrics.audio_seconds = 10.0
+        metrics.decode_seconds = 2.5
+        metrics.chars_typed = 42
+        lines = metrics.as_text().splitlines()
+        self.assertIn('nerd_dictation_state{state="recording"} 1', lines)
+        self.assertIn('nerd_dictation_state{state="suspended"} 0', lines)
+        self.assertIn("nerd_dictation_real_time_factor 0.25", lines)
+        self.assertIn("nerd_dictation_chars_typed_total 42", lines)
+        # Each metric has help & type comments.
+        for line in lines:
+            if not line.startswith("#"):
+                name = line.split("{", 1)[0].split(" ", 1)[0]
+                self.assertIn("# TYPE {:s} ".format(name), "\n".join(lines))
+
+    def test_write_throttled(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            metrics_file = os.path.join(temp_dir, "metrics.prom")
+            metrics = DictationMetrics(metrics_file, write_interval=60.0)
+            metrics.write(force=True)
+            metrics.chars_typed = 1
+            # Within the interval, not written.
+            metrics.write()
+            with open(metrics_file, "r", encoding="utf-8") as fh:
+                self.assertIn("nerd_dictation_chars_typed_total 0\n", fh.read())
+            metrics.write(force=True)
+            with open(metrics_file, "r", encoding="utf-8") as fh:
+                self.assertIn("nerd_dictation_chars_typed_total 1\n", fh.read())
+            self.assertEqual(os.listdir(temp_dir), ["metrics.prom"])
+
+
+class TestStatus(unittest.TestCase):
+    def test_not_running(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            output, code = main_status_output(path_to_cookie=os.path.join(temp_dir, "cookie"))
+        self.assertEqual(output, "state: not running\n")
+        self.assertEqual(code, 1)
+
+    def test_metrics(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # This process stands in for the dictation process.
+            cookie = os.path.join(temp_dir, "cookie")
+            with open(cookie, "w", encoding="utf-8") as fh:
+                fh.write(str(os.getpid()))
+            metrics_file = os.path.join(temp_dir, "metrics.prom")
+            metrics = DictationMetrics(metrics_file)
+            metrics.state = "suspended"
+            metrics.dropped_samples = 160
+            metrics.write(force=True)
+
+            output, code = main_status_output(path_to_cookie=cookie, metrics_file=metrics_file)
+        self.assertEqual(code, 0)
+        lines = output.splitlines()
+        self.assertEqual(lines[0], "pid: {:d}".format(os.getpid()))
+        self.assertTrue(lines[1].startswith("process: "))
+        self.assertIn("state: suspended", lines)
+        self.assertIn("dropped_samples_total: 160", lines)
+        self.assertNotIn("state: recording", lines)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# SPDX-License-Identifier: GPL-2.0-or-later
+
+"""
+Unit tests for choosing between the primary & alternate model (``--model-swap-dir``).
+
+Run with:
+    python -m pytest tests/test_model_swap.py -v
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from nerd_dictation import core as _mod  # noqa: E402
+
+DictationMetrics = _mod.DictationMetrics
+ModelSwap = _mod.ModelSwap
+memory_pressure_or_none = _mod.memory_pressure_or_none
+power_on_battery = _mod.power_on_battery
+
+
+def power_supply_write(power_supply_dir, name, **attributes):
+    os.makedirs(os.path.join(power_supply_dir, name))
+    for key, value in attributes.items():
+        with open(os.path.join(power_supply_dir, name, key), "w", encoding="utf-8") as fh:
+            fh.write(value + "\n")
+
+
+class TestPowerOnBattery(unittest.TestCase):
+    def test_missing(self):
+        self.assertFalse(power_on_battery("/nonexistent"))
+
+    def test_discharging(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            power_supply_write(temp_dir, "BAT0", type="Battery", status="Discharging")
+            self.assertTrue(power_on_battery(temp_dir))
+            power_supply_write(temp_dir, "AC", type="Mains", online="1")
+            self.assertFalse(power_on_battery(temp_dir))
+
+    def test_charging(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            power_supply_write(temp_dir, "BAT0", type="Battery", status="Charging")
+            power_supply_write(temp_dir, "AC", type="Mains", online="0")
+            self.assertFalse(power_on_battery(temp_dir))
+
+
+class TestMemoryPressure(unittest.TestCase):
+    def test_parse(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            pressure_file = os.path.join(temp_dir, "memory")
+            with open(pressure_file, "w", encoding="utf-8") as fh:
+                fh.write(
+                    "some avg10=12.50 avg60=3.00 avg300=1.00 total=123\n"
+                    "full avg10=5.00 avg60=1.00 avg300=0.50 total=45\n"
+                )
+            self.assertEqual(memory_pressure_or_none(pressure_file), 12.5)
+
+    def test_missing(self):
+        self.assertIsNone(memory_pressure_or_none("/nonexistent"))
+
+
+class TestModelSwap(unittest.TestCase):
+    def setUp(self):
+        self.metrics = DictationMetrics("")
+        # Check the conditions on every call.
+        patch = mock.patch.object(_mod, "MODEL_SWAP_CHECK_INTERVAL", 0.0)
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def test_request(self):
+        model_swap = ModelSwap("large", "small")
+        self.assertEqual(model_swap.index_want(self.metrics), 0)
+        self.assertTrue(model_swap.request_set("alternate"))
+        self.assertEqual(model_swap.index_want(self.metrics), 1)
+        self.assertTrue(model_swap.request_set("primary"))
+        self.assertEqual(model_swap.index_want(self.metrics), 0)
+        self.assertFalse(model_swap.request_set("unknown"))
+        self.assertEqual(model_swap.request, "primary")
+
+    def test_on_battery(self):
+        model_swap = ModelSwap("large", "small", on_battery=True)
+        with mock.patch.object(_mod, "power_on_battery", return_value=True):
+            self.assertEqual(model_swap.index_want(self.metrics), 1)
+        with mock.patch.object(_mod, "power_on_battery", return_value=False):
+            self.assertEqual(model_swap.index_want(self.metrics), 0)
+
+    def test_memory_pressure(self):
+        model_swap = ModelSwap("large", "small", pressure_limit=10.0)
+        with mock.patch.object(_mod, "memory_pressure_or_none", return_value=20.0):
+            self.assertEqual(model_swap.index_want(self.metrics), 1)
+        with mock.patch.object(_mod, "memory_pressure_or_none", return_value=None):
+            self.assertEqual(model_swap.index_want(self.metrics), 0)
+
+    def test_rtf(self):
+        model_swap = ModelSwap("large", "small", rtf_limit=0.5)
+        # Not enough audio has been measured.
+        self.metrics.audio_seconds = 5.0
+        self.metrics.decode_seconds = 8.0
+        self.assertEqual(model_swap.index_want(self.metrics), 0)
+        self.metrics.audio_seconds = 10.0
+        self.assertEqual(model_swap.index_want(self.metrics), 1)
+        model_swap.swapped(1, self.metrics)
+        self.assertEqual(self.metrics.model_swap_count, 1)
+        # The alternate model is kept while it's faster.
+        self.metrics.audio_seconds = 30.0
+        self.metrics.decode_seconds = 9.0
+        self.assertEqual(model_swap.index_want(self.metrics), 1)
+        # Until returning to automatic swapping.
+        model_swap.request_set("auto")
+        self.assertEqual(model_swap.index_want(self.metrics), 0)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -1,10 +1,9 @@
 #!/usr/bin/env python3
 """Test how noise reduction affects recognition accuracy (CER) on sherpa-large."""
 
-import importlib.machinery
 import json
 import os
-import tempfile
+import sys
 import wave
 
 import time
@@ -12,11 +11,11 @@ import time
 import jiwer
 import numpy as np
 
-from tests.test_sherpa_recognition import create_recognizer, recognize_wav
+from tests.test_sherpa_recognition import create_recognizer, recognize_samples
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from nerd_dictation import core as _mod  # noqa: E402
 
-_SCRIPT_PATH = os.path.join(os.path.dirname(__file__), "..", "nerd-dictation")
-_loader = importlib.machinery.SourceFileLoader("nerd_dictation", _SCRIPT_PATH)
-_mod = _loader.load_module()
 denoise_audio = _mod.denoise_audio
 
 TESTS_DIR = os.path.dirname(__file__)
@@ -37,22 +36,11 @@ def recognize_denoised(recognizer, wav_path, level):
     with wave.open(wav_path, "rb") as f:
         raw = f.readframes(f.getnframes())
         sr = f.getframerate()
-        sw = f.getsampwidth()
-        nc = f.getnchannels()
-
-    denoised = denoise_audio(raw, sr, level=level)
-
-    with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp:
-        tmp_path = tmp.name
-    with wave.open(tmp_path, "wb") as wf:
-        wf.setnchannels(nc)
-        wf.setsampwidth(sw)
-        wf.setframerate(sr)
-        wf.writeframes(denoised)
-
-    text = recognize_wav(recognizer, tmp_path)
-    os.unlink(tmp_path)
-    return text
+
+    # Denoise & recognize in memory (no temporary WAV round-trip).
+    samples = np.frombuffer(raw, dtype=np.int16).astype(np.float32) / 32768.0
+    denoised = np.frombuffer(denoise_audio(samples.tobytes(), sr, level=level, dtype="float32"), dtype=np.float32)
+    return recognize_samples(recognizer, denoised, sr)
 
 
 def main():
@@ -10,7 +10,6 @@ or:
     python tests/test_noise_reduction.py
 """
 
-import importlib.machinery
 import os
 import sys
 import unittest
@@ -19,14 +18,11 @@ import wave
 import numpy as np
 
 # ---------------------------------------------------------------------------
-# Import denoise_audio from the main script.
-#
-# nerd-dictation is a single executable script (no .py extension), so we use
-# SourceFileLoader - the same technique used in tests/from_words_to_digits.py.
+# Import denoise_audio from the package (in the repository root).
 # ---------------------------------------------------------------------------
-_SCRIPT_PATH = os.path.join(os.path.dirname(__file__), "..", "nerd-dictation")
-_loader = importlib.machinery.SourceFileLoader("nerd_dictation", _SCRIPT_PATH)
-_mod = _loader.load_module()
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from nerd_dictation import core as _mod  # noqa: E402
+
 denoise_audio = _mod.denoise_audio
 
 # ---------------------------------------------------------------------------
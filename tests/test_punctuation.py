@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+# SPDX-License-Identifier: GPL-2.0-or-later
+
+"""
+Unit tests for the punctuation stage (``--punctuation-model``), using a stand-in for the model.
+
+Run with:
+    python -m pytest tests/test_punctuation.py -v
+"""
+
+import os
+import sys
+import threading
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from nerd_dictation import core as _mod  # noqa: E402
+
+TextEmitter = _mod.TextEmitter
+PunctuationWorker = _mod.PunctuationWorker
+PunctuationSegments = _mod.PunctuationSegments
+punctuation_split = _mod.punctuation_split
+punctuate_batch = _mod.punctuate_batch
+
+
+class _Output:
+    """Simulate typing."""
+
+    def __init__(self):
+        self.text = ""
+
+    def __call__(self, delete_prev_chars, text):
+        if delete_prev_chars:
+            self.text = self.text[:-delete_prev_chars]
+        self.text += text
+
+
+def _punctuate(text):
+    # Capitalize & end with a full stop.
+    return text[:1].upper() + text[1:] + "."
+
+
+class _Worker:
+    """A worker which only returns results when released (for deterministic tests)."""
+
+    def __init__(self):
+        self.requests = []
+        self.ready = []
+
+    def submit(self, key, text):
+        self.requests.append((key, text))
+
+    def release(self, key):
+        self.ready += [(k, _punctuate(text)) for k, text in self.requests if k == key]
+
+    def results(self, timeout=0.0):
+        result, self.ready = self.ready, []
+        return result
+
+
+class TestPunctuationSplit(unittest.TestCase):
+    def test_split(self):
+        self.assertEqual(
+            punctuation_split(["hello world", "how are you"], "Hello, world. How are you?"),
+            ["Hello, world.", "How are you?"],
+        )
+
+    def test_split_without_spaces(self):
+        self.assertEqual(punctuation_split(["你好", "世界"], "你好，世界。"), ["你好，", "世界。"])
+
+    def test_split_mismatch(self):
+        self.assertIsNone(punctuation_split(["hello world"], "Hello, word."))
+        self.assertIsNone(punctuation_split(["hello world"], "Hello."))
+
+    def test_batch_falls_back_to_each_text(self):
+        calls = []
+
+        def punctuate_fn(text):
+            calls.append(text)
+            return text.replace("o", "0") if " " in text else text + "."
+
+        self.assertEqual(punctuate_batch(punctuate_fn, ["one", "two"]), ["one.", "two."])
+        self.assertEqual(calls, ["one two", "one", "two"])
+
+
+class TestPunctuationWorker(unittest.TestCase):
+    def test_batch_while_busy(self):
+        calls = []
+        busy = threading.Event()
+        release = threading.Event()
+
+        def punctuate_fn(text):
+            calls.append(text)
+            busy.set()
+            release.wait(5.0)
+            return _punctuate(text)
+
+        worker = PunctuationWorker(lambda: punctuate_fn)
+        worker.submit(0, "one")
+        self.assertTrue(busy.wait(5.0))
+        # Submitted while the model is busy, punctuated together.
+        worker.submit(1, "two")
+        worker.submit(2, "three")
+        release.set()
+        self.assertEqual(worker.results(5.0), [(0, "One."), (1, "Two"), (2, "three.")])
+        self.assertEqual(calls, ["one", "two three"])
+        self.assertEqual(worker.batch_count, 2)
+        worker.close()
+
+    def test_load_failure_keeps_text(self):
+        def punctuate_fn_create():
+            raise RuntimeError("no model")
+
+        worker = PunctuationWorker(punctuate_fn_create)
+        worker.submit(0, "one")
+        self.assertEqual(worker.results(5.0), [(0, "one")])
+        worker.close()
+
+
+class TestPunctuationSegments(unittest.TestCase):
+    def _segments(self, progressive_continuous=True, **kw):
+        out = _Output()
+        emitter = TextEmitter(out, **kw)
+        worker = _Worker()
+        segments = PunctuationSegments(worker, emitter, lambda text: " " + text, True, progressive_continuous, [])
+        return out, emitter, worker, segments
+
+    def _final(self, emitter, segments, text):
+        emitter.update(segments.text_prefix() + " " + text, False)
+        segments.add(text, " " + text)
+
+    def test_patch_while_speaking(self):
+        out, emitter, worker, segments = self._segments()
+        self._final(emitter, segments, "hello there")
+        emitter.update(segments.text_prefix() + " how", True)
+        worker.release(0)
+        segments.apply()
+        self.assertEqual(out.text, " Hello there. how")
+        # The punctuated segment is removed from the block.
+        self.assertEqual(emitter.text_emitted, " how")
+        self.assertEqual(segments.text_prefix(), "")
+
+    def test_patch_out_of_order(self):
+        out, emitter, worker, segments = self._segments()
+        self._final(emitter, segments, "one")
+        self._final(emitter, segments, "two")
+        worker.release(1)
+        segments.apply()
+        self.assertEqual(out.text, " one Two.")
+        self.assertEqual(segments.text_prefix(), " one Two.")
+        worker.release(0)
+        segments.apply()
+        self.assertEqual(out.text, " One. Two.")
+        self.assertEqual(emitter.text_emitted, "")
+
+    def test_patch_keeps_held_back_text(self):
+        out, emitter, worker, segments = self._segments(stable_partials=2)
+        self._final(emitter, segments, "one")
+        emitter.update(segments.text_prefix() + " two", True)
+        self.assertEqual(out.text, " one")
+        worker.release(0)
+        segments.apply()
+        self.assertEqual(out.text, " One.")
+        emitter.update(segments.text_prefix() + " two", False)
+        self.assertEqual(out.text, " One. two")
+
+    def test_cleared_results_ignored(self):
+        out, emitter, worker, segments = self._segments()
+        self._final(emitter, segments, "one")
+        segments.clear()
+        emitter.reset()
+        worker.release(0)
+        segments.apply()
+        self.assertEqual(out.text, " one")
+
+    def test_text_list(self):
+        out, emitter, worker, segments = self._segments(progressive_continuous=False)
+        segments.text_list += ["one", "two"]
+        segments.add("one", "")
+        segments.add("two", "")
+        worker.release(1)
+        segments.flush()
+        self.assertEqual(segments.text_list, ["one", "Two."])
+        self.assertEqual(out.text, " one Two.")
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
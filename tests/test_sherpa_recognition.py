@@ -13,18 +13,25 @@ MODEL_DIR = os.path.join(
 )
 
 
-def create_recognizer(model_dir=MODEL_DIR, hotwords_file="", hotwords_score=1.5):
+def create_recognizer(
+    model_dir=MODEL_DIR,
+    hotwords_file="",
+    hotwords_score=1.5,
+    num_threads=2,
+    rule1_min_trailing_silence=2.4,
+    rule2_min_trailing_silence=1.2,
+):
     kwargs = dict(
         encoder=os.path.join(model_dir, "encoder-epoch-99-avg-1.int8.onnx"),
         decoder=os.path.join(model_dir, "decoder-epoch-99-avg-1.onnx"),
         joiner=os.path.join(model_dir, "joiner-epoch-99-avg-1.int8.onnx"),
         tokens=os.path.join(model_dir, "tokens.txt"),
-        num_threads=2,
+        num_threads=num_threads,
         sample_rate=16000,
         feature_dim=80,
         enable_endpoint_detection=True,
-        rule1_min_trailing_silence=2.4,
-        rule2_min_trailing_silence=1.2,
+        rule1_min_trailing_silence=rule1_min_trailing_silence,
+        rule2_min_trailing_silence=rule2_min_trailing_silence,
         rule3_min_utterance_length=300,
     )
     if hotwords_file:
@@ -41,30 +48,51 @@ def create_recognizer(model_dir=MODEL_DIR, hotwords_file="", hotwords_score=1.5)
                 raise
 
 
+def recognize_samples(recognizer, samples, sample_rate, use_endpoints=False):
+    """
+    Recognize float32 mono ``samples`` (in memory, no WAV file needed).
+
+    When ``use_endpoints`` is true the stream is reset at each endpoint (as ``nerd-dictation`` does),
+    so the endpoint rule thresholds affect the result.
+    """
+    stream = recognizer.create_stream()
+    segments = []
+
+    def decode():
+        while recognizer.is_ready(stream):
+            recognizer.decode_stream(stream)
+        if use_endpoints and recognizer.is_endpoint(stream):
+            text = recognizer.get_result(stream).strip()
+            if text:
+                segments.append(text)
+            recognizer.reset(stream)
+
+    chunk_size = int(0.1 * sample_rate)
+    for i in range(0, len(samples), chunk_size):
+        stream.accept_waveform(sample_rate, samples[i:i + chunk_size])
+        decode()
+
+    tail_padding = np.zeros(int(0.5 * sample_rate), dtype=np.float32)
+    stream.accept_waveform(sample_rate, tail_padding)
+    decode()
+
+    text = recognizer.get_result(stream).strip()
+    if text:
+        segments.append(text)
+    return " ".join(segments)
+
+
 def recognize_wav(recognizer, wav_path):
     with wave.open(wav_path, "rb") as f:
         sample_rate = f.getframerate()
         num_channels = f.getnchannels()
-        sample_width = f.getsampwidth()
         raw = f.readframes(f.getnframes())
 
     samples = np.frombuffer(raw, dtype=np.int16).astype(np.float32) / 32768.0
     if num_channels > 1:
         samples = samples[::num_channels]
 
-    stream = recognizer.create_stream()
-    chunk_size = int(0.1 * sample_rate)
-    for i in range(0, len(samples), chunk_size):
-        stream.accept_waveform(sample_rate, samples[i:i + chunk_size])
-        while recognizer.is_ready(stream):
-            recognizer.decode_stream(stream)
-
-    tail_padding = np.zeros(int(0.5 * sample_rate), dtype=np.float32)
-    stream.accept_waveform(sample_rate, tail_padding)
-    while recognizer.is_ready(stream):
-        recognizer.decode_stream(stream)
-
-    return recognizer.get_result(stream).strip()
+    return recognize_samples(recognizer, samples, sample_rate)
 
 
 class TestSherpaRecognition(unittest.TestCase):
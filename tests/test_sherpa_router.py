@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# SPDX-License-Identifier: GPL-2.0-or-later
+
+"""
+Unit tests for routing between sherpa-onnx models (``--route-model``), using stand-in recognizers.
+
+Run with:
+    python -m pytest tests/test_sherpa_router.py -v
+"""
+
+import os
+import sys
+import threading
+import types
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from nerd_dictation import core as _mod  # noqa: E402
+
+SherpaRouter = _mod.SherpaRouter
+route_choose = _mod.route_choose
+
+
+class _Stream:
+    def __init__(self):
+        self.samples = 0
+
+    def accept_waveform(self, sample_rate, samples):
+        self.samples += len(samples)
+
+
+class _Recognizer:
+    """Recognize ``text`` with a fixed ``score`` once any audio has been accepted."""
+
+    def __init__(self, text, score, endpoint_samples=4):
+        self.text = text
+        self.score = score
+        self.endpoint_samples = endpoint_samples
+        self.threads = set()
+
+    def create_stream(self):
+        return _Stream()
+
+    def is_ready(self, stream):
+        self.threads.add(threading.get_ident())
+        return False
+
+    def decode_stream(self, stream):
+        pass
+
+    def get_result(self, stream):
+        return self.text if stream.samples else ""
+
+    def get_result_all(self, stream):
+        return types.SimpleNamespace(ys_probs=[self.score] if stream.samples else [])
+
+    def is_endpoint(self, stream):
+        return stream.samples >= self.endpoint_samples
+
+    def reset(self, stream):
+        stream.samples = 0
+
+
+class TestRouteChoose(unittest.TestCase):
+    def test_highest_score(self):
+        self.assertEqual(route_choose([("a", -2.0), ("b", -0.5), ("c", -1.0)], 0), 1)
+
+    def test_empty_text_ignored(self):
+        self.assertEqual(route_choose([("", -0.1), ("b", -3.0)], 0), 1)
+
+    def test_no_scores(self):
+        self.assertEqual(route_choose([("a", None), ("b", None)], 1), 1)
+        self.assertEqual(route_choose([("a", None), ("", None)], 1), 0)
+        self.assertEqual(route_choose([("", None), ("", None)], 1), 1)
+
+    def test_score_preferred(self):
+        self.assertEqual(route_choose([("a", None), ("b", -5.0)], 0), 1)
+
+
+class TestSherpaRouter(unittest.TestCase):
+    def test_single(self):
+        router = SherpaRouter([_Recognizer("hello", -1.0)])
+        router.accept_waveform(16000, [0.0] * 2)
+        self.assertEqual(router.result(), "hello")
+        self.assertFalse(router.is_endpoint())
+        self.assertEqual(router.result_final(), "hello")
+        router.close()
+
+    def test_route(self):
+        recognizers = [_Recognizer("ni hao", -2.0), _Recognizer("hello", -0.5, endpoint_samples=8)]
+        router = SherpaRouter(recognizers)
+        router.accept_waveform(16000, [0.0] * 4)
+        # Partial results & endpoints come from the 1st model until a segment has been routed.
+        self.assertEqual(router.result(), "ni hao")
+        self.assertTrue(router.is_endpoint())
+        self.assertEqual(router.result_final(), "hello")
+        router.reset()
+
+        # The chosen model is used for partial results & endpoints.
+        router.accept_waveform(16000, [0.0] * 4)
+        self.assertEqual(router.result(), "hello")
+        self.assertFalse(router.is_endpoint())
+        router.close()
+
+        # Each recognizer decodes on the thread pool.
+        self.assertNotIn(threading.get_ident(), recognizers[0].threads | recognizers[1].threads)
+
+    def test_score_unavailable(self):
+        # Older sherpa-onnx versions.
+        recognizer = types.SimpleNamespace(get_result=lambda stream: "hello")
+        self.assertIsNone(_mod.sherpa_result_score_or_none(recognizer, _Stream()))
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+# SPDX-License-Identifier: GPL-2.0-or-later
+
+"""
+Unit tests for the commands passed to each ``--simulate-input-tool``,
+the programs they run are replaced so none are required.
+
+Run with:
+    python -m pytest tests/test_simulate_input.py -v
+"""
+
+import contextlib
+import io
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from nerd_dictation import core as _mod  # noqa: E402
+
+SIMULATE_INPUT_CODE_COMMAND = _mod.SIMULATE_INPUT_CODE_COMMAND
+SIMULATE_INPUT_TOOLS = _mod.SIMULATE_INPUT_TOOLS
+
+
+class TestSimulateInputCommands(unittest.TestCase):
+    def test_commands(self):
+        with contextlib.ExitStack() as stack:
+            # Don't run any programs.
+            for obj, attr in (
+                (_mod, "run_command_or_exit_on_failure"),
+                (_mod.subprocess, "run"),
+                (_mod.subprocess, "Popen"),
+                (_mod.os, "kill"),
+                (_mod.DBusTextInput, "open"),
+                (_mod.DBusTextInput, "_call"),
+            ):
+                stack.enter_context(mock.patch.object(obj, attr))
+            stack.enter_context(contextlib.redirect_stdout(io.StringIO()))
+
+            for simulate_input_tool, handle_fn in SIMULATE_INPUT_TOOLS.items():
+                with self.subTest(simulate_input_tool=simulate_input_tool):
+                    handle_fn(SIMULATE_INPUT_CODE_COMMAND, "SETUP")
+                    handle_fn(0, "hello")
+                    handle_fn(SIMULATE_INPUT_CODE_COMMAND, "COMMIT")
+                    handle_fn(SIMULATE_INPUT_CODE_COMMAND, "TEARDOWN")
+                    # Setup again after tear-down (when resuming after being suspended).
+                    handle_fn(SIMULATE_INPUT_CODE_COMMAND, "SETUP")
+                    handle_fn(SIMULATE_INPUT_CODE_COMMAND, "COMMIT")
+                    handle_fn(SIMULATE_INPUT_CODE_COMMAND, "TEARDOWN")
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
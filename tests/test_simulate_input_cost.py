@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# SPDX-License-Identifier: GPL-2.0-or-later
+
+"""
+Unit tests for the SimulateInputCostModel class (used for ``--simulate-input-tool=YDOTOOL_AUTO``).
+
+Run with:
+    python -m pytest tests/test_simulate_input_cost.py -v
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from nerd_dictation import core as _mod  # noqa: E402
+
+SimulateInputCostModel = _mod.SimulateInputCostModel
+
+
+class TestSimulateInputCostModel(unittest.TestCase):
+    def test_short_ascii_is_typed(self):
+        cost = SimulateInputCostModel(type_per_char=0.01, paste_seconds=0.06)
+        self.assertFalse(cost.use_paste(""))
+        self.assertFalse(cost.use_paste("an"))
+
+    def test_long_ascii_is_pasted(self):
+        cost = SimulateInputCostModel(type_per_char=0.01, paste_seconds=0.06)
+        self.assertTrue(cost.use_paste("this is a much longer sentence"))
+
+    def test_non_ascii_is_pasted(self):
+        cost = SimulateInputCostModel(type_per_char=0.01, paste_seconds=10.0)
+        self.assertTrue(cost.use_paste("好"))
+        self.assertTrue(cost.use_paste("café"))
+
+    def test_measurements_change_the_choice(self):
+        cost = SimulateInputCostModel(type_per_char=0.01, paste_seconds=0.06)
+        text = "hello world"
+        self.assertTrue(cost.use_paste(text))
+        # Pasting is measured to be slow (the clipboard is slow to respond).
+        for _ in range(20):
+            cost.update_paste(0.5)
+        self.assertFalse(cost.use_paste(text))
+        # Typing is measured to be slow too.
+        for _ in range(20):
+            cost.update_type(len(text), cost.TYPE_OVERHEAD + len(text) * 0.1)
+        self.assertTrue(cost.use_paste(text))
+
+    def test_update_type_empty(self):
+        cost = SimulateInputCostModel(type_per_char=0.01)
+        cost.update_type(0, 1.0)
+        self.assertEqual(cost.type_per_char, 0.01)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
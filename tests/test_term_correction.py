@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+# SPDX-License-Identifier: GPL-2.0-or-later
+
+"""
+Unit tests for correcting terms from a term list (``--term-list``).
+
+Run with:
+    python -m pytest tests/test_term_correction.py -v
+"""
+
+import os
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from nerd_dictation import term_correction as _mod  # noqa: E402
+
+TermIndex = _mod.TermIndex
+deletes_from_word = _mod.deletes_from_word
+distance_osa = _mod.distance_osa
+syllable_fuzzy = _mod.syllable_fuzzy
+term_index_load = _mod.term_index_load
+terms_from_lines = _mod.terms_from_lines
+
+try:
+    import pypinyin
+except ImportError:
+    pypinyin = None
+
+TERM_LIST = (
+    "# Comments are ignored.\n"
+    "transformer\n"
+    "PostgreSQL\n"
+    "Kubernetes\n"
+    "GitHub\n"
+    "API\n"
+    "Python\n"
+    "interest\n"
+    "余弦 yu'xian 10\n"
+    "余弦相似度\n"
+    "梯度下降\n"
+    "注意力\n"
+)
+
+
+class TestUtilities(unittest.TestCase):
+    def test_distance(self):
+        for a, b, distance in (
+            ("abc", "abc", 0),
+            ("abc", "abd", 1),
+            ("abc", "acb", 1),
+            ("transformer", "transformar", 1),
+            ("kubernetes", "kubernets", 1),
+            ("abc", "", 3),
+        ):
+            with self.subTest(a=a, b=b):
+                self.assertEqual(distance_osa(a, b), distance)
+
+    def test_deletes(self):
+        self.assertEqual(deletes_from_word("abc", 1), {"abc", "bc", "ac", "ab"})
+        self.assertEqual(len(deletes_from_word("abcd", 2)), 1 + 4 + 6)
+
+    def test_syllable_fuzzy(self):
+        for syllable, syllable_expect in (
+            ("yú", "yu"),
+            ("zhōng", "zong"),
+            ("shàng", "san"),
+            ("shì", "si"),
+            ("lǜ", "lv"),
+            ("xing", "xin"),
+        ):
+            with self.subTest(syllable=syllable):
+                self.assertEqual(syllable_fuzzy(syllable), syllable_expect)
+
+    def test_terms_from_lines(self):
+        self.assertEqual(
+            list(terms_from_lines(iter(["# Comment", "", "post gres", "余弦 yu'xian 10", "余弦"]))),
+            [("post gres", "", 0), ("余弦", "yu'xian", 10), ("余弦", "", 0)],
+        )
+
+
+class TermIndexTestCase(unittest.TestCase):
+    index = TermIndex.from_terms(list(terms_from_lines(iter(TERM_LIST.splitlines()))), 2)
+
+    def assertCorrected(self, cases):
+        for text, text_expect in cases:
+            with self.subTest(text=text):
+                self.assertEqual(self.index.correct(text), text_expect)
+
+
+class TestCorrectLatin(TermIndexTestCase):
+    def test_corrected(self):
+        self.assertCorrected(
+            (
+                ("我们用 transformar 模型", "我们用 transformer 模型"),
+                ("kubernets cluster", "Kubernetes cluster"),
+                ("postgre sql", "PostgreSQL"),
+                ("git hub", "GitHub"),
+                ("the api is fine", "the API is fine"),
+                ("python's", "Python's"),
+                ("the intrest rate", "the interest rate"),
+            )
+        )
+
+    def test_unchanged(self):
+        self.assertCorrected(
+            (
+                ("I am fine and it is good", "I am fine and it is good"),
+                # Short words are only corrected when they match.
+                ("ape", "ape"),
+                ("transformation", "transformation"),
+                # Words aren't joined with words which are terms, common words or other characters.
+                ("a Python", "a Python"),
+                ("in the rest", "in the rest"),
+                ("git-hub", "git-hub"),
+                # Other forms of a term.
+                ("transform", "transform"),
+                ("pythons", "pythons"),
+                ("transformers", "transformers"),
+            )
+        )
+
+
+@unittest.skipIf(pypinyin is None, "requires pypinyin")
+class TestCorrectChinese(TermIndexTestCase):
+    def test_corrected(self):
+        self.assertCorrected(
+            (
+                ("鱼弦相似度很高", "余弦相似度很高"),
+                ("鱼弦 相似度", "余弦 相似度"),
+                ("计算鱼弦", "计算余弦"),
+                ("使用提督下降", "使用梯度下降"),
+            )
+        )
+
+    def test_unchanged(self):
+        self.assertCorrected(
+            (
+                ("就是这样", "就是这样"),
+                ("注意 力机制", "注意 力机制"),
+                # Words which sound like a term but have no characters in common.
+                ("于是", "于是"),
+            )
+        )
+
+    def test_mixed(self):
+        self.assertCorrected((("用 transformar 算鱼弦", "用 transformer 算余弦"),))
+
+
+class TestCorrectCommonWords(TermIndexTestCase):
+    index = TermIndex.from_terms(list(terms_from_lines(iter(["Rust", "Docker", "tensor", "Java"]))), 2)
+
+    def test_unchanged(self):
+        # Words within an edit of a term which are ordinary words.
+        self.assertCorrected(
+            (
+                ("i just must trust you", "i just must trust you"),
+                ("in the rest", "in the rest"),
+                ("the crust is hard", "the crust is hard"),
+                ("the locker room", "the locker room"),
+                ("censor", "censor"),
+                ("lava", "lava"),
+            )
+        )
+
+    def test_corrected(self):
+        self.assertCorrected(
+            (
+                ("rust and docker", "Rust and Docker"),
+                ("the tenzor shape", "the tensor shape"),
+                ("dokker compose", "Docker compose"),
+            )
+        )
+
+
+class TestTermIndexCache(unittest.TestCase):
+    def test_cache(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            term_list = os.path.join(tmp_dir, "terms.txt")
+            with open(term_list, "w", encoding="utf-8") as fh:
+                fh.write(TERM_LIST)
+            cache_dir_prev = os.environ.get("XDG_CACHE_HOME")
+            os.environ["XDG_CACHE_HOME"] = os.path.join(tmp_dir, "cache")
+            try:
+                index = term_index_load([term_list])
+                cache_files = os.listdir(os.path.join(tmp_dir, "cache", "nerd-dictation"))
+                self.assertEqual(len(cache_files), 1)
+                # Loaded from the cache.
+                index_cached = term_index_load([term_list])
+                self.assertEqual(index_cached.to_data(), index.to_data())
+                self.assertEqual(index_cached.correct("transformar"), "transformer")
+
+                # Changing the term list uses a new cache file.
+                with open(term_list, "a", encoding="utf-8") as fh:
+                    fh.write("numpy\n")
+                self.assertEqual(term_index_load([term_list]).correct("numpi"), "numpy")
+                self.assertEqual(len(os.listdir(os.path.join(tmp_dir, "cache", "nerd-dictation"))), 2)
+            finally:
+                if cache_dir_prev is None:
+                    del os.environ["XDG_CACHE_HOME"]
+                else:
+                    os.environ["XDG_CACHE_HOME"] = cache_dir_prev
+
+
+class TestTermIndexPerformance(unittest.TestCase):
+    def test_final(self):
+        terms = [("term{:d}word".format(i), "", 0) for i in range(2000)] + list(
+            terms_from_lines(iter(TERM_LIST.splitlines()))
+        )
+        index = TermIndex.from_terms(terms, 2)
+        text = "so we trained the transformar on the kubernets cluster 然后 计算 鱼弦相似度 using postgre sql"
+        time_beg = time.perf_counter()
+        for _ in range(20):
+            index.correct(text)
+        elapsed = (time.perf_counter() - time_beg) / 20
+        # Typically around a millisecond.
+        self.assertLess(elapsed, 0.02)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
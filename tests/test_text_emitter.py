@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# SPDX-License-Identifier: GPL-2.0-or-later
+
+"""
+Unit tests for the TextEmitter class (used for progressive output, ``--stable-partials`` & ``--stable-time``).
+
+Run with:
+    python -m pytest tests/test_text_emitter.py -v
+"""
+
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from nerd_dictation import core as _mod  # noqa: E402
+
+TextEmitter = _mod.TextEmitter
+
+
+class _Output:
+    """Simulate typing, recording the calls."""
+
+    def __init__(self):
+        self.text = ""
+        self.calls = []
+
+    def __call__(self, delete_prev_chars, text):
+        self.calls.append((delete_prev_chars, text))
+        if delete_prev_chars:
+            self.text = self.text[:-delete_prev_chars]
+        self.text += text
+
+
+class TestTextEmitterImmediate(unittest.TestCase):
+    def test_partials_typed_immediately(self):
+        out = _Output()
+        emitter = TextEmitter(out)
+        emitter.update("hello", True)
+        emitter.update("hello wold", True)
+        emitter.update("hello world", True)
+        emitter.update("hello word", False)
+        self.assertEqual(out.text, "hello word")
+        self.assertEqual(out.calls, [(0, "hello"), (0, " wold"), (2, "rld"), (2, "d")])
+        self.assertEqual((emitter.chars_typed, emitter.chars_deleted), (14, 4))
+
+    def test_reset_keeps_output(self):
+        out = _Output()
+        emitter = TextEmitter(out)
+        emitter.update("one", False)
+        emitter.reset()
+        emitter.update(" two", False)
+        self.assertEqual(out.text, "one two")
+
+
+class TestTextEmitterStablePartials(unittest.TestCase):
+    def test_unstable_tail_held_back(self):
+        out = _Output()
+        emitter = TextEmitter(out, stable_partials=2)
+        emitter.update("the cat", True)
+        self.assertEqual(out.text, "")
+        emitter.update("the car", True)
+        # "the ca" has been seen twice.
+        self.assertEqual(out.text, "the ca")
+        emitter.update("the cart", True)
+        self.assertEqual(out.text, "the car")
+        emitter.update("the cart is", False)
+        self.assertEqual(out.text, "the cart is")
+        # Nothing was deleted.
+        self.assertEqual(emitter.chars_deleted, 0)
+
+    def test_final_replaces_output(self):
+        out = _Output()
+        emitter = TextEmitter(out, stable_partials=1)
+        emitter.update("flower", True)
+        emitter.update("flour", False)
+        self.assertEqual(out.text, "flour")
+        self.assertEqual(emitter.report(), "Typed 8 characters, 3 deleted (1.60 typed for each character kept).\n")
+
+    def test_shorter_partial_keeps_output(self):
+        out = _Output()
+        emitter = TextEmitter(out, stable_partials=1)
+        emitter.update("hello there", True)
+        emitter.update("hello", True)
+        # The stable prefix is a prefix of the output, don't delete the tail (it may be re-recognized).
+        self.assertEqual(out.text, "hello there")
+        emitter.update("hello then", True)
+        self.assertEqual(out.text, "hello then")
+
+    def test_less_churn_than_immediate(self):
+        partials = ["I", "I scream", "ice", "ice cream", "ice cream is", "ice cream is cold"]
+        totals = []
+        for stable_partials in (0, 3):
+            out = _Output()
+            emitter = TextEmitter(out, stable_partials=stable_partials)
+            for text in partials:
+                emitter.update(text, True)
+            emitter.update(partials[-1], False)
+            self.assertEqual(out.text, partials[-1])
+            totals.append(emitter.chars_deleted)
+        self.assertLess(totals[1], totals[0])
+
+
+class TestTextEmitterStableTime(unittest.TestCase):
+    def test_stable_after_time(self):
+        out = _Output()
+        emitter = TextEmitter(out, stable_time=0.5)
+        with mock.patch.object(_mod.time, "monotonic", return_value=10.0):
+            emitter.update("hello", True)
+        self.assertEqual(out.text, "")
+        with mock.patch.object(_mod.time, "monotonic", return_value=10.25):
+            emitter.update("hello world", True)
+        self.assertEqual(out.text, "")
+        with mock.patch.object(_mod.time, "monotonic", return_value=10.5):
+            emitter.poll()
+        self.assertEqual(out.text, "hello")
+        with mock.patch.object(_mod.time, "monotonic", return_value=11.0):
+            emitter.poll()
+        self.assertEqual(out.text, "hello world")
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
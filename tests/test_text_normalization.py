@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+# SPDX-License-Identifier: GPL-2.0-or-later
+
+"""
+Unit tests for inverse text normalization (``--itn``).
+
+Run with:
+    python -m pytest tests/test_text_normalization.py -v
+"""
+
+import os
+import sys
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from nerd_dictation import core as _mod  # noqa: E402
+from nerd_dictation import text_normalization as _itn  # noqa: E402
+
+InverseTextNormalizer = _itn.InverseTextNormalizer
+en_cardinal_or_none = _itn.en_cardinal_or_none
+zh_cardinal_or_none = _itn.zh_cardinal_or_none
+process_text = _mod.process_text
+
+
+class NormalizeTestCase(unittest.TestCase):
+    normalizer = InverseTextNormalizer(["en", "zh"])
+
+    def assertNormalized(self, cases):
+        for text, text_expect in cases:
+            with self.subTest(text=text):
+                self.assertEqual(self.normalizer.apply(text), text_expect)
+
+
+class TestCardinal(unittest.TestCase):
+    def test_en(self):
+        for text, value in (
+            ("five", 5),
+            ("twenty one", 21),
+            ("twenty-one", 21),
+            ("one hundred and five", 105),
+            ("two thousand twenty six", 2026),
+            ("three million five hundred thousand", 3_500_000),
+            ("1,200", 1200),
+            # Invalid.
+            ("five six", None),
+            ("twenty twelve", None),
+            ("five and six", None),
+            ("hundred hundred", None),
+        ):
+            with self.subTest(text=text):
+                self.assertEqual(en_cardinal_or_none(text), value)
+
+    def test_zh(self):
+        for text, value in (
+            ("五", 5),
+            ("十五", 15),
+            ("二十", 20),
+            ("一百零五", 105),
+            ("一千零一", 1001),
+            ("三百五", 350),
+            ("两万五", 25_000),
+            ("十万", 100_000),
+            ("一亿两千万", 120_000_000),
+            ("12", 12),
+            # Invalid.
+            ("一五一十", None),
+            ("九九八十一", None),
+            ("一百十", None),
+            ("二零", None),
+        ):
+            with self.subTest(text=text):
+                self.assertEqual(zh_cardinal_or_none(text), value)
+
+
+class TestNormalizeEnglish(NormalizeTestCase):
+    def test_money(self):
+        self.assertNormalized(
+            (
+                ("it costs five dollars", "it costs $5"),
+                ("FIVE DOLLARS", "$5"),
+                ("five dollars and twenty cents", "$5.20"),
+                ("one hundred and five euros", "€105"),
+                ("a hundred dollars", "$100"),
+                ("it costs a thousand euros", "it costs €1000"),
+                ("a dollar", "a dollar"),
+                ("two point five million", "two point five million"),
+                ("twenty cents", "20¢"),
+            )
+        )
+
+    def test_percent(self):
+        self.assertNormalized(
+            (
+                ("fifty percent", "50%"),
+                ("two point five per cent", "2.5%"),
+            )
+        )
+
+    def test_time(self):
+        self.assertNormalized(
+            (
+                ("meet at three thirty pm", "meet at 3:30 pm"),
+                ("at ten a m", "at 10 am"),
+                ("ten fifteen a.m.", "10:15 am"),
+                ("seven oh five pm", "7:05 pm"),
+                ("three o'clock", "3:00"),
+            )
+        )
+
+    def test_date(self):
+        self.assertNormalized(
+            (
+                ("january first twenty twenty six", "january 1, 2026"),
+                ("june the twenty second", "june 22"),
+                ("march the twenty second twenty twenty", "march 22, 2020"),
+                ("may 3rd two thousand", "may 3, 2000"),
+                # Not a year.
+                ("may first one of us", "may 1 one of us"),
+                # Not a day.
+                ("march 0th", "march 0th"),
+                ("march 45th", "march 45th"),
+                # Not a date (a year is needed to follow "may the" or "march the").
+                ("may the fourth be with you", "may the fourth be with you"),
+                ("march the second battalion", "march the second battalion"),
+            )
+        )
+
+    def test_unit(self):
+        self.assertNormalized(
+            (
+                ("five kilometers", "5 km"),
+                ("two point five gigabytes", "2.5 GB"),
+                ("twenty degrees celsius", "20°C"),
+            )
+        )
+
+    def test_unchanged(self):
+        self.assertNormalized(
+            (
+                ("I am fine", "I am fine"),
+                ("wait a minute", "wait a minute"),
+                ("someone", "someone"),
+            )
+        )
+
+    def test_partial_match(self):
+        # When a match isn't valid, a match which starts later is used.
+        self.assertNormalized(
+            (
+                ("five and six dollars", "five and $6"),
+                ("twenty twenty and five percent", "twenty twenty and 5%"),
+            )
+        )
+
+
+class TestNormalizeChinese(NormalizeTestCase):
+    def test_time(self):
+        self.assertNormalized(
+            (
+                ("三点半", "3:30"),
+                ("三点十分", "3:10"),
+                ("三点零五分", "3:05"),
+                ("十一点一刻", "11:15"),
+                ("下午三点十五分", "下午3:15"),
+                ("下午三点", "下午3点"),
+                # Separated words.
+                ("下午 三 点 半", "下午3:30"),
+            )
+        )
+
+    def test_date(self):
+        self.assertNormalized(
+            (
+                ("二零二六年", "2026年"),
+                ("二〇二六年三月五号", "2026年3月5号"),
+                ("十二月三十一日", "12月31日"),
+            )
+        )
+
+    def test_money_percent_measure(self):
+        self.assertNormalized(
+            (
+                ("两块钱", "2块钱"),
+                ("三十元", "30元"),
+                ("百分之五十", "50%"),
+                ("百分之三点五", "3.5%"),
+                ("五公里", "5公里"),
+                ("他今年二十岁", "他今年20岁"),
+                ("三个月", "3个月"),
+            )
+        )
+
+    def test_numbers(self):
+        self.assertNormalized(
+            (
+                ("三点五", "3.5"),
+                ("一百二十三个人", "123个人"),
+                ("一千零一夜", "1001夜"),
+                ("一二三", "123"),
+            )
+        )
+
+    def test_unchanged(self):
+        # Words which contain numerals.
+        self.assertNormalized(
+            (
+                ("快一点", "快一点"),
+                ("一点一点地", "一点一点地"),
+                ("我们一块去", "我们一块去"),
+                ("一个月", "一个月"),
+                ("三三两两", "三三两两"),
+                ("一五一十", "一五一十"),
+                ("万一", "万一"),
+                ("千万不要", "千万不要"),
+                ("十分好", "十分好"),
+            )
+        )
+
+    def test_mixed(self):
+        self.assertNormalized((("下午三点半 it costs five dollars", "下午3:30 it costs $5"),))
+
+
+class TestNormalizer(unittest.TestCase):
+    def test_languages(self):
+        self.assertEqual(InverseTextNormalizer(["en"]).apply("三点半 five dollars"), "三点半 $5")
+        self.assertEqual(InverseTextNormalizer(["zh"]).apply("三点半 five dollars"), "3:30 five dollars")
+        self.assertEqual(InverseTextNormalizer([]).apply("five dollars"), "five dollars")
+        with self.assertRaises(ValueError):
+            InverseTextNormalizer(["unknown"])
+
+    def test_process_text(self):
+        normalize_fn = InverseTextNormalizer(["en"]).apply
+        # Applied before numbers are converted.
+        self.assertEqual(
+            process_text(
+                "twenty twenty and five dollars", numbers_as_digits=True, inverse_text_normalize_fn=normalize_fn
+            ),
+            "2020 and $5",
+        )
+
+
+class TestNormalizerPerformance(unittest.TestCase):
+    def test_partial(self):
+        normalizer = InverseTextNormalizer(["en", "zh"])
+        words = (
+            "so we meet on january first twenty twenty six at three thirty pm and it costs five dollars "
+            "我们 下午三点半 在 二零二六年 见面 花了 两块钱"
+        ).split()
+        # Each partial result is a little longer than the last.
+        partials = [" ".join(words[: i + 1]) for i in range(len(words))]
+        time_beg = time.perf_counter()
+        for _ in range(20):
+            for text in partials:
+                normalizer.apply(text)
+        elapsed = (time.perf_counter() - time_beg) / (20 * len(partials))
+        # Typically well under 100 micro-seconds.
+        self.assertLess(elapsed, 0.0005)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -9,6 +9,7 @@ export LD_LIBRARY_PATH="$NVIDIA_LIB/curand/lib:$NVIDIA_LIB/cufft/lib:$NVIDIA_LIB
 NERD_DICTATION="$HOME/Codes/VoiceTyping/nerd-dictation/nerd-dictation"
 MODEL_DIR="$HOME/Codes/VoiceTyping/vosk-models/sherpa-onnx-streaming-zipformer-bilingual-zh-en-2023-02-20"
 HOTWORDS="$HOME/Codes/VoiceTyping/nerd-dictation/hotwords.txt"
+METRICS="${XDG_RUNTIME_DIR:-/tmp}/nerd-dictation.prom"
 
 PID=$(pgrep -f "nerd-dictation begin" | head -1)
 
@@ -28,11 +29,15 @@ if [ -z "$PID" ]; then
         --continuous \
         --noise-reduction=0 \
         --timeout=3 \
+        --capture-stall-timeout=5 \
+        --suspend-trim-timeout=600 \
+        --metrics-file="$METRICS" \
         --debug-audio-dir="$HOME/Codes/VoiceTyping/nerd-dictation/debug_audio" \
         --hotwords-file="$HOTWORDS" &
 else
-    STATE=$(awk '/^State:/{print $2}' /proc/"$PID"/status 2>/dev/null)
-    if [ "$STATE" = "T" ]; then
+    # Read the state nerd-dictation reports (not the process state), since a suspended process
+    # briefly runs to release memory (see --suspend-trim-timeout).
+    if "$NERD_DICTATION" status --metrics-file="$METRICS" | grep -qx "state: suspended"; then
         kill -CONT "$PID"
         notify-send -t 1500 -u low "Voice Typing" "Recording"
     else